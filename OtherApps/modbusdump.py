@@ -11,6 +11,7 @@
 
 
 import getopt
+import json
 import os
 import sys
 import time
@@ -19,6 +20,8 @@ import time
 sys.path.append(os.path.dirname(sys.path[0]))  
 
 try:
+    from genmonlib.myscanner import RegisterScanner
+    from genmonlib.modbus_file import ModbusFile
     from genmonlib.mymodbus import ModbusProtocol
 except Exception as e1:
     print("\n\nThis program is used for the testing of modbus registers.")
@@ -124,6 +127,45 @@ def ModbusWrite():
     return True
 
 
+# ----------------ScanRegisters--------------------------------------------------
+# find the valid registers with block reads, read them Passes times and show
+# which registers changed
+def ScanRegisters(modbus, Passes):
+
+    try:
+        def WaitBetweenReads():
+            if DelayMS > 0:
+                time.sleep(DelayMS / 1000.0)
+            return False
+
+        Scanner = RegisterScanner(
+            modbus,
+            block_length=BlockLength,
+            wait=WaitBetweenReads,
+            isinput=UseInputReg,
+        )
+        print("Scanning registers %04x to %04x" % (startregister, endregister))
+        Scanner.Scan(startregister, endregister, Passes=Passes)
+        Results = Scanner.GetResults()
+        for Register, Value in Scanner.Registers.items():
+            print("%s:%s  changes: %d" % (Register, Value, Scanner.Changes.get(Register, 0)))
+        print("\nInvalid registers: " + ", ".join(Results["Invalid"]))
+        if len(Scanner.NoResponse):
+            print("No response: " + ", ".join(Scanner.NoResponse))
+        print(
+            "\n%d valid registers, %d reads, %d passes, %s"
+            % (len(Scanner.Registers), Results["Reads"], Results["Passes"], Results["Scan Time"])
+        )
+        if OutputFile != None:
+            with open(OutputFile, "w") as ResultsFile:
+                json.dump(Results, ResultsFile, indent=4)
+            print("Results written to " + OutputFile)
+    except Exception as e1:
+        print("Error scanning device: " + str(e1))
+        return False
+    return True
+
+
 # ----------------DisplayComErrors-----------------------------------------------
 def DisplayComErrors(modbusdevice):
 
@@ -185,6 +227,9 @@ if __name__ == "__main__":  #
     SingleRegWrites = False
     DelayMS = 0.0
     Length = 1
+    ScanPasses = None
+    SimulationFile = None
+    OutputFile = None
 
     HelpStr = "\npython3 mobusdump.py -r <Baud Rate> -p <serial port> -a <modbus address to query> -s <start modbus register>  -e <end modbus register>\n"
     HelpStr += "\n   Example: python3 modbusdump.py -r 9600 -p /dev/serial0 -a 9d -s 5 -e 100 \n"
@@ -206,13 +251,17 @@ if __name__ == "__main__":  #
     HelpStr += "\n      -u  use single register writes for holding (modbus function 0x06) and coil writes (modbus fuction 0x05)"
     HelpStr += "\n      -d  delay between modbus requests in milliseconds (e.g. 10 for 10 ms)"
     HelpStr += "\n      -l  length of each read. 16 bit incriments. Use 1 for 16 bit, 2 for 32 bit, 3 for 48 bit, etc"
+    HelpStr += "\n      -k  scan with block reads to find the valid registers, then read them this many times in total to find registers that change"
+    HelpStr += "\n          -l is the maximum block length when scanning (default 32)"
+    HelpStr += "\n      -f  read registers from a register file (genmon simulation file) instead of a device"
+    HelpStr += "\n      -o  write the scan results to this file (JSON, can be used with -f)"
     HelpStr += "\n\n     Default read and write use holding registers (modbus fuction 0x03 and 0x10)"
     HelpStr += "\n \n"
 
     try:
         opts, args = getopt.getopt(
             sys.argv[1:],
-            "ucnmbhr:p:s:e:a:x:w:i:t:d:l:",
+            "ucnmbhr:p:s:e:a:x:w:i:t:d:l:k:f:o:",
             [
                 "rate=",
                 "port=",
@@ -292,13 +341,28 @@ if __name__ == "__main__":  #
             elif opt in ("-l", "--length"):
                 Length = int(arg)
                 print(f"Length: {Length}")
+            elif opt in ("-k", "--scan"):
+                ScanPasses = max(1, int(arg))
+                print(f"Scan Passes: {ScanPasses}")
+            elif opt in ("-f", "--file"):
+                SimulationFile = arg
+                print("Register File : " + SimulationFile)
+            elif opt in ("-o", "--output"):
+                OutputFile = arg
+                print("Output File : " + OutputFile)
 
     except Exception as e1:
         print("\nError parsing command line: " + str(e1) + "\n")
         print(HelpStr)
         sys.exit(2)
 
-    if TCPport != None and hostIP != None:
+    BlockLength = Length if Length > 1 else 32
+    if SimulationFile != None:
+        if ScanPasses == None:
+            ScanPasses = 1
+        if modbusaddress == None:
+            modbusaddress = 0x9D
+    elif TCPport != None and hostIP != None:
         useTCP = True
         print("Using serial over TCP.")
     elif (
@@ -340,7 +404,13 @@ if __name__ == "__main__":  #
     try:
         modbus = None
 
-        if writevalue != None and modbusaddress != "all":
+        if SimulationFile != None:
+            modbus = ModbusFile(RegisterResults, inputfile=SimulationFile)
+            modbus.SimulateTime = False
+            ScanRegisters(modbus, ScanPasses)
+            DisplayComErrors(modbus)
+
+        elif writevalue != None and modbusaddress != "all":
             if not ModbusWrite():
                 sys.exit(2)
 
@@ -367,15 +437,19 @@ if __name__ == "__main__":  #
             except Exception as e1:
                 print("Error opening serial device...: " + str(e1))
                 sys.exit(2)
-            try:
-                for Reg in range(startregister, endregister, Length):
-                    RegStr = "%04x" % Reg
-                    modbus.ProcessTransaction(RegStr, Length, IsCoil = UseCoils, IsInput = UseInputReg)
-                    if DelayMS > 0:
-                        time.sleep(DelayMS / 1000.0)
-            except Exception as e1:
-                print("Error reading device: " + str(e1))
-                sys.exit(2)
+            if ScanPasses != None:
+                if not ScanRegisters(modbus, ScanPasses):
+                    sys.exit(2)
+            else:
+                try:
+                    for Reg in range(startregister, endregister, Length):
+                        RegStr = "%04x" % Reg
+                        modbus.ProcessTransaction(RegStr, Length, IsCoil = UseCoils, IsInput = UseInputReg)
+                        if DelayMS > 0:
+                            time.sleep(DelayMS / 1000.0)
+                except Exception as e1:
+                    print("Error reading device: " + str(e1))
+                    sys.exit(2)
 
             DisplayComErrors(modbus)
         else:
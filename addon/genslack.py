@@ -216,6 +216,26 @@ def SendNotice(Message):
         return False
 
 
+# ----------  ReloadSettings ----------------------------------------------------
+# called when genslack.conf is changed (see MySupport.SetupConfigReload)
+def ReloadSettings():
+
+    global webhook_url, channel, username, icon_emoji, title_link
+
+    Settings = [
+        config.ReadValue("webhook_url", default=None, live=True),
+        config.ReadValue("channel", default=None, live=True),
+        config.ReadValue("username", default=None, live=True),
+        config.ReadValue("icon_emoji", default=":red_circle:", live=True),
+        config.ReadValue("title_link", default=None, live=True),
+    ]
+    for Value in Settings:
+        if Value == None or not len(Value):
+            log.error("Error: invalid setting in genslack.conf, settings not changed")
+            return
+    webhook_url, channel, username, icon_emoji, title_link = Settings
+
+
 # ------------------- Command-line interface for gengpio ------------------------
 if __name__ == "__main__":
 
@@ -238,11 +258,11 @@ if __name__ == "__main__":
             log=log,
         )
 
-        webhook_url = config.ReadValue("webhook_url", default=None)
-        channel = config.ReadValue("channel", default=None)
-        username = config.ReadValue("username", default=None)
-        icon_emoji = config.ReadValue("icon_emoji", default=":red_circle:")
-        title_link = config.ReadValue("title_link", default=None)
+        webhook_url = config.ReadValue("webhook_url", default=None, live=True)
+        channel = config.ReadValue("channel", default=None, live=True)
+        username = config.ReadValue("username", default=None, live=True)
+        icon_emoji = config.ReadValue("icon_emoji", default=":red_circle:", live=True)
+        title_link = config.ReadValue("title_link", default=None, live=True)
 
         if webhook_url == None or not len(webhook_url):
             log.error("Error: invalid webhoot_url setting")
@@ -301,6 +321,7 @@ if __name__ == "__main__":
             console=console,
             config=config,
         )
+        MySupport.SetupConfigReload(config, ReloadSettings, log)
 
         while True:
             time.sleep(1)
@@ -10,12 +10,19 @@
 
 import getopt
 import os
+import select
+import signal
 import subprocess
 import sys
 import time
 from shutil import copyfile, move
 from subprocess import PIPE, Popen
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 try:
     from genmonlib.myconfig import MyConfig
     from genmonlib.mylog import SetupLogger
@@ -53,6 +60,19 @@ class Loader(MySupport):
         self.NewInstall = False
         self.Upgrade = False
         self.version = None
+        self.Supervise = False  # keep running and restart modules that exit
+        self.Children = {}  # section name : dict of the module process info
+        self.SupervisorStopping = False
+        self.SupervisorRestart = False  # set by SIGHUP (genloader -s)
+        # self-pipe used to wake the supervisor from the signal handler, a
+        # lock (i.e. threading.Event) can not be used in a signal handler
+        self.SupervisorWakeFD = None
+        self.RestartDelayMin = 2  # seconds, doubled each time a module exits
+        self.RestartDelayMax = 300
+        self.StableTime = 600  # a module that ran this long is restarted quickly
+        self.DaemonFD = None
+        self.LogLocation = loglocation
+        self.ModuleOutputMax = 1000000  # bytes, size of the module output files
 
         if sys.version_info[0] < 3:
             self.pipProgram = "pip2"
@@ -155,7 +175,13 @@ class Loader(MySupport):
             self.Maintenance()
 
             if self.Start:
+                if self.Supervise and not self.bSystemIsNotLinux:
+                    # returns in the background process
+                    self.Daemonize()
                 self.StartModules()
+                if self.DaemonFD != None:
+                    self.DaemonStarted()
+                    self.Supervisor()
         except Exception as e1:
             self.LogErrorLine("Error in init: " + str(e1))
 
@@ -1127,6 +1153,11 @@ class Loader(MySupport):
                     TempDict["pid"] = 0
 
                 self.CachedConfig[SectionName] = TempDict
+
+            self.config.SetSection("genloader")
+            self.Supervise = self.config.ReadValue(
+                "supervise", return_type=bool, default=False, NoLog=True
+            )
             return True
 
         except Exception as e1:
@@ -1226,61 +1257,398 @@ class Loader(MySupport):
             self.LogInfo("Error, nothing to start.")
             return False
         ErrorOccured = False
-        for Module in reversed(self.LoadOrder):
-            try:
-                if self.CachedConfig[Module]["enable"]:
-                    modulepath = self.GetModulePath(
-                        self.ModulePath, self.CachedConfig[Module]["module"]
+        try:
+            StartList = []
+            for Module in reversed(self.LoadOrder):
+                if not self.CachedConfig[Module]["enable"]:
+                    continue
+                modulepath = self.GetModulePath(
+                    self.ModulePath, self.CachedConfig[Module]["module"]
+                )
+                if modulepath == None:
+                    continue
+                StartList.append([Module, modulepath])
+
+            if not multi_instance:
+                # check that the modules are not loaded already, if they are
+                # then force them (hard) to unload
+                self.StopRunningInstances([Module for Module, modulepath in StartList])
+
+            # Modules are started without waiting for each other. A module with
+            # a postloaddelay (i.e. genmon) must be ready before the modules
+            # after it in the load order are started, wait until it signals it
+            # is ready or the delay passes.
+            for Module, modulepath in StartList:
+                PostLoadDelay = self.CachedConfig[Module]["postloaddelay"]
+                if PostLoadDelay == None:
+                    PostLoadDelay = 0
+                ReadFD = WriteFD = None
+                if (
+                    PostLoadDelay > 0
+                    and not self.bSysetmIsWindows
+                    and sys.version_info[0] >= 3
+                ):
+                    ReadFD, WriteFD = os.pipe()
+                process = self.LoadModule(
+                    modulepath,
+                    self.CachedConfig[Module]["module"],
+                    args=self.CachedConfig[Module]["args"],
+                    ReadyFD=WriteFD,
+                )
+                if process == None:
+                    self.LogInfo("Error starting " + Module)
+                    ErrorOccured = True
+                else:
+                    self.Children[Module] = {
+                        "process": process,
+                        "path": modulepath,
+                        "started": time.time(),
+                        "delay": 0,
+                        "restart": None,
+                    }
+                if PostLoadDelay > 0:
+                    if ReadFD != None:
+                        self.WaitForReady(Module, ReadFD, PostLoadDelay)
+                    else:
+                        time.sleep(PostLoadDelay)
+        except Exception as e1:
+            self.LogInfo("Error starting modules: " + str(e1), LogLine=True)
+            return False
+        return not ErrorOccured
+
+    # ---------------------------------------------------------------------------
+    # wait for a module to write to the ready pipe, returns True if it is ready
+    def WaitForReady(self, Module, ReadFD, Timeout):
+
+        try:
+            Ready = False
+            StartTime = time.time()
+            while True:
+                Remaining = Timeout - (time.time() - StartTime)
+                if Remaining <= 0:
+                    break
+                Readable, _, _ = select.select([ReadFD], [], [], Remaining)
+                if not len(Readable):
+                    break
+                # empty if the module exited (or closed the pipe)
+                Ready = len(os.read(ReadFD, 1)) > 0
+                break
+            if Ready:
+                self.LogConsole(
+                    "%s ready in %.1f seconds" % (Module, time.time() - StartTime)
+                )
+            return Ready
+        except Exception as e1:
+            self.LogInfo("Error waiting for " + Module + ": " + str(e1), LogLine=True)
+            return False
+        finally:
+            os.close(ReadFD)
+
+    # ---------------------------------------------------------------------------
+    # return a dict of module file name : list of PIDs for the modules that are
+    # running, one scan of the process table for all modules
+    def GetRunningModules(self):
+
+        Running = {}
+        try:
+            import psutil
+        except:
+            # psutil is not installed, use the PIDs genloader saved
+            for Module, Settings in self.CachedConfig.items():
+                if Settings["module"] != None and self.PIDIsRunning(
+                    Settings["pid"], Settings["module"]
+                ):
+                    Running.setdefault(Settings["module"], []).append(
+                        Settings["pid"]
                     )
-                    if modulepath == None:
-                        continue
+            return Running
+        for q in psutil.process_iter():
+            try:
+                if q.name().lower().startswith("python") and q.pid != os.getpid():
+                    CmdLine = q.cmdline()
+                    if len(CmdLine) > 1:
+                        Running.setdefault(os.path.basename(CmdLine[1]), []).append(
+                            q.pid
+                        )
+            except Exception as e1:
+                continue  # the process exited
+        return Running
 
-                    if not multi_instance:
-                        # check that module is not loaded already, if it is then force it (hard) to unload
-                        attempts = 0
-                        while True:
-                            if MySupport.IsRunning(
-                                prog_name=self.CachedConfig[Module]["module"],
-                                log=self.log,
-                                multi_instance=multi_instance,
-                            ):
-                                # if loaded then kill it
-                                if attempts >= 4:
-                                    # kill it
-                                    if not self.UnloadModule(
-                                        self.CachedConfig[Module]["module"],
-                                        pid=None,
-                                        HardStop=True,
-                                        UsePID=False,
-                                    ):
-                                        self.LogInfo(
-                                            "Error killing "
-                                            + self.CachedConfig[Module]["module"]
-                                        )
-                                else:
-                                    attempts += 1
-                                    time.sleep(1)
-                            else:
-                                break
+    # ---------------------------------------------------------------------------
+    def PIDIsRunning(self, pid, modulename=None):
 
-                    if not self.LoadModule(
-                        modulepath,
-                        self.CachedConfig[Module]["module"],
-                        args=self.CachedConfig[Module]["args"],
-                    ):
-                        self.LogInfo("Error starting " + Module)
-                        ErrorOccured = True
-                    if (
-                        not self.CachedConfig[Module]["postloaddelay"] == None
-                        and self.CachedConfig[Module]["postloaddelay"] > 0
+        try:
+            if pid == None or pid == "" or pid == 0:
+                return False
+            if self.bSystemIsNotLinux:
+                import psutil
+
+                return psutil.pid_exists(int(pid))
+            with open("/proc/%d/cmdline" % int(pid), "rb") as CmdFile:
+                CmdLine = CmdFile.read()
+            if not len(CmdLine):
+                return False  # exited, not reaped yet
+            if modulename == None:
+                return True
+            return modulename.encode("utf-8") in CmdLine
+        except Exception as e1:
+            return False
+
+    # ---------------------------------------------------------------------------
+    # wait (up to four seconds) for instances of the modules that are stopping,
+    # then force any that are still running to unload
+    def StopRunningInstances(self, ModuleList):
+
+        try:
+            Running = self.GetRunningModules()
+            Instances = []
+            for Module in ModuleList:
+                modulename = self.CachedConfig[Module]["module"]
+                for pid in Running.get(modulename, []):
+                    Instances.append([modulename, pid])
+            if not len(Instances):
+                return
+            StartTime = time.time()
+            while time.time() - StartTime < 4:
+                if not any(
+                    self.PIDIsRunning(pid, modulename) for modulename, pid in Instances
+                ):
+                    return
+                time.sleep(0.2)
+            for modulename, pid in Instances:
+                if self.PIDIsRunning(pid, modulename):
+                    if not self.UnloadModule(
+                        modulename, pid=pid, HardStop=True, UsePID=True
                     ):
-                        time.sleep(self.CachedConfig[Module]["postloaddelay"])
+                        self.LogInfo("Error killing " + modulename)
+        except Exception as e1:
+            self.LogInfo("Error in StopRunningInstances: " + str(e1), LogLine=True)
+
+    # ---------------------------------------------------------------------------
+    # fork, the foreground process exits when the background process has
+    # started the modules so startgenmon.sh returns as it did before
+    def Daemonize(self):
+
+        ReadFD, WriteFD = os.pipe()
+        pid = os.fork()
+        if pid != 0:
+            os.close(WriteFD)
+            try:
+                Status = os.read(ReadFD, 1)
             except Exception as e1:
+                Status = b""
+            os._exit(0 if Status == b"1" else 1)
+        os.close(ReadFD)
+        os.setsid()
+        self.DaemonFD = WriteFD
+
+    # ---------------------------------------------------------------------------
+    # tell the foreground process the modules are started
+    def DaemonStarted(self):
+
+        try:
+            # do not keep the console (or the pipe of the caller) open
+            NullFD = os.open(os.devnull, os.O_RDWR)
+            for fd in [0, 1, 2]:
+                os.dup2(NullFD, fd)
+            os.close(NullFD)
+            os.write(self.DaemonFD, b"1")
+            os.close(self.DaemonFD)
+        except Exception as e1:
+            self.LogInfo("Error in DaemonStarted: " + str(e1), LogLine=True)
+
+    # ---------------------------------------------------------------------------
+    def SupervisorSignal(self, signum, frame):
+
+        if signum == signal.SIGHUP:
+            self.SupervisorRestart = True
+        elif signum != signal.SIGCHLD:
+            self.SupervisorStopping = True
+        try:
+            os.write(self.SupervisorWakeFD[1], b"1")
+        except Exception as e1:
+            # the pipe is full, the supervisor is already woken
+            pass
+
+    # ---------------------------------------------------------------------------
+    # restart modules that exit, until genloader is told to stop
+    def Supervisor(self):
+
+        try:
+            self.SupervisorWakeFD = os.pipe()
+            for fd in self.SupervisorWakeFD:
+                Flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+                fcntl.fcntl(fd, fcntl.F_SETFL, Flags | os.O_NONBLOCK)
+                Flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+                fcntl.fcntl(fd, fcntl.F_SETFD, Flags | fcntl.FD_CLOEXEC)
+            signal.signal(signal.SIGTERM, self.SupervisorSignal)
+            signal.signal(signal.SIGINT, self.SupervisorSignal)
+            signal.signal(signal.SIGCHLD, self.SupervisorSignal)
+            signal.signal(signal.SIGHUP, self.SupervisorSignal)
+            self.WriteSupervisorPID(os.getpid())
+            self.LogInfo("Supervising %d modules" % len(self.Children))
+            while not self.SupervisorStopping:
+                if self.SupervisorRestart:
+                    self.SupervisorRestart = False
+                    self.RestartChildren()
+                Timeout = self.CheckChildren()
+                if self.SupervisorStopping or self.SupervisorRestart:
+                    continue
+                self.WaitForSignal(Timeout)
+            self.LogInfo("Supervisor stopped")
+        except Exception as e1:
+            self.LogInfo("Error in Supervisor: " + str(e1), LogLine=True)
+        finally:
+            self.WriteSupervisorPID("")
+
+    # ---------------------------------------------------------------------------
+    # wait up to Timeout seconds for a signal, the data in the wake pipe is
+    # discarded since the flags set by SupervisorSignal say what to do
+    def WaitForSignal(self, Timeout):
+
+        ReadFD = self.SupervisorWakeFD[0]
+        try:
+            Readable, _, _ = select.select([ReadFD], [], [], Timeout)
+        except (select.error, OSError) as e1:
+            # interrupted by a signal (python 2), the loop checks the flags
+            return
+        if not len(Readable):
+            return
+        try:
+            while len(os.read(ReadFD, 512)):
+                pass
+        except Exception as e1:
+            # no more data
+            pass
+
+    # ---------------------------------------------------------------------------
+    # stop the modules and start them again (genloader -s while the supervisor
+    # is running). The config is read again so changes to the enabled modules
+    # are used.
+    def RestartChildren(self):
+
+        try:
+            self.LogInfo("Restarting modules")
+            self.config = MyConfig(
+                filename=self.configfile, section="genmon", log=self.log
+            )
+            if not self.GetConfig():
+                self.LogInfo("Error reading config file, modules not restarted")
+                return
+            self.LoadOrder = self.GetLoadOrder()
+            Children = self.Children
+            self.Children = {}
+            self.StopModules()
+            for Module, Child in Children.items():
+                try:
+                    # collect the exit status
+                    Child["process"].wait(10)
+                except Exception as e1:
+                    self.LogInfo("Error waiting for " + Module + ": " + str(e1))
+            self.StartModules()
+        except Exception as e1:
+            self.LogInfo("Error in RestartChildren: " + str(e1), LogLine=True)
+
+    # ---------------------------------------------------------------------------
+    # restart modules that have exited, returns the number of seconds until the
+    # next restart is due
+    def CheckChildren(self):
+
+        Now = time.time()
+        Timeout = 60
+        for Module, Child in self.Children.items():
+            try:
+                if Child["restart"] != None:
+                    if Now < Child["restart"]:
+                        Timeout = min(Timeout, Child["restart"] - Now)
+                        continue
+                    process = self.LoadModule(
+                        Child["path"],
+                        self.CachedConfig[Module]["module"],
+                        args=self.CachedConfig[Module]["args"],
+                    )
+                    if process == None:
+                        Child["delay"] = min(Child["delay"] * 2, self.RestartDelayMax)
+                        Child["restart"] = Now + Child["delay"]
+                        Timeout = min(Timeout, Child["delay"])
+                        continue
+                    Child["process"] = process
+                    Child["started"] = Now
+                    Child["restart"] = None
+                    continue
+                ReturnCode = Child["process"].poll()
+                if ReturnCode == None:
+                    continue
+                if Child["delay"] == 0 or Now - Child["started"] >= self.StableTime:
+                    Child["delay"] = self.RestartDelayMin
+                else:
+                    Child["delay"] = min(Child["delay"] * 2, self.RestartDelayMax)
+                Child["restart"] = Now + Child["delay"]
+                Timeout = min(Timeout, Child["delay"])
                 self.LogInfo(
-                    "Error starting module " + Module + " : " + str(e1), LogLine=True
+                    "%s exited (%s), restarting in %d seconds"
+                    % (Module, str(ReturnCode), Child["delay"])
                 )
-                return False
-        return not ErrorOccured
+            except Exception as e1:
+                self.LogInfo("Error checking " + Module + ": " + str(e1), LogLine=True)
+        return Timeout
+
+    # ---------------------------------------------------------------------------
+    def WriteSupervisorPID(self, pid):
+
+        try:
+            self.config.WriteValue("pid", str(pid), section="genloader")
+        except Exception as e1:
+            self.LogInfo("Error writing supervisor PID: " + str(e1))
+
+    # ---------------------------------------------------------------------------
+    # return the PID of a running genloader supervisor, or 0
+    @staticmethod
+    def GetSupervisorPID(ConfigFilePath, log=None):
+
+        try:
+            if not "linux" in sys.platform:
+                return 0
+            config = MyConfig(
+                filename=os.path.join(ConfigFilePath, "genloader.conf"),
+                section="genloader",
+                log=log,
+            )
+            pid = config.ReadValue("pid", return_type=int, default=0, NoLog=True)
+            if not pid or pid == os.getpid():
+                return 0
+            # make sure the PID is still genloader
+            try:
+                with open("/proc/%d/cmdline" % pid, "rb") as CmdFile:
+                    if not b"genloader" in CmdFile.read():
+                        return 0
+            except Exception as e1:
+                return 0
+            return pid
+        except Exception as e1:
+            if log != None:
+                log.error("Error in GetSupervisorPID: " + str(e1))
+            return 0
+
+    # ---------------------------------------------------------------------------
+    # stop a running genloader supervisor so it does not restart the modules
+    # that are being stopped
+    @staticmethod
+    def StopSupervisor(ConfigFilePath, log=None):
+
+        try:
+            pid = Loader.GetSupervisorPID(ConfigFilePath, log=log)
+            if not pid:
+                return
+            os.kill(pid, signal.SIGTERM)
+            for _ in range(50):
+                if not os.path.isdir("/proc/%d" % pid):
+                    return
+                time.sleep(0.1)
+            os.kill(pid, signal.SIGKILL)
+        except Exception as e1:
+            if log != None:
+                log.error("Error in StopSupervisor: " + str(e1))
 
     # ---------------------------------------------------------------------------
     def LoadModuleAlt(self, modulename, args=None):
@@ -1300,7 +1668,9 @@ class Loader(MySupport):
             return False
 
     # ---------------------------------------------------------------------------
-    def LoadModule(self, path, modulename, args=None):
+    # returns the process (subprocess.Popen) or None. If ReadyFD is given it is
+    # passed to the module in GENMON_READY_FD (see MySupport.SignalReady)
+    def LoadModule(self, path, modulename, args=None, ReadyFD=None):
         try:
             try:
                 import os
@@ -1320,13 +1690,21 @@ class Loader(MySupport):
 
                 DEVNULL = open(os.devnull, "wb")
 
-            if not len(args):
+            if args != None and not len(args):
                 args = None
 
-            if "genserv.py" in modulename:
-                OutputStream = DEVNULL
+            # the supervisor does not read the output of the modules, it is
+            # kept in a file so errors (i.e. a traceback) can be seen
+            OutputFile = None
+            if self.Supervise:
+                OutputFile = self.OpenModuleOutput(modulename)
+            if OutputFile != None:
+                OutputStream = OutputFile
+                InputStream = DEVNULL
+            elif "genserv.py" in modulename or self.Supervise:
+                OutputStream = InputStream = DEVNULL
             else:
-                OutputStream = subprocess.PIPE
+                OutputStream = InputStream = subprocess.PIPE
 
             executelist = [sys.executable, fullmodulename]
             if args != None:
@@ -1334,20 +1712,64 @@ class Loader(MySupport):
             # This will make all the programs use the same config files
             executelist.extend(["-c", self.ConfigFilePath])
             # close_fds=True
-            pid = subprocess.Popen(
-                executelist,
-                stdout=OutputStream,
-                stderr=OutputStream,
-                stdin=OutputStream,
-            )
-            return self.UpdatePID(modulename, pid.pid)
+            if ReadyFD != None:
+                env = os.environ.copy()
+                env["GENMON_READY_FD"] = str(ReadyFD)
+                try:
+                    process = subprocess.Popen(
+                        executelist,
+                        stdout=OutputStream,
+                        stderr=OutputStream,
+                        stdin=InputStream,
+                        env=env,
+                        pass_fds=(ReadyFD,),
+                    )
+                finally:
+                    os.close(ReadyFD)
+                    if OutputFile != None:
+                        OutputFile.close()
+            else:
+                try:
+                    process = subprocess.Popen(
+                        executelist,
+                        stdout=OutputStream,
+                        stderr=OutputStream,
+                        stdin=InputStream,
+                    )
+                finally:
+                    if OutputFile != None:
+                        OutputFile.close()
+            if not self.UpdatePID(modulename, process.pid):
+                return None
+            return process
 
         except Exception as e1:
             self.LogInfo(
                 "Error loading module " + path + ": " + modulename + ": " + str(e1),
                 LogLine=True,
             )
-            return False
+            return None
+
+    # ---------------------------------------------------------------------------
+    # open the file in the log folder that gets the output of a supervised
+    # module, it is started again when it is larger than ModuleOutputMax.
+    # Returns None on error.
+    def OpenModuleOutput(self, modulename):
+
+        try:
+            FileName = os.path.join(
+                self.LogLocation, os.path.splitext(modulename)[0] + "_output.log"
+            )
+            Mode = "ab"
+            if (
+                os.path.isfile(FileName)
+                and os.path.getsize(FileName) > self.ModuleOutputMax
+            ):
+                Mode = "wb"
+            return open(FileName, Mode)
+        except Exception as e1:
+            self.LogInfo("Error opening output file for " + modulename + ": " + str(e1))
+            return None
 
     # ---------------------------------------------------------------------------
     def UnloadModule(self, modulename, pid=None, HardStop=False, UsePID=False):
@@ -1477,6 +1899,17 @@ if __name__ == "__main__":
         ConfigFilePath, log=None
     )
 
+    if StopModules:
+        # a supervisor would restart the modules that are stopped
+        Loader.StopSupervisor(ConfigFilePath)
+    elif StartModules:
+        SupervisorPID = Loader.GetSupervisorPID(ConfigFilePath)
+        if SupervisorPID:
+            # the supervisor stops and starts its modules
+            os.kill(SupervisorPID, signal.SIGHUP)
+            print("\ngenloader supervisor is running, restarting modules.")
+            sys.exit(0)
+
     if MySupport.IsRunning(os.path.basename(__file__), multi_instance=multi_instance):
         print("\ngenloader already running.")
         sys.exit(2)
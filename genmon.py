@@ -19,6 +19,7 @@ import datetime
 import getopt
 import json
 import os
+import select
 import signal
 import socket
 import sys
@@ -30,10 +31,20 @@ try:
     from genmonlib.generac_evolution import Evolution
     from genmonlib.generac_HPanel import HPanel
     from genmonlib.generac_powerzone_pro import PowerZonePro
+    from genmonlib.mycache import MyCache, ResponseSnapshot
     from genmonlib.myconfig import MyConfig
+    from genmonlib.myframing import (
+        FRAMING_ZLIB,
+        BuildFrame,
+        BuildFramingReply,
+        GetFramingOptions,
+        IsFramingCommand,
+        RecvFrame,
+    )
     from genmonlib.mylog import SetupLogger
     from genmonlib.mymail import MyMail
     from genmonlib.mypipe import MyPipe
+    from genmonlib.mysubscription import SubscriptionServer
     from genmonlib.myplatform import MyPlatform
     from genmonlib.mysupport import MySupport
     from genmonlib.mythread import MyThread
@@ -65,6 +76,27 @@ class Monitor(MySupport):
             self.ConfigFilePath = ConfigFilePath
 
         self.ConnectionList = []  # list of incoming connections for heartbeat
+        self.Subscriptions = None  # pushes changes to subscribed socket clients
+        self.ResponseCache = MyCache()  # responses shared by socket clients
+        self.ResponseCacheTime = 2.0  # max age of a cached response (seconds)
+        # gui_status_json is rendered once per poll cycle, see PublishGUIStatus
+        self.GUIStatus = None  # ResponseSnapshot of the last published status
+        self.GUIStatusLock = threading.Lock()
+        self.GUIStatusMaxAge = 10.0  # seconds, rendered on request if older
+        # commands that are cached, True if the response depends on register
+        # values, False if it is only refreshed by time
+        self.CachedCommands = {
+            "status_json": True,
+            "status_num_json": True,
+            "maint_json": True,
+            "maint_num_json": True,
+            "outage_json": True,
+            "outage_num_json": True,
+            "getbase": True,
+            "monitor_json": False,
+            "monitor_num_json": False,
+            "weather_json": False,
+        }
         # defautl values
         self.SiteName = "Home"
         self.ServerSocket = None
@@ -200,6 +232,7 @@ class Monitor(MySupport):
                 incoming_callback=self.ProcessCommand,
                 loglocation=self.LogLocation,
                 ConfigFilePath=ConfigFilePath,
+                spool=True,
             )
 
             self.Threads = self.MergeDicts(self.Threads, self.mail.Threads)
@@ -276,6 +309,7 @@ class Monitor(MySupport):
                     config=self.config,
                 )
             self.Threads = self.MergeDicts(self.Threads, self.Controller.Threads)
+            self.Controller.AddPollCycleCallback(self.PublishGUIStatus)
 
         except Exception as e1:
             self.LogErrorLine("Error opening controller device: " + str(e1))
@@ -335,15 +369,45 @@ class Monitor(MySupport):
                     debug = self.debug
                 )
                 self.Threads = self.MergeDicts(self.Threads, self.MyWeather.Threads)
+
+            self.Subscriptions = SubscriptionServer(
+                self.GetSubscriptionTopics(),
+                self.GetSubscriptionGeneration,
+                log=self.log,
+                debug=self.debug,
+            )
+            self.Threads = self.MergeDicts(self.Threads, self.Subscriptions.Threads)
         except Exception as e1:
             self.LogErrorLine("Error in StartThreads: " + str(e1))
 
+    # ------------------------ Monitor::GetSubscriptionTopics-------------------
+    # commands that socket clients can subscribe to, see SubscriptionServer
+    def GetSubscriptionTopics(self):
+
+        return {
+            "status_json": [self.Controller.DisplayStatus, (True,)],
+            "status_num_json": [self.Controller.DisplayStatus, (True, True)],
+            "maint_json": [self.Controller.DisplayMaintenance, (True,)],
+            "maint_num_json": [self.Controller.DisplayMaintenance, (True, True)],
+            "outage_json": [self.Controller.DisplayOutage, (True,)],
+            "outage_num_json": [self.Controller.DisplayOutage, (True, True)],
+            "monitor_json": [self.DisplayMonitor, (True,)],
+            "monitor_num_json": [self.DisplayMonitor, (True, True)],
+            "gui_status_json": [self.GetGUIStatusData, ()],
+            "getbase": [self.Controller.GetBaseStatus, ()],
+        }
+
+    # ------------------------ Monitor::GetSubscriptionGeneration---------------
+    # changes each time the controller finishes reading the registers
+    def GetSubscriptionGeneration(self):
+
+        return self.Controller.PollCycleCount
+
     # -------------------- Monitor::GetConfig-----------------------------------
     def GetConfig(self):
 
         try:
-            if self.config.HasOption("sitename"):
-                self.SiteName = self.config.ReadValue("sitename")
+            self.ReadLiveConfig()
 
             self.debug = self.config.ReadValue("debug", return_type=bool, default=False)
 
@@ -418,20 +482,11 @@ class Monitor(MySupport):
                     "minimumweatherinfo", return_type=bool
                 )
 
-            if self.config.HasOption("readonlyemailcommands"):
-                self.ReadOnlyEmailCommands = self.config.ReadValue(
-                    "readonlyemailcommands", return_type=bool
-                )
-
             if self.config.HasOption("optimizeforslowercpu"):
                 self.SlowCPUOptimization = self.config.ReadValue(
                     "optimizeforslowercpu", return_type=bool
                 )
 
-            self.AdditionalWatchdogTime = self.config.ReadValue(
-                "watchdog_addition", return_type=int, default=0
-            )
-
             if self.config.HasOption("version"):
                 self.Version = self.config.ReadValue("version")
                 if not self.Version == ProgramDefaults.GENMON_VERSION:
@@ -467,11 +522,6 @@ class Monitor(MySupport):
                 except Exception as e1:
                     os.remove(self.FeedbackLogFile)
 
-            self.UpdateCheck = self.config.ReadValue(
-                "update_check", return_type=bool, default=True
-            )
-            self.UserURL = self.config.ReadValue("user_url", default="").strip()
-
             self.PreferredNetworkAdapter = self.config.ReadValue(
                 "preferred_network_adapter", default=None
             )
@@ -485,6 +535,68 @@ class Monitor(MySupport):
 
         return True
 
+    # ---------------------------------------------------------------------------
+    # settings that can be changed without restarting genmon (see ReloadConfig)
+    def ReadLiveConfig(self):
+
+        self.SiteName = self.config.ReadValue("sitename", default=self.SiteName, live=True)
+        self.ReadOnlyEmailCommands = self.config.ReadValue(
+            "readonlyemailcommands",
+            return_type=bool,
+            default=self.ReadOnlyEmailCommands,
+            live=True,
+        )
+        self.AdditionalWatchdogTime = self.config.ReadValue(
+            "watchdog_addition", return_type=int, default=0, live=True
+        )
+        self.ResponseCacheTime = self.config.ReadValue(
+            "response_cache_time", return_type=float, default=2.0, NoLog=True, live=True
+        )
+        self.UpdateCheck = self.config.ReadValue(
+            "update_check", return_type=bool, default=True, live=True
+        )
+        self.UserURL = self.config.ReadValue("user_url", default="", live=True).strip()
+
+    # ---------------------------------------------------------------------------
+    # re-read the config files after they were changed (i.e. by genserv) and
+    # apply the settings that can change while running. Returns "OK" or a list
+    # of the changed settings that need genmon to be restarted.
+    def ReloadConfig(self):
+
+        try:
+            Changed = self.config.Reload()
+            MailChanged = []
+            if self.MailInit:
+                MailChanged = self.mail.config.Reload()
+            if Changed == None or MailChanged == None:
+                return "Error reloading config files"
+            RestartList = self.config.GetRestartEntries(Changed)
+            if self.MailInit:
+                RestartList.extend(self.mail.config.GetRestartEntries(MailChanged))
+            if len(RestartList):
+                Entries = ", ".join(sorted(set(Entry for Section, Entry in RestartList)))
+                self.LogError("Config changes require a restart: " + Entries)
+                return "Restart Required: " + Entries
+            if len(Changed):
+                self.ReadLiveConfig()
+                if self.Controller != None:
+                    self.Controller.ReloadConfig()
+            if len(MailChanged):
+                self.mail.GetConfig(reload=True)
+            self.ResponseCache.Clear()
+            self.GUIStatus = None
+            if len(Changed) or len(MailChanged):
+                self.LogError(
+                    "Config reloaded: "
+                    + ", ".join(
+                        sorted(set(Entry for Section, Entry in Changed + MailChanged))
+                    )
+                )
+            return "OK"
+        except Exception as e1:
+            self.LogErrorLine("Error in ReloadConfig: " + str(e1))
+            return "Error in ReloadConfig: " + str(e1)
+
     # ---------------------------------------------------------------------------
     def ProcessFeedbackInfo(self):
 
@@ -625,11 +737,11 @@ class Monitor(MySupport):
                 SupportData["PlatformStats"] = self.GetPlatformStats(net_adapter=self.PreferredNetworkAdapter)
             #SupportData["Data"] = self.Controller.DisplayRegisters(AllRegs=True, DictOut=True)
             # Raw Modbus data
-            SupportData["Holding"] = self.Controller.Holding
+            SupportData["Holding"] = self.Controller.Holding.GetHexView()
             SupportData["Strings"] = self.Controller.Strings
             SupportData["FileData"] = self.Controller.FileData
-            SupportData["Coils"] = self.Controller.Coils
-            SupportData["Inputs"] = self.Controller.Inputs
+            SupportData["Coils"] = self.Controller.Coils.GetHexView()
+            SupportData["Inputs"] = self.Controller.Inputs.GetHexView()
         except Exception as e1:
             self.LogErrorLine("Error in GetSupportData: " + str(e1))
 
@@ -927,7 +1039,9 @@ class Monitor(MySupport):
                 "set_power_data": [self.Controller.SetExternalCTData, (command,), True],
                 "notify_message": [self.SendMessage, (command,), True],
                 "getreglabels_json": [self.Controller.GetRegisterLabels, (), True],
-                "set_button_command": [self.Controller.SetCommandButton, (command,), True]
+                "set_button_command": [self.Controller.SetCommandButton, (command,), True],
+                # re-read the config files after they change, see ReloadConfig
+                "reload_config": [self.ReloadConfig, (), True],
             }
 
             CommandList = command.split(" ")
@@ -962,16 +1076,40 @@ class Monitor(MySupport):
                 if not fromsocket and ExecList[2]:
                     continue
                 # Execute Command
-                ReturnMessage = ExecList[0](*ExecList[1])
+                if fromsocket and LookUp.lower() == "gui_status_json":
+                    # gui_status_json=<etag> returns the ETag first, see
+                    # ResponseSnapshot::GetResponse
+                    ClientETag = item.split("=", 1)[1] if "=" in item else None
+                    ReturnMessage = self.GetGUIStatusSnapshot().GetResponse(
+                        ClientETag
+                    ).decode("utf-8")
+                elif (
+                    fromsocket
+                    and self.ResponseCacheTime > 0
+                    and LookUp.lower() in self.CachedCommands
+                ):
+                    if self.CachedCommands[LookUp.lower()]:
+                        Generation = self.Controller.RegisterGeneration
+                    else:
+                        Generation = None
+                    ReturnMessage = self.ResponseCache.Get(
+                        LookUp.lower(),
+                        Generation,
+                        self.ResponseCacheTime,
+                        self.FormatCommandResponse,
+                        (LookUp, ExecList),
+                    )
+                else:
+                    ReturnMessage = self.FormatCommandResponse(LookUp, ExecList)
+                    if not LookUp.lower().endswith("_json") and not LookUp.lower().startswith("get"):
+                        # the command may have changed something, do not
+                        # return responses created before the change
+                        self.ResponseCache.Clear()
+                        self.GUIStatus = None
 
                 ValidCommand = True
 
-                if LookUp.lower().endswith("_json") and not isinstance(
-                    ReturnMessage, str
-                ):
-                    msgbody += json.dumps(ReturnMessage, sort_keys=False)
-                else:
-                    msgbody += ReturnMessage
+                msgbody += ReturnMessage
 
                 if not fromsocket:
                     msgbody += "\n"
@@ -987,6 +1125,16 @@ class Monitor(MySupport):
             msgbody += "EndOfMessage"
             return msgbody
 
+    # ------------ Monitor::FormatCommandResponse -------------------------------
+    # run a command from the CommandDict in ProcessCommand and return the
+    # response as a string
+    def FormatCommandResponse(self, LookUp, ExecList):
+
+        ReturnMessage = ExecList[0](*ExecList[1])
+        if LookUp.lower().endswith("_json") and not isinstance(ReturnMessage, str):
+            return json.dumps(ReturnMessage, sort_keys=False)
+        return ReturnMessage
+
     # ------------ Monitor::DisplayHelp -----------------------------------------
     def DisplayHelp(self):
 
@@ -1232,6 +1380,79 @@ class Monitor(MySupport):
         StartInfo = self.MergeDicts(StartInfo, ControllerStartInfo)
         return StartInfo
 
+    # ------------ Monitor::PublishGUIStatus -----------------------------------
+    # render gui_status_json, called by the controller after each poll cycle
+    # so requests from the web interface only return the published snapshot
+    def PublishGUIStatus(self):
+
+        with self.GUIStatusLock:
+            return self.RenderGUIStatus()
+
+    # ------------ Monitor::RenderGUIStatus ------------------------------------
+    # GUIStatusLock must be held
+    def RenderGUIStatus(self):
+
+        Snapshot = ResponseSnapshot(
+            self.GetStatusForGUI(), version=self.Controller.PollCycleCount
+        )
+        self.GUIStatus = Snapshot
+        return Snapshot
+
+    # ------------ Monitor::IsGUIStatusCurrent ---------------------------------
+    def IsGUIStatusCurrent(self, Snapshot):
+
+        return (
+            Snapshot != None
+            and self.ResponseCacheTime > 0
+            and Snapshot.GetAge() < self.GUIStatusMaxAge
+        )
+
+    # ------------ Monitor::GetGUIStatusSnapshot -------------------------------
+    # return the published gui_status_json snapshot, it is rendered now if the
+    # controller is not completing poll cycles (i.e. during init) or if
+    # response caching is disabled
+    def GetGUIStatusSnapshot(self):
+
+        Snapshot = self.GUIStatus
+        if self.IsGUIStatusCurrent(Snapshot):
+            return Snapshot
+        with self.GUIStatusLock:
+            # another thread may have rendered it while we waited
+            if self.ResponseCacheTime > 0 and self.GUIStatus is not Snapshot:
+                if self.IsGUIStatusCurrent(self.GUIStatus):
+                    return self.GUIStatus
+            return self.RenderGUIStatus()
+
+    # ------------ Monitor::GetGUIStatusData -----------------------------------
+    def GetGUIStatusData(self):
+
+        return self.GetGUIStatusSnapshot().Data
+
+    # ------------ Monitor::GetSnapshotResponse --------------------------------
+    # return the response (bytes, without EndOfMessage) for a socket command
+    # that is answered from a published snapshot, None if the command must be
+    # run by ProcessCommand
+    def GetSnapshotResponse(self, command):
+
+        try:
+            if self.Controller == None or self.genmonext != None:
+                return None
+            Command = bytes(command).strip()
+            if not Command[: len(b"generator:")].lower() == b"generator:":
+                return None
+            Item = Command[len(b"generator:") :].strip()
+            if b" " in Item:
+                return None
+            Name, Separator, ETag = Item.partition(b"=")
+            if Name.lower() != b"gui_status_json":
+                return None
+            if not Separator:
+                return self.GetGUIStatusSnapshot().Bytes
+            return self.GetGUIStatusSnapshot().GetResponse(ETag.decode("utf-8", "replace"))
+        except Exception as e1:
+            self.LogErrorLine("Error in GetSnapshotResponse: " + str(e1))
+            return None
+
     # ------------ Monitor::GetStatusForGUI -------------------------------------
     def GetStatusForGUI(self):
 
@@ -1255,6 +1476,8 @@ class Monitor(MySupport):
             Status["AltDateformat"] = self.Controller.bAlternateDateFormat
             Status["version"] = ProgramDefaults.GENMON_VERSION
             Status["UpdateAvailable"] = self.UpdateAvailable
+            # True while the data is from the warm start snapshot
+            Status["SavedData"] = self.Controller.SnapshotTime != None
             ReturnDict = self.MergeDicts(Status, self.Controller.GetStatusForGUI())
             return ReturnDict
         except Exception as e1:
@@ -1268,6 +1491,14 @@ class Monitor(MySupport):
         outstr = ""
         if not self.Controller.InitComplete:
             outstr += "System Initializing. "
+            if self.Controller.SnapshotTime != None:
+                outstr += (
+                    "Showing saved data from "
+                    + time.strftime(
+                        "%x %X", time.localtime(self.Controller.SnapshotTime)
+                    )
+                    + ". "
+                )
         if not self.AreThreadsAlive():
             outstr += " Threads are dead. "
         if not self.CommunicationsActive:
@@ -1534,18 +1765,69 @@ class Monitor(MySupport):
                 outstr = statusstr + ": " + self.Controller.GetOneLineStatus()
                 conn.sendall(outstr.encode())
 
+            Framed = False  # True if the client switched to length prefixed frames
+            Compress = False  # True if the client accepts compressed frames
+            Subscribed = False  # True if the connection is used to push data
             while True:
                 try:
-                    data = conn.recv(2098152)  # max json string size plus 1000
-                    if len(data):
-                        if self.Controller == None:
-                            outstr = "Retry, System Initializing"
+                    if Subscribed:
+                        # the subscription thread is the only one that sends on
+                        # this connection, input is read only to see when the
+                        # client closes it and is discarded. The socket timeout
+                        # is used for sends, wait here.
+                        if not len(select.select([conn], [], [], 0.5)[0]):
+                            if self.IsStopping:
+                                break
+                            continue
+                        if not len(conn.recv(4096)):
+                            # socket closed remotely
+                            break
+                        continue
+                    if Framed:
+                        Flags, data = RecvFrame(conn, stop=lambda: self.IsStopping)
+                        if Flags == None:
+                            # socket closed remotely
+                            break
+                    else:
+                        data = conn.recv(2098152)  # max json string size plus 1000
+                        if not len(data):
+                            # socket closed remotely
+                            break
+                        if IsFramingCommand(data):
+                            # reply in text mode, all messages after this are framed
+                            Compress = FRAMING_ZLIB in GetFramingOptions(data)
+                            Accepted = [FRAMING_ZLIB] if Compress else []
+                            conn.sendall(
+                                (BuildFramingReply(Accepted) + "EndOfMessage").encode("utf-8")
+                            )
+                            Framed = True
+                            continue
+                        if self.Subscriptions != None and self.Subscriptions.IsSubscribeCommand(data):
+                            # from here on this connection is only used to push
+                            # data, commands sent on it are ignored
+                            if not self.Subscriptions.AddSubscriber(conn, data):
+                                break
+                            Subscribed = True
+                            continue
+                    Response = self.GetSnapshotResponse(data)
+                    if Response != None:
+                        # pre-serialized, send without formatting
+                        if Framed:
+                            conn.sendall(BuildFrame(Response, compress=Compress))
                         else:
-                            outstr = self.ProcessCommand(data, True)
-                        conn.sendall(outstr.encode("utf-8"))
+                            conn.sendall(Response)
+                            conn.sendall(b"EndOfMessage")
+                        continue
+                    if self.Controller == None:
+                        outstr = "Retry, System InitializingEndOfMessage"
                     else:
-                        # socket closed remotely
-                        break
+                        outstr = self.ProcessCommand(bytes(data), True)
+                    if Framed:
+                        if outstr.endswith("EndOfMessage"):
+                            outstr = outstr[: -len("EndOfMessage")]
+                        conn.sendall(BuildFrame(outstr, compress=Compress))
+                    else:
+                        conn.sendall(outstr.encode("utf-8"))
                 except socket.timeout:
                     if self.IsStopping:
                         break
@@ -1563,6 +1845,8 @@ class Monitor(MySupport):
             pass
 
         try:
+            if self.Subscriptions != None:
+                self.Subscriptions.RemoveSubscriber(conn)
             self.ConnectionList.remove(conn)
             conn.close()
         except:
@@ -1581,6 +1865,8 @@ class Monitor(MySupport):
         self.ServerSocket.bind((self.ServerIPAddress, self.ServerSocketPort))
         # become a server socket
         self.ServerSocket.listen(5)
+        # add-ons can connect now, let genloader start them
+        MySupport.SignalReady()
 
         # wait to accept a connection - blocking call
         while True:
@@ -1646,6 +1932,12 @@ class Monitor(MySupport):
             except:
                 pass
 
+            try:
+                if self.Subscriptions != None:
+                    self.Subscriptions.Close()
+            except:
+                pass
+
             try:
                 if not self.Controller == None:
                     self.Controller.Close()
@@ -26,7 +26,14 @@ import copy
 import re
 
 from genmonlib.mylog import SetupLogger
-from genmonlib.myplatform import MyPlatform
+from genmonlib.myplatform import MyPlatform, PlatformSampler
+from genmonlib.mypoll import PollScheduler
+from genmonlib.mypowerlog import BinaryPowerLog
+from genmonlib.mypowertotals import PowerTotals
+from genmonlib.myregisters import RegisterStore
+from genmonlib.myrollup import Rollup
+from genmonlib.myscanner import RegisterScanner
+from genmonlib.mysnapshot import SNAPSHOT_REGISTERS, ControllerSnapshot
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
 from genmonlib.mytile import MyTile
@@ -70,15 +77,25 @@ class GeneratorController(MySupport):
         self.CheckForAlarmEvent = (
             threading.Event()
         )  # Event to signal checking for alarm
-        self.Holding = collections.OrderedDict()  # dict for registers and values (modbus fuction 03)
+        self.Holding = RegisterStore()              # registers and values (modbus fuction 03)
         self.Strings = collections.OrderedDict()    # dict for registers read a string data
         self.FileData = collections.OrderedDict()   # dict for modbus file reads (modbus function 0x14)
-        self.Coils = collections.OrderedDict()      # dict for modbus coil reads (modbus fuction 01)
-        self.Inputs = collections.OrderedDict()     # dict for modbus input registers (modbus function 4)
+        self.Coils = RegisterStore()                # modbus coil reads (modbus fuction 01)
+        self.Inputs = RegisterStore()               # modbus input registers (modbus function 4)
         self.NotChanged = 0  # stats for registers
         self.Changed = 0  # stats for registers
+        self.PollCycleCount = 0  # incremented each time MasterEmulation completes
+        self.PollCycleCallbacks = []  # functions called after each poll cycle
+        self.RegisterGeneration = 0  # incremented each time a register value changes
         self.TotalChanged = 0.0  # ratio of changed ragisters
         self.MaintLog = os.path.join(ConfigFilePath, "maintlog.json")
+        self.SnapshotFile = os.path.join(ConfigFilePath, "snapshot.json")
+        self.Snapshot = None  # ControllerSnapshot if warm_start is enabled
+        self.WarmStartMaxAge = 1440  # minutes, older snapshots are not used
+        self.PlatformStatsInterval = 10  # seconds between reads of the platform stats
+        self.SnapshotTime = None  # time of the snapshot data shown until init is complete
+        self.SnapshotIdentityNames = []  # attributes saved in the snapshot (set by each controller)
+        self.SnapshotIdentityDefaults = None  # values of these attributes before the snapshot was loaded
         self.MaintLogList = []
         self.MaintLock = threading.RLock()
         self.OutageLog = os.path.join(ConfigFilePath, "outage.txt")
@@ -90,11 +107,16 @@ class GeneratorController(MySupport):
         self.FuelLock = threading.RLock()
         self.PowerLogList = []
         self.PowerLock = threading.RLock()
+        self.bUseBinaryPowerLog = False
+        self.BinaryPowerLog = None  # BinaryPowerLog if binary_power_log is enabled
+        self.PowerTotals = None  # running totals of the power log
+        self.PowerRollup = None  # min / max / average of the power log for charts
         self.SensorLogPath = os.path.join(ConfigFilePath, "sensordata")
         self.SensorLogMaxSize = 5.0  # 5 MB max size per sensor
         self.MaxSensorLogEntries = 8000
         self.SensorLogLock = threading.RLock()
         self.SensorLogLists = {}  # per-sensor cached lists: {sensor_name: [[ts, val], ...]}
+        self.SensorRollups = {}  # per-sensor Rollup, created with the cached list
         self.bAlternateDateFormat = False
         self.HoursFuelRemainingAtLoad = None
         self.HoursFuelRemainingCurrentLoad = None
@@ -141,12 +163,21 @@ class GeneratorController(MySupport):
         self.LastOutageDuration = self.OutageStartTime - self.OutageStartTime
         self.OutageNoticeDelay = 0
         self.Buttons = []   # UI command buttons (loaded after controller ID, if any)
+        # modbus block read planning (merge nearby registers into one request)
+        self.UseBlockReads = False
+        self.BlockReadMaxGap = 0        # max number of unused registers between merged registers
+        self.BlockReadMaxLength = 32    # max number of registers in a single block read
+        self.BlockReadExclude = []      # registers that must always be read individually
+        self.BlockReadMaxFailures = 3   # failed reads in a row (no modbus exception) before a block is split
+        self.BlockReadFailures = {}     # (start, length, IsInput) : failed reads in a row
+        self.AdaptivePolling = True     # poll registers based on tier and how often they change
+        self.PollSchedule = None        # PollScheduler, created after the config is read
 
         try:
 
             self.console = SetupLogger("controller_console", log_file="", stream=True)
             if self.config != None:
-                self.SiteName = self.config.ReadValue("sitename", default="Home")
+                self.ReadLiveConfig()
                 self.LogLocation = self.config.ReadValue(
                     "loglocation", default=ProgramDefaults.LogPath
                 )
@@ -159,26 +190,9 @@ class GeneratorController(MySupport):
                 self.EnableDebug = self.config.ReadValue(
                     "enabledebug", return_type=bool, default=False
                 )
-                self.bDisplayExperimentalData = self.config.ReadValue(
-                    "displayunknown", return_type=bool, default=False
-                )
                 self.bDisablePowerLog = self.config.ReadValue(
                     "disablepowerlog", return_type=bool, default=False
                 )
-                self.SubtractFuel = self.config.ReadValue(
-                    "subtractfuel", return_type=float, default=0.0
-                )
-                self.UserURL = self.config.ReadValue("user_url", default="").strip()
-                self.FuelUnits = self.config.ReadValue("fuel_units", default="gal")
-                self.FuelHalfRate = self.config.ReadValue(
-                    "half_rate", return_type=float, default=0.0
-                )
-                self.FuelFullRate = self.config.ReadValue(
-                    "full_rate", return_type=float, default=0.0
-                )
-                self.UseFuelSensor = self.config.ReadValue(
-                    "usesensorforfuelgauge", return_type=bool, default=True
-                )
                 self.UseCalculatedPower = self.config.ReadValue(
                     "usecalculatedpower", return_type=bool, default=False
                 )
@@ -200,29 +214,6 @@ class GeneratorController(MySupport):
                     self.UseExternalFuelData = self.config.ReadValue(
                         "use_external_fuel_data_diy", return_type=bool, default=False
                     )
-
-                self.EstimateLoad = self.config.ReadValue(
-                    "estimated_load", return_type=float, default=0.50
-                )
-                if self.EstimateLoad < 0:
-                    self.EstimateLoad = 0
-                if self.EstimateLoad > 1:
-                    self.EstimateLoad = 1
-
-                self.DisableOutageCheck = self.config.ReadValue(
-                    "disableoutagecheck", return_type=bool, default=False
-                )
-                
-                self.bDisableSensorLog = self.config.ReadValue(
-                    "disablesensorlog", return_type=bool, default=False
-                )
-
-                self.SensorLogMaxSize = self.config.ReadValue(
-                    "sensorlogmax", return_type=float, default=5.0
-                )
-                self.MaxSensorLogEntries = self.config.ReadValue(
-                    "max_sensorlog_entries", return_type=int, default=8000
-                )
                 if self.config.HasOption("outagelog"):
                     self.OutageLog = self.config.ReadValue("outagelog")
                     self.LogError(
@@ -232,6 +223,23 @@ class GeneratorController(MySupport):
                 if self.config.HasOption("kwlog"):
                     self.PowerLog = self.config.ReadValue("kwlog")
 
+                self.bUseBinaryPowerLog = self.config.ReadValue(
+                    "binary_power_log", return_type=bool, default=False, NoLog=True
+                )
+
+                if self.config.ReadValue(
+                    "warm_start", return_type=bool, default=True, NoLog=True
+                ):
+                    self.Snapshot = ControllerSnapshot(
+                        self.SnapshotFile,
+                        log=self.log,
+                        debug=self.debug,
+                        simulation=self.Simulation,
+                    )
+                self.WarmStartMaxAge = self.config.ReadValue(
+                    "warm_start_max_age", return_type=int, default=1440, NoLog=True
+                )
+
                 if self.config.HasOption("fuel_log"):
                     self.FuelLog = self.config.ReadValue("fuel_log")
                     self.FuelLog = self.FuelLog.strip()
@@ -239,19 +247,6 @@ class GeneratorController(MySupport):
                 self.UseFuelLog = self.config.ReadValue(
                     "enable_fuel_log", return_type=bool, default=False
                 )
-                self.FuelLogFrequency = self.config.ReadValue(
-                    "fuel_log_freq", return_type=float, default=15.0
-                )
-
-                self.MinimumOutageDuration = self.config.ReadValue(
-                    "min_outage_duration", return_type=int, default=0
-                )
-                self.PowerLogMaxSize = self.config.ReadValue(
-                    "kwlogmax", return_type=float, default=15.0
-                )
-                self.MaxPowerLogEntries = self.config.ReadValue(
-                    "max_powerlog_entries", return_type=int, default=8000
-                )
 
                 if self.config.HasOption("nominalfrequency"):
                     self.NominalFreq = self.config.ReadValue("nominalfrequency")
@@ -278,17 +273,11 @@ class GeneratorController(MySupport):
                 if self.config.HasOption("fueltype"):
                     self.FuelType = self.config.ReadValue("fueltype")
 
-                self.TankSize = self.config.ReadValue(
-                    "tanksize", return_type=int, default=0
-                )
 
                 self.SmartSwitch = self.config.ReadValue(
                     "smart_transfer_switch", return_type=bool, default=False
                 )
 
-                self.OutageNoticeDelay = self.config.ReadValue(
-                    "outage_notice_delay", return_type=int, default=0
-                )
 
                 self.bDisablePlatformStats = self.config.ReadValue(
                     "disableplatformstats", return_type=bool, default=False
@@ -297,6 +286,23 @@ class GeneratorController(MySupport):
                     "alternate_date_format", return_type=bool, default=False
                 )
 
+                self.UseBlockReads = self.config.ReadValue(
+                    "modbus_block_reads", return_type=bool, default=False
+                )
+                self.BlockReadMaxGap = self.config.ReadValue(
+                    "modbus_block_max_gap", return_type=int, default=0, NoLog=True
+                )
+                self.BlockReadMaxLength = self.config.ReadValue(
+                    "modbus_block_max_length", return_type=int, default=32, NoLog=True
+                )
+                BlockReadExclude = self.config.ReadValue("modbus_block_exclude", default=None, NoLog=True)
+                if BlockReadExclude != None and len(BlockReadExclude.strip()):
+                    for Items in BlockReadExclude.strip().split(","):
+                        self.BlockReadExclude.append("%04x" % int(Items.strip(), 16))
+                self.AdaptivePolling = self.config.ReadValue(
+                    "adaptive_polling", return_type=bool, default=True, NoLog=True
+                )
+
                 self.ImportButtonFileList = []
                 self.ImportedButtons = []
                 ImportButtonsFiles = config.ReadValue("import_buttons",default=None)
@@ -308,13 +314,6 @@ class GeneratorController(MySupport):
                             for Items in ImportList:
                                 self.ImportButtonFileList.append(Items.strip())
 
-                # num minutes to send a warning email about an outage
-                self.OutageNoticeInterval = self.config.ReadValue("outage_notice_interval", return_type=int, default=0)
-
-                # the percentage of the total load of the allowable difference in current between legs
-                self.UnbalancedCapacity = self.config.ReadValue(
-                    "unbalanced_capacity", return_type=float, default=0
-                )
                 if self.bDisablePlatformStats:
                     self.bUseRaspberryPiCpuTempGauge = False
                     self.bUseLinuxWifiSignalGauge = False
@@ -335,12 +334,22 @@ class GeneratorController(MySupport):
                     )
                     if self.PreferredNetworkAdapter != None:
                         self.PreferredNetworkAdapter = self.PreferredNetworkAdapter.strip()
+                    self.PlatformStatsInterval = self.config.ReadValue(
+                        "platform_stats_interval", return_type=int, default=10, NoLog=True
+                    )
         except Exception as e1:
             self.FatalError("Missing config file or config file entries: " + str(e1))
 
+        self.PollSchedule = PollScheduler(
+            log=self.log, debug=self.debug, enabled=self.AdaptivePolling
+        )
+
         try:
             if not self.bDisablePlatformStats:
                 self.Platform = MyPlatform(log=self.log, usemetric=self.UseMetric, net_adapter=self.PreferredNetworkAdapter, debug = self.debug)
+                # platform values are read in the background and shared with
+                # the status pages
+                self.Platform.Sampler.Start(self.PlatformStatsInterval)
                 if self.Platform.GetRaspberryPiTemp(ReturnFloat=True) == 0.0:
                     self.LogError("CPU Temp not supported.")
                     self.bUseRaspberryPiCpuTempGauge = False
@@ -350,6 +359,99 @@ class GeneratorController(MySupport):
         except Exception as e1:
             self.FatalError("Failure loading platform module: " + str(e1))
 
+        if self.bUseBinaryPowerLog and len(self.PowerLog):
+            self.SetupBinaryPowerLog()
+        if len(self.PowerLog):
+            self.PowerTotals = PowerTotals(
+                os.path.splitext(self.PowerLog)[0] + "_totals.json",
+                log=self.log,
+                debug=self.debug,
+                simulation=self.Simulation,
+            )
+            self.PowerRollup = Rollup(log=self.log, debug=self.debug)
+
+    # ----------  GeneratorController:ReadLiveConfig-----------------------------
+    # settings that can be changed without restarting genmon (see ReloadConfig)
+    def ReadLiveConfig(self):
+
+        self.SiteName = self.config.ReadValue("sitename", default="Home", live=True)
+        self.bDisplayExperimentalData = self.config.ReadValue(
+            "displayunknown", return_type=bool, default=False, live=True
+        )
+        self.SubtractFuel = self.config.ReadValue(
+            "subtractfuel", return_type=float, default=0.0, live=True
+        )
+        self.UserURL = self.config.ReadValue("user_url", default="", live=True).strip()
+        self.FuelUnits = self.config.ReadValue("fuel_units", default="gal", live=True)
+        self.FuelHalfRate = self.config.ReadValue(
+            "half_rate", return_type=float, default=0.0, live=True
+        )
+        self.FuelFullRate = self.config.ReadValue(
+            "full_rate", return_type=float, default=0.0, live=True
+        )
+        self.UseFuelSensor = self.config.ReadValue(
+            "usesensorforfuelgauge", return_type=bool, default=True, live=True
+        )
+        self.EstimateLoad = self.config.ReadValue(
+            "estimated_load", return_type=float, default=0.50, live=True
+        )
+        if self.EstimateLoad < 0:
+            self.EstimateLoad = 0
+        if self.EstimateLoad > 1:
+            self.EstimateLoad = 1
+
+        self.DisableOutageCheck = self.config.ReadValue(
+            "disableoutagecheck", return_type=bool, default=False, live=True
+        )
+        self.bDisableSensorLog = self.config.ReadValue(
+            "disablesensorlog", return_type=bool, default=False, live=True
+        )
+        self.SensorLogMaxSize = self.config.ReadValue(
+            "sensorlogmax", return_type=float, default=5.0, live=True
+        )
+        self.MaxSensorLogEntries = self.config.ReadValue(
+            "max_sensorlog_entries", return_type=int, default=8000, live=True
+        )
+        self.FuelLogFrequency = self.config.ReadValue(
+            "fuel_log_freq", return_type=float, default=15.0, live=True
+        )
+        self.MinimumOutageDuration = self.config.ReadValue(
+            "min_outage_duration", return_type=int, default=0, live=True
+        )
+        self.PowerLogMaxSize = self.config.ReadValue(
+            "kwlogmax", return_type=float, default=15.0, live=True
+        )
+        self.MaxPowerLogEntries = self.config.ReadValue(
+            "max_powerlog_entries", return_type=int, default=8000, live=True
+        )
+        self.TankSize = self.config.ReadValue(
+            "tanksize", return_type=int, default=0, live=True
+        )
+        self.OutageNoticeDelay = self.config.ReadValue(
+            "outage_notice_delay", return_type=int, default=0, live=True
+        )
+        # num minutes to send a warning email about an outage
+        self.OutageNoticeInterval = self.config.ReadValue(
+            "outage_notice_interval", return_type=int, default=0, live=True
+        )
+        # the percentage of the total load of the allowable difference in current between legs
+        self.UnbalancedCapacity = self.config.ReadValue(
+            "unbalanced_capacity", return_type=float, default=0, live=True
+        )
+
+    # ----------  GeneratorController:ReloadConfig-------------------------------
+    # called by genmon after the config file was re-read and only settings read
+    # in ReadLiveConfig changed
+    def ReloadConfig(self):
+
+        try:
+            self.ReadLiveConfig()
+            if self.InitComplete:
+                # tiles use the fuel and tank settings
+                self.SetupTiles()
+        except Exception as e1:
+            self.LogErrorLine("Error in ReloadConfig: " + str(e1))
+
     # ----------  GeneratorController:StartCommonThreads-------------------------
     # called after get config file, starts threads common to all controllers
     def StartCommonThreads(self):
@@ -509,6 +611,7 @@ class GeneratorController(MySupport):
 
         try:
             self.ModBus.Flush()
+            self.LoadSnapshot()
             self.InitDevice()
             if self.IsStopping:
                 return
@@ -517,7 +620,12 @@ class GeneratorController(MySupport):
                     if not self.InitComplete:
                         self.InitDevice()
                     else:
+                        if self.SnapshotTime != None:
+                            self.SnapshotTime = None
+                            self.LogDebug("Initialization complete, saved data replaced")
                         self.MasterEmulation()
+                        self.PollCycleCount += 1
+                        self.RunPollCycleCallbacks()
                     if self.IsStopSignaled("ProcessThread"):
                         break
                     if self.IsStopping:
@@ -529,6 +637,107 @@ class GeneratorController(MySupport):
         except Exception as e1:
             self.LogErrorLine("Exiting Controller ProcessThread (2): " + str(e1))
 
+    # ---------- GeneratorController:AddPollCycleCallback-----------------------
+    # function() is called from ProcessThread each time the registers have
+    # been read (i.e. to publish data that is rendered once per poll cycle)
+    def AddPollCycleCallback(self, function):
+
+        if not function in self.PollCycleCallbacks:
+            self.PollCycleCallbacks.append(function)
+
+    # ---------- GeneratorController:RunPollCycleCallbacks----------------------
+    def RunPollCycleCallbacks(self):
+
+        for Function in self.PollCycleCallbacks:
+            try:
+                Function()
+            except Exception as e1:
+                self.LogErrorLine("Error in RunPollCycleCallbacks: " + str(e1))
+
+    # ---------- GeneratorController:GetSnapshotKey-----------------------------
+    # a snapshot is only used by the same type of controller
+    def GetSnapshotKey(self):
+
+        return self.__class__.__name__
+
+    # ---------- GeneratorController:GetSnapshotIdentity------------------------
+    # values found when the controller was identified
+    def GetSnapshotIdentity(self):
+
+        Identity = {}
+        for Name in self.SnapshotIdentityNames:
+            Identity[Name] = getattr(self, Name, None)
+        return Identity
+
+    # ---------- GeneratorController:SetSnapshotIdentity------------------------
+    # use the values from a snapshot until the controller is identified again,
+    # the current values are kept for ResetSnapshotIdentity
+    def SetSnapshotIdentity(self, Identity):
+
+        self.SnapshotIdentityDefaults = {}
+        for Name in self.SnapshotIdentityNames:
+            if not Name in Identity:
+                continue
+            self.SnapshotIdentityDefaults[Name] = getattr(self, Name, None)
+            setattr(self, Name, Identity[Name])
+
+    # ---------- GeneratorController:ResetSnapshotIdentity----------------------
+    # called before the controller is identified, so values from the snapshot
+    # are not mistaken for values from the conf file
+    def ResetSnapshotIdentity(self):
+
+        if self.SnapshotIdentityDefaults == None:
+            return
+        for Name, Value in self.SnapshotIdentityDefaults.items():
+            setattr(self, Name, Value)
+        self.SnapshotIdentityDefaults = None
+
+    # ---------- GeneratorController:LoadSnapshot-------------------------------
+    # load the register data saved by the last run so the UI has something to
+    # show while the controller is initialized
+    def LoadSnapshot(self):
+
+        try:
+            if self.Snapshot == None:
+                return False
+            Data = self.Snapshot.Load(self.GetSnapshotKey(), self.WarmStartMaxAge)
+            if Data == None:
+                return False
+            for Name in SNAPSHOT_REGISTERS:
+                RegDict = getattr(self, Name)
+                for Register, Value in Data["registers"].get(Name, []):
+                    RegDict[Register] = Value
+            self.RegisterGeneration += 1
+            self.SetSnapshotIdentity(Data["identity"])
+            self.SnapshotTime = Data["time"]
+            self.SetupTiles()
+            self.LogError(
+                "Using saved data from "
+                + time.strftime("%x %X", time.localtime(self.SnapshotTime))
+                + " until initialization is complete"
+            )
+            return True
+        except Exception as e1:
+            self.LogErrorLine("Error in LoadSnapshot: " + str(e1))
+            return False
+
+    # ---------- GeneratorController:SaveSnapshot-------------------------------
+    def SaveSnapshot(self):
+
+        try:
+            # do not replace the last snapshot with partial data
+            if self.Snapshot == None or not self.InitComplete:
+                return False
+            Registers = {}
+            for Name in SNAPSHOT_REGISTERS:
+                Registers[Name] = collections.OrderedDict(getattr(self, Name))
+            return self.Snapshot.Save(
+                self.GetSnapshotKey(), self.GetSnapshotIdentity(), Registers
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in SaveSnapshot: " + str(e1))
+            return False
+
     # ---------- GeneratorController:CheckAlarmThread---------------------------
     #  When signaled, this thread will check for alarms
     def CheckAlarmThread(self):
@@ -643,7 +852,15 @@ class GeneratorController(MySupport):
         )
         TotalSent = 0
 
-        RegistersUnderTest = collections.OrderedDict()
+        # find the valid registers with block reads, then read the valid
+        # registers again on each pass to see which ones change
+        Scanner = RegisterScanner(
+            self.ModBus,
+            log=self.log,
+            debug=self.debug,
+            block_length=self.BlockReadMaxLength,
+            wait=lambda: self.WaitForExit("DebugThread", 0.05),
+        )
         RegistersUnderTestData = ""
 
         while True:
@@ -661,21 +878,16 @@ class GeneratorController(MySupport):
                     return
                 continue
             try:
-                for Reg in range(0x0, MaxReg):
-                    if self.WaitForExit("DebugThread", 0.25):  #
+                if TotalSent == 0:
+                    if not Scanner.Discover(0, MaxReg):
                         return
-                    Register = "%04x" % Reg
-                    NewValue = self.ModBus.ProcessTransaction(
-                        Register, 1, skipupdate=True
-                    )
-                    if not len(NewValue):
-                        continue
-                    OldValue = RegistersUnderTest.get(Register, "")
-                    if OldValue == "":
-                        RegistersUnderTest[
-                            Register
-                        ] = NewValue  # first time seeing this register so add it to the list
-                    elif NewValue != OldValue:
+                else:
+                    if self.WaitForExit("DebugThread", 60):
+                        return
+                    ChangeList = Scanner.Poll()
+                    if Scanner.Stopped:
+                        return
+                    for Register, OldValue, NewValue in ChangeList:
                         BitsChanged, Mask = self.GetNumBitsChanged(OldValue, NewValue)
                         RegistersUnderTestData += (
                             "Reg %s changed from %s to %s, Bits Changed: %d, Mask: %x, Engine State: %s\n"
@@ -688,13 +900,12 @@ class GeneratorController(MySupport):
                                 self.GetEngineState(),
                             )
                         )
-                        RegistersUnderTest[Register] = NewValue  # update the value
 
                 msgbody = "\n"
                 try:
-                    msgbody += json.dumps(RegistersUnderTest, indent=4, sort_keys=False)
+                    msgbody += json.dumps(Scanner.GetResults(), indent=4, sort_keys=False)
                 except:
-                    for Register, Value in RegistersUnderTest.items():
+                    for Register, Value in Scanner.Registers.items():
                         msgbody += self.printToString("%s:%s" % (Register, Value))
 
                 self.FeedbackPipe.SendFeedback(
@@ -752,6 +963,23 @@ class GeneratorController(MySupport):
                 return self.HexStringToString(StringValue[:max])
         return StringValue
 
+    # ------------ GeneratorController:SetRegisterValue -------------------------
+    # store a value read from the controller in RegDict (i.e. self.Holding)
+    def SetRegisterValue(self, RegDict, Register, Value):
+
+        if isinstance(RegDict, RegisterStore):
+            Changed = RegDict.Set(Register, Value)
+        else:
+            Changed = RegDict.get(Register, None) != Value
+            if Changed:
+                RegDict[Register] = Value
+        if Changed:
+            self.RegisterGeneration += 1
+        if RegDict is self.Holding or RegDict is self.Strings:
+            self.PollSchedule.Observe(Register, Changed)
+        elif RegDict is self.Inputs:
+            self.PollSchedule.Observe(Register, Changed, IsInput=True)
+
     # ------------ GeneratorController:GetRegisterValueFromList -----------------
     def GetRegisterValueFromList(self, Register, IsCoil = False, IsInput = False):
 
@@ -765,6 +993,20 @@ class GeneratorController(MySupport):
             self.LogErrorLine("Error in GetRegisterValueFromList: " + str(e1))
             return ""
 
+    # ------------ GeneratorController:GetRegisterIntFromList -------------------
+    # return the register value as an int, None if the register has not been read
+    def GetRegisterIntFromList(self, Register, IsCoil = False, IsInput = False):
+
+        try:
+            if IsCoil:
+                return self.Coils.GetInt(Register)
+            if IsInput:
+                return self.Inputs.GetInt(Register)
+            return self.Holding.GetInt(Register)
+        except Exception as e1:
+            self.LogErrorLine("Error in GetRegisterIntFromList: " + str(e1))
+            return None
+
     # -------------GeneratorController:GetCoil-----------------------------------
     def GetCoil(self, Register,OnLabel=None, OffLabel=None):
 
@@ -787,12 +1029,10 @@ class GeneratorController(MySupport):
     def GetParameterBit(self, Register, Mask, OnLabel=None, OffLabel=None, IsCoil = False, IsInput = False):
 
         try:
-            Value = self.GetRegisterValueFromList(Register, IsCoil = IsCoil, IsInput = IsInput)
-            if not len(Value):
+            IntValue = self.GetRegisterIntFromList(Register, IsCoil = IsCoil, IsInput = IsInput)
+            if IntValue == None:
                 return ""
 
-            IntValue = int(Value, 16)
-
             if OnLabel == None or OffLabel == None:
                 return self.BitIsEqual(IntValue, Mask, Mask)
             elif self.BitIsEqual(IntValue, Mask, Mask):
@@ -829,15 +1069,12 @@ class GeneratorController(MySupport):
             else:
                 LabelStr = ""
 
-            ValueLo = self.GetParameter(RegisterLo, IsCoil = IsCoil, IsInput = IsInput)
-            ValueHi = self.GetParameter(RegisterHi, IsCoil = IsCoil, IsInput = IsInput)
+            IntValueLo = self.GetRegisterIntFromList(RegisterLo, IsCoil = IsCoil, IsInput = IsInput)
+            IntValueHi = self.GetRegisterIntFromList(RegisterHi, IsCoil = IsCoil, IsInput = IsInput)
 
-            if not len(ValueLo) or not len(ValueHi):
+            if IntValueLo == None or IntValueHi == None:
                 return DefaultReturn
 
-            IntValueLo = int(ValueLo)
-            IntValueHi = int(ValueHi)
-
             IntValue = IntValueHi << 16 | IntValueLo
 
             if ReturnInt:
@@ -877,24 +1114,27 @@ class GeneratorController(MySupport):
             else:
                 DefaultReturn = ""
 
-            Value = self.GetRegisterValueFromList(Register, IsCoil = IsCoil, IsInput = IsInput)
-            if not len(Value):
-                return DefaultReturn
+            if ReturnString == True or Hex:
+                Value = self.GetRegisterValueFromList(Register, IsCoil = IsCoil, IsInput = IsInput)
+                if not len(Value):
+                    return DefaultReturn
+                if ReturnString == True:
+                    return self.HexStringToString(Value)
+                if Divider == None and Label == None:
+                    return Value
 
-            if ReturnString == True:
-                return self.HexStringToString(Value)
+            IntValue = self.GetRegisterIntFromList(Register, IsCoil = IsCoil, IsInput = IsInput)
+            if IntValue == None:
+                return DefaultReturn
 
             if Divider == None and Label == None:
-                if Hex:
-                    return Value
-                elif ReturnFloat:
-                    return float(int(Value, 16))
+                if ReturnFloat:
+                    return float(IntValue)
                 elif ReturnInt:
-                    return int(Value, 16)
+                    return IntValue
                 else:
-                    return str(int(Value, 16))
+                    return str(IntValue)
 
-            IntValue = int(Value, 16)
             if not Divider == None:
                 FloatValue = IntValue / Divider
                 if ReturnInt:
@@ -910,7 +1150,7 @@ class GeneratorController(MySupport):
             elif not Label == None:
                 return "%d %s" % (IntValue, Label)
             else:
-                return str(int(Value, 16))
+                return str(IntValue)
 
         except Exception as e1:
             self.LogErrorLine(
@@ -1325,6 +1565,255 @@ class GeneratorController(MySupport):
         except Exception as e1:
             self.LogErrorLine(f"Error in DelayBetween Frames: {e1}")
 
+    # ------------ GeneratorController:StartPollCycle ---------------------------
+    # called at the start of MasterEmulation, see PollScheduler
+    def StartPollCycle(self):
+
+        self.PollSchedule.StartCycle(WriteCount=self.ModBus.WriteCount)
+
+    # ------------ GeneratorController:ReadFastRegisters ------------------------
+    # read the registers in the fast poll tier, RegisterList is a list of
+    # [register, length in bytes, IsInput]. Returns False if stopping.
+    def ReadFastRegisters(self, RegisterList):
+
+        try:
+            for Register, Length, IsInput in RegisterList:
+                if self.IsStopping:
+                    return False
+                localTimeoutCount = self.ModBus.ComTimoutError
+                localSyncError = self.ModBus.ComSyncError
+                if IsInput:
+                    self.ModBus.ProcessTransaction(Register, Length // 2, IsInput=True)
+                else:
+                    self.ModBus.ProcessTransaction(Register, Length // 2)
+                if (
+                    localSyncError != self.ModBus.ComSyncError
+                    or localTimeoutCount != self.ModBus.ComTimoutError
+                ) and self.ModBus.RxPacketCount:
+                    # Wait for a bit to allow any missed response from the controller to arrive
+                    # This assumes the registers are read from ProcessThread
+                    if self.WaitForExit("ProcessThread", float(self.ModBus.ModBusPacketTimoutMS / 1000.0)):
+                        return False
+                    self.ModBus.Flush()
+                self.DelayBetweenFrames()
+            # check for alarms and engine state changes as soon as the fast tier is read
+            self.CheckForAlarmEvent.set()
+        except Exception as e1:
+            self.LogErrorLine("Error in ReadFastRegisters: " + str(e1))
+        return not self.IsStopping
+
+    # ------------ GeneratorController:ProcessScheduledReadPlan -----------------
+    # read the blocks in Plan that have a register due in this poll cycle (see
+    # PollScheduler). FastPlans is a list of [plan, IsInput] for the fast poll
+    # tier, these are read first and again after every FastStride blocks.
+    def ProcessScheduledReadPlan(self, Plan, IsInput=False, FastPlans=None):
+
+        try:
+            if not len(Plan):
+                return not self.IsStopping
+            Due = []
+            NotDue = []
+            for Entry in Plan:
+                if self.PollSchedule.BlockIsDue(Entry[2], IsInput=IsInput):
+                    Due.append(Entry)
+                else:
+                    NotDue.append(Entry)
+            if FastPlans:
+                Stride = self.PollSchedule.FastStride
+            else:
+                Stride = max(1, len(Due))
+            Read = []
+            for Start in range(0, max(1, len(Due)), Stride):
+                if FastPlans:
+                    for FastPlan, FastIsInput in FastPlans:
+                        if not self.ProcessReadPlan(FastPlan, IsInput=FastIsInput):
+                            return False
+                    self.CheckForAlarmEvent.set()
+                Chunk = Due[Start:Start + Stride]
+                if len(Chunk) and not self.ProcessReadPlan(Chunk, IsInput=IsInput):
+                    return False
+                Read.extend(Chunk)
+            if len(Read) != len(Due):
+                # a failed block read was split into single register reads
+                Plan[:] = sorted(NotDue + Read, key=lambda Entry: Entry[0])
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessScheduledReadPlan: " + str(e1))
+        return not self.IsStopping
+
+    # ------------ GeneratorController:UseReadPlans -----------------------------
+    # return True if MasterEmulation should read registers using a read plan,
+    # either to merge registers into block reads or to submit the poll cycle
+    # as a batch when the modbus transport supports pipelining
+    def UseReadPlans(self):
+
+        if self.Simulation or self.ModBus == None:
+            return False
+        return self.UseBlockReads or self.ModBus.CanPipeline()
+
+    # ------------ GeneratorController:CreateReadPlan ---------------------------
+    # Merge registers into block reads. RegisterDict is a dict of register (hex
+    # string) and length in bytes. Returns a list of blocks, each block is a list
+    # of [start register (int), length in words, [[register, word offset, word length], ...]]
+    def CreateReadPlan(self, RegisterDict, MaxGap=None, MaxLength=None, Exclude=None):
+
+        Plan = []
+        try:
+            if MaxGap == None:
+                MaxGap = self.BlockReadMaxGap
+            if MaxLength == None:
+                MaxLength = self.BlockReadMaxLength
+            if Exclude == None:
+                Exclude = self.BlockReadExclude
+            if not self.UseBlockReads:
+                # plan is only used to batch requests, read each register on its own
+                MaxLength = 1
+            # modbus limits a register read to 125 words
+            MaxLength = max(1, min(int(MaxLength), 125))
+            MaxGap = max(0, int(MaxGap))
+
+            RegList = []
+            for Register, Length in RegisterDict.items():
+                if Register.lower().startswith("comment"):
+                    continue
+                RegList.append([int(Register, 16), max(1, int(Length) // 2), Register])
+            RegList.sort(key=lambda x: x[0])
+
+            Block = None
+            for RegInt, WordLength, Register in RegList:
+                CanMerge = (
+                    Block != None
+                    and Register not in Exclude
+                    and Block[3]
+                    and RegInt >= Block[0]
+                    and RegInt <= (Block[0] + Block[1] + MaxGap)
+                    and (max(Block[0] + Block[1], RegInt + WordLength) - Block[0]) <= MaxLength
+                )
+                if CanMerge:
+                    Block[1] = max(Block[1], (RegInt + WordLength) - Block[0])
+                    Block[2].append([Register, RegInt - Block[0], WordLength])
+                    continue
+                if Block != None:
+                    Plan.append(Block[:3])
+                # [start, length, members, merge allowed]
+                Block = [RegInt, WordLength, [[Register, 0, WordLength]], Register not in Exclude]
+            if Block != None:
+                Plan.append(Block[:3])
+        except Exception as e1:
+            self.LogErrorLine("Error in CreateReadPlan: " + str(e1))
+        return Plan
+
+    # ------------ GeneratorController:ProcessReadPlan --------------------------
+    # Read each block in the plan and pass the individual register values to
+    # UpdateRegisterList. Blocks that fail are split so the registers are read
+    # one at a time (see BlockReadFailed). Returns False if the process is stopping.
+    def ProcessReadPlan(self, Plan, IsInput=False):
+
+        if self.ModBus.CanPipeline():
+            return self.ProcessReadPlanBatch(Plan, IsInput=IsInput)
+        try:
+            Index = 0
+            while Index < len(Plan):
+                if self.IsStopping:
+                    return False
+                Start, Length, Members = Plan[Index]
+                localTimeoutCount = self.ModBus.ComTimoutError
+                localSyncError = self.ModBus.ComSyncError
+                localExceptionCount = self.ModBus.ModbusException
+                if len(Members) == 1 and Members[0][1] == 0 and Members[0][2] == Length:
+                    if IsInput:
+                        self.ModBus.ProcessTransaction(Members[0][0], Length, IsInput=True)
+                    else:
+                        self.ModBus.ProcessTransaction(Members[0][0], Length)
+                else:
+                    if IsInput:
+                        Value = self.ModBus.ProcessTransaction("%04x" % Start, Length, skipupdate=True, IsInput=True)
+                    else:
+                        Value = self.ModBus.ProcessTransaction("%04x" % Start, Length, skipupdate=True)
+                    if Value == None or len(Value) != Length * 4:
+                        if self.BlockReadFailed(
+                            Start, Length, IsInput, localExceptionCount != self.ModBus.ModbusException
+                        ):
+                            Plan[Index:Index + 1] = [[int(Reg, 16), WordLength, [[Reg, 0, WordLength]]] for Reg, Offset, WordLength in Members]
+                            self.DelayBetweenFrames()
+                            continue
+                    else:
+                        if len(self.BlockReadFailures):
+                            self.BlockReadFailures.pop((Start, Length, IsInput), None)
+                        for Register, Offset, WordLength in Members:
+                            RegValue = Value[Offset * 4:(Offset + WordLength) * 4]
+                            if not self.UpdateRegisterList(Register, RegValue, IsInput=IsInput):
+                                self.ModBus.ComSyncError += 1
+                if (
+                    localSyncError != self.ModBus.ComSyncError
+                    or localTimeoutCount != self.ModBus.ComTimoutError
+                ) and self.ModBus.RxPacketCount:
+                    # Wait for a bit to allow any missed response from the controller to arrive
+                    # This assumes the plan is processed from ProcessThread
+                    if self.WaitForExit("ProcessThread", float(self.ModBus.ModBusPacketTimoutMS / 1000.0)):
+                        return False
+                    self.ModBus.Flush()
+                self.DelayBetweenFrames()
+                Index += 1
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessReadPlan: " + str(e1))
+        return not self.IsStopping
+
+    # ------------ GeneratorController::BlockReadFailed -------------------------
+    # called when a block read failed, returns True if the block should be
+    # split into single register reads. A modbus exception (i.e. a register in
+    # the block does not exist) splits the block at once. A timeout or CRC
+    # error may not happen again so the block is only split after
+    # BlockReadMaxFailures failures in a row.
+    def BlockReadFailed(self, Start, Length, IsInput, ModbusException):
+
+        Key = (Start, Length, IsInput)
+        Failures = self.BlockReadFailures.get(Key, 0) + 1
+        if ModbusException or Failures >= self.BlockReadMaxFailures:
+            self.BlockReadFailures.pop(Key, None)
+            self.LogDebug("Block read failed, reading registers individually: %04x %d" % (Start, Length))
+            return True
+        self.BlockReadFailures[Key] = Failures
+        return False
+
+    # ------------ GeneratorController::ProcessReadPlanBatch --------------------
+    # submit the whole read plan to the modbus layer at once, used when the
+    # transport can have several requests in flight (Modbus TCP)
+    def ProcessReadPlanBatch(self, Plan, IsInput=False):
+
+        try:
+            Requests = []
+            for Start, Length, Members in Plan:
+                Requests.append(["%04x" % Start, Length, False, IsInput])
+            Results = self.ModBus.ProcessTransactionBatch(Requests, skipupdate=True)
+
+            NewPlan = []
+            Retry = []
+            for Entry, Value in zip(Plan, Results):
+                Start, Length, Members = Entry
+                if Value == None or len(Value) != Length * 4:
+                    if len(Members) > 1 and self.BlockReadFailed(Start, Length, IsInput, Value == None):
+                        for Register, Offset, WordLength in Members:
+                            Single = [int(Register, 16), WordLength, [[Register, 0, WordLength]]]
+                            NewPlan.append(Single)
+                            Retry.append([Register, WordLength, False, IsInput])
+                        continue
+                    NewPlan.append(Entry)
+                    continue
+                NewPlan.append(Entry)
+                if len(self.BlockReadFailures):
+                    self.BlockReadFailures.pop((Start, Length, IsInput), None)
+                for Register, Offset, WordLength in Members:
+                    RegValue = Value[Offset * 4:(Offset + WordLength) * 4]
+                    if not self.UpdateRegisterList(Register, RegValue, IsInput=IsInput):
+                        self.ModBus.ComSyncError += 1
+            Plan[:] = NewPlan
+
+            if len(Retry) and not self.IsStopping:
+                self.ModBus.ProcessTransactionBatch(Retry)
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessReadPlanBatch: " + str(e1))
+        return not self.IsStopping
+
     # ------------ GeneratorController::GetStartInfo ----------------------------
     # return a dictionary with startup info for the gui
     def GetStartInfo(self, NoTile=False):
@@ -1524,7 +2013,7 @@ class GeneratorController(MySupport):
     # ----------  GeneratorController:GetCommStatus  ----------------------------
     # return Dict with communication stats
     def GetCommStatus(self):
-        return self.ModBus.GetCommStats()
+        return self.ModBus.GetCommStats() + self.PollSchedule.GetStats()
 
     # ------------ GeneratorController:GetRunHours ------------------------------
     def GetRunHours(self):
@@ -1766,6 +2255,31 @@ class GeneratorController(MySupport):
             self.LogErrorLine("Error in  DisplayOutageHistory: " + str(e1))
             return []
 
+    # ------------ GeneratorController::SetupBinaryPowerLog----------------------
+    # use a binary power log in place of the text log, the first time this is
+    # enabled the existing text log is imported
+    def SetupBinaryPowerLog(self):
+
+        try:
+            TextLog = self.PowerLog
+            self.PowerLog = os.path.splitext(TextLog)[0] + ".bin"
+            self.BinaryPowerLog = BinaryPowerLog(
+                self.PowerLog, log=self.log, debug=self.debug, simulation=self.Simulation
+            )
+            if not self.BinaryPowerLog.Exists() and os.path.isfile(TextLog):
+                self.BinaryPowerLog.Migrate(TextLog)
+        except Exception as e1:
+            self.LogErrorLine("Error in SetupBinaryPowerLog: " + str(e1))
+
+    # ------------ GeneratorController::GetPowerLogStartEpoch--------------------
+    # return the time of the oldest entry to include for a query of Minutes,
+    # None for the entire log
+    def GetPowerLogStartEpoch(self, Minutes):
+
+        if not Minutes:
+            return None
+        return time.time() - (Minutes * 60)
+
     # ------------ GeneratorController::LogToPowerLog----------------------------
     def LogToPowerLog(self, TimeStamp, Value):
 
@@ -1780,12 +2294,141 @@ class GeneratorController(MySupport):
                     + str(Value)
                 )
                 return
-            if len(self.PowerLogList):
-                self.PowerLogList.insert(0, [TimeStamp, Value])
-            self.LogToFile(self.PowerLog, TimeStamp, Value)
+            with self.PowerLock:
+                if self.BinaryPowerLog != None:
+                    Epoch = time.mktime(time.strptime(TimeStamp, "%x %X"))
+                    self.BinaryPowerLog.Append(Epoch, self.removeAlpha(Value))
+                else:
+                    if len(self.PowerLogList):
+                        self.PowerLogList.insert(0, [TimeStamp, Value])
+                    self.LogToFile(self.PowerLog, TimeStamp, Value)
+                    Epoch = time.mktime(time.strptime(TimeStamp, "%x %X"))
+                if self.PowerTotals != None and self.PowerTotals.Ready:
+                    self.PowerTotals.Add(Epoch, float(self.removeAlpha(Value)))
+                if self.PowerRollup != None and self.PowerRollup.Ready:
+                    self.PowerRollup.Add(Epoch, self.removeAlpha(Value))
         except Exception as e1:
             self.LogErrorLine("Error in LogToPowerLog: " + str(e1))
 
+    # ------------ GeneratorController::ParsePowerLogLine------------------------
+    # return (epoch, kW) for a line of the text power log, None if not valid
+    def ParsePowerLogLine(self, line):
+
+        line = self.removeNonPrintable(line.strip())
+        if not len(line) or line[0] == "#":  # comment
+            return None
+        Items = line.split(",")
+        if len(Items) != 2:
+            return None
+        try:
+            Epoch = time.mktime(time.strptime(Items[0], "%x %X"))
+            return Epoch, float(self.removeAlpha(Items[1]))
+        except Exception as e1:
+            return None
+
+    # ------------ GeneratorController::GetFirstPowerLogTime---------------------
+    # return the time (epoch) of the oldest entry in the power log
+    def GetFirstPowerLogTime(self):
+
+        if self.BinaryPowerLog != None:
+            Record = self.BinaryPowerLog.GetFirstRecord()
+            return None if Record == None else Record[0]
+        with open(self.PowerLog, "r") as LogFile:
+            for line in LogFile:
+                Entry = self.ParsePowerLogLine(line)
+                if Entry != None:
+                    return Entry[0]
+        return None
+
+    # ------------ GeneratorController::ReadPowerLogEntries----------------------
+    # return ([(epoch, kW), ...] oldest first, size of the log) for the entries
+    # at or after Offset in the power log file
+    def ReadPowerLogEntries(self, Offset=0):
+
+        with self.PowerLock:
+            if not os.path.isfile(self.PowerLog):
+                return [], 0
+            if self.BinaryPowerLog != None:
+                return (
+                    self.BinaryPowerLog.ReadRecords(StartOffset=Offset),
+                    os.path.getsize(self.PowerLog),
+                )
+            with open(self.PowerLog, "rb") as LogFile:
+                LogFile.seek(Offset)
+                Data = LogFile.read()
+        Entries = []
+        for line in Data.decode("utf-8", "ignore").splitlines():
+            Entry = self.ParsePowerLogLine(line)
+            if Entry != None:
+                Entries.append(Entry)
+        return Entries, Offset + len(Data)
+
+    # ------------ GeneratorController::SyncPowerTotals--------------------------
+    # load the power totals checkpoint and add any entries logged since it was
+    # saved, if the checkpoint does not match the log the totals are rebuilt
+    def SyncPowerTotals(self):
+
+        if self.PowerTotals == None:
+            return
+        try:
+            with self.PowerLock:
+                Offset = 0
+                Checkpoint = self.PowerTotals.Load()
+                if Checkpoint != None:
+                    LogSize, FirstTime = Checkpoint
+                    if (
+                        not os.path.isfile(self.PowerLog)
+                        or LogSize > os.path.getsize(self.PowerLog)
+                        or FirstTime != self.GetFirstPowerLogTime()
+                    ):
+                        Checkpoint = None
+                    else:
+                        Offset = LogSize
+                if Checkpoint == None:
+                    self.LogDebug("Rebuilding power log totals")
+                    self.PowerTotals.Reset()
+                    Offset = 0
+                Entries, LogSize = self.ReadPowerLogEntries(Offset)
+                for Epoch, Power in Entries:
+                    self.PowerTotals.Add(Epoch, Power)
+                self.PowerTotals.Ready = True
+                self.PowerTotals.Save(LogSize)
+        except Exception as e1:
+            self.LogErrorLine("Error in SyncPowerTotals: " + str(e1))
+
+    # ------------ GeneratorController::RebuildPowerTotals-----------------------
+    def RebuildPowerTotals(self):
+
+        if self.PowerTotals == None:
+            return
+        with self.PowerLock:
+            self.PowerTotals.Reset()
+            Entries, LogSize = self.ReadPowerLogEntries()
+            for Epoch, Power in Entries:
+                self.PowerTotals.Add(Epoch, Power)
+            self.PowerTotals.Save(LogSize)
+
+    # ------------ GeneratorController::BuildPowerRollup-------------------------
+    def BuildPowerRollup(self):
+
+        if self.PowerRollup == None:
+            return
+        try:
+            with self.PowerLock:
+                Entries, LogSize = self.ReadPowerLogEntries()
+                self.PowerRollup.Build(Entries)
+        except Exception as e1:
+            self.LogErrorLine("Error in BuildPowerRollup: " + str(e1))
+
+    # ------------ GeneratorController::SavePowerTotals--------------------------
+    def SavePowerTotals(self):
+
+        if self.PowerTotals == None:
+            return
+        with self.PowerLock:
+            if os.path.isfile(self.PowerLog):
+                self.PowerTotals.Save(os.path.getsize(self.PowerLog))
+
     # ------------ GeneratorController::GetPowerLogFileDetails-------------------
     def GetPowerLogFileDetails(self):
 
@@ -1836,6 +2479,15 @@ class GeneratorController(MySupport):
 
             # if we get here the power log is 85% full or greater so let's try to reduce the size by
             # deleting entires that are older than the input Minutes
+            if self.BinaryPowerLog != None:
+                self.BinaryPowerLog.Prune(self.GetPowerLogStartEpoch(Minutes))
+                self.RebuildPowerTotals()
+                self.BuildPowerRollup()
+                if not len(self.BinaryPowerLog.ReadRecords(MaxEntries=1)):
+                    TimeStamp = datetime.datetime.now().strftime("%x %X")
+                    self.LogToPowerLog(TimeStamp, "0.0")
+                return "OK"
+
             CmdString = "power_log_json=%d" % Minutes
             PowerLog = self.GetPowerHistory(CmdString, NoReduce=True)
 
@@ -1873,6 +2525,10 @@ class GeneratorController(MySupport):
             try:
                 with self.PowerLock:
                     os.remove(self.PowerLog)
+                    if self.PowerTotals != None:
+                        self.PowerTotals.Reset()
+                    if self.PowerRollup != None:
+                        self.PowerRollup.Reset()
                     time.sleep(1)
             except:
                 pass
@@ -2030,6 +2686,8 @@ class GeneratorController(MySupport):
         # check to see if a log file exist yet
         if not os.path.isfile(self.PowerLog):
             return []
+        if self.BinaryPowerLog != None:
+            return self.ReadBinaryPowerLog(Minutes=Minutes, NoReduce=NoReduce)
         PowerList = []
 
         with self.PowerLock:
@@ -2067,6 +2725,22 @@ class GeneratorController(MySupport):
                 self.PowerLogList = PowerList
         return PowerList
 
+    # ------------ GeneratorController::ReadBinaryPowerLog-----------------------
+    # return the binary power log in the same format as the text log, newest
+    # entry first
+    def ReadBinaryPowerLog(self, Minutes=0, NoReduce=False):
+
+        MaxEntries = None
+        if not Minutes and not NoReduce:
+            MaxEntries = self.MaxPowerLogEntries
+        Records = self.BinaryPowerLog.ReadRecords(
+            StartEpoch=self.GetPowerLogStartEpoch(Minutes), MaxEntries=MaxEntries
+        )
+        return [
+            [time.strftime("%x %X", time.localtime(Epoch)), str(Value)]
+            for Epoch, Value in reversed(Records)
+        ]
+
     # ------------ GeneratorController::GetPowerHistory--------------------------
     def GetPowerHistory(self, CmdString, NoReduce=False, FromUI=False):
 
@@ -2136,17 +2810,46 @@ class GeneratorController(MySupport):
                 self.LogDebug("Reducing from UI: " + CmdString)
                 Minutes = (60 *24 * 31) # Minutes in month
 
-            PowerList = self.ReadPowerLogFromFile(Minutes=Minutes)
+            Totals = None
+            if self.PowerTotals != None and (KWHours or FuelConsumption or RunHours):
+                Totals = self.PowerTotals.GetTotals(Minutes, time.time())
+            if Totals != None:
+                AvgPower, TotalSeconds = Totals
+            elif self.BinaryPowerLog != None and (KWHours or FuelConsumption or RunHours):
+                # totals are calculated from the records, no need to format them
+                Records = self.BinaryPowerLog.ReadRecords(
+                    StartEpoch=self.GetPowerLogStartEpoch(Minutes)
+                )
+                AvgPower, TotalSeconds = self.BinaryPowerLog.GetAveragePower(Records)
+            else:
+                if (
+                    Minutes
+                    and not NoReduce
+                    and not KWHours
+                    and not FuelConsumption
+                    and not RunHours
+                    and self.PowerRollup != None
+                    and self.PowerRollup.Ready
+                ):
+                    # too many entries for the time period, use the rollup
+                    Rows = self.PowerRollup.Query(
+                        self.GetPowerLogStartEpoch(Minutes), self.MaxPowerLogEntries
+                    )
+                    if Rows != None:
+                        return Rows
+                PowerList = self.ReadPowerLogFromFile(Minutes=Minutes)
+
+                # Shorten list to self.MaxPowerLogEntries if specific duration requested
+                # if not KWHours and len(PowerList) > self.MaxPowerLogEntries and Minutes and not NoReduce:
+                if len(PowerList) > self.MaxPowerLogEntries and Minutes and not NoReduce:
+                    PowerList = self.ReducePowerSamples(PowerList, self.MaxPowerLogEntries)
+                if not KWHours and not FuelConsumption and not RunHours:
+                    return PowerList
+                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
 
-            # Shorten list to self.MaxPowerLogEntries if specific duration requested
-            # if not KWHours and len(PowerList) > self.MaxPowerLogEntries and Minutes and not NoReduce:
-            if len(PowerList) > self.MaxPowerLogEntries and Minutes and not NoReduce:
-                PowerList = self.ReducePowerSamples(PowerList, self.MaxPowerLogEntries)
             if KWHours:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 return "%.2f" % ((TotalSeconds / 3600) * AvgPower)
             if FuelConsumption:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 Consumption, Label = self.GetFuelConsumption(AvgPower, TotalSeconds)
                 if Consumption == None:
                     return "Unknown"
@@ -2154,11 +2857,8 @@ class GeneratorController(MySupport):
                     self.LogDebug("WARNING: Fuel Consumption is less than zero in GetPowerHistory: %d" % Consumption)
                 return "%.2f %s" % (Consumption, Label)
             if RunHours:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 return "%.2f" % (TotalSeconds / 60.0 / 60.0)
 
-            return PowerList
-
         except Exception as e1:
             self.LogErrorLine("Error in  GetPowerHistory: " + str(e1))
             msgbody = "Error in  GetPowerHistory: " + str(e1)
@@ -2253,6 +2953,8 @@ class GeneratorController(MySupport):
             with self.SensorLogLock:
                 if cache_key in self.SensorLogLists and len(self.SensorLogLists[cache_key]):
                     self.SensorLogLists[cache_key].insert(0, [TimeStamp, Value, epoch])
+                if cache_key in self.SensorRollups:
+                    self.SensorRollups[cache_key].Add(epoch, Value)
             self.LogToFile(LogFile, TimeStamp, Value)
             # Prune if file exceeds size limit
             if os.path.isfile(LogFile):
@@ -2321,13 +3023,18 @@ class GeneratorController(MySupport):
         if cache_key in self.SensorLogLists and len(self.SensorLogLists[cache_key]):
             return self.SensorLogLists[cache_key]
         TempList = self._ParseSensorLogFile(LogFile)
+        SensorRollup = Rollup(log=self.log, debug=self.debug)
+        SensorRollup.Build(
+            [[entry[2], entry[1]] for entry in reversed(TempList) if entry[2]]
+        )
+        self.SensorRollups[cache_key] = SensorRollup
         if len(TempList) > self.MaxSensorLogEntries:
             TempList = self.DecimateList(TempList, self.MaxSensorLogEntries)
         self.SensorLogLists[cache_key] = TempList
         return TempList
 
     # ----------  GeneratorController::GetSensorHistory-----------------------------
-    def GetSensorHistory(self, CmdString):
+    def GetSensorHistory(self, CmdString, NoRollup=False):
         try:
             if not len(CmdString):
                 self.LogError("Error in GetSensorHistory: Invalid input")
@@ -2354,7 +3061,6 @@ class GeneratorController(MySupport):
                     sensor_name = known
                     break
 
-            TempList = self.ReadSensorLogFromFile(sensor_name, Minutes=Minutes)
             if Minutes <= 360:
                 MaxPoints = 1000
             elif Minutes <= 1440:
@@ -2363,6 +3069,14 @@ class GeneratorController(MySupport):
                 MaxPoints = 3000
             else:
                 MaxPoints = 4000
+            TempList = self.ReadSensorLogFromFile(sensor_name, Minutes=Minutes)
+            SensorRollup = self.SensorRollups.get(self.GetSensorCacheKey(sensor_name), None)
+            if not NoRollup and SensorRollup != None:
+                StartEpoch = (time.time() - (Minutes * 60)) if Minutes else None
+                Rows = SensorRollup.Query(StartEpoch, MaxPoints)
+                if Rows != None:
+                    # [timestamp, average, min, max]
+                    return Rows
             if len(TempList) > MaxPoints:
                 TempList = self.DecimateList(TempList, MaxPoints)
             # Return only [timestamp, value] for JSON response
@@ -2387,15 +3101,17 @@ class GeneratorController(MySupport):
                 with self.SensorLogLock:
                     os.remove(LogFile)
                     self.SensorLogLists.pop(cache_key, None)
+                    self.SensorRollups.pop(cache_key, None)
                 return
             # prune old entries
             cache_key = self.GetSensorCacheKey(sensor_name)
             CmdString = "sensor_log_json=%d&sensor=%s" % (Minutes, sensor_name)
-            TempLog = self.GetSensorHistory(CmdString)
+            TempLog = self.GetSensorHistory(CmdString, NoRollup=True)
             with self.SensorLogLock:
                 if os.path.isfile(LogFile):
                     os.remove(LogFile)
                 self.SensorLogLists.pop(cache_key, None)
+                self.SensorRollups.pop(cache_key, None)
             for Items in reversed(TempLog):
                 self.LogToSensorLog(sensor_name, Items[0], Items[1])
         except Exception as e1:
@@ -2412,6 +3128,9 @@ class GeneratorController(MySupport):
                 with self.SensorLogLock:
                     with open(LogFile, "r+") as f:
                         f.truncate(0) 
+                    cache_key = self.GetSensorCacheKey(sensor_name)
+                    self.SensorLogLists.pop(cache_key, None)
+                    self.SensorRollups.pop(cache_key, None)
 
             return "Sensor Log cleared"
         except Exception as e1:
@@ -2500,6 +3219,9 @@ class GeneratorController(MySupport):
             if self.WaitForExit("PowerMeter", 60):
                 return
 
+        self.SyncPowerTotals()
+        self.BuildPowerRollup()
+
         # if log file is empty or does not exist, make a zero entry in log to denote start of collection
         if not os.path.isfile(self.PowerLog) or os.path.getsize(self.PowerLog) == 0:
             TimeStamp = datetime.datetime.now().strftime("%x %X")
@@ -2535,6 +3257,7 @@ class GeneratorController(MySupport):
                 ):  # check 10 min
                     LastFuelCheckTime = datetime.datetime.now()
                     self.CheckFuelLevel()
+                    self.SavePowerTotals()
 
                 # Time to exit?
                 if self.IsStopSignaled("PowerMeter"):
@@ -2825,6 +3548,7 @@ class GeneratorController(MySupport):
                         self.HoursFuelRemainingCurrentLoad = self.GetRemainingFuelTime(
                             ReturnFloat=True, Actual=True
                         )
+                    self.SaveSnapshot()
                     if self.WaitForExit("MaintenanceHouseKeepingThread", 60 * 10):  #
                         return
                 except Exception as e1:
@@ -4077,6 +4801,14 @@ class GeneratorController(MySupport):
                 self.KillThread("MaintenanceHouseKeepingThread")
             except:
                 pass
+            try:
+                self.SavePowerTotals()
+            except:
+                pass
+            try:
+                self.SaveSnapshot()
+            except:
+                pass
             try:
                 self.KillThread("PowerMeter")
             except:
@@ -4085,6 +4817,10 @@ class GeneratorController(MySupport):
                 self.KillThread("SensorCollectionThread")
             except:
                 pass
+            try:
+                PlatformSampler.GetShared().Stop()
+            except:
+                pass
 
             if self.ModBus != None:
                 # close modbus last 
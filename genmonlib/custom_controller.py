@@ -23,7 +23,9 @@ import math
 
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_file import ModbusFile
+from genmonlib.myexec import ExecTemplate
 from genmonlib.mymodbus import ModbusProtocol
+from genmonlib.mypoll import POLL_FAST, POLL_NORMAL
 from genmonlib.mytile import MyTile
 
 
@@ -67,6 +69,12 @@ class CustomController(GeneratorController):
         self.SerialBaudRate = 9600
         self.SerialParity = None
         self.SerialOnePointFiveStopBits = False
+        self.HoldingReadPlan = None     # block read plans, created on first use
+        self.InputReadPlan = None
+        self.FastReadPlans = []         # [plan, IsInput] for the fast poll tier
+        self.FastRegisters = []         # [register, length, IsInput] for the fast poll tier
+        self.ExecTemplates = {}         # exec string : compiled ExecTemplate
+        self.DisplayEntries = {}        # id(entry) : [entry, validated entry or None]
 
         self.DaysOfWeek = {
             0: "Sunday",  # decode for register values with day of week
@@ -463,6 +471,8 @@ class CustomController(GeneratorController):
                         )
                         return False
 
+            self.SetupPollSchedule()
+            self.CompileExecModifiers()
             self.LogDebug("Configuration Validated!")
             self.ConfigValidated = True
 
@@ -471,6 +481,93 @@ class CustomController(GeneratorController):
             self.LogErrorLine("Error in ValidateConfig: " + str(e1))
             return False
 
+    # -------------CustomController:SetupPollSchedule----------------------------
+    # Register entries in holding_registers and input_registers can have a
+    # "poll_tier" of "fast", "normal", "slow" or "once" (see PollScheduler), i.e.
+    # "002a": {"length": 2, "text": "Firmware Version", "poll_tier": "once"}
+    # Registers without a poll_tier that are used for the engine state, switch
+    # state, alarm active or utility voltage are in the fast tier, all others
+    # are in the normal tier.
+    def SetupPollSchedule(self):
+
+        try:
+            FastDefault = []
+            for Section in ["engine_state", "switch_state", "alarm_active", "linevoltage"]:
+                Entries = self.controllerimport.get(Section, [])
+                if isinstance(Entries, dict):
+                    Entries = [Entries]
+                for Entry in Entries:
+                    if not isinstance(Entry, dict) or "reg" not in Entry:
+                        continue
+                    RegType = Entry.get("reg_type", "holding")
+                    if RegType in ["holding", "input"]:
+                        FastDefault.append((Entry["reg"].lower(), RegType == "input"))
+
+            self.PollSchedule.Clear()
+            self.FastRegisters = []
+            for RegType in ["holding_registers", "input_registers"]:
+                IsInput = RegType == "input_registers"
+                for Register, RegisterData in self.controllerimport.get(RegType, {}).items():
+                    if Register.lower().startswith("comment"):
+                        continue
+                    if isinstance(RegisterData, dict):
+                        Length = int(RegisterData["length"])
+                        Tier = RegisterData.get("poll_tier", None)
+                    else:
+                        Length = int(RegisterData)
+                        Tier = None
+                    if Tier == None:
+                        if (Register.lower(), IsInput) in FastDefault:
+                            Tier = POLL_FAST
+                        else:
+                            Tier = POLL_NORMAL
+                    self.PollSchedule.AddRegister(Register, Tier, IsInput=IsInput)
+                    if self.PollSchedule.GetTier(Register, IsInput=IsInput) == POLL_FAST:
+                        self.FastRegisters.append([Register, Length, IsInput])
+            self.LogDebug("Fast poll tier: " + str([Entry[0] for Entry in self.FastRegisters]))
+        except Exception as e1:
+            self.LogErrorLine("Error in SetupPollSchedule: " + str(e1))
+
+    # -------------CustomController:CompileExecModifiers-------------------------
+    # compile the exec modifiers (and the year, month, day, hour and minute
+    # modifiers of the set time commands) once so they are not compiled each
+    # time a value is displayed. Entries are validated the first time they are
+    # displayed (see PrepareDisplayEntry).
+    def CompileExecModifiers(self):
+
+        try:
+            self.ExecTemplates = {}
+            self.DisplayEntries = {}
+            Pending = [self.controllerimport]
+            while len(Pending):
+                Item = Pending.pop()
+                if isinstance(Item, dict):
+                    for Key, Value in Item.items():
+                        if Key in ["exec", "year", "month", "day", "hour", "minute"] and isinstance(Value, str):
+                            self.GetExecTemplate(Value)
+                        elif isinstance(Value, (dict, list)):
+                            Pending.append(Value)
+                elif isinstance(Item, list):
+                    Pending.extend(Item)
+            NotCompiled = [Template.Template for Template in self.ExecTemplates.values() if Template.Code == None]
+            self.LogDebug("Exec modifiers compiled: %d, not compiled: %s" % (len(self.ExecTemplates), str(NotCompiled)))
+        except Exception as e1:
+            self.LogErrorLine("Error in CompileExecModifiers: " + str(e1))
+
+    # -------------CustomController:GetExecTemplate------------------------------
+    def GetExecTemplate(self, exec_string):
+
+        Template = self.ExecTemplates.get(exec_string, None)
+        if Template == None:
+            Template = ExecTemplate(exec_string)
+            self.ExecTemplates[exec_string] = Template
+        return Template
+
+    # -------------CustomController:GetSnapshotKey-------------------------------
+    def GetSnapshotKey(self):
+
+        return self.__class__.__name__ + ":" + str(self.ConfigImportFile)
+
     # -------------CustomController:InitDevice-----------------------------------
     # One time reads, and read all registers once
     def InitDevice(self):
@@ -699,6 +796,65 @@ class CustomController(GeneratorController):
         except Exception as e1:
             self.LogErrorLing("Error in UpdateLogRegistersAsMaster: " + str(e1))
 
+    # -------------CustomController:CreateReadPlans------------------------------
+    # The optional "block_read" object in the controller import file holds the
+    # controller specific settings: "enabled", "max_gap", "max_length" and
+    # "exclude" (list of registers). Values in genmon.conf take precedence.
+    def CreateReadPlans(self):
+
+        try:
+            MaxGap = self.BlockReadMaxGap
+            MaxLength = self.BlockReadMaxLength
+            Exclude = list(self.BlockReadExclude)
+            BlockRead = self.controllerimport.get("block_read", {})
+            if not isinstance(BlockRead, dict):
+                self.LogError("Error in CreateReadPlans: block_read is not an object")
+                BlockRead = {}
+            if not BlockRead.get("enabled", True):
+                self.LogDebug("Block reads disabled by controller import file")
+                MaxGap = 0
+                MaxLength = 1
+            else:
+                if "max_gap" in BlockRead and not self.config.HasOption("modbus_block_max_gap"):
+                    MaxGap = int(BlockRead["max_gap"])
+                if "max_length" in BlockRead and not self.config.HasOption("modbus_block_max_length"):
+                    MaxLength = int(BlockRead["max_length"])
+            for Register in BlockRead.get("exclude", []):
+                Exclude.append("%04x" % int(Register, 16))
+
+            self.FastReadPlans = []
+            for RegType in ["holding_registers", "input_registers"]:
+                IsInput = RegType == "input_registers"
+                # fast tier registers are read in their own plan (see ProcessScheduledReadPlan)
+                RegisterDict = collections.OrderedDict()
+                FastDict = collections.OrderedDict()
+                for Register, RegisterData in self.controllerimport.get(RegType, {}).items():
+                    if Register.lower().startswith("comment"):
+                        continue
+                    if isinstance(RegisterData, dict):
+                        Length = int(RegisterData["length"])
+                    else:
+                        Length = int(RegisterData)
+                    if self.PollSchedule.GetTier(Register, IsInput=IsInput) == POLL_FAST:
+                        FastDict[Register] = Length
+                    else:
+                        RegisterDict[Register] = Length
+                Plan = self.CreateReadPlan(RegisterDict, MaxGap=MaxGap, MaxLength=MaxLength, Exclude=Exclude)
+                self.LogDebug("Block read plan: %d %s in %d reads" % (len(RegisterDict), RegType, len(Plan)))
+                if len(FastDict):
+                    FastPlan = self.CreateReadPlan(FastDict, MaxGap=MaxGap, MaxLength=MaxLength, Exclude=Exclude)
+                    self.LogDebug("Block read plan: %d fast %s in %d reads" % (len(FastDict), RegType, len(FastPlan)))
+                    self.FastReadPlans.append([FastPlan, IsInput])
+                if RegType == "holding_registers":
+                    self.HoldingReadPlan = Plan
+                else:
+                    self.InputReadPlan = Plan
+        except Exception as e1:
+            self.LogErrorLine("Error in CreateReadPlans: " + str(e1))
+            self.HoldingReadPlan = None
+            self.InputReadPlan = None
+            self.FastReadPlans = []
+
     # -------------CustomController:MasterEmulation------------------------------
     def MasterEmulation(self):
 
@@ -707,7 +863,19 @@ class CustomController(GeneratorController):
                 self.ValidateConfig()
                 if not self.ConfigValidated:
                     return
-            if "holding_registers" in self.controllerimport.keys():
+            self.StartPollCycle()
+            UseReadPlan = False
+            if self.UseReadPlans():
+                if self.HoldingReadPlan == None or self.InputReadPlan == None:
+                    self.CreateReadPlans()
+                UseReadPlan = self.HoldingReadPlan != None and self.InputReadPlan != None
+            if UseReadPlan:
+                if not self.ProcessScheduledReadPlan(self.HoldingReadPlan, FastPlans=self.FastReadPlans):
+                    return
+                if not self.ProcessScheduledReadPlan(self.InputReadPlan, IsInput=True, FastPlans=self.FastReadPlans):
+                    return
+            counter = 0
+            if not UseReadPlan and "holding_registers" in self.controllerimport.keys():
                 for Register, RegisterData in self.controllerimport["holding_registers"].items():
                     if Register.lower().startswith("comment"):
                         continue
@@ -718,6 +886,12 @@ class CustomController(GeneratorController):
                     try:
                         if self.IsStopping:
                             return
+                        if not self.PollSchedule.IsDue(Register):
+                            continue
+                        if counter % self.PollSchedule.FastStride == 0:
+                            if not self.ReadFastRegisters(self.FastRegisters):
+                                return
+                        counter += 1
                         localTimeoutCount = self.ModBus.ComTimoutError
                         localSyncError = self.ModBus.ComSyncError
                         self.ModBus.ProcessTransaction(Register, Length // 2)
@@ -730,7 +904,7 @@ class CustomController(GeneratorController):
                     except Exception as e1:
                         self.LogErrorLine("Error in MasterEmulation (holding): " + str(e1))
 
-            if "input_registers" in self.controllerimport.keys():
+            if not UseReadPlan and "input_registers" in self.controllerimport.keys():
                 for Register, RegisterData in self.controllerimport["input_registers"].items():
                     if Register.lower().startswith("comment"):
                         continue
@@ -741,6 +915,12 @@ class CustomController(GeneratorController):
                     try:
                         if self.IsStopping:
                             return
+                        if not self.PollSchedule.IsDue(Register, IsInput=True):
+                            continue
+                        if counter % self.PollSchedule.FastStride == 0:
+                            if not self.ReadFastRegisters(self.FastRegisters):
+                                return
+                        counter += 1
                         localTimeoutCount = self.ModBus.ComTimoutError
                         localSyncError = self.ModBus.ComSyncError
                         self.ModBus.ProcessTransaction(Register, Length // 2, IsInput = True)
@@ -753,6 +933,11 @@ class CustomController(GeneratorController):
                     except Exception as e1:
                         self.LogErrorLine("Error in MasterEmulation (input): " + str(e1))
 
+            if not UseReadPlan and counter == 0:
+                # nothing else was due this cycle, still read the fast tier
+                if not self.ReadFastRegisters(self.FastRegisters):
+                    return
+
             if "coil_registers" in self.controllerimport.keys():
                 for Register, RegisterData in self.controllerimport["coil_registers"].items():
                     if Register.lower().startswith("comment"):
@@ -892,27 +1077,27 @@ class CustomController(GeneratorController):
 
             if IsFile:
                 # todo validate file data length
-                self.FileData[Register] = Value
+                self.SetRegisterValue(self.FileData, Register, Value)
             elif IsCoil:
-                self.Coils[Register] = Value
+                self.SetRegisterValue(self.Coils, Register, Value)
             elif IsInput:
                 if self.ValidateRegister("input_registers", Register, Value):
-                    self.Inputs[Register] = Value
+                    self.SetRegisterValue(self.Inputs, Register, Value)
                 else:
                     ReturnStatus, LogRegLength, Name = self.RegisterIsLog(Register)
                     if ReturnStatus:
-                        self.Inputs[Register] = Value
+                        self.SetRegisterValue(self.Inputs, Register, Value)
                     else:
                         self.LogError("Failure validating log input register: " + Register)
                         return False
             else:   # base register (holding register)
                 #  validate data length
                 if self.ValidateRegister("holding_registers", Register, Value):
-                    self.Holding[Register] = Value
+                    self.SetRegisterValue(self.Holding, Register, Value)
                 else:
                     ReturnStatus, LogRegLength, Name = self.RegisterIsLog(Register)
                     if ReturnStatus:
-                        self.Holding[Register] = Value
+                        self.SetRegisterValue(self.Holding, Register, Value)
                     else:
                         self.LogError("Failure validating log holding register: " + Register)
                         return False
@@ -1583,30 +1768,26 @@ class CustomController(GeneratorController):
             return "Error"
         return "Command not found."
 
-    # ------------ GeneratorController:GetDisplayEntry --------------------------
-    # return a title and value of an input dict describing the modbus register
-    # and type of value it is
-    def GetDisplayEntry(self, entry, JSONNum=False, no_units=False, inheritreg = None, inheritregtype = None):
+    # ------------ GeneratorController:PrepareDisplayEntry ----------------------
+    # return the entry with its includes merged if the entry is valid, None if
+    # not. Entries are validated the first time they are displayed and the
+    # result is kept so this is not repeated each time the status is rendered.
+    def PrepareDisplayEntry(self, entry):
+
+        Prepared = self.DisplayEntries.get(id(entry), None)
+        # the entry is kept in the list so the id can not be reused
+        if Prepared != None and Prepared[0] is entry:
+            return Prepared[1]
+        Validated = self.ValidateDisplayEntry(entry)
+        self.DisplayEntries[id(entry)] = [entry, Validated]
+        return Validated
+
+    # ------------ GeneratorController:ValidateDisplayEntry ---------------------
+    def ValidateDisplayEntry(self, entry):
 
-        ReturnTitle = ReturnValue = None
         try:
             Register = None
             reg_type = None
-            if not isinstance(entry, dict):
-                self.LogError("Error: non dict passed to GetDisplayEntry: " + str(type(entry)))
-                return ReturnTitle, ReturnValue
-
-            if "container" in entry.keys() and entry["container"] and "value" in entry.keys() and "title" in entry.keys():
-                ReturnValue = self.GetDisplayList(entry, "value", JSONNum=JSONNum)
-                return entry["title"], ReturnValue
-            if "inherit" in entry.keys() and inheritreg == None:
-                self.LogError("Error: inherit specified but no inherit value passed")
-                return ReturnTitle, ReturnValue
-
-            if "iteration" in entry.keys():
-                ReturnValue = self.ProcessIterationObject(entry)
-                return entry["title"], ReturnValue
-
             if "include" in entry.keys() and "include" in self.controllerimport.keys():
                 includeNames = entry["include"]
                 includeList = includeNames.split(",")
@@ -1617,63 +1798,106 @@ class CustomController(GeneratorController):
                             entry = self.MergeDicts(entry, includeValue)
                         else:
                             self.LogError("Error: include value is not an object: " + str(includeValue))
-                            return ReturnTitle, ReturnValue
+                            return None
                     else:
                         self.LogError("Error: entry has include but object name is not in scope of base include object: " + str(entry))
-                        return ReturnTitle, ReturnValue
+                        return None
 
             if "reg" not in entry.keys():  # required with exceptions
-                if "inherit" in entry.keys():
-                    Register = inheritreg.lower()   # add inherit register 
-                    reg_type = inheritregtype
-                elif entry["type"] != "list":
+                if "inherit" not in entry.keys() and entry["type"] != "list":
                     self.LogError("Error: reg not found in input to GetDisplayEntry: " + str(entry))
-                    return ReturnTitle, ReturnValue
+                    return None
             else:
                 if "reg_type" in entry.keys():
                     reg_type = entry["reg_type"]
                     if not reg_type in ["coil", "holding", "input", "file", "config"]:
                         self.LogError("Error : invalid reg_type in GetDisplayEntry:" + str(entry))
-                        return ReturnTitle, ReturnValue
+                        return None
                 Register = entry["reg"].lower()
 
+            # an inherited register is checked when the entry is displayed
             if reg_type != "config" and Register != None and not self.StringIsHex(Register):
                 self.LogError("Error: reg does not contain valid hex value in input to GetDisplayEntry: "+ str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             
             if not "type" in entry.keys():  # required
                 self.LogError("Error: type not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             
             if not "title" in entry.keys():  # required
                 self.LogError("Error: title not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             
             if entry["type"] == "bits" and not "value" in entry.keys():
                 self.LogError("Error: value (requried for bits) not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if entry["type"] == "bits" and not "text" in entry.keys():
                 self.LogError("Error: text not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if entry["type"] == "float" and (not "multiplier" in entry.keys() and not "ieee754" in entry.keys()):
                 self.LogError("Error: multiplier or ieee754 (requried for float) not found in input to GetDisplayEntry: "+ str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if entry["type"] == "regex" and not "regex" in entry.keys():
                 self.LogError("Error: regex not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if "multiplier" in entry and entry["multiplier"] == 0:
                 self.LogError("Error: multiplier (requried for float) must not be zero in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if (entry["type"] in ["int", "bits", "regex"] and not "mask" in entry):  # required
                 self.LogError("Error: mask not found in input to GetDisplayEntry: " + str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             elif "mask" in entry and not self.StringIsHex(entry["mask"]):
                 self.LogError("Error: mask does not contain valid hex value in input to GetDisplayEntry: "+ str(entry))
-                return ReturnTitle, ReturnValue
+                return None
             if entry["type"] == "default" and not "text" in entry.keys():
                 self.LogError("Error: text (default) not found in input to GetDisplayEntry: "+ str(entry))
+                return None
+
+            return entry
+        except Exception as e1:
+            self.LogErrorLine("Error in ValidateDisplayEntry : " + str(e1))
+            self.LogDebug(str(entry))
+            return None
+
+    # ------------ GeneratorController:GetDisplayEntry --------------------------
+    # return a title and value of an input dict describing the modbus register
+    # and type of value it is
+    def GetDisplayEntry(self, entry, JSONNum=False, no_units=False, inheritreg = None, inheritregtype = None):
+
+        ReturnTitle = ReturnValue = None
+        try:
+            Register = None
+            reg_type = None
+            if not isinstance(entry, dict):
+                self.LogError("Error: non dict passed to GetDisplayEntry: " + str(type(entry)))
+                return ReturnTitle, ReturnValue
+
+            if "container" in entry.keys() and entry["container"] and "value" in entry.keys() and "title" in entry.keys():
+                ReturnValue = self.GetDisplayList(entry, "value", JSONNum=JSONNum)
+                return entry["title"], ReturnValue
+            if "inherit" in entry.keys() and inheritreg == None:
+                self.LogError("Error: inherit specified but no inherit value passed")
+                return ReturnTitle, ReturnValue
+
+            if "iteration" in entry.keys():
+                ReturnValue = self.ProcessIterationObject(entry)
+                return entry["title"], ReturnValue
+
+            entry = self.PrepareDisplayEntry(entry)
+            if entry == None:
                 return ReturnTitle, ReturnValue
 
+            if "reg" not in entry.keys():
+                if "inherit" in entry.keys():
+                    Register = inheritreg.lower()   # add inherit register 
+                    reg_type = inheritregtype
+                    if reg_type != "config" and not self.StringIsHex(Register):
+                        self.LogError("Error: reg does not contain valid hex value in input to GetDisplayEntry: "+ str(entry))
+                        return ReturnTitle, ReturnValue
+            else:
+                reg_type = entry.get("reg_type", None)
+                Register = entry["reg"].lower()
+
             if entry["type"] != "list":
                 # check if we have read the register yet
                 if ((reg_type == None or reg_type == "holding") and 
@@ -2019,13 +2243,12 @@ class CustomController(GeneratorController):
                 return value
             
             if isinstance(value, tuple):
-                exec_string = entry[execname].format(*value)
+                values = value
             else:
-                exec_string = entry[execname].format(value)
-            exec_out = value
-            localsparam = {'exec_out': exec_out}
-            exec(exec_string, globals(), localsparam)
-            return localsparam["exec_out"]
+                values = (value,)
+            Template = self.GetExecTemplate(entry[execname])
+            exec_string = Template.Template
+            return Template.Run(values, value, globals())
 
         except Exception as e1:
             self.LogErrorLine("Error in ProcessExecModifier: " + str(e1) + ": " + str(entry["title"]))
@@ -2188,7 +2411,7 @@ class CustomController(GeneratorController):
 
             Regs["Holding"] = RegList
             # display all the registers
-            temp_regsiters = self.Holding
+            temp_regsiters = self.Holding.GetHexView()
             for Register, Value in temp_regsiters.items():
                 isLog, LogRegLength, Name = self.RegisterIsLog(Register)
                 if AllRegs or not isLog:
@@ -2196,13 +2419,13 @@ class CustomController(GeneratorController):
 
             Regs["Inputs"] = InputList
             # display all the registers
-            temp_regsiters = self.Inputs
+            temp_regsiters = self.Inputs.GetHexView()
             for Register, Value in temp_regsiters.items():
                 InputList.append({Register: Value})
 
             Regs["Coils"] = CoilList
             # display all the registers
-            temp_regsiters = self.Coils
+            temp_regsiters = self.Coils.GetHexView()
             for Register, Value in temp_regsiters.items():
                 CoilList.append({Register: Value})
         except Exception as e1:
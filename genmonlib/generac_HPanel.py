@@ -17,6 +17,7 @@ import threading
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_file import ModbusFile
 from genmonlib.mymodbus import ModbusProtocol
+from genmonlib.mypoll import POLL_FAST, POLL_NORMAL, POLL_ONCE, POLL_SLOW
 from genmonlib.mytile import MyTile
 
 # Module defines ---------------------------------------------------------------
@@ -1117,6 +1118,11 @@ class HPanel(GeneratorController):
         self.HPanelDetected = True  # False if G-Panel
         self.Reg = HPanelReg()
         self.IO = HPanelIO()
+        self.SnapshotIdentityNames = ["HPanelDetected"]
+        # register map the poll schedule was set up for (H-Panel and G-Panel
+        # registers are not the same), see SetupPollSchedule
+        self.PollScheduleReg = None
+        self.FastRegisters = []
 
         self.DaysOfWeek = {
             1: "Sunday",  # decode for register values with day of week
@@ -1198,6 +1204,17 @@ class HPanel(GeneratorController):
 
         return True
 
+    # -------------HPanel:SetSnapshotIdentity------------------------------------
+    def SetSnapshotIdentity(self, Identity):
+
+        super(HPanel, self).SetSnapshotIdentity(Identity)
+        if self.HPanelDetected:
+            self.Reg = HPanelReg()
+            self.IO = HPanelIO()
+        else:
+            self.Reg = GPanelReg()
+            self.IO = GPanelIO()
+
     # -------------HPanel:IdentifyController-------------------------------------
     def IdentifyController(self):
 
@@ -1639,6 +1656,8 @@ class HPanel(GeneratorController):
                 try:
                     if self.IsStopping:
                         return
+                    if not self.PollSchedule.IsDue(RegisterList[REGISTER]):
+                        continue
                     localTimeoutCount = self.ModBus.ComTimoutError
                     localSyncError = self.ModBus.ComSyncError
                     self.ModBus.ProcessTransaction(
@@ -1657,6 +1676,49 @@ class HPanel(GeneratorController):
         except Exception as e1:
             self.LogErrorLine("Error in GetGeneratorStrings: " + str(e1))
 
+    # -------------HPanel:SetupPollSchedule-------------------------------------
+    # poll tiers for the registers of the detected controller (see PollScheduler)
+    def SetupPollSchedule(self):
+
+        try:
+            FastList = [
+                self.Reg.INPUT_1,
+                self.Reg.ACTIVE_ALARM_COUNT,
+                self.Reg.ENGINE_STATUS_CODE,
+                self.Reg.KEY_SWITCH_STATE,
+                self.Reg.EXT_SW_GENERAL_STATUS,
+                self.Reg.EXT_SW_UTILITY_AVG_VOLTS,
+            ]
+            SlowList = [
+                self.Reg.EXT_SW_TARGET_VOLTAGE,
+                self.Reg.EXT_SW_TARGET_FREQ,
+                RegisterStringEnum.MAINT_LIFE,
+            ]
+            OnceList = [
+                self.Reg.EXT_SW_VERSION,
+                RegisterStringEnum.CONTROLLER_NAME,
+                RegisterStringEnum.VERSION_DATE,
+                RegisterStringEnum.MIN_GENLINK_VERSION,
+            ]
+            self.PollSchedule.Clear()
+            for RegisterList in self.Reg.GetRegList() + RegisterStringEnum.GetRegList():
+                if RegisterList in FastList:
+                    self.PollSchedule.AddRegister(RegisterList[REGISTER], POLL_FAST)
+                elif RegisterList in SlowList:
+                    self.PollSchedule.AddRegister(RegisterList[REGISTER], POLL_SLOW)
+                elif RegisterList in OnceList:
+                    self.PollSchedule.AddRegister(RegisterList[REGISTER], POLL_ONCE)
+                else:
+                    self.PollSchedule.AddRegister(RegisterList[REGISTER], POLL_NORMAL)
+            self.FastRegisters = [
+                [RegisterList[REGISTER], RegisterList[LENGTH], False]
+                for RegisterList in FastList
+                if self.PollSchedule.GetTier(RegisterList[REGISTER]) == POLL_FAST
+            ]
+            self.PollScheduleReg = self.Reg.__class__
+        except Exception as e1:
+            self.LogErrorLine("Error in SetupPollSchedule: " + str(e1))
+
     # -------------HPanel:MasterEmulation----------------------------------------
     def MasterEmulation(self):
 
@@ -1665,10 +1727,20 @@ class HPanel(GeneratorController):
                 self.IdentifyController()
                 if not self.ControllerDetected:
                     return
+            if self.PollScheduleReg != self.Reg.__class__:
+                self.SetupPollSchedule()
+            self.StartPollCycle()
+            counter = 0
             for RegisterList in self.Reg.GetRegList():
                 try:
                     if self.IsStopping:
                         return
+                    if not self.PollSchedule.IsDue(RegisterList[REGISTER]):
+                        continue
+                    if counter % self.PollSchedule.FastStride == 0:
+                        if not self.ReadFastRegisters(self.FastRegisters):
+                            return
+                    counter += 1
                     localTimeoutCount = self.ModBus.ComTimoutError
                     localSyncError = self.ModBus.ComSyncError
                     self.ModBus.ProcessTransaction(
@@ -1683,6 +1755,8 @@ class HPanel(GeneratorController):
                 except Exception as e1:
                     self.LogErrorLine("Error in MasterEmulation: " + str(e1))
 
+            if counter == 0 and not self.ReadFastRegisters(self.FastRegisters):
+                return
             if self.IsStopping:
                 return
             self.GetGeneratorStrings()
@@ -1961,13 +2035,13 @@ class HPanel(GeneratorController):
 
             if not IsFile and self.RegisterIsBaseRegister(Register, Value):
                 # TODO validate register length
-                self.Holding[Register] = Value
+                self.SetRegisterValue(self.Holding, Register, Value)
             elif not IsFile and self.RegisterIsStringRegister(Register):
                 # TODO validate register string length
-                self.Strings[Register] = Value
+                self.SetRegisterValue(self.Strings, Register, Value)
             elif IsFile and self.RegisterIsFileRecord(Register):
                 # todo validate file data length
-                self.FileData[Register] = Value
+                self.SetRegisterValue(self.FileData, Register, Value)
             else:
                 self.LogError(
                     "Error in UpdateRegisterList: Unknown Register "
@@ -3323,7 +3397,7 @@ class HPanel(GeneratorController):
 
             Regs["Holding"] = RegList
             # display all the registers
-            temp_regsiters = self.Holding
+            temp_regsiters = self.Holding.GetHexView()
             for Register, Value in temp_regsiters.items():
                 RegList.append({Register: Value})
 
@@ -3721,7 +3795,7 @@ class HPanel(GeneratorController):
     # ----------  HPanel:GetCommStatus  -----------------------------------------
     # return Dict with communication stats
     def GetCommStatus(self):
-        return self.ModBus.GetCommStats()
+        return self.ModBus.GetCommStats() + self.PollSchedule.GetStats()
 
     # ------------ HPanel:GetBaseStatus -----------------------------------------
     # return one of the following: "ALARM", "SERVICEDUE", "EXERCISING", "RUNNING",
@@ -25,6 +25,7 @@ else:
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_evo2 import ModbusEvo2
 from genmonlib.modbus_file import ModbusFile
+from genmonlib.mypoll import POLL_FAST, POLL_NORMAL, POLL_ONCE, POLL_SLOW
 from genmonlib.mytile import MyTile
 
 # -------------------Generator specific const defines for Generator class--------
@@ -333,11 +334,55 @@ class Evolution(GeneratorController):
             "0638": [2, 0],  # Power Zone 200 Warning is active if non zero
         }  
 
+        # values found by DetectController, saved in the warm start snapshot
+        self.SnapshotIdentityNames = [
+            "EvolutionController",
+            "LiquidCooled",
+            "SynergyController",
+            "PowerZone200",
+            "Evolution2",
+            "PowerPact",
+            "PreNexus",
+            "Evo45L",
+            "bUseLegacyWrite",
+            "bEnhancedExerciseFrequency",
+        ]
+
+        # base registers that are polled less often (see PollScheduler), prime
+        # registers are in the fast tier, other base registers are normal
+        self.SlowPollRegisters = [
+            "0011", "001a", "001b", "001c", "001d", "001e", "001f", "0020",
+            "0021", "0022", "002a", "002b", "0054", "07e6", "07e7", "0208",
+            "0209", "020a", "020b", "020c", "020d", "020e", "020f", "0235",
+            "0236", "0237", "0238", "0239", "023a", "023b", "023d", "023e",
+            "023f", "0241", "0242", "0243", "0244", "0245", "0246", "0247",
+            "0248", "0249", "024a", "0255", "0256", "0258", "025a",
+        ]
+        self.OncePollRegisters = ["0019", "0051", "0059", "005a", "005c"]
+
         self.REGLEN = 0
         self.REGMONITOR = 1
+        self.BaseReadPlan = None  # block read plans, created on first use
+        self.PrimeReadPlan = None
+
+        self.SetupPollSchedule()
 
         self.SetupClass()
 
+    # -------------Evolution:SetupPollSchedule-----------------------------------
+    def SetupPollSchedule(self):
+
+        self.PollSchedule.FastStride = 6
+        for Reg in self.PrimeRegisters.keys():
+            self.PollSchedule.AddRegister(Reg, POLL_FAST)
+        for Reg in self.BaseRegisters.keys():
+            if Reg in self.OncePollRegisters:
+                self.PollSchedule.AddRegister(Reg, POLL_ONCE)
+            elif Reg in self.SlowPollRegisters:
+                self.PollSchedule.AddRegister(Reg, POLL_SLOW)
+            else:
+                self.PollSchedule.AddRegister(Reg, POLL_NORMAL)
+
     # -------------Evolution:SetupClass------------------------------------------
     def SetupClass(self):
 
@@ -1361,6 +1406,8 @@ class Evolution(GeneratorController):
         if len(Value) != 4:
             return ""
         ProductModel = int(Value, 16)
+        # identify the controller from the live data, not the warm start snapshot
+        self.ResetSnapshotIdentity()
         # 0x01  R200
         # 0x02  Pre-Nexus
         # 0x03, 0x4, 0x5  Nexus, Air Cooled
@@ -1530,37 +1577,23 @@ class Evolution(GeneratorController):
     # -------------Evolution:MasterEmulation-------------------------------------
     def MasterEmulation(self):
 
+        if self.UseReadPlans():
+            return self.MasterEmulationBlockRead()
+
+        self.StartPollCycle()
+        FastRegisters = [
+            [PrimeReg, PrimeInfo[self.REGLEN], False]
+            for PrimeReg, PrimeInfo in self.PrimeRegisters.items()
+        ]
         counter = 0
         for Reg, Info in self.BaseRegisters.items():
 
-            if counter % 6 == 0:
-                for PrimeReg, PrimeInfo in self.PrimeRegisters.items():
-                    localTimeoutCount = self.ModBus.ComTimoutError
-                    localSyncError = self.ModBus.ComSyncError
-                    self.ModBus.ProcessTransaction(
-                        PrimeReg, int(PrimeInfo[self.REGLEN] // 2)
-                    )
-                    self.DelayBetweenFrames()
-                    if self.IsStopping:
-                        return
-                    if (
-                        localSyncError != self.ModBus.ComSyncError
-                        or localTimeoutCount != self.ModBus.ComTimoutError
-                    ) and self.ModBus.RxPacketCount:
-                        # if we get here a timeout occured, and we have recieved at least one good packet
-                        # this logic is to keep from receiving a packet that we have already requested once we
-                        # timeout and start to request another
-                        # Wait for a bit to allow any missed response from the controller to arrive
-                        # otherwise this could get us out of sync
-                        # This assumes MasterEmulation is called from ProcessThread
-                        if self.WaitForExit(
-                            "ProcessThread",
-                            float(self.ModBus.ModBusPacketTimoutMS / 1000.0),
-                        ):  #
-                            return
-                        self.ModBus.Flush()
-                # check for unknown events (i.e. events we are not decoded) and send an email if they occur
-                self.CheckForAlarmEvent.set()
+            if not self.PollSchedule.IsDue(Reg):
+                continue
+            if counter % self.PollSchedule.FastStride == 0:
+                # read the prime registers, this also sets CheckForAlarmEvent
+                if not self.ReadFastRegisters(FastRegisters):
+                    return
 
             if self.IsStopping:
                 return
@@ -1571,6 +1604,52 @@ class Evolution(GeneratorController):
             self.DelayBetweenFrames()
             counter += 1
 
+        if counter == 0 and not self.ReadFastRegisters(FastRegisters):
+            return
+
+        # check that we have the serial number, if we do not then retry
+        RegStr = "%04x" % SERIAL_NUM_REG
+        Value = self.GetRegisterValueFromList(RegStr)  # Serial Number Register
+        if len(Value) != 20:
+            self.ModBus.ProcessTransaction(
+                "%04x" % SERIAL_NUM_REG, SERIAL_NUM_REG_LENGTH
+            )
+            self.DelayBetweenFrames()
+
+        if self.PowerZone200:
+            # check that we have the identity, if we do not then retry
+            RegStr = "%04x" % IDENTITY_REG
+            Value = self.GetRegisterValueFromList(RegStr)  # identity Register
+            if len(Value) != 40:
+                self.ModBus.ProcessTransaction(
+                    "%04x" % IDENTITY_REG, IDENTITY_REG_LENGTH
+                )
+
+    # -------------Evolution:MasterEmulationBlockRead----------------------------
+    # same as MasterEmulation but registers are read using read plans (adjacent
+    # registers merged into block reads and/or the poll cycle sent as a batch)
+    def MasterEmulationBlockRead(self):
+
+        self.StartPollCycle()
+        if self.BaseReadPlan == None or self.PrimeReadPlan == None:
+            self.PrimeReadPlan = self.CreateReadPlan(
+                dict((Reg, Info[self.REGLEN]) for Reg, Info in self.PrimeRegisters.items())
+            )
+            self.BaseReadPlan = self.CreateReadPlan(
+                dict((Reg, Info[self.REGLEN]) for Reg, Info in self.BaseRegisters.items())
+            )
+            self.LogDebug(
+                "Block read plan: %d base registers in %d reads, %d prime registers in %d reads"
+                % (len(self.BaseRegisters), len(self.BaseReadPlan), len(self.PrimeRegisters), len(self.PrimeReadPlan))
+            )
+
+        # the prime registers are read first and again after every FastStride
+        # blocks, CheckForAlarmEvent is set after each read of the prime registers
+        if not self.ProcessScheduledReadPlan(
+            self.BaseReadPlan, FastPlans=[[self.PrimeReadPlan, False]]
+        ):
+            return
+
         # check that we have the serial number, if we do not then retry
         RegStr = "%04x" % SERIAL_NUM_REG
         Value = self.GetRegisterValueFromList(RegStr)  # Serial Number Register
@@ -2416,17 +2495,17 @@ class Evolution(GeneratorController):
         RegValue = self.Holding.get(Register, "")
 
         if RegValue == "":
-            self.Holding[
-                Register
-            ] = Value  # first time seeing this register so add it to the list
+            # first time seeing this register so add it to the list
+            self.SetRegisterValue(self.Holding, Register, Value)
         elif RegValue != Value:
             # don't print values of registers we have validated the purpose
             if not self.RegisterIsLog(Register):
                 self.MonitorUnknownRegisters(Register, RegValue, Value)
-            self.Holding[Register] = Value
+            self.SetRegisterValue(self.Holding, Register, Value)
             self.Changed += 1
         else:
             self.NotChanged += 1
+            self.PollSchedule.Observe(Register, False)
 
         self.CheckResetableBits(Register, Value, RegValue)
         return True
@@ -2463,7 +2542,7 @@ class Evolution(GeneratorController):
             Regs["Holding"] = RegList
             # print all the registers
             # make a temp copy in case the registers change whil iterating
-            temp_regsiters = self.Holding
+            temp_regsiters = self.Holding.GetHexView()
             for Register, Value in temp_regsiters.items():
 
                 # do not display log registers or model register
@@ -1212,13 +1212,13 @@ class PowerZonePro(GeneratorController):
             if not IsFile and self.RegisterIsBaseRegister(
                 Register, Value, validate_length=True
             ):
-                self.Holding[Register] = Value
+                self.SetRegisterValue(self.Holding, Register, Value)
             elif not IsFile and self.RegisterIsStringRegister(Register):
                 # TODO validate register string length
-                self.Strings[Register] = Value
+                self.SetRegisterValue(self.Strings, Register, Value)
             elif IsFile and self.RegisterIsFileRecord(Register, Value):
                 # todo validate file data length
-                self.FileData[Register] = Value
+                self.SetRegisterValue(self.FileData, Register, Value)
             else:
                 self.LogError(
                     "Error in UpdateRegisterList: Unknown Register "
@@ -2796,7 +2796,7 @@ class PowerZonePro(GeneratorController):
 
             Regs["Holding"] = RegList
             # display all the registers
-            temp_regsiters = self.Holding
+            temp_regsiters = self.Holding.GetHexView()
             for Register, Value in temp_regsiters.items():
                 RegList.append({Register: Value})
 
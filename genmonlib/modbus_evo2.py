@@ -126,6 +126,13 @@ class ModbusEvo2(ModbusProtocol):
         # check Modbus exceptions and if needed change to encapsulated modbus calls
         return self._PT(Register, Length, skipupdate, ReturnString)
 
+    # -------------ModbusEvo2::CanPipeline--------------------------------------
+    def CanPipeline(self):
+        # encapsulated requests must be sent one at a time
+        if self.Encapsulating():
+            return False
+        return super(ModbusEvo2, self).CanPipeline()
+
     # -------------ModbusProtocol::ProcessWriteTransaction-----------------------
     def ProcessWriteTransaction(self, Register, Length, Data, IsCoil = False, IsSingle = False):
         if self.Encapsulating():
@@ -122,10 +122,9 @@ class ModbusFile(ModbusBase):
                 if IsCoil:
                     RegValue = self.Coils.get(Register, "")
                 elif IsInput:
-                    RegValue = self.Inputs.get(Register, "")
+                    RegValue = self.GetRegisterBlock(self.Inputs, Register, Length)
                 else:
-                    RegValue = self.Registers.get(Register, "")
-                    
+                    RegValue = self.GetRegisterBlock(self.Registers, Register, Length)
 
                 if len(RegValue):
                     while len(RegValue) != Length * 4:
@@ -140,6 +139,12 @@ class ModbusFile(ModbusBase):
         if self.SimulateTime:
             time.sleep(0.02)
 
+        if RegValue == None or not len(RegValue):
+            # the controller would return an Illegal Address exception
+            self.ModbusException += 1
+            self.ExcepAddress += 1
+            return ""
+
         if not skipupdate:
             if not self.UpdateRegisterList == None:
                 self.UpdateRegisterList(
@@ -148,6 +153,29 @@ class ModbusFile(ModbusBase):
 
         return RegValue
 
+    # -------------ModbusFile::GetRegisterBlock---------------------------------
+    # return the value for a read of Length registers starting at Register.
+    # Registers are stored with the length they were read with (i.e. a 32 bit
+    # register is stored as 8 hex digits under the first register), a read of
+    # more registers than are stored at Register continues with the registers
+    # that follow. Returns "" if any register in the block is not present.
+    def GetRegisterBlock(self, RegDict, Register, Length):
+
+        RegValue = RegDict.get(Register, "")
+        if Length <= 1 or not len(RegValue) or len(RegValue) >= Length * 4:
+            return RegValue
+        RegInt = int(Register, 16)
+        Words = (len(RegValue) + 3) // 4
+        Block = RegValue.rjust(Words * 4, "0")
+        while Words < Length:
+            Value = RegDict.get("%04x" % (RegInt + Words), "")
+            if not len(Value):
+                return ""
+            Count = (len(Value) + 3) // 4
+            Block += Value.rjust(Count * 4, "0")
+            Words += Count
+        return Block[: Length * 4]
+
     # -------------ModbusProtocol::ProcessFileReadTransaction---------
     def ProcessFileReadTransaction(
         self, Register, Length, skipupdate=False, file_num=1, ReturnString=False
@@ -189,6 +189,7 @@ class ModbusBase(MySupport):
         self.ComValidationError = 0
         self.ComSyncError = 0
         self.UnexpectedData = 0
+        self.WriteCount = 0  # number of register writes sent
         self.SlowCPUOptimization = False
         self.UseTCP = False
         self.AdditionalModbusTimeout = 0
@@ -196,6 +197,7 @@ class ModbusBase(MySupport):
         self.ResponseAddress = None  # Used if recieve packes have a different address than sent packets
         self.debug = False
         self.UseModbusFunction4 = use_fc4
+        self.PipelineDepth = 1  # max number of requests in flight (Modbus TCP only)
 
         if self.config != None:
             self.debug = self.config.ReadValue("debug", return_type=bool, default=False)
@@ -238,6 +240,12 @@ class ModbusBase(MySupport):
                 "modbus_between_frame_delay", return_type=float, default=0.0, NoLog=True
             )
             
+            self.PipelineDepth = self.config.ReadValue(
+                "modbus_tcp_pipeline_depth", return_type=int, default=1, NoLog=True
+            )
+            if self.PipelineDepth < 1:
+                self.PipelineDepth = 1
+
             ResponseAddressStr = self.config.ReadValue("response_address", default=None)
             if ResponseAddressStr != None:
                 try:
@@ -283,6 +291,37 @@ class ModbusBase(MySupport):
     ):
         return
 
+    # -------------ModbusBase::CanPipeline--------------------------------------
+    # return True if ProcessTransactionBatch can have more than one request in
+    # flight at a time
+    def CanPipeline(self):
+        return False
+
+    # -------------ModbusBase::ProcessTransactionBatch--------------------------
+    # Requests is a list of [Register, Length, IsCoil, IsInput]. Returns a list
+    # of results (same as ProcessTransaction) in the same order as Requests,
+    # the result is None if the controller returned a modbus exception.
+    # The default is to process each request in turn.
+    def ProcessTransactionBatch(self, Requests, skipupdate=False):
+
+        Results = []
+        for Register, Length, IsCoil, IsInput in Requests:
+            if self.IsStopping:
+                break
+            ExceptionCount = self.ModbusException
+            if IsCoil or IsInput:
+                Value = self.ProcessTransaction(
+                    Register, Length, skipupdate=skipupdate, IsCoil=IsCoil, IsInput=IsInput
+                )
+            else:
+                Value = self.ProcessTransaction(Register, Length, skipupdate=skipupdate)
+            if ExceptionCount != self.ModbusException:
+                Value = None
+            Results.append(Value)
+        while len(Results) < len(Requests):
+            Results.append("")
+        return Results
+
     # -------------ModbusProtocol::ProcessFileWriteTransaction-------------------
     def ProcessFileWriteTransaction(
         self, Register, Length, Data, file_num=1, min_response_override=None
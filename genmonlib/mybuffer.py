@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mybuffer.py
+# PURPOSE: receive buffer for serial and serial over TCP comms
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+
+# ---------- MyBuffer------------------------------------------------------------
+class MyBuffer(object):
+    # Byte receive buffer backed by a bytearray. Removing bytes from the front
+    # of a bytearray only moves the start offset (no copy), so discarding a byte
+    # or extracting a frame does not depend on the amount of data buffered.
+    # Indexing returns ints, the same as the list of ints this replaces.
+    # The read thread only appends, the modbus thread only removes from the
+    # front, so no additional locking is needed beyond the device BufferLock.
+
+    # ---------- MyBuffer::__init__---------------------------------------------
+    def __init__(self):
+        self.Data = bytearray()
+
+    # ---------- MyBuffer::__len__----------------------------------------------
+    def __len__(self):
+        return len(self.Data)
+
+    # ---------- MyBuffer::__getitem__------------------------------------------
+    def __getitem__(self, index):
+        return self.Data[index]
+
+    # ---------- MyBuffer::__iter__---------------------------------------------
+    def __iter__(self):
+        return iter(self.Data)
+
+    # ---------- MyBuffer::extend-----------------------------------------------
+    def extend(self, data):
+        self.Data.extend(data)
+
+    # ---------- MyBuffer::append-----------------------------------------------
+    def append(self, value):
+        self.Data.append(value)
+
+    # ---------- MyBuffer::pop--------------------------------------------------
+    # only removing from the front of the buffer is supported
+    def pop(self, index=0):
+        if index != 0:
+            raise IndexError("MyBuffer only supports pop(0)")
+        value = self.Data[0]
+        del self.Data[:1]
+        return value
+
+    # ---------- MyBuffer::Discard----------------------------------------------
+    def Discard(self, count=1):
+        del self.Data[:count]
+
+    # ---------- MyBuffer::GetFrame---------------------------------------------
+    # remove count bytes from the front of the buffer and return them as a
+    # bytearray (the frame no longer shares memory with the buffer so it is
+    # safe to hand off while the read thread keeps appending)
+    def GetFrame(self, count):
+        Frame = self.Data[:count]
+        del self.Data[: len(Frame)]
+        return Frame
+
+    # ---------- MyBuffer::Peek-------------------------------------------------
+    # return a read only copy of the first count bytes without removing them
+    def Peek(self, count=None):
+        if count == None:
+            return bytes(self.Data)
+        return bytes(self.Data[:count])
+
+    # ---------- MyBuffer::Clear------------------------------------------------
+    def Clear(self):
+        del self.Data[:]
+
+    # ---------- MyBuffer::__delitem__------------------------------------------
+    def __delitem__(self, index):
+        del self.Data[index]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mycache.py
+# PURPOSE: cache for command responses shared by socket clients
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import hashlib
+import json
+import threading
+import time
+
+from genmonlib.mycommon import MyCommon
+
+
+# ------------ MyCache class ----------------------------------------------------
+# Each entry is valid until the generation passed in changes (i.e. a register
+# value changed) or it is older than the max age of the entry. If several
+# threads ask for the same key at the same time only one renders the value,
+# the others wait for it.
+class MyCache(MyCommon):
+
+    # ------------ MyCache::init------------------------------------------------
+    def __init__(self, log=None, debug=False):
+
+        super(MyCache, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.CacheLock = threading.Lock()
+        self.KeyLocks = {}  # key : lock held while the value is rendered
+        self.Entries = {}  # key : [generation, time, value]
+        self.ClearCount = 0  # values rendered before a Clear are not stored
+        self.Hits = 0
+        self.Misses = 0
+
+    # ------------ MyCache::GetKeyLock------------------------------------------
+    def GetKeyLock(self, Key):
+
+        with self.CacheLock:
+            Lock = self.KeyLocks.get(Key, None)
+            if Lock == None:
+                Lock = threading.Lock()
+                self.KeyLocks[Key] = Lock
+            return Lock
+
+    # ------------ MyCache::Get-------------------------------------------------
+    # return the cached value for Key, call function(*args) to create it if the
+    # entry is missing or stale. If generation is None only max_age is used.
+    def Get(self, Key, generation, max_age, function, args=()):
+
+        with self.GetKeyLock(Key):
+            Entry = self.Entries.get(Key, None)
+            Now = time.time()
+            if (
+                Entry != None
+                and Entry[0] == generation
+                and (Now - Entry[1]) < max_age
+            ):
+                self.Hits += 1
+                return Entry[2]
+            self.Misses += 1
+            ClearCount = self.ClearCount
+            Value = function(*args)
+            with self.CacheLock:
+                if ClearCount == self.ClearCount:
+                    self.Entries[Key] = [generation, Now, Value]
+            return Value
+
+    # ------------ MyCache::Clear-----------------------------------------------
+    def Clear(self):
+
+        with self.CacheLock:
+            self.ClearCount += 1
+            self.Entries = {}
+
+
+# ------------ ResponseSnapshot class -------------------------------------------
+# A response that is rendered once (i.e. after each poll cycle) and returned to
+# every client until the next one is published. The data is serialized when
+# the snapshot is created and the snapshot is not changed after that, so it can
+# be used by any thread without a lock. The ETag only changes if the serialized
+# data changes, so clients can skip responses they already have.
+class ResponseSnapshot(object):
+
+    # ------------ ResponseSnapshot::init---------------------------------------
+    def __init__(self, data, version=0):
+
+        self.Data = data  # do not modify, shared with subscriptions
+        self.Text = json.dumps(data, sort_keys=False)
+        self.Bytes = self.Text.encode("utf-8")
+        self.ETag = hashlib.sha1(self.Bytes).hexdigest()[:20]
+        self.Version = version  # i.e. the poll cycle the data is from
+        self.Time = time.time()
+
+    # ------------ ResponseSnapshot::GetAge-------------------------------------
+    def GetAge(self):
+
+        return time.time() - self.Time
+
+    # ------------ ResponseSnapshot::GetResponse-------------------------------
+    # return the response (bytes) for a client that has the data for etag. If
+    # etag is None only the data is returned, else the first line is the ETag
+    # of the snapshot and the data follows if etag is not the current ETag.
+    def GetResponse(self, etag=None):
+
+        if etag == None:
+            return self.Bytes
+        Header = ("ETag: " + self.ETag + "\n").encode("utf-8")
+        if etag.strip().strip('"') == self.ETag:
+            return Header
+        return Header + self.Bytes
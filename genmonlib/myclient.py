@@ -7,18 +7,149 @@
 #    DATE: 5-Apr-2017
 # MODIFICATIONS:
 # -------------------------------------------------------------------------------
+import json
 import os
+import select
 import socket
 import sys
 import threading
 import time
 
 from genmonlib.mycommon import MyCommon
+from genmonlib.myframing import (
+    FRAMING_ZLIB,
+    BuildFrame,
+    BuildFramingCommand,
+    GetFramingOptions,
+    RecvFrame,
+)
 from genmonlib.mylog import SetupLogger
+from genmonlib.mysubscription import ApplyChanges
 from genmonlib.program_defaults import ProgramDefaults
 
 
+# ----------  ClientConnection ---------------------------------------------------
+# one connection to genmon, used by ClientInterface
+class ClientConnection(MyCommon):
+    def __init__(
+        self, host, port, log=None, framing=True, compress=True, rxdatasize=2098152
+    ):
+        super(ClientConnection, self).__init__()
+        self.log = log
+        self.host = host
+        self.port = port
+        self.UseFraming = framing
+        self.UseCompression = compress
+        self.Framed = False  # True if genmon accepted framed mode
+        self.Compressed = False  # True if genmon may send compressed frames
+        self.EndOfMessage = "EndOfMessage"
+        self.rxdatasize = rxdatasize
+        self.Socket = None
+
+    # ----------  ClientConnection::Connect -------------------------------------
+    # connect once, returns the initial status from genmon, raises an exception
+    # on failure
+    def Connect(self):
+
+        try:
+            # create an INET, STREAMing socket
+            self.Socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+            # now connect to the server on our port
+            self.Socket.connect((self.host, self.port))
+            # Get initial status before commands are sent
+            sRetData, data = self.Receive(noeom=True)
+            if not len(data):
+                raise socket.error("Connection closed by genmon")
+            if self.UseFraming:
+                self.NegotiateFraming()
+            return data
+        except Exception:
+            self.Close()
+            raise
+
+    # ----------  ClientConnection::NegotiateFraming ----------------------------
+    # switch to framed mode, versions of genmon that do not support framing
+    # return an error and the connection stays in text mode
+    def NegotiateFraming(self):
+
+        Options = [FRAMING_ZLIB] if self.UseCompression else []
+        self.Socket.sendall(BuildFramingCommand(Options).encode("utf-8"))
+        RetStatus, data = self.Receive()
+        Accepted = GetFramingOptions(data)
+        self.Framed = Accepted != None
+        self.Compressed = self.Framed and FRAMING_ZLIB in Accepted
+
+    # ----------  ClientConnection::Receive -------------------------------------
+    # receive a text mode response. The initial status sent when the connection
+    # is opened is the only message without an end of message marker, it is
+    # read with noeom=True. Data is collected in a bytearray and decoded once
+    # so large responses are not copied for each read.
+    def Receive(self, noeom=False):
+
+        bytedata = self.Socket.recv(self.rxdatasize)
+        if not len(bytedata):
+            return False, ""
+        if noeom:
+            return True, bytedata.decode("utf-8")
+
+        EndOfMessage = self.EndOfMessage.encode("utf-8")
+        Buffer = bytearray(bytedata)
+        while not Buffer.endswith(EndOfMessage):
+            morebytes = self.Socket.recv(self.rxdatasize)
+            if not len(morebytes):
+                raise socket.error("Connection closed by genmon")
+            Buffer.extend(morebytes)
+
+        del Buffer[-len(EndOfMessage) :]
+        return True, Buffer.decode("utf-8")
+
+    # ----------  ClientConnection::Command -------------------------------------
+    # send a command and return (status, response), an exception is raised if
+    # the connection failed
+    def Command(self, cmd):
+
+        if self.Framed:
+            self.Socket.sendall(BuildFrame(cmd))
+            Flags, data = RecvFrame(self.Socket)
+            if Flags == None:
+                raise socket.error("Connection closed by genmon")
+            return True, data.decode("utf-8")
+
+        self.Socket.sendall(cmd.encode("utf-8"))
+        RetStatus, data = self.Receive()
+        if not RetStatus:
+            raise socket.error("Connection closed by genmon")
+        return RetStatus, data
+
+    # ----------  ClientConnection::IsHealthy -----------------------------------
+    # an idle connection should have nothing to read, if it is readable genmon
+    # closed the connection (or sent data we did not ask for)
+    def IsHealthy(self):
+
+        try:
+            if self.Socket == None:
+                return False
+            Readable, Writable, Error = select.select([self.Socket], [], [], 0)
+            return not len(Readable)
+        except Exception as e1:
+            return False
+
+    # ----------  ClientConnection::Close ---------------------------------------
+    def Close(self):
+
+        try:
+            if self.Socket != None:
+                self.Socket.close()
+        except:
+            pass
+        self.Socket = None
+
+
 # ----------  ClientInterface::init--- ------------------------------------------
+# pool_size is the max number of connections to genmon, each connection handles
+# one command at a time so more connections allow commands from multiple
+# threads to be processed concurrently. Connections are opened as needed.
 class ClientInterface(MyCommon):
     def __init__(
         self,
@@ -26,6 +157,9 @@ class ClientInterface(MyCommon):
         port=ProgramDefaults.ServerPort,
         log=None,
         loglocation=ProgramDefaults.LogPath,
+        pool_size=1,
+        framing=True,
+        compress=True,
     ):
         super(ClientInterface, self).__init__()
         if log != None:
@@ -36,30 +170,51 @@ class ClientInterface(MyCommon):
 
         self.console = SetupLogger("client_console", log_file="", stream=True)
 
-        self.AccessLock = threading.RLock()
         self.EndOfMessage = "EndOfMessage"
         self.rxdatasize = 2098152  # max json string size plus 1000
         self.host = host
         self.port = port
         self.max_reties = 10
+        self.PoolSize = max(1, pool_size)
+        self.UseFraming = framing
+        self.UseCompression = compress
+        self.PoolCondition = threading.Condition()
+        self.IdleConnections = []
+        self.ConnectionCount = 0  # idle and checked out connections
+        self.SubscribeSocket = None
+        self.SubscribeTopics = []
+        self.SubscribeCallback = None
+        self.SubscribedData = {}  # topic : data, updated from pushed changes
+        self.SubscribeStop = threading.Event()
         self.Connect()
 
+    # ----------  ClientInterface::NewConnection --------------------------------
+    def NewConnection(self):
+
+        return ClientConnection(
+            self.host,
+            self.port,
+            log=self.log,
+            framing=self.UseFraming,
+            compress=self.UseCompression,
+            rxdatasize=self.rxdatasize,
+        )
+
     # ----------  ClientInterface::Connect --------------------------------------
+    # open the first connection, exit if genmon is not running
     def Connect(self):
 
         retries = 0
         while True:
 
             try:
-                # create an INET, STREAMing socket
-                self.Socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-                # now connect to the server on our port
-                self.Socket.connect((self.host, self.port))
-                sRetData, data = self.Receive(
-                    noeom=True
-                )  # Get initial status before commands are sent
+                Connection = self.NewConnection()
+                data = Connection.Connect()
                 self.console.info(data)
+                with self.PoolCondition:
+                    self.ConnectionCount += 1
+                    self.IdleConnections.append(Connection)
+                    self.PoolCondition.notify()
                 return
             except Exception as e1:
                 retries += 1
@@ -71,78 +226,227 @@ class ClientInterface(MyCommon):
                     time.sleep(1)
                     continue
 
-    # ----------  ClientInterface::SendCommand ----------------------------------
-    def SendCommand(self, cmd):
+    # ----------  ClientInterface::CheckOut -------------------------------------
+    # return an idle connection, open a new one if the pool is not full or
+    # wait for one to be returned. Returns None if a new connection failed.
+    def CheckOut(self):
 
+        with self.PoolCondition:
+            while True:
+                if len(self.IdleConnections):
+                    Connection = self.IdleConnections.pop()
+                    if Connection.IsHealthy():
+                        return Connection
+                    Connection.Close()
+                    self.ConnectionCount -= 1
+                    continue
+                if self.ConnectionCount < self.PoolSize:
+                    self.ConnectionCount += 1
+                    break
+                self.PoolCondition.wait()
+
+        # connect outside of the lock so other threads are not blocked
         try:
-            self.Socket.sendall(cmd.encode("utf-8"))
+            Connection = self.NewConnection()
+            Connection.Connect()
+            return Connection
         except Exception as e1:
-            self.LogErrorLine("Error: TX: " + str(e1))
-            self.Close()
-            self.Connect()
+            self.LogErrorLine("Error: Connect : " + str(e1))
+            self.CheckIn(None)
+            return None
 
-    # ----------  ClientInterface::Receive --------------------------------------
-    def Receive(self, noeom=False):
+    # ----------  ClientInterface::CheckIn --------------------------------------
+    # return a connection to the pool, None or a failed connection is closed
+    def CheckIn(self, Connection, Failed=False):
 
-        with self.AccessLock:
-            RetStatus = True
+        with self.PoolCondition:
+            if Connection == None or Failed:
+                if Connection != None:
+                    Connection.Close()
+                self.ConnectionCount -= 1
+            else:
+                self.IdleConnections.append(Connection)
+            self.PoolCondition.notify()
+
+    # ----------  ClientInterface::Subscribe ------------------------------------
+    # Open a second connection to genmon and subscribe to a list of commands
+    # (i.e. ["status_json", "outage_json"]). Genmon pushes changed values as
+    # the controller is read, callback(topic, data) is called with the updated
+    # data for the topic (same format as returned by ProcessMonitorCommand
+    # after json.loads). If the connection is lost callback(topic, None) is
+    # called, the data is sent again after the connection is restored.
+    # Returns False if genmon does not support subscriptions or none of the
+    # topics are supported.
+    def Subscribe(self, topics, callback):
+
+        try:
+            if self.SubscribeSocket != None:
+                self.LogError("Error in Subscribe: already subscribed")
+                return False
+            self.SubscribeTopics = list(topics)
+            self.SubscribeCallback = callback
+            self.SubscribeStop.clear()
+            if not self.SubscribeConnect():
+                return False
+            SubscribeThread = threading.Thread(
+                target=self.SubscribeThread, name="SubscribeThread"
+            )
+            SubscribeThread.daemon = True
+            SubscribeThread.start()
+            return True
+        except Exception as e1:
+            self.LogErrorLine("Error in Subscribe: " + str(e1))
+            return False
+
+    # ----------  ClientInterface::SubscribeConnect -----------------------------
+    def SubscribeConnect(self):
+
+        try:
+            self.SubscribeBuffer = bytearray()
+            self.SubscribeSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.SubscribeSocket.connect((self.host, self.port))
+            self.SubscribeSocket.recv(self.rxdatasize)  # initial status
+            self.SubscribeSocket.sendall(
+                ("generator: subscribe=" + ",".join(self.SubscribeTopics)).encode("utf-8")
+            )
+            self.SubscribeSocket.settimeout(5)
+            Reply = self.ReceiveSubscribeMessage()
+            self.SubscribeSocket.settimeout(1)
+            if Reply == None or not isinstance(Reply, dict) or "subscribed" not in Reply:
+                self.LogError("Subscriptions not supported by genmon")
+                self.SubscribeClose()
+                return False
+            if len(Reply.get("rejected", [])):
+                self.LogError("Subscription topics not supported: " + ",".join(Reply["rejected"]))
+            if not len(Reply["subscribed"]):
+                self.SubscribeClose()
+                return False
+            return True
+        except Exception as e1:
+            self.LogErrorLine("Error in SubscribeConnect: " + str(e1))
+            self.SubscribeClose()
+            return False
+
+    # ----------  ClientInterface::ReceiveSubscribeMessage ----------------------
+    # return the next message from the subscribe connection, None if the
+    # message was not valid JSON. socket.timeout is raised if nothing arrived
+    def ReceiveSubscribeMessage(self):
+
+        EndOfMessage = self.EndOfMessage.encode("utf-8")
+        while True:
+            Index = self.SubscribeBuffer.find(EndOfMessage)
+            if Index >= 0:
+                Message = bytes(self.SubscribeBuffer[:Index])
+                del self.SubscribeBuffer[: Index + len(EndOfMessage)]
+                try:
+                    return json.loads(Message.decode("utf-8"))
+                except Exception as e1:
+                    return None
+            data = self.SubscribeSocket.recv(self.rxdatasize)
+            if not len(data):
+                raise socket.error("Subscribe connection closed")
+            self.SubscribeBuffer.extend(data)
+
+    # ----------  ClientInterface::SubscribeThread ------------------------------
+    def SubscribeThread(self):
+
+        while not self.SubscribeStop.is_set():
             try:
-                bytedata = self.Socket.recv(self.rxdatasize)
-                data = bytedata.decode("utf-8")
-                if len(data):
-                    if not self.CheckForStarupMessage(data) or not noeom:
-                        while not self.EndOfMessage in data:
-                            morebytes = self.Socket.recv(self.rxdatasize)
-                            more = morebytes.decode("utf-8")
-                            if len(more):
-                                if self.CheckForStarupMessage(more):
-                                    data = ""
-                                    RetStatus = False
-                                    break
-                                data += more
-
-                        if data.endswith(self.EndOfMessage):
-                            data = data[: -len(self.EndOfMessage)]
-                            RetStatus = True
+                if self.SubscribeSocket == None:
+                    # genmon restarted, reconnect and subscribe again
+                    if self.SubscribeStop.wait(5):
+                        break
+                    self.SubscribeConnect()
+                    continue
+                Message = self.ReceiveSubscribeMessage()
+                if not isinstance(Message, dict) or "topic" not in Message:
+                    continue
+                Topic = Message["topic"]
+                if Message.get("full", False):
+                    self.SubscribedData[Topic] = Message["data"]
+                elif Topic in self.SubscribedData:
+                    self.SubscribedData[Topic] = ApplyChanges(
+                        self.SubscribedData[Topic], Message["changes"]
+                    )
                 else:
-                    self.Connect()
-                    return False, data
+                    continue
+                try:
+                    self.SubscribeCallback(Topic, self.SubscribedData[Topic])
+                except Exception as e1:
+                    self.LogErrorLine("Error in subscribe callback: " + str(e1))
+            except socket.timeout:
+                continue
             except Exception as e1:
-                self.LogErrorLine("Error: RX:" + str(e1))
-                self.Close()
-                self.Connect()
-                RetStatus = False
-                data = "Retry"
-
-            return RetStatus, data
-
-    # ----------  ClientInterface::CheckForStarupMessage ------------------------
-    def CheckForStarupMessage(self, data):
-
-        # check for initial status response from monitor
-        if (
-            data.startswith("OK")
-            or data.startswith("CRITICAL:")
-            or data.startswith("WARNING:")
-        ):
-            return True
-        else:
-            return False
+                if self.SubscribeStop.is_set():
+                    break
+                self.LogErrorLine("Error in SubscribeThread: " + str(e1))
+                self.SubscribeClose()
+                self.SubscribeLost()
+
+        self.SubscribeClose()
+
+    # ----------  ClientInterface::SubscribeLost --------------------------------
+    # the pushed data is not current until genmon sends it again
+    def SubscribeLost(self):
+
+        Topics = list(self.SubscribedData.keys())
+        self.SubscribedData = {}
+        for Topic in Topics:
+            try:
+                self.SubscribeCallback(Topic, None)
+            except Exception as e1:
+                self.LogErrorLine("Error in subscribe callback: " + str(e1))
+
+    # ----------  ClientInterface::SubscribeClose -------------------------------
+    def SubscribeClose(self):
+
+        try:
+            if self.SubscribeSocket != None:
+                self.SubscribeSocket.close()
+        except:
+            pass
+        self.SubscribeSocket = None
+
+    # ----------  ClientInterface::Unsubscribe ----------------------------------
+    def Unsubscribe(self):
+
+        self.SubscribeStop.set()
+        self.SubscribeClose()
 
     # ----------  ClientInterface::Close ----------------------------------------
     def Close(self):
-        self.Socket.close()
+
+        with self.PoolCondition:
+            for Connection in self.IdleConnections:
+                self.ConnectionCount -= 1
+                Connection.Close()
+            self.IdleConnections = []
 
     # ----------  ClientInterface::ProcessMonitorCommand ------------------------
     def ProcessMonitorCommand(self, cmd):
 
         data = ""
         try:
-            with self.AccessLock:
-                RetStatus = False
-                while RetStatus == False:
-                    self.SendCommand(cmd)
-                    RetStatus, data = self.Receive()
+            retries = 0
+            while retries < self.max_reties:
+                Connection = self.CheckOut()
+                if Connection == None:
+                    # genmon is not responding, only this thread waits
+                    retries += 1
+                    time.sleep(1)
+                    continue
+                try:
+                    RetStatus, data = Connection.Command(cmd)
+                except Exception as e1:
+                    self.LogErrorLine("Error: RX:" + str(e1))
+                    self.CheckIn(Connection, Failed=True)
+                    retries += 1
+                    data = ""
+                    continue
+                self.CheckIn(Connection)
+                if RetStatus:
+                    return data
+                retries += 1
         except Exception as e1:
             self.LogErrorLine("Error in ProcessMonitorCommand:" + str(e1))
         return data
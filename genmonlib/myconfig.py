@@ -10,7 +10,11 @@
 #
 # -------------------------------------------------------------------------------
 
+import collections
+import os
+import shutil
 import sys
+import tempfile
 import threading
 
 if sys.version_info[0] < 3:
@@ -36,6 +40,12 @@ class MyConfig(MyCommon):
         self.Simulation = simulation
         self.CriticalLock = threading.Lock()  # Critical Lock (writing conf file)
         self.InitComplete = False
+        # (section, entry) read by the program, used by Reload to find settings
+        # that changed. Live entries are re-read by the program on a reload,
+        # other entries need a restart.
+        self.AccessedEntries = set()
+        self.LiveEntries = set()
+        self.Batches = {}  # thread ident : list of changes (see Begin / Commit)
         try:
             if sys.version_info[0] < 3:
                 self.config = ConfigParser()
@@ -53,9 +63,15 @@ class MyConfig(MyCommon):
             return
         self.InitComplete = True
 
+    # ---------------------MyConfig::GetEntryKey---------------------------------
+    def GetEntryKey(self, Entry):
+
+        return (str(self.Section).lower(), str(Entry).lower())
+
     # ---------------------MyConfig::HasOption-----------------------------------
     def HasOption(self, Entry):
 
+        self.AccessedEntries.add(self.GetEntryKey(Entry))
         return self.config.has_option(self.Section, Entry)
 
     # ---------------------MyConfig::GetList-------------------------------------
@@ -91,7 +107,7 @@ class MyConfig(MyCommon):
 
     # ---------------------MyConfig::ReadValue-----------------------------------
     def ReadValue(
-        self, Entry, return_type=str, default=None, section=None, NoLog=False
+        self, Entry, return_type=str, default=None, section=None, NoLog=False, live=False
     ):
 
         try:
@@ -99,6 +115,10 @@ class MyConfig(MyCommon):
             if section != None:
                 self.SetSection(section)
 
+            self.AccessedEntries.add(self.GetEntryKey(Entry))
+            if live:
+                self.LiveEntries.add(self.GetEntryKey(Entry))
+
             if self.config.has_option(self.Section, Entry):
                 if return_type == str:
                     return self.config.get(self.Section, Entry)
@@ -128,6 +148,46 @@ class MyConfig(MyCommon):
                 )
             return default
 
+    # ---------------------MyConfig::Reload--------------------------------------
+    # re-read the file (i.e. after another program changed it), returns a list
+    # of (section, entry) that changed or None on error
+    def Reload(self):
+
+        try:
+            if sys.version_info[0] < 3:
+                NewConfig = ConfigParser()
+            else:
+                NewConfig = ConfigParser(interpolation=None)
+            with self.CriticalLock:
+                NewConfig.read(self.FileName)
+                Changed = []
+                for Section in set(self.config.sections()) | set(NewConfig.sections()):
+                    OldItems = {}
+                    NewItems = {}
+                    if self.config.has_section(Section):
+                        OldItems = dict(self.config.items(Section))
+                    if NewConfig.has_section(Section):
+                        NewItems = dict(NewConfig.items(Section))
+                    for Entry in set(OldItems) | set(NewItems):
+                        if OldItems.get(Entry, None) != NewItems.get(Entry, None):
+                            Changed.append((Section.lower(), Entry.lower()))
+                self.config = NewConfig
+            return Changed
+        except Exception as e1:
+            self.LogErrorLine("Error in MyConfig:Reload: " + str(e1))
+            return None
+
+    # ---------------------MyConfig::GetRestartEntries---------------------------
+    # return the entries in Changed (from Reload) that the program read and can
+    # not re-read while running
+    def GetRestartEntries(self, Changed):
+
+        return [
+            Entry
+            for Entry in Changed
+            if Entry in self.AccessedEntries and not Entry in self.LiveEntries
+        ]
+
     # ---------------------MyConfig::WriteSection--------------------------------
     # NOTE: This will remove comments from the config file
     def alt_WriteSection(self, SectionName):
@@ -212,6 +272,38 @@ class MyConfig(MyCommon):
             self.LogErrorLine("Error in WriteValue: " + str(e1))
             return False
 
+    # ---------------------MyConfig::Begin---------------------------------------
+    # start a batch of changes, WriteValue calls from this thread are saved
+    # until Commit is called and then written to the file in one pass
+    def Begin(self):
+
+        with self.CriticalLock:
+            self.Batches[threading.current_thread().ident] = []
+
+    # ---------------------MyConfig::Set-----------------------------------------
+    # add a change to the batch for this thread, same as WriteValue if there
+    # is no batch
+    def Set(self, Entry, Value, remove=False, section=None):
+
+        return self.WriteValue(Entry, Value, remove=remove, section=section)
+
+    # ---------------------MyConfig::Commit--------------------------------------
+    # write the changes in the batch for this thread
+    def Commit(self):
+
+        with self.CriticalLock:
+            Edits = self.Batches.pop(threading.current_thread().ident, None)
+        if Edits == None or not len(Edits):
+            return True
+        return self.WriteEdits(Edits)
+
+    # ---------------------MyConfig::Rollback------------------------------------
+    # discard the changes in the batch for this thread
+    def Rollback(self):
+
+        with self.CriticalLock:
+            self.Batches.pop(threading.current_thread().ident, None)
+
     # ---------------------MyConfig::WriteValue----------------------------------
     def WriteValue(self, Entry, Value, remove=False, section=None):
 
@@ -224,79 +316,155 @@ class MyConfig(MyCommon):
         if section != None:
             self.SetSection(section)
 
-        SectionFound = False
+        Edit = [self.Section, Entry, Value, remove]
+        with self.CriticalLock:
+            Batch = self.Batches.get(threading.current_thread().ident, None)
+            if Batch != None:
+                Batch.append(Edit)
+                return True
+        return self.WriteEdits([Edit])
+
+    # ---------------------MyConfig::WriteEdits----------------------------------
+    # Edits is a list of [section, entry, value, remove]. The file is changed in
+    # one pass (comments are kept), written to a temp file and renamed, then the
+    # changes are made to the cached data.
+    def WriteEdits(self, Edits):
+
+        if self.Simulation:
+            return True
         try:
             with self.CriticalLock:
-                Found = False
-                ConfigFile = open(self.FileName, "r")
-                FileString = ConfigFile.read()
-                ConfigFile.close()
+                with open(self.FileName, "r") as ConfigFile:
+                    FileString = ConfigFile.read()
 
-                # open in unbuffered mode
-                ConfigFile = open(self.FileName, "w")
-                for line in FileString.splitlines():
-                    if not line.isspace():  # blank lines
-                        newLine = line.strip()  # strip leading spaces
-                        if len(newLine):
-                            if not newLine[0] == "#":  # not a comment
-                                if not SectionFound and not self.LineIsSection(newLine):
-                                    ConfigFile.write(line + "\n")
-                                    continue
-
-                                if (
-                                    self.LineIsSection(newLine)
-                                    and self.Section.lower()
-                                    != self.GetSectionName(newLine).lower()
-                                ):
-                                    if (
-                                        SectionFound and not Found and not remove
-                                    ):  # we reached the end of the section
-                                        ConfigFile.write(Entry + " = " + Value + "\n")
-                                        Found = True
-                                    SectionFound = False
-                                    ConfigFile.write(line + "\n")
-                                    continue
-                                if (
-                                    self.LineIsSection(newLine)
-                                    and self.Section.lower()
-                                    == self.GetSectionName(newLine).lower()
-                                ):
-                                    SectionFound = True
-                                    ConfigFile.write(line + "\n")
-                                    continue
-
-                                if not SectionFound:
-                                    ConfigFile.write(line + "\n")
-                                    continue
-                                items = newLine.split(
-                                    "="
-                                )  # split items in line by spaces
-                                if len(items) >= 2:
-                                    items[0] = items[0].strip()
-                                    if items[0] == Entry:
-                                        if not remove:
-                                            ConfigFile.write(
-                                                Entry + " = " + Value + "\n"
-                                            )
-                                        Found = True
-                                        continue
-
-                    ConfigFile.write(line + "\n")
-                # if this is a new entry, then write it to the file, unless we are removing it
-                # this check is if there is not section below the one we are working in,
-                # it will be added to the end of the file
-                if not Found and not remove:
-                    ConfigFile.write(Entry + " = " + Value + "\n")
-                ConfigFile.flush()
-                ConfigFile.close()
-                # update the read data that is cached
-                self.config.read(self.FileName)
+                OutputString = self.ApplyEdits(FileString, Edits)
+
+                # a unique name so two programs writing the file at the same
+                # time do not write to the same temp file
+                Directory = os.path.dirname(os.path.abspath(self.FileName))
+                TempFD, TempFile = tempfile.mkstemp(
+                    dir=Directory, prefix=os.path.basename(self.FileName) + "."
+                )
+                try:
+                    with os.fdopen(TempFD, "w") as ConfigFile:
+                        ConfigFile.write(OutputString)
+                        ConfigFile.flush()
+                        os.fsync(ConfigFile.fileno())
+                    try:
+                        shutil.copymode(self.FileName, TempFile)
+                    except Exception as e1:
+                        pass
+                    os.rename(TempFile, self.FileName)
+                except Exception:
+                    try:
+                        os.remove(TempFile)
+                    except Exception:
+                        pass
+                    raise
+                self.SyncDirectory(Directory)
+
+                # update the data that is cached
+                for Section, Entry, Value, remove in Edits:
+                    SectionName = self.GetCachedSection(Section, Create=not remove)
+                    if SectionName == None:
+                        continue
+                    if remove:
+                        self.config.remove_option(SectionName, Entry)
+                    else:
+                        self.config.set(SectionName, Entry, Value)
             return True
 
         except Exception as e1:
             self.LogErrorLine("Error in WriteValue: " + str(e1))
             return False
 
+    # ---------------------MyConfig::SyncDirectory-------------------------------
+    # write the directory entry of a renamed file to disk, not supported on
+    # some systems (i.e. Windows)
+    def SyncDirectory(self, Directory):
+
+        try:
+            DirFD = os.open(Directory, os.O_RDONLY)
+        except Exception as e1:
+            return
+        try:
+            os.fsync(DirFD)
+        except Exception as e1:
+            pass
+        finally:
+            os.close(DirFD)
+
+    # ---------------------MyConfig::GetCachedSection----------------------------
+    # return the name of the section in the cached data (names are not case
+    # sensitive in the file)
+    def GetCachedSection(self, Section, Create=False):
+
+        for SectionName in self.config.sections():
+            if SectionName.lower() == Section.lower():
+                return SectionName
+        if not Create:
+            return None
+        self.config.add_section(Section)
+        return Section
+
+    # ---------------------MyConfig::ApplyEdits----------------------------------
+    # return the contents of the file (FileString) with the changes in Edits
+    def ApplyEdits(self, FileString, Edits):
+
+        # (section, entry) : [value, remove], the last change to an entry wins
+        EditDict = collections.OrderedDict()
+        for Section, Entry, Value, remove in Edits:
+            EditDict[(Section.lower(), Entry)] = [Value, remove]
+        Done = set()
+        Output = []
+
+        # add the new entries for a section at the end of the section
+        def AddNewEntries(SectionName):
+            for (Section, Entry), (Value, remove) in EditDict.items():
+                if Section == SectionName and not remove and not (Section, Entry) in Done:
+                    Output.append(Entry + " = " + Value)
+                    Done.add((Section, Entry))
+
+        CurrentSection = None
+        for line in FileString.splitlines():
+            newLine = line.strip()
+            if len(newLine) and not newLine[0] == "#":  # not a comment or blank
+                if self.LineIsSection(newLine):
+                    if CurrentSection != None:
+                        AddNewEntries(CurrentSection)
+                    CurrentSection = self.GetSectionName(newLine).lower()
+                    Output.append(line)
+                    continue
+                if CurrentSection != None:
+                    items = newLine.split("=")  # split items in line by spaces
+                    if len(items) >= 2:
+                        Key = (CurrentSection, items[0].strip())
+                        if Key in EditDict:
+                            Value, remove = EditDict[Key]
+                            if not remove:
+                                Output.append(Key[1] + " = " + Value)
+                            Done.add(Key)
+                            continue
+            Output.append(line)
+        if CurrentSection != None:
+            AddNewEntries(CurrentSection)
+
+        # entries in sections that are not in the file
+        for (Section, Entry), (Value, remove) in EditDict.items():
+            if remove or (Section, Entry) in Done:
+                continue
+            Output.append("[" + self.GetOriginalSectionName(Edits, Section) + "]")
+            AddNewEntries(Section)
+        return "\n".join(Output) + "\n"
+
+    # ---------------------MyConfig::GetOriginalSectionName----------------------
+    def GetOriginalSectionName(self, Edits, Section):
+
+        for Items in Edits:
+            if Items[0].lower() == Section:
+                return Items[0]
+        return Section
+
     # ---------------------MyConfig::GetSectionName------------------------------
     def GetSectionName(self, Line):
 
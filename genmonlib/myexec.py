@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myexec.py
+# PURPOSE: precompile the exec modifiers of custom controller definitions
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import ast
+import io
+import math
+import string
+import tokenize
+
+# An exec modifier is a python statement with format placeholders, i.e.
+#
+#   "exec": "exec_out = '{}' if '{}' == 'Monthly' else '{}'"
+#
+# The values are formatted into the statement as text and the result is run
+# with exec(). Compiling the statement for every value is slow, so the
+# statement is compiled once with each placeholder replaced:
+#
+#   - a placeholder in the code is replaced by a variable that holds the value
+#     converted the way python would read it from the text (i.e. "12.5" is the
+#     float 12.5)
+#   - a string literal with placeholders is formatted with the values when the
+#     statement runs, i.e. '{}' becomes '{0}'.format(*values)
+#
+# Statements that can not be compiled this way (placeholders next to names or
+# numbers, format specs in the code etc.) are formatted and run with exec()
+# each time, as before.
+
+VALUE_NAME = "_exec_value%d"
+VALUES_NAME = "_exec_values"
+
+
+# ------------ ExecTemplate class -----------------------------------------------
+class ExecTemplate(object):
+
+    # ------------ ExecTemplate::init-------------------------------------------
+    def __init__(self, template):
+
+        self.Template = template
+        self.Code = None  # compiled statement, None if it could not be compiled
+        self.CodeValues = []  # value index of each placeholder in the code
+        try:
+            self.Compile()
+        except Exception:
+            self.Code = None
+            self.CodeValues = []
+
+    # ------------ ExecTemplate::Compile----------------------------------------
+    def Compile(self):
+
+        Tokens = list(tokenize.generate_tokens(io.StringIO(self.Template).readline))
+        LineStart = [0]
+        for Line in self.Template.splitlines(True):
+            LineStart.append(LineStart[-1] + len(Line))
+
+        def Offset(Position):
+            return LineStart[Position[0] - 1] + Position[1]
+
+        Source = ""
+        Last = 0
+        AutoIndex = 0
+        Numbered = False
+        CodeValues = []
+        Index = 0
+        while Index < len(Tokens):
+            Token = Tokens[Index]
+            if Token.type == tokenize.OP and Token.string == "{":
+                # placeholder in the code, {} or {n}
+                End = Index + 1
+                if End < len(Tokens) and Tokens[End].type == tokenize.NUMBER:
+                    if not Tokens[End].string.isdigit():
+                        return
+                    ValueIndex = int(Tokens[End].string)
+                    Numbered = True
+                    End += 1
+                else:
+                    ValueIndex = AutoIndex
+                    AutoIndex += 1
+                if End >= len(Tokens) or Tokens[End].string != "}":
+                    return
+                if self.Touches(Tokens, Index, End):
+                    return
+                Source += self.Template[Last : Offset(Token.start)]
+                Source += VALUE_NAME % len(CodeValues)
+                CodeValues.append(ValueIndex)
+                Last = Offset(Tokens[End].end)
+                Index = End + 1
+                continue
+            if Token.type == tokenize.OP and Token.string == "}":
+                return
+            if Token.type == tokenize.COMMENT and ("{" in Token.string or "}" in Token.string):
+                return
+            if Token.type == tokenize.STRING and ("{" in Token.string or "}" in Token.string):
+                Prefix = Token.string[: len(Token.string) - len(Token.string.lstrip("rRbBuUfF"))]
+                if "f" in Prefix.lower() or "b" in Prefix.lower():
+                    return
+                Literal = ""
+                Plain = ""  # the literal as text if it has no placeholders
+                HasFields = False
+                for Text, Field, Spec, Conversion in string.Formatter().parse(Token.string):
+                    Literal += Text.replace("{", "{{").replace("}", "}}")
+                    Plain += Text
+                    if Field == None:
+                        continue
+                    if Spec and ("{" in Spec or "}" in Spec):
+                        return
+                    if Field == "":
+                        ValueIndex = AutoIndex
+                        AutoIndex += 1
+                    elif Field.isdigit():
+                        ValueIndex = int(Field)
+                        Numbered = True
+                    else:
+                        return
+                    HasFields = True
+                    Literal += "{" + str(ValueIndex)
+                    if Conversion:
+                        Literal += "!" + Conversion
+                    if Spec:
+                        Literal += ":" + Spec
+                    Literal += "}"
+                Source += self.Template[Last : Offset(Token.start)]
+                if HasFields:
+                    Source += "(" + Literal + ").format(*" + VALUES_NAME + ")"
+                else:
+                    Source += Plain
+                Last = Offset(Token.end)
+            Index += 1
+
+        if Numbered and AutoIndex:
+            # mixing {} and {n} is an error when formatting
+            return
+        Source += self.Template[Last:]
+        self.Code = compile(Source, "<exec>", "exec")
+        self.CodeValues = CodeValues
+
+    # ------------ ExecTemplate::Touches----------------------------------------
+    # True if the placeholder from Tokens[Start] to Tokens[End] is joined to a
+    # name, number or string, i.e. 0x{} or {}5
+    def Touches(self, Tokens, Start, End):
+
+        Joined = (tokenize.NAME, tokenize.NUMBER, tokenize.STRING)
+        if Start > 0 and Tokens[Start - 1].type in Joined:
+            if Tokens[Start - 1].end == Tokens[Start].start:
+                return True
+        if End + 1 < len(Tokens) and Tokens[End + 1].type in Joined:
+            if Tokens[End].end == Tokens[End + 1].start:
+                return True
+        return False
+
+    # ------------ ExecTemplate::CodeValue--------------------------------------
+    # return value as python would read it if it was formatted into the code
+    def CodeValue(self, value):
+
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                raise ValueError("invalid value in exec: " + str(value))
+            return value
+        return ast.literal_eval(str(value).strip())
+
+    # ------------ ExecTemplate::Run--------------------------------------------
+    # values is a tuple of the values for the placeholders, returns exec_out
+    def Run(self, values, exec_out, globalsparam):
+
+        if self.Code == None:
+            localsparam = {"exec_out": exec_out}
+            exec(self.Template.format(*values), globalsparam, localsparam)
+            return localsparam["exec_out"]
+
+        localsparam = {"exec_out": exec_out, VALUES_NAME: values}
+        for Index, ValueIndex in enumerate(self.CodeValues):
+            localsparam[VALUE_NAME % Index] = self.CodeValue(values[ValueIndex])
+        exec(self.Code, globalsparam, localsparam)
+        return localsparam["exec_out"]
+
+    # ------------ ExecTemplate::GetSource--------------------------------------
+    # the statement as it is run for values (used for debugging)
+    def GetSource(self, values):
+
+        return self.Template.format(*values)
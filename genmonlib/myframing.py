@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myframing.py
+# PURPOSE: length prefixed message framing for the genmon socket interface
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import socket
+import struct
+import zlib
+
+# By default commands and responses on the genmon socket are text, responses
+# end with "EndOfMessage". A client can switch a connection to framed mode by
+# sending FRAMING_COMMAND, genmon replies (in text mode) with a response that
+# starts with "OK". After that every command and response is sent as a frame:
+#
+#   byte 0:     flags (FLAG_ZLIB if the payload is compressed)
+#   byte 1-4:   payload length (big endian)
+#   byte 5 on:  payload (utf-8)
+#
+# Options follow the version in the framing command, separated by commas
+# ("generator: framing=1,zlib"). The reply lists the options genmon accepted.
+# If zlib is accepted payloads larger than COMPRESS_THRESHOLD may be sent
+# compressed (i.e. power_log_json, allregs_json).
+
+FRAMING_COMMAND = "generator: framing=1"
+FRAMING_VERSION = "1"
+FRAMING_ZLIB = "zlib"
+FRAME_HEADER = struct.Struct(">BI")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+FLAG_ZLIB = 0x01
+COMPRESS_THRESHOLD = 32 * 1024
+COMPRESS_LEVEL = 1  # fastest, JSON still compresses well at this level
+
+
+# ------------ IsFramingCommand -------------------------------------------------
+def IsFramingCommand(command):
+
+    if isinstance(command, (bytes, bytearray)):
+        command = command.decode("utf-8", "replace")
+    if not command.strip().lower().startswith("generator:"):
+        return False
+    return GetFramingOptions(command) != None
+
+
+# ------------ GetFramingOptions ------------------------------------------------
+# return the list of options in a framing command or reply (i.e. ["zlib"]),
+# None if command is not a framing command for a supported version
+def GetFramingOptions(command):
+
+    if isinstance(command, (bytes, bytearray)):
+        command = command.decode("utf-8", "replace")
+    command = command.strip().lower()
+    Index = command.find("framing=")
+    if Index < 0 or not command[:Index].strip() in ["generator:", "ok:"]:
+        return None
+    Values = [Value.strip() for Value in command[Index + len("framing=") :].split(",")]
+    if Values[0] != FRAMING_VERSION:
+        return None
+    return Values[1:]
+
+
+# ------------ BuildFramingCommand ----------------------------------------------
+def BuildFramingCommand(options=None):
+
+    return ",".join([FRAMING_COMMAND] + list(options or []))
+
+
+# ------------ BuildFramingReply ------------------------------------------------
+def BuildFramingReply(options=None):
+
+    return "OK: " + ",".join(["framing=" + FRAMING_VERSION] + list(options or []))
+
+
+# ------------ BuildFrame -------------------------------------------------------
+# return the frame (bytes) for data (str or bytes), if compress is True and the
+# data is large it is compressed with zlib
+def BuildFrame(data, flags=0, compress=False):
+
+    if not isinstance(data, bytes):
+        data = data.encode("utf-8")
+    if compress and len(data) > COMPRESS_THRESHOLD:
+        data = zlib.compress(data, COMPRESS_LEVEL)
+        flags |= FLAG_ZLIB
+    return FRAME_HEADER.pack(flags, len(data)) + data
+
+
+# ------------ RecvExact --------------------------------------------------------
+# receive exactly count bytes. If the socket has a timeout, stop() is called
+# each time the socket times out, if it returns True the socket.timeout is
+# raised. An empty result is returned if the connection was closed before any
+# data was received.
+def RecvExact(sock, count, stop=None):
+
+    Buffer = bytearray(count)
+    View = memoryview(Buffer)
+    Received = 0
+    while Received < count:
+        try:
+            Length = sock.recv_into(View[Received:], count - Received)
+        except socket.timeout:
+            if stop == None or stop():
+                raise
+            continue
+        if Length == 0:
+            if Received == 0:
+                return b""
+            raise socket.error("Connection closed in the middle of a frame")
+        Received += Length
+    return Buffer
+
+
+# ------------ RecvFrame --------------------------------------------------------
+# return (flags, payload) for the next frame, flags is None if the connection
+# was closed. Compressed payloads are returned decompressed.
+def RecvFrame(sock, stop=None):
+
+    Header = RecvExact(sock, FRAME_HEADER.size, stop=stop)
+    if not len(Header):
+        return None, b""
+    Flags, Length = FRAME_HEADER.unpack(bytes(Header))
+    if Length > MAX_FRAME_SIZE:
+        raise socket.error("Frame too large: %d" % Length)
+    if Length == 0:
+        return Flags, b""
+    Payload = RecvExact(sock, Length, stop=stop)
+    if Flags & FLAG_ZLIB:
+        # limit the decompressed size so a small frame can not expand without
+        # bound
+        Decompressor = zlib.decompressobj()
+        try:
+            Payload = Decompressor.decompress(Payload, MAX_FRAME_SIZE)
+        except zlib.error as e1:
+            raise socket.error("Invalid compressed frame: " + str(e1))
+        if len(Decompressor.unconsumed_tail):
+            raise socket.error("Decompressed frame too large")
+    return Flags, Payload
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myimap.py
+# PURPOSE: IMAP mailbox used to receive commands via email
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import email
+import email.header
+import imaplib
+import re
+import select
+import ssl
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# Commands are sent as the subject of a message in the incoming folder. Only
+# the Subject and From headers of new (unseen) messages are fetched, the
+# processed messages are moved to the processed folder with one command.
+# BODY.PEEK does not set the \Seen flag, so a message that could not be moved
+# is found again by the next search.
+#
+# If the server supports IDLE (RFC 2177) the connection waits for the server
+# to report new messages, otherwise the folder is checked every PollTime
+# seconds. IDLE is renewed every IdleTime seconds (servers end IDLE after 30
+# minutes, NAT on cellular links drops quiet connections sooner).
+
+HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (SUBJECT FROM)]"
+UID_PATTERN = re.compile(rb"UID (\d+)")
+
+
+# ------------ IMAPCommandMailbox class -----------------------------------------
+class IMAPCommandMailbox(MyCommon):
+
+    # ------------ IMAPCommandMailbox::init-------------------------------------
+    def __init__(
+        self,
+        server,
+        account,
+        password,
+        incoming_folder,
+        processed_folder,
+        login=True,
+        log=None,
+        debug=False,
+        poll_time=15,
+        idle_time=300,
+    ):
+
+        super(IMAPCommandMailbox, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Server = server
+        self.Account = account
+        self.Password = password
+        self.IncomingFolder = incoming_folder
+        self.ProcessedFolder = processed_folder
+        self.Login = login
+        self.PollTime = poll_time
+        self.IdleTime = idle_time
+        self.Mailbox = None  # imaplib.IMAP4_SSL
+        self.Capabilities = []
+        self.HasIdle = False
+        self.HasMove = False
+
+    # ------------ IMAPCommandMailbox::Connect----------------------------------
+    # connect, log in and select the incoming folder. Raises an exception on
+    # error
+    def Connect(self):
+
+        self.Mailbox = imaplib.IMAP4_SSL(self.Server)
+        if self.debug:
+            self.Mailbox.Debug = 4
+        if self.Login:
+            self.Mailbox.login(self.Account, self.Password)
+        # servers may list more capabilities after login
+        rv, data = self.Mailbox.capability()
+        if rv == "OK" and len(data) and data[0]:
+            self.Capabilities = data[0].decode("ascii", "replace").upper().split()
+        else:
+            self.Capabilities = [
+                Capability.upper() for Capability in self.Mailbox.capabilities
+            ]
+        self.HasIdle = "IDLE" in self.Capabilities
+        self.HasMove = "MOVE" in self.Capabilities and "MOVE" in imaplib.Commands
+        rv, data = self.Mailbox.select(self.IncomingFolder)
+        if rv != "OK":
+            raise imaplib.IMAP4.error("Error selecting mail folder: " + str(data))
+
+    # ------------ IMAPCommandMailbox::GetMessages------------------------------
+    # return a list of (uid, subject, from) for the unseen messages, or for all
+    # messages if Unseen is False (i.e. messages read by a mail client before
+    # genmon was connected)
+    def GetMessages(self, Unseen=True):
+
+        rv, data = self.Mailbox.uid("SEARCH", None, "UNSEEN" if Unseen else "ALL")
+        if rv != "OK":
+            raise imaplib.IMAP4.error("Error searching mail folder: " + str(data))
+        UIDs = b" ".join(data).split()
+        if not len(UIDs):
+            return []
+        rv, data = self.Mailbox.uid(
+            "FETCH", b",".join(UIDs).decode("ascii"), "(UID " + HEADER_FIELDS + ")"
+        )
+        if rv != "OK":
+            raise imaplib.IMAP4.error("Error fetching messages: " + str(data))
+        Messages = []
+        for Response in data:
+            if not isinstance(Response, tuple):
+                continue
+            Match = UID_PATTERN.search(Response[0])
+            if Match == None:
+                continue
+            Header = email.message_from_bytes(Response[1])
+            Messages.append(
+                (
+                    Match.group(1).decode("ascii"),
+                    self.DecodeHeader(Header["Subject"]),
+                    self.DecodeHeader(Header["From"]),
+                )
+            )
+        Messages.sort(key=lambda Message: int(Message[0]))
+        return Messages
+
+    # ------------ IMAPCommandMailbox::DecodeHeader-----------------------------
+    def DecodeHeader(self, Value):
+
+        if Value == None:
+            return ""
+        try:
+            return str(email.header.make_header(email.header.decode_header(Value)))
+        except Exception:
+            return str(Value)
+
+    # ------------ IMAPCommandMailbox::MoveMessages-----------------------------
+    # move the messages with the list of UIDs to the processed folder
+    def MoveMessages(self, UIDs):
+
+        if not len(UIDs):
+            return
+        UIDSet = ",".join(UIDs)
+        if self.HasMove:
+            rv, data = self.Mailbox.uid("MOVE", UIDSet, self.ProcessedFolder)
+            if rv == "OK":
+                return
+            self.LogDebug("UID MOVE failed, using COPY: " + str(data))
+        rv, data = self.Mailbox.uid("COPY", UIDSet, self.ProcessedFolder)
+        if rv != "OK":
+            raise imaplib.IMAP4.error("Error copying messages: " + str(data))
+        # this is needed to remove the original label
+        self.Mailbox.uid("STORE", UIDSet, "+FLAGS", "(\\Deleted)")
+        self.Mailbox.expunge()
+
+    # ------------ IMAPCommandMailbox::WaitForMessages--------------------------
+    # wait until the server reports a change in the folder (IDLE) or PollTime
+    # seconds have passed (no IDLE). stop() is called every second, the wait
+    # ends if it returns True. Returns the value of stop().
+    def WaitForMessages(self, stop):
+
+        if not self.HasIdle:
+            End = time.time() + self.PollTime
+            while time.time() < End:
+                if stop():
+                    return True
+                time.sleep(min(1, max(End - time.time(), 0)))
+            # a NOOP lets the server report a lost connection
+            self.Mailbox.noop()
+            return stop()
+
+        Tag = self.Mailbox._new_tag()
+        self.Mailbox.send(Tag + b" IDLE\r\n")
+        Line = self.Mailbox.readline()
+        NewMail = False
+        while Line.startswith(b"*"):
+            # untagged responses sent before the continuation
+            if self.IsNewMail(Line):
+                NewMail = True
+            Line = self.Mailbox.readline()
+        if Line.startswith(Tag):
+            # refused, check the folder every PollTime seconds instead
+            self.LogError("IMAP IDLE not accepted, polling: " + str(Line))
+            self.HasIdle = False
+            return self.WaitForMessages(stop)
+        if not Line.startswith(b"+"):
+            raise imaplib.IMAP4.abort("Unexpected response to IDLE: " + str(Line))
+
+        Stopped = False
+        End = time.time() + self.IdleTime
+        try:
+            while not NewMail and time.time() < End:
+                Stopped = stop()
+                if Stopped:
+                    break
+                if not self.DataReady(1):
+                    continue
+                Line = self.Mailbox.readline()
+                if not len(Line):
+                    raise imaplib.IMAP4.abort("Connection closed during IDLE")
+                NewMail = self.IsNewMail(Line)
+        finally:
+            self.Mailbox.send(b"DONE\r\n")
+            while True:
+                Line = self.Mailbox.readline()
+                if not len(Line):
+                    raise imaplib.IMAP4.abort("Connection closed ending IDLE")
+                if Line.startswith(Tag):
+                    break
+        return Stopped
+
+    # ------------ IMAPCommandMailbox::IsNewMail--------------------------------
+    def IsNewMail(self, Line):
+
+        return Line.startswith(b"*") and (b"EXISTS" in Line or b"RECENT" in Line)
+
+    # ------------ IMAPCommandMailbox::DataReady--------------------------------
+    # True if there is data to read, waits up to Timeout seconds. imaplib reads
+    # the socket through a buffered file and SSL may hold decrypted data,
+    # select does not see either so the buffer is checked first without
+    # blocking.
+    def DataReady(self, Timeout):
+
+        Socket = self.Mailbox.socket()
+        SavedTimeout = Socket.gettimeout()
+        try:
+            Socket.settimeout(0)
+            if len(self.Mailbox.file.peek(1)):
+                return True
+        except (ssl.SSLWantReadError, BlockingIOError):
+            pass
+        finally:
+            Socket.settimeout(SavedTimeout)
+        return len(select.select([Socket], [], [], Timeout)[0]) > 0
+
+    # ------------ IMAPCommandMailbox::Close------------------------------------
+    def Close(self):
+
+        if self.Mailbox == None:
+            return
+        try:
+            self.Mailbox.close()
+            self.Mailbox.logout()
+        except Exception:
+            pass
+        self.Mailbox = None
@@ -10,6 +10,7 @@
 # -------------------------------------------------------------------------------
 
 import atexit
+import collections
 import datetime
 import email
 import email.header
@@ -28,11 +29,46 @@ from shutil import copyfile
 import idna
 
 from genmonlib.myconfig import MyConfig
+from genmonlib.myimap import IMAPCommandMailbox
 from genmonlib.mylog import SetupLogger
+from genmonlib.mysmtp import SMTPSession
+from genmonlib.myspool import MySpool
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
 from genmonlib.program_defaults import ProgramDefaults
 
+MAIL_CHANNEL = "email"  # spool channel of the messages to send
+
+# results of MyMail::SendQueuedMail
+MAIL_SENT = 0
+MAIL_RETRY = 1
+MAIL_NO_CONNECTION = 2  # could not connect or log in to the SMTP server
+
+MAIL_RETRY_MIN = 15  # seconds before a failed message is retried, doubles
+MAIL_RETRY_MAX = 120  # for each failure up to this (plus extend_wait)
+
+
+# ------------ QueuedMail class -------------------------------------------------
+# a message in the send queue of MyMail
+class QueuedMail(object):
+    def __init__(self, args):
+
+        (
+            self.MsgType,
+            self.Subject,
+            self.Body,
+            self.Recipient,
+            self.Files,
+            self.DeleteFile,
+            self.ForceText,
+        ) = args
+        self.Time = time.time()  # time the message was queued
+        self.NextTry = 0  # time of the next send attempt
+        self.Attempts = 0
+        self.Envelope = None  # recipients, set when the message is built
+        self.Message = None  # message as sent, built on the first attempt
+        self.Entries = []  # SpoolEntry objects acknowledged when it is sent
+
 
 # ------------ MyMail class -----------------------------------------------------
 class MyMail(MySupport):
@@ -47,6 +83,7 @@ class MyMail(MySupport):
         ConfigFilePath="/etc/",
         log=None,
         start=True,
+        spool=False,
     ):
 
         self.Monitor = monitor  # true if we receive IMAP email
@@ -60,7 +97,13 @@ class MyMail(MySupport):
         else:
             self.ConfigFilePath = ConfigFilePath
         self.Mailbox = 0
-        self.EmailSendQueue = []  # queue for email to send
+        self.Spool = None  # MySpool, messages waiting to be sent
+        self.UseSpool = spool  # True to save the messages to send on disk
+        self.SpooledMail = set()  # SpoolEntry objects in PendingMail
+        self.PendingMail = []  # QueuedMail objects, used by SendMailThread only
+        self.LastSentTo = {}  # recipient : time a message was last sent
+        self.ConnectRetryTime = 0  # no messages are sent before this time
+        self.BatchWindow = 0
         self.DisableEmail = False
         self.DisableIMAP = False
         self.DisableSNMP = False
@@ -99,6 +142,15 @@ class MyMail(MySupport):
         self.config = MyConfig(filename=self.configfile, section="MyMail", log=self.log)
 
         self.GetConfig()
+        self.Session = SMTPSession(log=self.log, debug=self.debug)
+        if self.UseSpool and not self.DisableEmail and not self.DisableSMTP and len(self.SMTPServer):
+            self.Spool = MySpool(
+                os.path.join(self.ConfigFilePath, "spool", "mymail"),
+                log=self.log,
+                debug=self.debug,
+            )
+        else:
+            self.Spool = MySpool(None, log=self.log, debug=self.debug)
 
         if self.DisableEmail:
             self.DisableIMAP = True
@@ -456,6 +508,7 @@ class MyMail(MySupport):
                 return text
 
     # ---------- MyMail.GetConfig -----------------------------------------------
+    # settings read with live=True are re-read when genmon reloads the config
     def GetConfig(self, reload=False):
 
         try:
@@ -476,7 +529,7 @@ class MyMail(MySupport):
 
             if self.config.HasOption("smtpauth_disable"):
                 self.DisableSmtpAuth = self.config.ReadValue(
-                    "smtpauth_disable", return_type=bool
+                    "smtpauth_disable", return_type=bool, live=True
                 )
             else:
                 self.DisableSmtpAuth = False
@@ -489,40 +542,44 @@ class MyMail(MySupport):
                 self.DisableIMAP = False
 
             if self.config.HasOption("usebcc"):
-                self.UseBCC = self.config.ReadValue("usebcc", return_type=bool)
+                self.UseBCC = self.config.ReadValue("usebcc", return_type=bool, live=True)
             
             self.UseHTML = self.config.ReadValue(
-                "use_html", return_type=bool, default=False
+                "use_html", return_type=bool, default=False, live=True
             )
 
             if self.config.HasOption("extend_wait"):
                 self.ExtendWait = self.config.ReadValue(
-                    "extend_wait", return_type=int, default=0, NoLog=True
+                    "extend_wait", return_type=int, default=0, NoLog=True, live=True
                 )
 
+            self.BatchWindow = self.config.ReadValue(
+                "batch_window", return_type=int, default=0, NoLog=True, live=True
+            )
+
             self.debug = self.config.ReadValue("debug", return_type=bool, default=False)
 
-            self.EmailPassword = self.config.ReadValue("email_pw", default="")
+            self.EmailPassword = self.config.ReadValue("email_pw", default="", live=True)
             self.EmailPassword = self.EmailPassword.strip()
-            self.EmailAccount = self.config.ReadValue("email_account")
+            self.EmailAccount = self.config.ReadValue("email_account", live=True)
             if self.config.HasOption("sender_account"):
-                self.SenderAccount = self.config.ReadValue("sender_account")
+                self.SenderAccount = self.config.ReadValue("sender_account", live=True)
                 self.SenderAccount = self.SenderAccount.strip()
                 if not len(self.SenderAccount):
                     self.SenderAccount = self.EmailAccount
             else:
                 self.SenderAccount = self.EmailAccount
 
-            self.SenderName = self.config.ReadValue("sender_name", default=None)
+            self.SenderName = self.config.ReadValue("sender_name", default=None, live=True)
 
             # SMTP Recipients
-            self.EmailRecipient = self.config.ReadValue("email_recipient")
+            self.EmailRecipient = self.config.ReadValue("email_recipient", live=True)
             self.EmailRecipientByType = {}
             for type in ["outage", "error", "warn", "info"]:
                 tempList = []
                 for email in self.EmailRecipient.split(","):
                     if self.config.HasOption(email):
-                        if type in self.config.ReadValue(email).split(","):
+                        if type in self.config.ReadValue(email, live=True).split(","):
                             tempList.append(email)
                     else:
                         tempList.append(email)
@@ -530,7 +587,7 @@ class MyMail(MySupport):
                 self.EmailRecipientByType[type] = ",".join(tempList)
             # SMTP Server
             if self.config.HasOption("smtp_server"):
-                self.SMTPServer = self.config.ReadValue("smtp_server")
+                self.SMTPServer = self.config.ReadValue("smtp_server", live=True)
                 self.SMTPServer = self.SMTPServer.strip()
             else:
                 self.SMTPServer = ""
@@ -541,14 +598,14 @@ class MyMail(MySupport):
             else:
                 self.IMAPServer = ""
             self.SMTPPort = self.config.ReadValue(
-                "smtp_port", return_type=int, default=587
+                "smtp_port", return_type=int, default=587, live=True
             )
 
             if self.config.HasOption("ssl_enabled"):
-                self.SSLEnabled = self.config.ReadValue("ssl_enabled", return_type=bool)
+                self.SSLEnabled = self.config.ReadValue("ssl_enabled", return_type=bool, live=True)
 
             self.TLSDisable = self.config.ReadValue(
-                "tls_disable", return_type=bool, default=False
+                "tls_disable", return_type=bool, default=False, live=True
             )
 
         except Exception as e1:
@@ -564,8 +621,12 @@ class MyMail(MySupport):
                 if self.SMTPServer != "" and not self.DisableSMTP:
                     try:
                         self.Threads["SendMailThread"].Stop()
+                        self.WakeSendThread()
+                        self.Threads["SendMailThread"].WaitForThreadToEnd(5)
                     except:
                         pass
+            if self.Spool != None:
+                self.Spool.Close()
 
             if not self.DisableEmail:
                 if self.Monitor and self.IMAPServer != "" and not self.DisableIMAP:
@@ -581,79 +642,67 @@ class MyMail(MySupport):
 
             if self.Monitor:
                 if self.Mailbox:
-                    try:
-                        self.Mailbox.close()
-                        self.Mailbox.logout()
-                    except:
-                        pass
+                    self.Mailbox.Close()
         except Exception as e1:
             self.LogErrorLine("Error Closing Mail: " + str(e1))
 
     # ---------- MyMail.EmailCommandThread --------------------------------------
     def EmailCommandThread(self):
 
+        def Stop():
+            return self.Threads["EmailCommandThread"].StopSignaled()
+
         while True:
             # start email command thread
+            self.Mailbox = IMAPCommandMailbox(
+                self.IMAPServer,
+                self.EmailAccount,
+                self.EmailPassword,
+                self.IncomingFolder,
+                self.ProcessedFolder,
+                login=not self.DisableSmtpAuth,
+                log=self.log,
+                debug=self.debug,
+            )
             try:
-                self.Mailbox = imaplib.IMAP4_SSL(self.IMAPServer)
-                if self.debug:
-                    self.Mailbox.Debug = 4
+                self.Mailbox.Connect()
+            except (imaplib.IMAP4.error, imaplib.IMAP4.abort) as e1:
+                self.LogError("LOGIN FAILED!!! " + str(e1))
+                self.Mailbox.Close()
+                if self.WaitForExit("EmailCommandThread", 60):
+                    return  # exit thread
+                continue
             except Exception:
                 self.LogError("No Internet Connection! ")
+                self.Mailbox.Close()
                 if self.WaitForExit("EmailCommandThread", 120):
                     return  # exit thread
                 continue
-            try:
-                if not self.DisableSmtpAuth:
-                    data = self.Mailbox.login(self.EmailAccount, self.EmailPassword)
-            except Exception as e1:
-                self.LogError("LOGIN FAILED!!! " + str(e1))
-                if self.WaitForExit("EmailCommandThread", 60):
-                    return  # exit thread
-                continue
+            self.LogDebug(
+                "IMAP connected, IDLE: " + str(self.Mailbox.HasIdle)
+                + ", MOVE: " + str(self.Mailbox.HasMove)
+            )
+            # after connecting also process messages that were already read
+            Unseen = False
             while True:
                 try:
-                    rv, data = self.Mailbox.select(self.IncomingFolder)
-                    if rv != "OK":
-                        self.LogError("Error selecting mail folder! (select)")
-                        if self.WaitForExit("EmailCommandThread", 15):
-                            return
-                        continue
-                    rv, data = self.Mailbox.search(None, "ALL")
-                    if rv != "OK":
-                        self.LogError("No messages found! (search)")
-                        if self.WaitForExit("EmailCommandThread", 15):
-                            return
-                        continue
-                    for num in data[0].split():
-                        rv, data = self.Mailbox.fetch(num, "(RFC822)")
-                        if rv != "OK":
-                            self.LogError("ERROR getting message (fetch): " + str(num))
-                            if self.WaitForExit("EmailCommandThread", 15):
-                                return
-                            continue
-                        if sys.version_info[0] < 3:  # PYTHON 2
-                            msg = email.message_from_string(data[0][1])
-                        else:  # PYTHON 3
-                            msg = email.message_from_bytes(data[0][1])
-                        decode_val = email.header.decode_header(msg["Subject"])[0]
-                        if sys.version_info[0] < 3:  # PYTHON 2
-                            subject = unicode(decode_val[0])
-                            subject = subject.decode("utf-8")
-                        else:  # PYTHON 3
-                            subject = decode_val[0]
-                        self.IncomingCallback(subject)
-
-                        # move the message to processed folder
-                        self.Mailbox.copy(num, self.ProcessedFolder)
-                        self.Mailbox.store(
-                            num, "+FLAGS", "\\Deleted"
-                        )  # this is needed to remove the original label
-                        self.Mailbox.expunge()
-                    if self.WaitForExit("EmailCommandThread", 15):
+                    Processed = []
+                    for UID, Subject, Sender in self.Mailbox.GetMessages(Unseen=Unseen):
+                        self.LogDebug("Email command from " + Sender + ": " + Subject)
+                        try:
+                            self.IncomingCallback(Subject)
+                        except Exception as e1:
+                            self.LogErrorLine("Error processing email command: " + str(e1))
+                        Processed.append(UID)
+                    # move the messages to processed folder
+                    self.Mailbox.MoveMessages(Processed)
+                    Unseen = True
+                    if self.Mailbox.WaitForMessages(Stop):
+                        self.Mailbox.Close()
                         return
                 except Exception as e1:
                     self.LogErrorLine("Resetting email thread : " + str(e1))
+                    self.Mailbox.Close()
                     if self.WaitForExit("EmailCommandThread", 60):  # 60 sec
                         return
                     break
@@ -684,17 +733,51 @@ class MyMail(MySupport):
         self, msgtype, subjectstr, msgstr, recipient=None, files=None, deletefile=False, force_text = False
     ):
 
+        recipient = self.GetRecipientByType(msgtype, recipient)
+        if recipient == None:
+            # returning true here means that there is not category for this message
+            self.LogDebug("Message abandoned, no recipient")
+            return True
+
+        Mail = self.BuildMIMEMessage(
+            subjectstr, msgstr, recipient, files=files, deletefile=deletefile, force_text=force_text
+        )
+        if Mail == None:
+            return False
+
+        Session = SMTPSession(log=self.log, debug=self.debug)
         try:
-            recipient = self.GetRecipientByType(msgtype, recipient)
-            if recipient == None:
-                # returning true here means that there is not category for this message
-                self.LogDebug("Message abandoned, no recipient")
-                return True
+            Refused = Session.SendMail(
+                self.GetSMTPSettings(), MyMail.FilterAddress(self.SenderAccount), Mail[0], Mail[1]
+            )
+            for Address, Response in Refused.items():
+                self.LogError("Mail to " + str(Address) + " refused: " + str(Response))
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error SMTP sendmail: SSL:<" + str(self.SSLEnabled) + ">: " + str(e1)
+            )
+            return False
+        finally:
+            Session.Close()
+
+        return True
+
+    # end sendEmailDirectMIME()
 
+    # ------------ MyMail.BuildMIMEMessage --------------------------------------
+    # returns (envelope recipients, message) or None on error. timestamp is the
+    # time shown in the message, default is now.
+    def BuildMIMEMessage(
+        self, subjectstr, msgstr, recipient, files=None, deletefile=False, force_text=False, timestamp=None
+    ):
+
+        try:
+            if timestamp == None:
+                timestamp = time.time()
             # update date
-            dtstamp = datetime.datetime.now().strftime("%a %d-%b-%Y")
+            dtstamp = datetime.datetime.fromtimestamp(timestamp).strftime("%a %d-%b-%Y")
             # update time
-            tmstamp = datetime.datetime.now().strftime("%I:%M:%S %p")
+            tmstamp = datetime.datetime.fromtimestamp(timestamp).strftime("%I:%M:%S %p")
             try:
                 import email.policy
                 parent = MIMEMultipart('mixed',policy=email.policy.SMTP)
@@ -722,7 +805,7 @@ class MyMail(MySupport):
             parent.attach(msg)
         except Exception as e1:
             self.LogErrorLine("Error in email init: " + str(e1))
-            return False
+            return None
 
         try:
             recipientList = recipient.strip().split(",")
@@ -739,7 +822,7 @@ class MyMail(MySupport):
             else:
                 parent["To"] = recipient
 
-            parent["Date"] = formatdate(localtime=True)
+            parent["Date"] = formatdate(timestamp, localtime=True)
             parent["Subject"] = subjectstr
 
             body = ("\r\n" + "Time: " + tmstamp + "\r\n" + 
@@ -770,7 +853,7 @@ class MyMail(MySupport):
                     msg.attach(MIMEText(body, "plain"))
         except Exception as e1:
             self.LogErrorLine("Error in email init 2: " + str(e1))
-            return False
+            return None
 
         # if the files are not found then we skip them but still send the email
         try:
@@ -790,67 +873,35 @@ class MyMail(MySupport):
                     os.remove(f)
 
         except Exception as e1:
-            self.LogErrorLine("Error attaching file in sendEmailDirectMIME: " + str(e1))
-
-        # self.LogError("Logging in: SMTP Server <"+self.SMTPServer+">:Port <"+str(self.SMTPPort) + ">")
+            self.LogErrorLine("Error attaching file in BuildMIMEMessage: " + str(e1))
 
         try:
-            if self.SSLEnabled:
-                session = smtplib.SMTP_SSL(self.SMTPServer, self.SMTPPort)
-                session.ehlo()
-            else:
-                session = smtplib.SMTP(self.SMTPServer, self.SMTPPort)
-                if not self.TLSDisable:
-                    session.starttls()
-                session.ehlo
-            try:
-                if self.debug:
-                    pass
-                    # session.set_debuglevel(1)     # for some reason login fails when this enabled
-            except Exception as e1:
-                self.LogErrorLine("Error setting debug level: " + str(e1))
-                # this allows support for simple TLS
-        except Exception as e1:
-            self.LogErrorLine(
-                "Error SMTP Init : SSL:<" + str(self.SSLEnabled) + ">: " + str(e1)
-            )
-            return False
-
-        try:
-            if self.EmailPassword != "" and not self.DisableSmtpAuth:
-                session.login(
-                    MyMail.FilterAddress(self.EmailAccount), str(self.EmailPassword)
-                )
-
             if sys.version_info[0] < 3:  # PYTHON 2
                 message = parent.as_string()
             else:  # PYTHON 3
                 message = parent.as_bytes()
-
-            if "," in recipient:
-                multiple_recipients = recipient.split(",")
-                session.sendmail(
-                    MyMail.FilterAddress(self.SenderAccount),
-                    multiple_recipients,
-                    message,
-                )
-            else:
-                session.sendmail(
-                    MyMail.FilterAddress(self.SenderAccount), recipient, message
-                )
         except Exception as e1:
-            self.LogErrorLine("Error SMTP sendmail: " + str(e1))
-            try:
-                session.quit()
-            except:
-                pass
-            return False
+            self.LogErrorLine("Error in email init 3: " + str(e1))
+            return None
 
-        session.quit()
+        return recipient.split(","), message
 
-        return True
+    # ------------ MyMail.GetSMTPSettings ---------------------------------------
+    # settings for SMTPSession, read each time as they may be reloaded
+    def GetSMTPSettings(self):
 
-    # end sendEmailDirectMIME()
+        if self.EmailPassword != "" and not self.DisableSmtpAuth:
+            Password = self.EmailPassword
+        else:
+            Password = ""
+        return (
+            self.SMTPServer,
+            self.SMTPPort,
+            self.SSLEnabled,
+            self.TLSDisable,
+            MyMail.FilterAddress(self.EmailAccount),
+            Password,
+        )
 
     # ------------MyMail::SendMailThread-----------------------------------------
     def SendMailThread(self):
@@ -859,46 +910,200 @@ class MyMail(MySupport):
         time.sleep(0.1)
         while True:
 
-            while self.EmailSendQueue != []:
-                MailError = False
-                EmailItems = self.EmailSendQueue.pop()
-                try:
-                    if not (
-                        self.sendEmailDirectMIME(
-                            EmailItems[0],
-                            EmailItems[1],
-                            EmailItems[2],
-                            EmailItems[3],
-                            EmailItems[4],
-                            EmailItems[5],
-                            EmailItems[6]
-                        )
-                    ):
-                        self.LogError(
-                            "Error in SendMailThread, sendEmailDirectMIME failed, retrying"
-                        )
-                        MailError = True
-                except Exception as e1:
-                    # put the time back at the end of the queue
-                    self.LogErrorLine(
-                        "Error in SendMailThread, retrying (2): " + str(e1)
-                    )
-                    MailError = True
+            try:
+                # messages are on disk before they are sent
+                self.Spool.Sync()
+                for Entry in self.Spool.GetMessages(MAIL_CHANNEL):
+                    if Entry in self.SpooledMail:
+                        continue
+                    Item = QueuedMail(Entry.Data)
+                    Item.Time = Entry.Time
+                    Item.Entries = [Entry]
+                    self.SpooledMail.add(Entry)
+                    Item.Recipient = self.GetRecipientByType(Item.MsgType, Item.Recipient)
+                    if Item.Recipient == None:
+                        self.LogDebug("Message abandoned, no recipient")
+                        self.AckQueuedMail(Item)
+                        continue
+                    self.PendingMail.append(Item)
+
+                self.SendPendingMail()
+                self.Session.CloseIfIdle()
+            except Exception as e1:
+                self.LogErrorLine("Error in SendMailThread: " + str(e1))
+
+            # wake up when mail is queued or the next message is due
+            SendEvent = self.Spool.GetEvent(MAIL_CHANNEL)
+            SendEvent.wait(self.GetSendWaitTime())
+            SendEvent.clear()
+            if self.Threads["SendMailThread"].StopSignaled():
+                self.Session.Close()
+                return
 
-                if MailError:
-                    # NOTE: emails are retried if they fail. This allows emails to eventually
-                    # be sent if there is an internet outage however the downside is that
-                    # if the recipient is bad then it will keep trying and the mail queue will
-                    # be stuck
+    # ------------MyMail::GetSendWaitTime----------------------------------------
+    def GetSendWaitTime(self):
 
-                    self.EmailSendQueue.insert(len(self.EmailSendQueue), EmailItems)
-                    # sleep for 2 min and try again
-                    if self.WaitForExit("SendMailThread", 120 + self.ExtendWait):
-                        return
+        WaitTime = 2.0
+        Now = time.time()
+        for Item in self.PendingMail:
+            WaitTime = min(WaitTime, max(Item.NextTry, self.ConnectRetryTime) - Now)
+        return max(WaitTime, 0.1)
+
+    # ------------MyMail::SendPendingMail----------------------------------------
+    # send the pending messages that are due. A message that fails is retried
+    # later without holding up the messages after it.
+    def SendPendingMail(self):
+
+        Now = time.time()
+        if Now < self.ConnectRetryTime:
+            return
+        self.BatchPendingMail(Now)
 
-            if self.WaitForExit("SendMailThread", 2):
+        for Item in list(self.PendingMail):
+            if Item.NextTry > Now:
+                continue
+            if self.Threads["SendMailThread"].StopSignaled():
+                return
+            Result = self.SendQueuedMail(Item)
+            if Result == MAIL_SENT:
+                self.PendingMail.remove(Item)
+                self.AckQueuedMail(Item)
+                self.LastSentTo[Item.Recipient] = time.time()
+                continue
+            # NOTE: emails are retried if they fail. This allows emails to eventually
+            # be sent if there is an internet outage
+            Delay = min(MAIL_RETRY_MIN * (2 ** (Item.Attempts - 1)), MAIL_RETRY_MAX)
+            Item.NextTry = time.time() + Delay + self.ExtendWait
+            self.LogError(
+                "Error in SendMailThread, send failed, retrying in "
+                + str(int(Delay + self.ExtendWait))
+                + " seconds: "
+                + Item.Subject
+            )
+            if Result == MAIL_NO_CONNECTION:
+                # the other messages will fail too
+                self.ConnectRetryTime = Item.NextTry
                 return
 
+    # ------------MyMail::BatchPendingMail---------------------------------------
+    # if batch_window is set, messages for a recipient that was sent a message
+    # less than batch_window seconds ago are held until the window ends, then
+    # all the held messages for the recipient are sent as one message
+    def BatchPendingMail(self, Now):
+
+        if self.BatchWindow <= 0:
+            return
+        Groups = collections.OrderedDict()
+        for Item in self.PendingMail:
+            if Item.Attempts or Item.Files:
+                continue
+            WindowEnd = self.LastSentTo.get(Item.Recipient, 0) + self.BatchWindow
+            if Now < WindowEnd:
+                Item.NextTry = WindowEnd
+                continue
+            Groups.setdefault((Item.Recipient, Item.ForceText), []).append(Item)
+
+        for Group in Groups.values():
+            if len(Group) < 2:
+                continue
+            Body = ""
+            for Item in Group:
+                Body += "\n" + "-" * 40 + "\n"
+                Body += Item.Subject + "\n"
+                Body += (
+                    "Time: "
+                    + datetime.datetime.fromtimestamp(Item.Time).strftime("%I:%M:%S %p")
+                    + "\n"
+                )
+                Body += Item.Body + "\n"
+            Digest = QueuedMail(
+                [
+                    Group[0].MsgType,
+                    Group[0].Subject + " (+" + str(len(Group) - 1) + " more)",
+                    Body,
+                    Group[0].Recipient,
+                    None,
+                    False,
+                    Group[0].ForceText,
+                ]
+            )
+            Digest.Time = Group[0].Time
+            for Item in Group:
+                Digest.Entries.extend(Item.Entries)
+            self.PendingMail[self.PendingMail.index(Group[0])] = Digest
+            for Item in Group[1:]:
+                self.PendingMail.remove(Item)
+            self.LogDebug("Sending " + str(len(Group)) + " messages as one: " + Digest.Subject)
+
+    # ------------MyMail::SendQueuedMail-----------------------------------------
+    # returns MAIL_SENT, MAIL_RETRY or MAIL_NO_CONNECTION
+    def SendQueuedMail(self, Item):
+
+        Item.Attempts += 1
+        if Item.Message == None:
+            # the message is built once so the attachments and time are kept
+            # if it is retried
+            Mail = self.BuildMIMEMessage(
+                Item.Subject,
+                Item.Body,
+                Item.Recipient,
+                files=Item.Files,
+                deletefile=Item.DeleteFile,
+                force_text=Item.ForceText,
+                timestamp=Item.Time,
+            )
+            if Mail == None:
+                return MAIL_RETRY
+            Item.Envelope, Item.Message = Mail
+
+        Settings = self.GetSMTPSettings()
+        try:
+            self.Session.Connect(Settings)
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error SMTP Init : SSL:<" + str(self.SSLEnabled) + ">: " + str(e1)
+            )
+            return MAIL_NO_CONNECTION
+
+        try:
+            Refused = self.Session.SendMail(
+                Settings, MyMail.FilterAddress(self.SenderAccount), Item.Envelope, Item.Message
+            )
+        except smtplib.SMTPRecipientsRefused as e1:
+            Refused = e1.recipients
+        except Exception as e1:
+            self.LogErrorLine("Error SMTP sendmail: " + str(e1))
+            return MAIL_RETRY
+
+        # a recipient that is refused with a temporary error (4xx) is retried,
+        # one that is rejected (5xx) is not
+        Retry = []
+        for Address, Response in Refused.items():
+            Code = Response[0] if isinstance(Response, tuple) else 0
+            if Code < 500:
+                Retry.append(Address)
+            self.LogError(
+                "Mail to " + str(Address) + " refused: " + str(Response)
+                + (", retrying" if Code < 500 else "")
+            )
+        if len(Retry):
+            Item.Envelope = Retry
+            return MAIL_RETRY
+        return MAIL_SENT
+
+    # ------------MyMail::AckQueuedMail------------------------------------------
+    # remove a message that was sent (or abandoned) from the spool
+    def AckQueuedMail(self, Item):
+
+        for Entry in Item.Entries:
+            self.Spool.Ack(Entry)
+            self.SpooledMail.discard(Entry)
+
+    # ------------MyMail::WakeSendThread-----------------------------------------
+    def WakeSendThread(self):
+
+        self.Spool.GetEvent(MAIL_CHANNEL).set()
+
     # ------------MyMail::sendEmail----------------------------------------------
     # msg type must be one of "outage", "error", "warn", "info"
     def sendEmail(
@@ -916,6 +1121,7 @@ class MyMail(MySupport):
             if (
                 self.SMTPServer != "" and not self.DisableSMTP
             ):  # if only sending is disabled, do not queue
-                self.EmailSendQueue.insert(
-                    0, [msgtype, subjectstr, msgstr, recipient, files, deletefile, force_text]
+                self.Spool.Add(
+                    MAIL_CHANNEL,
+                    [msgtype, subjectstr, msgstr, recipient, files, deletefile, force_text],
                 )
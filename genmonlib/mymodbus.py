@@ -13,6 +13,7 @@ from __future__ import (  # For python 3.x compatibility with print function
     print_function,
 )
 
+import collections
 import datetime
 import sys
 import time
@@ -57,6 +58,11 @@ class ModbusProtocol(ModbusBase):
                 self.Parity = Parity
                 self.Rate = rate
             self.TransactionID = 0
+            self.CurrentTransactionID = 0
+            # transaction ID of the last Modbus TCP response received
+            self.RxTransactionID = None
+            # when pipelining, dict of transaction IDs that are waiting for a response
+            self.PendingTransactions = None
             self.AlternateFileProtocol = False
 
             if host != None and port != None and self.config == None:
@@ -191,9 +197,9 @@ class ModbusProtocol(ModbusBase):
                 ):
                     return True, EmptyPacket
 
-                # transaction ID must match
+                # transaction ID must match (if pipelining, checked below)
                 rxID = (self.Slave.Buffer[0] << 8) | (self.Slave.Buffer[1] & 0xFF)
-                if self.CurrentTransactionID != rxID:
+                if self.PendingTransactions == None and self.CurrentTransactionID != rxID:
                     self.LogError(
                         "ModbusTCP transaction ID mismatch: %x %x"
                         % (self.CurrentTransactionID, rxID)
@@ -214,13 +220,19 @@ class ModbusProtocol(ModbusBase):
                 ModbusTCPLength = (self.Slave.Buffer[4] << 8) | (
                     self.Slave.Buffer[5] & 0xFF
                 )
-                if len(self.Slave.Buffer[6:]) != ModbusTCPLength:
+                if (len(self.Slave.Buffer) - self.MODBUS_TCP_HEADER_SIZE) < ModbusTCPLength:
                     # more data is needed
                     return True, EmptyPacket
 
+                if self.PendingTransactions != None and rxID not in self.PendingTransactions:
+                    # likely a late response to a request that timed out, drop the frame
+                    self.LogError("ModbusTCP unexpected transaction ID: %x" % rxID)
+                    self.Slave.Buffer.Discard(self.MODBUS_TCP_HEADER_SIZE + ModbusTCPLength)
+                    return True, EmptyPacket
+                self.RxTransactionID = rxID
+
                 # remove modbud TCP header
-                for i in range(0, self.MODBUS_TCP_HEADER_SIZE):
-                    self.Slave.Buffer.pop(0)
+                self.Slave.Buffer.Discard(self.MODBUS_TCP_HEADER_SIZE)
 
             if not self.CheckResponseAddress(self.Slave.Buffer[self.MBUS_OFF_ADDRESS]):
                 self.DiscardByte(reason="Response Address")
@@ -231,10 +243,8 @@ class ModbusProtocol(ModbusBase):
                 return True, EmptyPacket  # No full packet ready
 
             if self.Slave.Buffer[self.MBUS_OFF_COMMAND] & self.MBUS_ERROR_BIT:
-                for i in range(0, self.MIN_PACKET_ERR_LENGTH):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Exception code, and CRC
+                # Address, Function, Exception code, and CRC
+                Packet = self.Slave.Buffer.GetFrame(self.MIN_PACKET_ERR_LENGTH)
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
                     self.ModbusException += 1
@@ -268,10 +278,8 @@ class ModbusProtocol(ModbusBase):
                 ):
                     return True, EmptyPacket
 
-                for i in range(0, length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # Address, Function, Length, message and CRC
+                Packet = self.Slave.Buffer.GetFrame(length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH)
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -283,9 +291,8 @@ class ModbusProtocol(ModbusBase):
                 # it must be a write command response
                 if len(self.Slave.Buffer) < self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH:
                     return True, EmptyPacket
-                for i in range(0, self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH):
-                    # address, function, address hi, address low, quantity hi, quantity low, CRC high, crc low
-                    Packet.append(self.Slave.Buffer.pop(0))  
+                # address, function, address hi, address low, quantity hi, quantity low, CRC high, crc low
+                Packet = self.Slave.Buffer.GetFrame(self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH)
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -296,9 +303,8 @@ class ModbusProtocol(ModbusBase):
             elif self.Slave.Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_WRITE_COIL, self.MBUS_CMD_WRITE_REG]:
                 if len(self.Slave.Buffer) < self.MBUS_SINGLE_WRITE_RES_LENGTH:
                     return True, EmptyPacket
-                for i in range(0, self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH):
-                    # address, function, address hi, address low, value hi, value low, CRC high, crc low
-                    Packet.append(self.Slave.Buffer.pop(0))  
+                # address, function, address hi, address low, value hi, value low, CRC high, crc low
+                Packet = self.Slave.Buffer.GetFrame(self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH)
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -323,10 +329,8 @@ class ModbusProtocol(ModbusBase):
                 ):
                     return True, EmptyPacket
                 # we will copy the entire buffer, this will be validated at a later time
-                for i in range(0, len(self.Slave.Buffer)):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # Address, Function, Length, message and CRC
+                Packet = self.Slave.Buffer.GetFrame(len(self.Slave.Buffer))
 
                 if len(self.Slave.Buffer):
                     self.LogHexList(self.Slave.Buffer, prefix="Left Over")
@@ -354,10 +358,8 @@ class ModbusProtocol(ModbusBase):
                 ):
                     return True, EmptyPacket
                 # we will copy the entire buffer, this will be validated at a later time
-                for i in range(0, len(self.Slave.Buffer)):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # Address, Function, Length, message and CRC
+                Packet = self.Slave.Buffer.GetFrame(len(self.Slave.Buffer))
 
                 if len(self.Slave.Buffer):
                     self.LogHexList(self.Slave.Buffer, prefix="Left Over")
@@ -414,6 +416,7 @@ class ModbusProtocol(ModbusBase):
                 if len(MasterPacket) == 0:
                     return False
 
+                self.WriteCount += 1
                 # skipupdate=True to skip writing results to cached reg values
                 return self.ProcessOneTransaction(
                     MasterPacket,
@@ -437,14 +440,8 @@ class ModbusProtocol(ModbusBase):
         try:
             min_response_override = None # use the default minimum response packet size
             with self.CommAccessLock:
-                if IsCoil:
-                    packet_type = self.MBUS_CMD_READ_COILS
-                elif IsInput:
-                    packet_type = self.MBUS_CMD_READ_INPUT_REGS
-                else:
-                    packet_type = self.MBUS_CMD_READ_HOLDING_REGS
                 MasterPacket = self.CreateMasterPacket(
-                    Register, command=packet_type, length=int(Length)
+                    Register, command=self.GetReadCommand(IsCoil, IsInput), length=int(Length)
                 )
 
                 if len(MasterPacket) == 0:
@@ -464,6 +461,127 @@ class ModbusProtocol(ModbusBase):
     ):
         return self._PT(Register, Length, skipupdate = skipupdate, ReturnString = ReturnString, IsCoil = IsCoil, IsInput = IsInput)
 
+    # -------------ModbusProtocol::GetReadCommand--------------------------------
+    def GetReadCommand(self, IsCoil=False, IsInput=False):
+        if IsCoil:
+            return self.MBUS_CMD_READ_COILS
+        elif IsInput:
+            return self.MBUS_CMD_READ_INPUT_REGS
+        return self.MBUS_CMD_READ_HOLDING_REGS
+
+    # -------------ModbusProtocol::CanPipeline-----------------------------------
+    def CanPipeline(self):
+        return self.ModbusTCP and self.PipelineDepth > 1
+
+    # -------------ModbusProtocol::ProcessTransactionBatch-----------------------
+    # Requests is a list of [Register, Length, IsCoil, IsInput]. With Modbus TCP
+    # up to PipelineDepth requests are sent before waiting for a response, and
+    # responses are matched to requests by transaction ID, so a slow response
+    # does not hold up the requests behind it. Returns a list of results in the
+    # same order as Requests, "" for any request that failed.
+    def ProcessTransactionBatch(self, Requests, skipupdate=False):
+
+        if not self.CanPipeline():
+            return super(ModbusProtocol, self).ProcessTransactionBatch(
+                Requests, skipupdate=skipupdate
+            )
+
+        Results = [""] * len(Requests)
+        try:
+            with self.CommAccessLock:
+                if len(self.Slave.Buffer):
+                    self.UnexpectedData += 1
+                    self.LogError("Flushing, unexpected data. Likely timeout.")
+                    self.Flush()
+
+                # transaction ID : [request index, master packet, sent time], oldest first
+                InFlight = collections.OrderedDict()
+                NextRequest = 0
+                ParsedLength = 0
+                MinLength = self.MODBUS_TCP_HEADER_SIZE + self.MIN_PACKET_ERR_LENGTH
+                while NextRequest < len(Requests) or len(InFlight):
+                    if self.IsStopping:
+                        break
+                    # keep the pipeline full
+                    while NextRequest < len(Requests) and len(InFlight) < self.PipelineDepth:
+                        Register, Length, IsCoil, IsInput = Requests[NextRequest]
+                        MasterPacket = self.CreateMasterPacket(
+                            Register, command=self.GetReadCommand(IsCoil, IsInput), length=int(Length)
+                        )
+                        if len(MasterPacket):
+                            InFlight[self.CurrentTransactionID] = [
+                                NextRequest,
+                                MasterPacket,
+                                datetime.datetime.now(),
+                            ]
+                            self.SendPacketAsMaster(MasterPacket)
+                        NextRequest += 1
+
+                    if not len(InFlight):
+                        continue
+
+                    # the oldest request in flight determines the timeout
+                    OldestID = next(iter(InFlight))
+                    Index, MasterPacket, SentTime = InFlight[OldestID]
+                    Remaining = (self.ModBusPacketTimoutMS - self.MillisecondsElapsed(SentTime)) / 1000.0
+                    if Remaining <= 0:
+                        self.ComTimoutError += 1
+                        self.LogError(
+                            "Error: timeout receiving slave packet for register %04x, transaction ID %x"
+                            % (
+                                self.GetRegisterFromPacket(
+                                    MasterPacket, offset=self.MODBUS_TCP_HEADER_SIZE
+                                ),
+                                OldestID,
+                            )
+                        )
+                        del InFlight[OldestID]
+                        continue
+
+                    if not self.Slave.WaitForData(
+                        max(MinLength, ParsedLength + 1), min(Remaining, 0.5)
+                    ):
+                        continue
+
+                    self.PendingTransactions = InFlight
+                    try:
+                        RetVal, SlavePacket = self.GetPacketFromSlave()
+                    finally:
+                        self.PendingTransactions = None
+
+                    if not len(SlavePacket):
+                        # incomplete frame, or an error that flushed the buffer. Any
+                        # requests whose responses were lost will time out.
+                        ParsedLength = len(self.Slave.Buffer)
+                        continue
+                    ParsedLength = 0
+
+                    Entry = InFlight.pop(self.RxTransactionID, None)
+                    if Entry == None:
+                        continue
+                    Index, MasterPacket, SentTime = Entry
+                    if RetVal == False:
+                        # modbus exception, logged in GetPacketFromSlave
+                        Results[Index] = None
+                        continue
+
+                    self.TotalElapsedPacketeTime += (
+                        self.MillisecondsElapsed(SentTime) / 1000
+                    )
+                    ReturnRegValue = self.UpdateRegistersFromPacket(
+                        MasterPacket, SlavePacket, SkipUpdate=skipupdate
+                    )
+                    if ReturnRegValue == "Error":
+                        self.LogHexList(MasterPacket, prefix="Master")
+                        self.LogHexList(SlavePacket, prefix="Slave")
+                        self.ComValidationError += 1
+                        ReturnRegValue = ""
+                    Results[Index] = ReturnRegValue
+
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessTransactionBatch: " + str(e1))
+        return Results
+
     # -------------ModbusProtocol::ProcessFileReadTransaction--------------------
     def ProcessFileReadTransaction(
         self, Register, Length, skipupdate=False, file_num=1, ReturnString=False
@@ -543,16 +661,27 @@ class ModbusProtocol(ModbusBase):
                     self.UnexpectedData += 1
                     self.LogError("Flushing, unexpected data. Likely timeout.")
                     self.Flush()
+                ExceptionCount = self.ModbusException
                 self.SendPacketAsMaster(MasterPacket)
 
                 SentTime = datetime.datetime.now()
+                ExpectedLength = self.GetExpectedResponseLength(
+                    MasterPacket, min_response_override=min_response_override
+                )
+                ParsedLength = 0
                 while True:
-                    # be kind to other processes, we know we are going to have to wait for the packet to arrive
-                    # so let's sleep for a bit before we start polling
-                    if self.SlowCPUOptimization:
-                        time.sleep(0.03)
-                    else:
-                        time.sleep(0.01)
+                    # wait for the read thread to signal that data has arrived instead of
+                    # polling. Only parse the buffer once enough bytes for a full response
+                    # (or an exception response) are present, or new data has arrived
+                    # since the last incomplete parse
+                    Remaining = (self.ModBusPacketTimoutMS - self.MillisecondsElapsed(SentTime)) / 1000.0
+                    if Remaining > 0 and not self.Slave.WaitForData(
+                        max(self.GetResponseLengthNeeded(ExpectedLength), ParsedLength + 1),
+                        min(Remaining, 0.5),
+                    ):
+                        if self.IsStopping:
+                            return ""
+                        continue
 
                     if self.IsStopping:
                         return ""
@@ -565,6 +694,7 @@ class ModbusProtocol(ModbusBase):
                             self.MillisecondsElapsed(SentTime) / 1000
                         )
                         break
+                    ParsedLength = len(self.Slave.Buffer)
                     if RetVal == False:
                         self.LogError(
                             "Error Receiving slave packet for register %04x"
@@ -575,7 +705,10 @@ class ModbusProtocol(ModbusBase):
                             )
                         )
                         # Errors returned here are logged in GetPacketFromSlave
-                        time.sleep(1)
+                        if ExceptionCount == self.ModbusException:
+                            # a complete exception response does not need time to
+                            # recover, anything else may have left partial data
+                            time.sleep(1)
                         self.Flush()
                         return ""
 
@@ -623,6 +756,63 @@ class ModbusProtocol(ModbusBase):
             self.LogErrorLine("Error in ProcessOneTransaction: " + str(e1))
             return ""
 
+    # ---------- ModbusProtocol::GetExpectedResponseLength----------------------
+    # return the number of bytes expected in the response to MasterPacket
+    # (including the Modbus TCP header if used) or the minimum response length
+    # if the length is not known until the response length byte is received
+    def GetExpectedResponseLength(self, MasterPacket, min_response_override=None):
+
+        try:
+            if self.ModbusTCP:
+                PacketOffset = self.MODBUS_TCP_HEADER_SIZE
+            else:
+                PacketOffset = 0
+
+            if min_response_override != None:
+                return min_response_override + PacketOffset
+
+            Command = MasterPacket[self.MBUS_OFF_COMMAND + PacketOffset]
+            if Command in [self.MBUS_CMD_READ_HOLDING_REGS, self.MBUS_CMD_READ_INPUT_REGS, self.MBUS_CMD_READ_COILS]:
+                Length = (
+                    MasterPacket[self.MBUS_OFF_LENGTH_HI + PacketOffset] << 8
+                    | MasterPacket[self.MBUS_OFF_LENGTH_LOW + PacketOffset] & 0x00FF
+                )
+                if Command == self.MBUS_CMD_READ_COILS:
+                    ByteCount = (Length + 7) // 8
+                else:
+                    ByteCount = Length * 2
+                return ByteCount + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH + PacketOffset
+            if Command in [self.MBUS_CMD_WRITE_REGS, self.MBUS_CMD_WRITE_COILS, self.MBUS_CMD_WRITE_COIL, self.MBUS_CMD_WRITE_REG]:
+                return self.MBUS_SINGLE_WRITE_RES_LENGTH - (2 - self.MBUS_CRC_SIZE) + PacketOffset
+        except Exception as e1:
+            self.LogErrorLine("Error in GetExpectedResponseLength: " + str(e1))
+        return self.MIN_PACKET_RESPONSE_LENGTH
+
+    # ---------- ModbusProtocol::GetResponseLengthNeeded-----------------------
+    # return the number of bytes needed in the receive buffer before the
+    # response can be parsed. This is the expected length unless the received
+    # function code has the exception bit set.
+    def GetResponseLengthNeeded(self, ExpectedLength):
+
+        try:
+            if self.ModbusTCP:
+                PacketOffset = self.MODBUS_TCP_HEADER_SIZE
+            else:
+                PacketOffset = 0
+            Buffer = self.Slave.Buffer
+            if len(Buffer) > (self.MBUS_OFF_COMMAND + PacketOffset):
+                if Buffer[self.MBUS_OFF_COMMAND + PacketOffset] & self.MBUS_ERROR_BIT:
+                    return self.MIN_PACKET_ERR_LENGTH + PacketOffset
+                if not self.CheckResponseAddress(Buffer[self.MBUS_OFF_ADDRESS + PacketOffset]):
+                    # let GetPacketFromSlave resync
+                    return 1
+            else:
+                return min(ExpectedLength, self.MBUS_OFF_COMMAND + PacketOffset + 1)
+        except Exception as e1:
+            self.LogErrorLine("Error in GetResponseLengthNeeded: " + str(e1))
+            return 1
+        return ExpectedLength
+
     # ---------- ModbusProtocol::MillisecondsElapsed----------------------------
     def MillisecondsElapsed(self, ReferenceTime):
 
@@ -1039,11 +1229,10 @@ class ModbusProtocol(ModbusBase):
                     )
                     return "Error"
 
-                for i in range(3, length + 3):
-                    RegisterValue += "%02x" % SlavePacket[i]
-                    if ReturnString:
-                        if SlavePacket[i]:
-                            RegisterStringValue += chr(SlavePacket[i])
+                Payload = bytearray(SlavePacket[3 : length + 3])
+                RegisterValue = Payload.hex()
+                if ReturnString:
+                    RegisterStringValue = "".join(chr(Byte) for Byte in Payload if Byte)
                 # update register list
                 if not SkipUpdate:
                     if not self.UpdateRegisterList == None:
@@ -1103,11 +1292,16 @@ class ModbusProtocol(ModbusBase):
 
             if len(Packet) == 0:
                 return False
-            ByteArray = bytearray(Packet[: len(Packet) - 2])
 
             if sys.version_info[0] < 3:
+                ByteArray = bytearray(Packet[: len(Packet) - 2])
                 results = self.ModbusCrc(str(ByteArray))
             else:  # PYTHON3
+                if isinstance(Packet, (bytes, bytearray)):
+                    # frames from the receive buffer, no need to copy
+                    ByteArray = memoryview(Packet)[: len(Packet) - 2]
+                else:
+                    ByteArray = bytearray(Packet[: len(Packet) - 2])
                 results = self.ModbusCrc(ByteArray)
 
             CRCValue = ((Packet[-1] & 0xFF) << 8) | (Packet[-2] & 0xFF)
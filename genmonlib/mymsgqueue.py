@@ -9,15 +9,17 @@
 # MODIFICATIONS:
 # -------------------------------------------------------------------------------
 
-import datetime
-import threading
-import time
+import os
 
+from genmonlib.myspool import MySpool, SpoolWorker
 from genmonlib.mysupport import MySupport
-from genmonlib.mythread import MyThread
+
+QUEUE_CHANNEL = "queue"
 
 
 # ------------ MyMsgQueue class -------------------------------------------------
+# messages are saved in a spool (in the spool folder next to the config file)
+# so they are sent after a restart
 class MyMsgQueue(MySupport):
     # ------------ MyMsgQueue::init----------------------------------------------
     def __init__(self, config=None, log=None, debug=False,callback=None, minimum_wait_between_messages = 0):
@@ -25,14 +27,12 @@ class MyMsgQueue(MySupport):
         self.log = log
         self.config = config
         self.callback = callback
-        self.MessageQueue = []
-
-        self.QueueLock = threading.RLock()
+        self.Spool = None
+        self.Worker = None
 
         self.max_retry_time = 600  # 10 min
         self.default_wait = 120  # 2 min
         self.minimum_wait_between_messages = minimum_wait_between_messages
-        self.last_message_sent_time = None
 
         self.debug = debug
 
@@ -56,76 +56,51 @@ class MyMsgQueue(MySupport):
                     "Error in MyMsgQueue:init, error reading config: " + str(e1)
                 )
         if not self.callback == None:
-            self.Threads["QueueWorker"] = MyThread(
-                self.QueueWorker, Name="QueueWorker", start=False
+            self.Spool = MySpool(self.GetSpoolPath(), log=self.log, debug=self.debug)
+            # retries start at 15 sec and double up to default_wait
+            self.Worker = SpoolWorker(
+                self.Spool,
+                QUEUE_CHANNEL,
+                self.SendSpooledMessage,
+                log=self.log,
+                debug=self.debug,
+                retry_min=min(15, self.default_wait),
+                retry_max=self.default_wait,
+                max_age=self.max_retry_time,
+                min_interval=self.minimum_wait_between_messages,
             )
-            self.Threads["QueueWorker"].Start()
-
-    # ------------ MyMsgQueue::QueueWorker---------------------------------------
-    def QueueWorker(self):
+            self.Threads = self.MergeDicts(self.Threads, self.Worker.Threads)
 
-        # once SendMessage is called messages are queued and then sent from this thread
-        time.sleep(0.1)
-        while True:
+    # ------------ MyMsgQueue::GetSpoolPath--------------------------------------
+    # i.e. /etc/genmon/spool/gensms for /etc/genmon/gensms.conf, None to keep
+    # the messages in memory
+    def GetSpoolPath(self):
 
-            while self.MessageQueue != []:
-                messageError = False
-                try:
-                    message_time = datetime.datetime.now()
-                    if self.last_message_sent_time != None and ((message_time - self.last_message_sent_time).total_seconds() < self.minimum_wait_between_messages):
-                        if self.WaitForExit("QueueWorker", self.minimum_wait_between_messages):
-                            return
-                        continue
-                    with self.QueueLock:
-                        MessageItems = self.MessageQueue.pop()
-                    if len(MessageItems[1]):
-                        ret_val = self.callback(MessageItems[0], **MessageItems[1])
-                    else:
-                        ret_val = self.callback(MessageItems[0])
-                    if not (ret_val):
-                        self.LogError("Error sending message in QueueWorker, callback failed, retrying")
-                        messageError = True
-                except Exception as e1:
-                    self.LogErrorLine("Error in QueueWorker, retrying (2): " + str(e1))
-                    messageError = True
+        try:
+            if self.config == None or not self.config.FileName:
+                return None
+            return os.path.join(
+                os.path.dirname(os.path.abspath(self.config.FileName)),
+                "spool",
+                os.path.splitext(os.path.basename(self.config.FileName))[0],
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in MyMsgQueue:GetSpoolPath: " + str(e1))
+            return None
 
-                try:
-                    if messageError:
-                        # check max retry timeout
-                        retry_duration = datetime.datetime.now() - MessageItems[2]
-                        if retry_duration.total_seconds() <= self.max_retry_time:
-                            with self.QueueLock:
-                                # put the message back at the end of the queue
-                                self.MessageQueue.insert(
-                                    len(self.MessageQueue), MessageItems
-                                )
-                            # sleep for 2 min and try again
-                            if self.WaitForExit("QueueWorker", self.default_wait):
-                                return
-                        else:
-                            self.LogDebug("Message retry expired: " + MessageItems[0])
-                    else:
-                        # message was sent
-                        self.LogDebug("Message Sent")
-                        self.last_message_sent_time = message_time
-                except Exception as e1:
-                    self.LogErrorLine(
-                        "Error in QueueWorker requeue, retrying (3): " + str(e1)
-                    )
+    # ------------ MyMsgQueue::SendSpooledMessage--------------------------------
+    def SendSpooledMessage(self, MessageItems):
 
-            if self.WaitForExit("QueueWorker", 2):
-                return
+        if len(MessageItems[1]):
+            return self.callback(MessageItems[0], **MessageItems[1])
+        else:
+            return self.callback(MessageItems[0])
 
     # ------------ MyMsgQueue::SendMessage---------------------------------------
     def SendMessage(self, message, **kwargs):
         try:
             if self.callback != None:
-                with self.QueueLock:
-                    MessageItems = []
-                    MessageItems.append(message)
-                    MessageItems.append(kwargs)
-                    MessageItems.append(datetime.datetime.now())
-                    self.MessageQueue.insert(0, MessageItems)
+                self.Spool.Add(QUEUE_CHANNEL, [message, kwargs])
         except Exception as e1:
             self.LogErrorLine("Error in MyMsgQueue:SendMessage: " + str(e1))
 
@@ -134,6 +109,7 @@ class MyMsgQueue(MySupport):
 
         try:
             if not self.callback == None:
-                self.KillThread("QueueWorker")
+                self.Worker.Close()
+                self.Spool.Close()
         except Exception as e1:
             self.LogErrorLine("Error in MyMsgQueue:Close: " + str(e1))
@@ -62,6 +62,9 @@ class GenNotify(MyCommon):
         self.LastPiState = None
         self.LastFuelWarningStatus = True
         self.Events = {}  # Dict for handling events
+        self.Subscribed = False  # True if genmon pushes changes to us
+        self.SubscribedData = {}  # command : latest data pushed by genmon
+        self.DataChanged = threading.Event()
         self.notify_outage = notify_outage
         self.notify_error = notify_error
         self.notify_warning = notify_warning
@@ -145,16 +148,21 @@ class GenNotify(MyCommon):
     # ---------- GenNotify::MainPollingThread-----------------------------------
     def MainPollingThread(self):
 
+        # if supported, have genmon push changes instead of polling
+        self.Subscribed = self.Generator.Subscribe(
+            ["outage_json", "monitor_json", "maint_json", "getbase"],
+            self.SubscribeCallback,
+        )
         while True:
             try:
 
                 OutageState = self.GetOutageState()
                 self.GetMonitorState()
                 self.GetMaintState()
-                data = self.SendCommand("generator: getbase")
+                data = self.GetCommandData("generator: getbase")
 
                 if self.LastEvent == data:
-                    time.sleep(3)
+                    self.WaitForData()
                     continue
                 if self.LastEvent != None:
                     self.console.info(
@@ -166,15 +174,47 @@ class GenNotify(MyCommon):
 
                 self.CallEventHandler(True)  # begin new event
 
-                time.sleep(3)
+                self.WaitForData()
             except Exception as e1:
                 self.LogErrorLine("Error in mynotify:MainPollingThread: " + str(e1))
                 time.sleep(3)
 
+    # ---------- GenNotify::SubscribeCallback-----------------------------------
+    def SubscribeCallback(self, topic, data):
+
+        if data == None:
+            # connection to genmon lost, send commands until data is pushed again
+            self.SubscribedData.pop(topic, None)
+        else:
+            self.SubscribedData[topic] = data
+        self.DataChanged.set()
+
+    # ---------- GenNotify::WaitForData-----------------------------------------
+    # wait for genmon to push new data, or for the next poll
+    def WaitForData(self):
+
+        if self.Subscribed and len(self.SubscribedData):
+            self.DataChanged.wait(60)
+            self.DataChanged.clear()
+        else:
+            time.sleep(3)
+
+    # ---------- GenNotify::GetCommandData--------------------------------------
+    # return the latest data pushed by genmon for a command, or send the
+    # command if the data is not available
+    def GetCommandData(self, Command):
+
+        Data = self.SubscribedData.get(Command[len("generator:") :].strip(), None)
+        if Data == None:
+            return self.SendCommand(Command)
+        if isinstance(Data, str):
+            return Data
+        return json.dumps(Data)
+
     # ----------  GenNotify::GetOutageState -------------------------------------
     def GetOutageState(self):
         OutageState = None
-        outagedata = self.SendCommand("generator: outage_json")
+        outagedata = self.GetCommandData("generator: outage_json")
         try:
             OutageDict = collections.OrderedDict()
             OutageDict = json.loads(outagedata)
@@ -205,7 +245,7 @@ class GenNotify(MyCommon):
         UpdateAvailable = None
 
         try:
-            monitordata = self.SendCommand("generator: monitor_json")
+            monitordata = self.GetCommandData("generator: monitor_json")
             GenDict = collections.OrderedDict()
             GenDict = json.loads(monitordata)
             GenList = GenDict["Monitor"][0]["Generator Monitor Stats"]
@@ -265,7 +305,7 @@ class GenNotify(MyCommon):
         FuelOK = None
 
         try:
-            maintdata = self.SendCommand("generator: maint_json")
+            maintdata = self.GetCommandData("generator: maint_json")
             GenDict = collections.OrderedDict()
             GenDict = json.loads(maintdata)
             GenList = GenDict["Maintenance"]
@@ -356,6 +396,7 @@ class GenNotify(MyCommon):
     def Close(self):
         try:
             self.KillThread("PollingThread")
+            self.Generator.Unsubscribe()
             self.Generator.Close()
         except Exception as e1:
             pass
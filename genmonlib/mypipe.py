@@ -57,7 +57,11 @@ class MyPipe(MySupport):
         self.FileName = os.path.join(ConfigFilePath, self.BasePipeName + "_dat")
 
         try:
-            if not Reuse:
+            if not Reuse and self.HasUnreadMessages():
+                # written before the last restart but not read, they are
+                # passed to the callback by ReadPipeThread
+                self.LogError("Pipe " + self.BasePipeName + ": sending unread messages")
+            elif not Reuse:
                 try:
                     os.remove(self.FileName)
                 except:
@@ -73,6 +77,18 @@ class MyPipe(MySupport):
                 self.ReadPipeThread, Name=self.ThreadName
             )
 
+    # ------------ MyPipe::HasUnreadMessages-------------------------------------
+    def HasUnreadMessages(self):
+
+        try:
+            return (
+                not self.Callback == None
+                and os.path.isfile(self.FileName)
+                and os.path.getsize(self.FileName) > 0
+            )
+        except Exception:
+            return False
+
     # ------------ MyPipe::Write-------------------------------------------------
     def WriteFile(self, data):
         try:
@@ -16,9 +16,122 @@ import os
 import re
 import subprocess
 import sys
+import threading
+import time
 from subprocess import PIPE, Popen
 
 from genmonlib.mycommon import MyCommon
+from genmonlib.mythread import MyThread
+
+VCGENCMD_PATHS = ["/usr/bin/vcgencmd", "/opt/vc/bin/vcgencmd"]
+
+
+# ------------ PlatformSampler class --------------------------------------------
+# Some platform values (throttling, WiFi signal and ESSID) are read by running
+# other programs (vcgencmd, iw, iwconfig). The status pages ask for these values
+# each time they are refreshed, so the values are kept here and read again at
+# most once every Interval seconds. One sampler is shared by every MyPlatform
+# object in the program. If Start() is called the values are read again by a
+# background thread so callers do not wait, otherwise an old value is read
+# again when it is requested.
+class PlatformSampler(MyCommon):
+
+    Shared = None
+    SharedLock = threading.Lock()
+
+    # ------------ PlatformSampler::init----------------------------------------
+    def __init__(self, log=None, interval=10, debug=False):
+
+        super(PlatformSampler, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Interval = max(1, int(interval))
+        self.Lock = threading.RLock()
+        self.Samples = {}  # name : [value, time read]
+        self.Readers = {}  # name : function to read the value, None if it does not change
+        self.Thread = None
+
+    # ------------ PlatformSampler::GetShared-----------------------------------
+    @classmethod
+    def GetShared(cls, log=None):
+
+        with cls.SharedLock:
+            if cls.Shared == None:
+                cls.Shared = PlatformSampler(log=log)
+            elif cls.Shared.log == None:
+                cls.Shared.log = log
+            return cls.Shared
+
+    # ------------ PlatformSampler::Start---------------------------------------
+    def Start(self, interval=None):
+
+        with self.Lock:
+            if interval != None:
+                self.Interval = max(1, int(interval))
+            if self.Thread != None and self.Thread.IsAlive():
+                return
+            self.Thread = MyThread(self.SamplerThread, Name="PlatformSamplerThread", start=False)
+            self.Thread.Start()
+
+    # ------------ PlatformSampler::Stop----------------------------------------
+    def Stop(self):
+
+        with self.Lock:
+            if self.Thread != None:
+                self.Thread.Stop()
+                self.Thread = None
+
+    # ------------ PlatformSampler::SamplerThread-------------------------------
+    def SamplerThread(self):
+
+        Thread = self.Thread
+        while Thread != None and not Thread.Wait(self.Interval):
+            with self.Lock:
+                Readers = [(Name, Reader) for Name, Reader in self.Readers.items() if Reader != None]
+            for Name, Reader in Readers:
+                if Thread.StopSignaled():
+                    return
+                self.Read(Name, Reader)
+
+    # ------------ PlatformSampler::Read----------------------------------------
+    def Read(self, Name, Reader):
+
+        try:
+            Value = Reader()
+        except Exception as e1:
+            self.LogDebug("Error in PlatformSampler:Read (" + Name + "): " + str(e1))
+            Value = None
+        with self.Lock:
+            self.Samples[Name] = [Value, time.time()]
+        return Value
+
+    # ------------ PlatformSampler::Get-----------------------------------------
+    # return the value for Name, Reader is called to read the value if it has
+    # not been read or is too old. If Static is True the value is only read once.
+    def Get(self, Name, Reader, Static=False):
+
+        with self.Lock:
+            if Name not in self.Readers:
+                self.Readers[Name] = None if Static else Reader
+            Sample = self.Samples.get(Name, None)
+            if Sample != None:
+                if Static:
+                    return Sample[0]
+                # the background thread reads the value every Interval seconds
+                MaxAge = self.Interval * (2 if self.Thread != None else 1)
+                if time.time() - Sample[1] < MaxAge:
+                    return Sample[0]
+        return self.Read(Name, Reader)
+
+    # ------------ PlatformSampler::GetAge--------------------------------------
+    # return the number of seconds since Name was read, None if not read
+    def GetAge(self, Name):
+
+        with self.Lock:
+            Sample = self.Samples.get(Name, None)
+            if Sample == None:
+                return None
+            return time.time() - Sample[1]
 
 
 # ------------ MyPlatform class -------------------------------------------------
@@ -30,6 +143,7 @@ class MyPlatform(MyCommon):
         self.UseMetric = usemetric
         self.debug = debug
         self.PreferredNetworkAdapter = net_adapter
+        self.Sampler = PlatformSampler.GetShared(log=log)
 
     # ------------ MyPlatform::GetInfo-------------------------------------------
     def GetInfo(self, JSONNum=False):
@@ -141,6 +255,13 @@ class MyPlatform(MyCommon):
     # ------------ MyPlatform::IsPlatformRaspberryPi-----------------------------
     def IsPlatformRaspberryPi(self, raise_on_errors=False):
 
+        if raise_on_errors:
+            return self.ReadIsPlatformRaspberryPi(raise_on_errors=True)
+        return self.Sampler.Get("is_raspberry_pi", self.ReadIsPlatformRaspberryPi, Static=True)
+
+    # ------------ MyPlatform::ReadIsPlatformRaspberryPi-------------------------
+    def ReadIsPlatformRaspberryPi(self, raise_on_errors=False):
+
         try:
             model = self.GetRaspberryPiModel(bForce = True)
             if model != None and "raspberry" in model.lower():
@@ -193,37 +314,10 @@ class MyPlatform(MyCommon):
 
             if not self.IsOSLinux():
                 return DefaultReturn
-            try:
-                if os.path.exists("/usr/bin/vcgencmd"):
-                    binarypath = "/usr/bin/vcgencmd"
-                else:
-                    binarypath = "/opt/vc/bin/vcgencmd"
-
-                process = Popen([binarypath, "measure_temp"], stdout=PIPE)
-                output, _error = process.communicate()
-                output = output.decode("utf-8")
-                if sys.version_info[0] >= 3:
-                    output = str(output)  # convert byte array to string for python3
-
-                TempCelciusFloat = float(
-                    output[output.index("=") + 1 : output.rindex("'")]
-                )
-
-            except Exception as e1:
-                # for non rasbpian based systems
-                tempfilepath = self.GetHwMonParamPath("temp1_input")
-                if tempfilepath == None:
-                    tempfilepath = "/sys/class/thermal/thermal_zone0/temp"
-
-                if os.path.exists(tempfilepath):
-                    process = Popen(["cat", tempfilepath], stdout=PIPE)
-                    output, _error = process.communicate()
-                    output = output.decode("utf-8")
-
-                    TempCelciusFloat = float(float(output) / 1000)
-                else:
-                    # not sure what OS this is, possibly docker image
-                    return DefaultReturn
+            TempCelciusFloat = self.Sampler.Get("cpu_temp", self.ReadCPUTemp)
+            if TempCelciusFloat == None:
+                # not sure what OS this is, possibly docker image
+                return DefaultReturn
             if self.UseMetric:
                 if not ReturnFloat:
                     return "%.2f C" % TempCelciusFloat
@@ -242,6 +336,33 @@ class MyPlatform(MyCommon):
             self.LogErrorLine("Error in GetRaspberryPiTemp: " + str(e1))
         return DefaultReturn
 
+    # ------------ MyPlatform::ReadCPUTemp --------------------------------------
+    # return the CPU temperature in celsius, None if not supported
+    def ReadCPUTemp(self):
+
+        tempfilepath = self.GetHwMonParamPath("temp1_input")
+        if tempfilepath == None:
+            tempfilepath = "/sys/class/thermal/thermal_zone0/temp"
+        if os.path.exists(tempfilepath):
+            with open(tempfilepath, "r") as TempFile:
+                return float(TempFile.read()) / 1000
+
+        binarypath = self.GetVCGenCmdPath()
+        if binarypath == None:
+            return None
+        process = Popen([binarypath, "measure_temp"], stdout=PIPE)
+        output, _error = process.communicate()
+        output = str(output.decode("utf-8"))
+        return float(output[output.index("=") + 1 : output.rindex("'")])
+
+    # ------------ MyPlatform::GetVCGenCmdPath ----------------------------------
+    def GetVCGenCmdPath(self):
+
+        for binarypath in VCGENCMD_PATHS:
+            if os.path.exists(binarypath):
+                return binarypath
+        return None
+
     # ------------ MyPlatform::GetRaspberryPiModel -----------------------------
     def GetRaspberryPiModel(self, bForce = False):
         try:
@@ -251,7 +372,14 @@ class MyPlatform(MyCommon):
 
             if bForce == False and not self.IsPlatformRaspberryPi():
                 return None
-            
+
+            return self.Sampler.Get("pi_model", self.ReadRaspberryPiModel, Static=True)
+        except Exception as e1:
+            return None
+
+    # ------------ MyPlatform::ReadRaspberryPiModel ----------------------------
+    def ReadRaspberryPiModel(self):
+        try:
             model_path = "/proc/device-tree/model"
             if os.path.exists(model_path):
                 with open(model_path, "r") as f:
@@ -331,34 +459,39 @@ class MyPlatform(MyCommon):
     # ------------ MyPlatform::GetThrottledStatus -------------------------------
     def GetThrottledStatus(self):
 
-        try:
-            if os.path.exists("/usr/bin/vcgencmd"):
-                binarypath = "/usr/bin/vcgencmd"
-            else:
-                binarypath = "/opt/vc/bin/vcgencmd"
+        status = self.Sampler.Get("throttled", self.ReadThrottledStatus)
+        if status == None:
+            return []
+        return self.ParseThrottleStatus(status)
 
-            process = Popen([binarypath, "get_throttled"], stdout=PIPE)
-            output, _error = process.communicate()
-            output = output.decode("utf-8")
-            hex_val = output.split("=")[1].strip()
-            get_throttled = int(hex_val, 16)
-            return self.ParseThrottleStatus(get_throttled)
+    # ------------ MyPlatform::ReadThrottledStatus ------------------------------
+    # return the throttled status bits (see vcgencmd get_throttled), None if
+    # not supported
+    def ReadThrottledStatus(self):
 
-        except Exception as e1:
-            try:
-                # if we get here then vcgencmd is not found, try an alternate approach
-                # /sys/class/hwmon/hwmonX/in0_lcrit_alarm
-                throttle_file = self.GetHwMonParamPath("in0_lcrit_alarm")
+        # this method is depricated but does not start vcgencmd
+        throttle_file = "/sys/devices/platform/soc/soc:firmware/get_throttled"
+        if os.path.exists(throttle_file):
+            with open(throttle_file, "r") as ThrottleFile:
+                return int(ThrottleFile.read().strip(), 16)
 
-                if throttle_file != None:
-                    file = open(throttle_file)
-                else:
-                    # this method is depricated
-                    file = open("/sys/devices/platform/soc/soc:firmware/get_throttled")
-                status = file.read()
-                return self.ParseThrottleStatus(int(status))
+        binarypath = self.GetVCGenCmdPath()
+        if binarypath != None:
+            try:
+                process = Popen([binarypath, "get_throttled"], stdout=PIPE)
+                output, _error = process.communicate()
+                output = output.decode("utf-8")
+                hex_val = output.split("=")[1].strip()
+                return int(hex_val, 16)
             except Exception as e1:
-                return []
+                pass
+
+        # /sys/class/hwmon/hwmonX/in0_lcrit_alarm, undervoltage only
+        throttle_file = self.GetHwMonParamPath("in0_lcrit_alarm")
+        if throttle_file == None:
+            return None
+        with open(throttle_file, "r") as ThrottleFile:
+            return int(ThrottleFile.read())
 
     # ------------ MyPlatform::GetHwMonParamPath --------------------------------
     def GetHwMonParamPath(self, param):
@@ -412,6 +545,16 @@ class MyPlatform(MyCommon):
             return iface
         return ""
 
+    # ------------ MyPlatform::GetNetworkAdapter --------------------------------
+    def GetNetworkAdapter(self):
+
+        if self.PreferredNetworkAdapter == None or len(self.PreferredNetworkAdapter) == 0:
+            adapter = self.Sampler.Get("network_adapter", self.GetActiveNetworkAdapter)
+            if adapter == None:
+                return ""
+            return adapter
+        return self.PreferredNetworkAdapter
+
     # ------------ MyPlatform::GetLinuxInfo -------------------------------------
     def GetLinuxInfo(self, JSONNum=False):
 
@@ -450,10 +593,7 @@ class MyPlatform(MyCommon):
                 pass
 
             try:
-                if self.PreferredNetworkAdapter == None or len(self.PreferredNetworkAdapter) == 0:
-                    adapter = self.GetActiveNetworkAdapter()
-                else:
-                    adapter = self.PreferredNetworkAdapter
+                adapter = self.GetNetworkAdapter()
                 # output, _error = process.communicate()
                 LinuxInfo.append({"Network Interface Used": adapter})
                 try:
@@ -481,10 +621,7 @@ class MyPlatform(MyCommon):
             if not self.IsOSLinux():  # call staticfuntion
                 return DefaultReturn
 
-            if self.PreferredNetworkAdapter == None or len(self.PreferredNetworkAdapter) == 0:
-                adapter = self.GetActiveNetworkAdapter()
-            else:
-                adapter = self.PreferredNetworkAdapter
+            adapter = self.GetNetworkAdapter()
 
             if not adapter.startswith("wl"):
                 return DefaultReturn
@@ -499,6 +636,13 @@ class MyPlatform(MyCommon):
 
     # ------------ MyPlatform::GetWiFiSignalStrengthFromAdapter -----------------
     def GetWiFiSignalStrengthFromAdapter(self, adapter, JSONNum=False):
+
+        return self.Sampler.Get(
+            "wifi_signal:" + adapter, lambda: self.ReadWiFiSignalStrength(adapter)
+        )
+
+    # ------------ MyPlatform::ReadWiFiSignalStrength ---------------------------
+    def ReadWiFiSignalStrength(self, adapter):
         try:
             result = subprocess.check_output(["iw", adapter, "link"])
             if sys.version_info[0] >= 3:
@@ -510,12 +654,20 @@ class MyPlatform(MyCommon):
             result = self.GetWiFiSignalStrenthFromProc(adapter)
             return result
 
+    # ------------ MyPlatform::ReadIwConfig -------------------------------------
+    # return the output of iwconfig for adapter, the signal quality and ESSID
+    # are both read from this
+    def ReadIwConfig(self, adapter):
+
+        result = subprocess.check_output(["iwconfig", adapter])
+        if sys.version_info[0] >= 3:
+            result = result.decode("utf-8")
+        return result
+
     # ------------ MyPlatform::GetWiFiSignalQuality -----------------------------
     def GetWiFiSignalQuality(self, adapter, JSONNum=False):
         try:
-            result = subprocess.check_output(["iwconfig", adapter])
-            if sys.version_info[0] >= 3:
-                result = result.decode("utf-8")
+            result = self.Sampler.Get("iwconfig:" + adapter, lambda: self.ReadIwConfig(adapter))
             match = re.search("Link Quality=([\\s\\S]*?) ", result)
             return match.group(1)
         except Exception as e1:
@@ -524,9 +676,7 @@ class MyPlatform(MyCommon):
     # ------------ MyPlatform::GetWiFiSSID --------------------------------------
     def GetWiFiSSID(self, adapter):
         try:
-            result = subprocess.check_output(["iwconfig", adapter])
-            if sys.version_info[0] >= 3:
-                result = result.decode("utf-8")
+            result = self.Sampler.Get("iwconfig:" + adapter, lambda: self.ReadIwConfig(adapter))
             match = re.search('ESSID:"([\\s\\S]*?)"', result)
             return match.group(1)
         except Exception as e1:
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mypoll.py
+# PURPOSE: schedule which registers are read in each poll cycle
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+from genmonlib.mycommon import MyCommon
+
+# Each register is given a poll tier:
+#
+#   fast    - engine state, switch state, alarms and utility voltage. These are
+#             read several times in each poll cycle (after every FastStride
+#             other reads) so a start, stop, alarm or outage is seen quickly.
+#             When a fast register changes every normal register is read
+#             every cycle again, so output voltage, frequency, RPM etc. are
+#             current during a start or an outage.
+#   normal  - read every poll cycle while the value is changing. If the value
+#             does not change for StableReads reads in a row the register is
+#             read every other cycle, then every 4th cycle etc. up to
+#             MaxInterval. Once the value changes it is read every cycle again.
+#   slow    - statistics and settings, read every SlowInterval poll cycles.
+#             A cycle where nothing else was due (only the fast tier was read)
+#             takes little time so it is not counted toward this interval.
+#   once    - identity (firmware version, model, etc), read until a value has
+#             been received.
+#
+# Registers not added to the scheduler are read every cycle. When a register
+# is written (i.e. a setting is changed from the UI) every normal and slow
+# register is read again on the next cycle. If the scheduler is not enabled
+# every register is in the normal tier and is read every cycle.
+
+POLL_FAST = "fast"
+POLL_NORMAL = "normal"
+POLL_SLOW = "slow"
+POLL_ONCE = "once"
+POLL_TIERS = [POLL_FAST, POLL_NORMAL, POLL_SLOW, POLL_ONCE]
+
+# entry index for the register info list
+TIER = 0
+INTERVAL = 1  # poll cycles between reads
+NEXT = 2  # next poll cycle the register is due
+STABLE = 3  # number of reads in a row with no change
+
+
+# ------------ PollScheduler class ----------------------------------------------
+class PollScheduler(MyCommon):
+
+    # ------------ PollScheduler::init------------------------------------------
+    def __init__(
+        self,
+        log=None,
+        debug=False,
+        enabled=True,
+        fast_stride=8,
+        max_interval=4,
+        slow_interval=16,
+        stable_reads=3,
+    ):
+
+        super(PollScheduler, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Enabled = enabled
+        self.FastStride = max(1, int(fast_stride))
+        self.MaxInterval = max(1, int(max_interval))
+        self.SlowInterval = max(1, int(slow_interval))
+        self.StableReads = max(1, int(stable_reads))
+        self.Registers = {}  # (register, IsInput) : [tier, interval, next, stable]
+        self.Cycle = 0
+        self.SlowCycle = 0  # poll cycles where a register other than fast was due
+        self.CycleDue = 0  # registers due in this cycle
+        self.HasNormal = False
+        self.WriteCount = 0
+        self.Reads = 0
+        self.Skipped = 0
+
+    # ------------ PollScheduler::GetKey----------------------------------------
+    def GetKey(self, Register, IsInput=False):
+
+        return (Register.lower(), IsInput)
+
+    # ------------ PollScheduler::AddRegister-----------------------------------
+    def AddRegister(self, Register, Tier=POLL_NORMAL, IsInput=False):
+
+        try:
+            if Tier not in POLL_TIERS:
+                self.LogError("Invalid poll tier for register " + str(Register) + ": " + str(Tier))
+                Tier = POLL_NORMAL
+            if not self.Enabled:
+                Tier = POLL_NORMAL
+            if Tier == POLL_SLOW:
+                Interval = self.SlowInterval
+            else:
+                Interval = 1
+            if Tier == POLL_NORMAL:
+                self.HasNormal = True
+            Info = [Tier, Interval, 0, 0]
+            Info[NEXT] = self.GetCycle(Info)
+            self.Registers[self.GetKey(Register, IsInput)] = Info
+        except Exception as e1:
+            self.LogErrorLine("Error in PollScheduler:AddRegister: " + str(e1))
+
+    # ------------ PollScheduler::Clear-----------------------------------------
+    # remove all registers (i.e. the controller type has changed)
+    def Clear(self):
+
+        self.Registers = {}
+        self.HasNormal = False
+
+    # ------------ PollScheduler::GetCycle--------------------------------------
+    # return the cycle count the NEXT value of a register is compared with
+    def GetCycle(self, Info):
+
+        if Info[TIER] == POLL_SLOW:
+            return self.SlowCycle
+        return self.Cycle
+
+    # ------------ PollScheduler::GetTier---------------------------------------
+    def GetTier(self, Register, IsInput=False):
+
+        Info = self.Registers.get(self.GetKey(Register, IsInput), None)
+        if Info == None:
+            return None
+        return Info[TIER]
+
+    # ------------ PollScheduler::GetRegisters----------------------------------
+    # return the list of (register, IsInput) in a tier
+    def GetRegisters(self, Tier):
+
+        return [Key for Key, Info in self.Registers.items() if Info[TIER] == Tier]
+
+    # ------------ PollScheduler::StartCycle------------------------------------
+    # called at the start of each poll cycle, WriteCount is the number of
+    # register writes sent to the controller
+    def StartCycle(self, WriteCount=0):
+
+        self.Cycle += 1
+        if self.CycleDue or not self.HasNormal:
+            self.SlowCycle += 1
+        self.CycleDue = 0
+        if WriteCount != self.WriteCount:
+            self.WriteCount = WriteCount
+            self.Reset()
+
+    # ------------ PollScheduler::Reset-----------------------------------------
+    # make the normal and slow registers due on the next cycle, if Once is
+    # True the once registers are also read again. If Tiers is a list only
+    # the registers in those tiers are reset.
+    def Reset(self, Once=False, Tiers=None):
+
+        for Info in self.Registers.values():
+            if Info[TIER] == POLL_ONCE and not Once:
+                continue
+            if Tiers != None and Info[TIER] not in Tiers:
+                continue
+            Info[NEXT] = self.GetCycle(Info)
+            if Info[TIER] != POLL_SLOW:
+                Info[INTERVAL] = 1
+                Info[STABLE] = 0
+
+    # ------------ PollScheduler::IsDue-----------------------------------------
+    # True if the register should be read in this cycle. Fast registers are
+    # read by the controller separately so they are never due here.
+    def IsDue(self, Register, IsInput=False):
+
+        Info = self.Registers.get(self.GetKey(Register, IsInput), None)
+        if Info == None:
+            self.CycleDue += 1
+            return True
+        if Info[TIER] == POLL_FAST:
+            return False
+        if Info[NEXT] <= self.GetCycle(Info):
+            self.CycleDue += 1
+            return True
+        self.Skipped += 1
+        return False
+
+    # ------------ PollScheduler::BlockIsDue------------------------------------
+    # Members is the member list of a read plan block, the block is due if any
+    # register in the block is due
+    def BlockIsDue(self, Members, IsInput=False):
+
+        for Register, Offset, WordLength in Members:
+            Info = self.Registers.get(self.GetKey(Register, IsInput), None)
+            if Info == None or (
+                Info[TIER] != POLL_FAST and Info[NEXT] <= self.GetCycle(Info)
+            ):
+                self.CycleDue += 1
+                return True
+        self.Skipped += len(Members)
+        return False
+
+    # ------------ PollScheduler::Observe---------------------------------------
+    # called each time a register is read, Changed is True if the value is
+    # different from the last read
+    def Observe(self, Register, Changed, IsInput=False):
+
+        Info = self.Registers.get(self.GetKey(Register, IsInput), None)
+        if Info == None:
+            return
+        self.Reads += 1
+        if Info[TIER] == POLL_FAST and Changed and self.Enabled:
+            # the state of the generator changed, stop the back off
+            self.Reset(Tiers=[POLL_NORMAL])
+        if Info[TIER] == POLL_ONCE:
+            # read again only if Reset(Once=True) is called
+            Info[NEXT] = float("inf")
+            return
+        if Info[TIER] == POLL_NORMAL and self.Enabled:
+            if Changed:
+                Info[INTERVAL] = 1
+                Info[STABLE] = 0
+            else:
+                Info[STABLE] += 1
+                if Info[STABLE] >= self.StableReads:
+                    Info[INTERVAL] = min(Info[INTERVAL] * 2, self.MaxInterval)
+                    Info[STABLE] = 0
+        Info[NEXT] = self.GetCycle(Info) + Info[INTERVAL]
+
+    # ------------ PollScheduler::GetStats--------------------------------------
+    def GetStats(self):
+
+        Stats = []
+        if not self.Enabled:
+            return Stats
+        Counts = []
+        for Tier in POLL_TIERS:
+            Counts.append("%s %d" % (Tier, len(self.GetRegisters(Tier))))
+        Stats.append({"Poll Tiers": ", ".join(Counts)})
+        Stats.append({"Poll Cycles": "%d" % self.Cycle})
+        Total = self.Reads + self.Skipped
+        if Total:
+            Stats.append(
+                {"Poll Reads Skipped": "%.1f%%" % (100.0 * float(self.Skipped) / float(Total))}
+            )
+        return Stats
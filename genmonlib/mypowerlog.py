@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mypowerlog.py
+# PURPOSE: binary power log (kW output over time)
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# The file starts with a header (magic, version, record size) followed by
+# fixed size records, oldest first. Each record is the time of the entry
+# (seconds since the epoch, UTC) and the power in kW. Records are only
+# appended, so the records are in time order unless the system clock was set
+# back, this allows a range of records to be found with a binary search.
+
+POWER_LOG_MAGIC = b"GENMONKW"
+POWER_LOG_VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, version, record size
+RECORD = struct.Struct("<Id")  # epoch seconds, kW
+
+
+# ------------ BinaryPowerLog class ---------------------------------------------
+class BinaryPowerLog(MyCommon):
+
+    # ------------ BinaryPowerLog::init-----------------------------------------
+    def __init__(self, FileName, log=None, debug=False, simulation=False):
+
+        super(BinaryPowerLog, self).__init__()
+        self.FileName = FileName
+        self.log = log
+        self.debug = debug
+        self.Simulation = simulation
+        self.LogLock = threading.RLock()
+
+    # ------------ BinaryPowerLog::Exists---------------------------------------
+    def Exists(self):
+
+        return os.path.isfile(self.FileName)
+
+    # ------------ BinaryPowerLog::GetHeader------------------------------------
+    def GetHeader(self):
+
+        return HEADER.pack(POWER_LOG_MAGIC, POWER_LOG_VERSION, RECORD.size)
+
+    # ------------ BinaryPowerLog::HeaderIsValid--------------------------------
+    def HeaderIsValid(self, Data):
+
+        if len(Data) < HEADER.size:
+            return False
+        Magic, Version, RecordSize = HEADER.unpack_from(Data, 0)
+        return (
+            Magic == POWER_LOG_MAGIC
+            and Version == POWER_LOG_VERSION
+            and RecordSize == RECORD.size
+        )
+
+    # ------------ BinaryPowerLog::Append---------------------------------------
+    def Append(self, Epoch, Value):
+
+        if self.Simulation:
+            return
+        try:
+            with self.LogLock:
+                with open(self.FileName, "ab") as LogFile:
+                    if LogFile.tell() == 0:
+                        LogFile.write(self.GetHeader())
+                    LogFile.write(RECORD.pack(int(Epoch), float(Value)))
+        except Exception as e1:
+            self.LogErrorLine("Error in BinaryPowerLog:Append: " + str(e1))
+
+    # ------------ BinaryPowerLog::GetFirstRecord-------------------------------
+    # return the oldest record (epoch, kW) or None if the log is empty
+    def GetFirstRecord(self):
+
+        try:
+            with self.LogLock:
+                if not os.path.isfile(self.FileName):
+                    return None
+                with open(self.FileName, "rb") as LogFile:
+                    Data = LogFile.read(HEADER.size + RECORD.size)
+            if len(Data) < HEADER.size + RECORD.size or not self.HeaderIsValid(Data):
+                return None
+            return RECORD.unpack_from(Data, HEADER.size)
+        except Exception as e1:
+            self.LogErrorLine("Error in BinaryPowerLog:GetFirstRecord: " + str(e1))
+            return None
+
+    # ------------ BinaryPowerLog::FindIndex------------------------------------
+    # return the index of the first record with a time >= Epoch
+    def FindIndex(self, Data, Count, Epoch):
+
+        Low = 0
+        High = Count
+        while Low < High:
+            Mid = (Low + High) // 2
+            if RECORD.unpack_from(Data, HEADER.size + Mid * RECORD.size)[0] < Epoch:
+                Low = Mid + 1
+            else:
+                High = Mid
+        return Low
+
+    # ------------ BinaryPowerLog::ReadRecords----------------------------------
+    # return a list of (epoch, kW) tuples, oldest first. If StartEpoch is given
+    # only records at or after that time are returned, if MaxEntries is given
+    # only the newest MaxEntries are returned. If StartOffset is given only
+    # records at or after that offset in the file are returned.
+    def ReadRecords(self, StartEpoch=None, MaxEntries=None, StartOffset=None):
+
+        try:
+            with self.LogLock:
+                if not os.path.isfile(self.FileName):
+                    return []
+                if os.path.getsize(self.FileName) <= HEADER.size:
+                    return []
+                with open(self.FileName, "rb") as LogFile:
+                    Data = mmap.mmap(LogFile.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if not self.HeaderIsValid(Data):
+                    self.LogError("Invalid header in power log: " + self.FileName)
+                    return []
+                Count = (len(Data) - HEADER.size) // RECORD.size
+                Start = 0
+                if StartEpoch != None:
+                    Start = self.FindIndex(Data, Count, StartEpoch)
+                if MaxEntries != None:
+                    Start = max(Start, Count - MaxEntries)
+                if StartOffset != None:
+                    Start = max(Start, (StartOffset - HEADER.size) // RECORD.size)
+                return list(
+                    RECORD.iter_unpack(
+                        Data[
+                            HEADER.size + Start * RECORD.size : HEADER.size
+                            + Count * RECORD.size
+                        ]
+                    )
+                )
+            finally:
+                Data.close()
+        except Exception as e1:
+            self.LogErrorLine("Error in BinaryPowerLog:ReadRecords: " + str(e1))
+            return []
+
+    # ------------ BinaryPowerLog::WriteRecords---------------------------------
+    # replace the contents of the log with Records (oldest first)
+    def WriteRecords(self, Records):
+
+        if self.Simulation:
+            return
+        try:
+            with self.LogLock:
+                TempFile = self.FileName + ".tmp"
+                with open(TempFile, "wb") as LogFile:
+                    LogFile.write(self.GetHeader())
+                    for Epoch, Value in Records:
+                        LogFile.write(RECORD.pack(int(Epoch), float(Value)))
+                    LogFile.flush()
+                    os.fsync(LogFile.fileno())
+                os.rename(TempFile, self.FileName)
+        except Exception as e1:
+            self.LogErrorLine("Error in BinaryPowerLog:WriteRecords: " + str(e1))
+
+    # ------------ BinaryPowerLog::Prune----------------------------------------
+    # remove records older than StartEpoch
+    def Prune(self, StartEpoch):
+
+        with self.LogLock:
+            self.WriteRecords(self.ReadRecords(StartEpoch=StartEpoch))
+
+    # ------------ BinaryPowerLog::Migrate--------------------------------------
+    # one time import of a text power log ("%x %X,kW" lines, oldest first).
+    # The text log is renamed so it is not imported again. Returns the number
+    # of entries imported.
+    def Migrate(self, TextFile):
+
+        if self.Simulation or not os.path.isfile(TextFile):
+            return 0
+        try:
+            Records = []
+            with open(TextFile, "r") as LogFile:
+                for line in LogFile:
+                    line = self.removeNonPrintable(line.strip())
+                    if not len(line) or line[0] == "#":
+                        continue
+                    Items = line.split(",")
+                    if len(Items) != 2:
+                        continue
+                    try:
+                        Epoch = time.mktime(time.strptime(Items[0], "%x %X"))
+                        Value = float(self.removeAlpha(Items[1]))
+                    except Exception as e1:
+                        continue
+                    Records.append((Epoch, Value))
+
+            with self.LogLock:
+                self.WriteRecords(Records)
+                os.rename(TextFile, TextFile + ".migrated")
+            self.LogError(
+                "Migrated %d entries from %s to %s"
+                % (len(Records), TextFile, self.FileName)
+            )
+            return len(Records)
+        except Exception as e1:
+            self.LogErrorLine("Error in BinaryPowerLog:Migrate: " + str(e1))
+            return 0
+
+    # ------------ BinaryPowerLog::GetAveragePower------------------------------
+    # Records is a list of (epoch, kW) oldest first. Returns the average power
+    # and the number of seconds the power was not zero, the same as
+    # GeneratorController:GetAveragePower
+    def GetAveragePower(self, Records):
+
+        TotalSeconds = 0
+        Entries = 0
+        TotalPower = 0.0
+        LastPower = 0.0
+        LastTime = None
+        for Epoch, Power in reversed(Records):
+            if LastTime != None and Power != 0:
+                TotalSeconds += LastTime - Epoch
+                TotalPower += (Power + LastPower) / 2
+                Entries += 1
+            LastTime = Epoch
+            LastPower = Power
+
+        if Entries == 0:
+            return 0, 0
+        return TotalPower / Entries, TotalSeconds
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mypowertotals.py
+# PURPOSE: running totals of the power log (kWh, fuel, run time)
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import json
+import os
+import threading
+
+from genmonlib.mycommon import MyCommon
+
+# GeneratorController:GetAveragePower walks the power log and for each interval
+# that starts with a non zero power entry adds the length of the interval, the
+# average of the power at each end of the interval and a count. kWh, fuel used
+# and run time are calculated from these three sums. The sums are updated as
+# each entry is added to the log, for the entire log and in buckets (one hour
+# by default) for recent history, so the totals for the whole log or the last
+# month do not require reading the log. An interval is counted in the bucket of
+# the time it started.
+
+TOTALS_VERSION = 1
+
+
+# ------------ PowerTotals class ------------------------------------------------
+class PowerTotals(MyCommon):
+
+    # ------------ PowerTotals::init--------------------------------------------
+    def __init__(
+        self,
+        FileName,
+        log=None,
+        debug=False,
+        simulation=False,
+        bucket_seconds=3600,
+        retain_seconds=31 * 24 * 3600,
+    ):
+
+        super(PowerTotals, self).__init__()
+        self.FileName = FileName  # checkpoint file
+        self.log = log
+        self.debug = debug
+        self.Simulation = simulation
+        self.BucketSeconds = bucket_seconds
+        self.RetainSeconds = retain_seconds
+        # shortest time period (minutes) returned from buckets, shorter periods
+        # would be too inaccurate since a partial bucket is not counted
+        self.MinimumMinutes = (bucket_seconds * 24) // 60
+        self.TotalsLock = threading.RLock()
+        self.Ready = False  # True when the totals match the log
+        self.Reset()
+
+    # ------------ PowerTotals::Reset-------------------------------------------
+    def Reset(self):
+
+        with self.TotalsLock:
+            self.FirstTime = None
+            self.LastTime = None
+            self.LastPower = 0.0
+            self.Lifetime = [0.0, 0.0, 0]  # seconds, sum of average power, count
+            self.Buckets = collections.OrderedDict()  # bucket start : [seconds, power, count]
+
+    # ------------ PowerTotals::Add---------------------------------------------
+    # add an entry (time, power) to the totals, entries must be added oldest
+    # first
+    def Add(self, Epoch, Power):
+
+        with self.TotalsLock:
+            if self.FirstTime == None:
+                self.FirstTime = Epoch
+            if self.LastTime != None and self.LastPower != 0:
+                Seconds = Epoch - self.LastTime
+                AvgPower = (self.LastPower + Power) / 2
+                self.Lifetime[0] += Seconds
+                self.Lifetime[1] += AvgPower
+                self.Lifetime[2] += 1
+                Start = int(self.LastTime // self.BucketSeconds) * self.BucketSeconds
+                Bucket = self.Buckets.get(Start, None)
+                if Bucket == None:
+                    Bucket = [0.0, 0.0, 0]
+                    self.Buckets[Start] = Bucket
+                Bucket[0] += Seconds
+                Bucket[1] += AvgPower
+                Bucket[2] += 1
+            self.LastTime = Epoch
+            self.LastPower = Power
+
+            # remove buckets that are too old
+            while len(self.Buckets):
+                Start = next(iter(self.Buckets))
+                if Start >= Epoch - self.RetainSeconds:
+                    break
+                del self.Buckets[Start]
+
+    # ------------ PowerTotals::CanGetTotals------------------------------------
+    def CanGetTotals(self, Minutes):
+
+        if not self.Ready:
+            return False
+        if not Minutes:
+            return True
+        return (
+            Minutes >= self.MinimumMinutes and Minutes * 60 <= self.RetainSeconds
+        )
+
+    # ------------ PowerTotals::GetTotals---------------------------------------
+    # return (average power, total seconds) for the last Minutes (0 is the
+    # entire log), the same as GeneratorController:GetAveragePower. Returns
+    # None if the totals can not be used for this time period.
+    def GetTotals(self, Minutes, Now):
+
+        with self.TotalsLock:
+            if not self.CanGetTotals(Minutes):
+                return None
+            if not Minutes:
+                Seconds, Power, Count = self.Lifetime
+            else:
+                Seconds, Power, Count = 0.0, 0.0, 0
+                Start = Now - (Minutes * 60)
+                for BucketStart, Bucket in self.Buckets.items():
+                    if BucketStart < Start:
+                        continue
+                    Seconds += Bucket[0]
+                    Power += Bucket[1]
+                    Count += Bucket[2]
+            if Count == 0:
+                return 0, 0
+            return Power / Count, Seconds
+
+    # ------------ PowerTotals::Save--------------------------------------------
+    # save a checkpoint, LogSize is the size of the power log that has been
+    # added to the totals
+    def Save(self, LogSize):
+
+        if self.Simulation or not self.Ready:
+            return
+        try:
+            with self.TotalsLock:
+                Data = {
+                    "version": TOTALS_VERSION,
+                    "bucket_seconds": self.BucketSeconds,
+                    "log_size": LogSize,
+                    "first_time": self.FirstTime,
+                    "last_time": self.LastTime,
+                    "last_power": self.LastPower,
+                    "lifetime": self.Lifetime,
+                    "buckets": [
+                        [Start] + Bucket for Start, Bucket in self.Buckets.items()
+                    ],
+                }
+            TempFile = self.FileName + ".tmp"
+            with open(TempFile, "w") as CheckpointFile:
+                json.dump(Data, CheckpointFile)
+            os.rename(TempFile, self.FileName)
+        except Exception as e1:
+            self.LogErrorLine("Error in PowerTotals:Save: " + str(e1))
+
+    # ------------ PowerTotals::Load--------------------------------------------
+    # load the last checkpoint, returns (log size, time of the first log entry)
+    # when the checkpoint was saved or None if there is no valid checkpoint
+    def Load(self):
+
+        try:
+            if not os.path.isfile(self.FileName):
+                return None
+            with open(self.FileName, "r") as CheckpointFile:
+                Data = json.load(CheckpointFile)
+            if (
+                Data.get("version", None) != TOTALS_VERSION
+                or Data.get("bucket_seconds", None) != self.BucketSeconds
+            ):
+                return None
+            with self.TotalsLock:
+                self.Reset()
+                self.FirstTime = Data["first_time"]
+                self.LastTime = Data["last_time"]
+                self.LastPower = Data["last_power"]
+                self.Lifetime = Data["lifetime"]
+                for Items in Data["buckets"]:
+                    self.Buckets[Items[0]] = Items[1:]
+            return Data["log_size"], Data["first_time"]
+        except Exception as e1:
+            self.LogErrorLine("Error in PowerTotals:Load: " + str(e1))
+            self.Reset()
+            return None
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myregisters.py
+# PURPOSE: store modbus register values as 16 bit words
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import array
+import collections
+import sys
+import time
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+# Register values are received from the controller as hex strings, i.e. a read
+# of two registers at 0010 gives "0001abcd". The controllers used to keep these
+# strings in a dict and parse them with int(Value, 16) every time a value was
+# displayed or checked for alarms. RegisterStore keeps the words in an array
+# (one word for each modbus address) so values can be returned as integers
+# without parsing. The register (i.e. "0010") and the number of hex digits that
+# were read are kept for each read so the store can still be used as a dict of
+# hex strings (i.e. for registers_json, snapshots and support data).
+#
+# Values that are not hex, use upper case or are stored with a register that is
+# not a lower case 4 digit hex string are kept as strings, as before. Some
+# controller definitions overlap (i.e. a 32 bit value at 9a09 and a 16 bit
+# value at 9a0a). A value that would use words already used by another
+# register is also kept as a string so each register keeps the value read for
+# it.
+
+TABLE_SIZE = 0x10000  # number of modbus addresses
+
+HEX_DIGITS = set("0123456789abcdef")
+
+
+# ------------ RegisterStore class ----------------------------------------------
+class RegisterStore(MutableMapping):
+
+    # ------------ RegisterStore::init------------------------------------------
+    def __init__(self, size=TABLE_SIZE):
+
+        self.Size = size
+        self.Words = array.array("H", bytes(2 * size))  # value of each address
+        self.Valid = bytearray((size + 7) // 8)  # bitmap of addresses with values
+        # register : (address, hex digits) or the value string, in the order
+        # the registers were first stored
+        self.Entries = collections.OrderedDict()
+        self.Times = {}  # register : time the value was stored
+        self.Owners = {}  # address : register whose value is in Words[address]
+
+    # ------------ RegisterStore::GetAddress------------------------------------
+    # return (address, digits) if Value can be stored as words, else None
+    def GetAddress(self, Register, Value):
+
+        if len(Register) != 4 or not len(Value) or (len(Value) > 4 and len(Value) % 4):
+            return None
+        if not HEX_DIGITS.issuperset(Register) or not HEX_DIGITS.issuperset(Value):
+            return None
+        Address = int(Register, 16)
+        if Address + (len(Value) + 3) // 4 > self.Size:
+            return None
+        return (Address, len(Value))
+
+    # ------------ RegisterStore::Set-------------------------------------------
+    # store a value, returns True if the value is different from the last value
+    # stored for the register
+    def Set(self, Register, Value):
+
+        Entry = self.GetAddress(Register, Value)
+        if Entry != None and self.Overlaps(Register, Entry[0], (Entry[1] + 3) // 4):
+            Entry = None
+        OldEntry = self.Entries.get(Register, None)
+        if OldEntry.__class__ is tuple and OldEntry != Entry:
+            self.Release(Register, OldEntry)
+        if Entry == None:
+            Changed = self.Entries.get(Register, None) != Value
+            self.Entries[Register] = Value
+            self.Times[Register] = time.time()
+            return Changed
+
+        Address, Digits = Entry
+        if Digits <= 4:
+            Word = int(Value, 16)
+            Changed = (
+                self.Entries.get(Register, None) != Entry
+                or not self.IsValid(Address)
+                or self.Words[Address] != Word
+            )
+            self.Words[Address] = Word
+            self.Valid[Address >> 3] |= 1 << (Address & 7)
+            self.Owners[Address] = Register
+        else:
+            Count = Digits // 4
+            Words = array.array("H", bytes.fromhex(Value))
+            if sys.byteorder == "little":
+                Words.byteswap()
+            Changed = (
+                self.Entries.get(Register, None) != Entry
+                or not self.IsValid(Address, Count)
+                or self.Words[Address : Address + Count] != Words
+            )
+            self.Words[Address : Address + Count] = Words
+            for Offset in range(Address, Address + Count):
+                self.Valid[Offset >> 3] |= 1 << (Offset & 7)
+                self.Owners[Offset] = Register
+        self.Entries[Register] = Entry
+        self.Times[Register] = time.time()
+        return Changed
+
+    # ------------ RegisterStore::Overlaps--------------------------------------
+    # True if any address from Address to Address + Count holds the value of
+    # another register
+    def Overlaps(self, Register, Address, Count):
+
+        for Offset in range(Address, Address + Count):
+            Owner = self.Owners.get(Offset, None)
+            if Owner != None and Owner != Register:
+                return True
+        return False
+
+    # ------------ RegisterStore::Release---------------------------------------
+    # mark the words used by Entry (address, digits) of Register as unused
+    def Release(self, Register, Entry):
+
+        Address, Digits = Entry
+        for Offset in range(Address, Address + (Digits + 3) // 4):
+            if self.Owners.get(Offset, None) == Register:
+                del self.Owners[Offset]
+                self.Valid[Offset >> 3] &= ~(1 << (Offset & 7)) & 0xFF
+
+    # ------------ RegisterStore::IsValid---------------------------------------
+    # True if all the addresses from Address to Address + Count have values
+    def IsValid(self, Address, Count=1):
+
+        for Offset in range(Address, Address + Count):
+            if not self.Valid[Offset >> 3] & (1 << (Offset & 7)):
+                return False
+        return True
+
+    # ------------ RegisterStore::GetInt----------------------------------------
+    # return the value stored for Register as an integer, None if no value
+    def GetInt(self, Register):
+
+        Entry = self.Entries.get(Register, None)
+        if Entry.__class__ is tuple:
+            Address, Digits = Entry
+            if Digits <= 4:
+                return self.Words[Address]
+            if Digits == 8:
+                return (self.Words[Address] << 16) | self.Words[Address + 1]
+        elif Entry == None or not len(Entry):
+            return None
+        else:
+            return int(Entry, 16)
+        Value = 0
+        for Word in self.Words[Address : Address + Digits // 4]:
+            Value = (Value << 16) | Word
+        return Value
+
+    # ------------ RegisterStore::GetTime---------------------------------------
+    # return the time the value for Register was stored, None if no value
+    def GetTime(self, Register):
+
+        return self.Times.get(Register, None)
+
+    # ------------ RegisterStore::GetHexView------------------------------------
+    # return a dict of register : hex string (i.e. for json output)
+    def GetHexView(self):
+
+        return collections.OrderedDict(
+            (Register, self[Register]) for Register in list(self.Entries.keys())
+        )
+
+    # ------------ RegisterStore::__getitem__-----------------------------------
+    def __getitem__(self, Register):
+
+        Entry = self.Entries[Register]
+        if isinstance(Entry, str):
+            return Entry
+        Address, Digits = Entry
+        if Digits <= 4:
+            return "%0*x" % (Digits, self.Words[Address])
+        Words = self.Words[Address : Address + Digits // 4]
+        if sys.byteorder == "little":
+            Words.byteswap()
+        return Words.tobytes().hex()
+
+    # ------------ RegisterStore::__setitem__-----------------------------------
+    def __setitem__(self, Register, Value):
+
+        self.Set(Register, Value)
+
+    # ------------ RegisterStore::__delitem__-----------------------------------
+    def __delitem__(self, Register):
+
+        Entry = self.Entries.pop(Register)
+        self.Times.pop(Register, None)
+        if not isinstance(Entry, str):
+            self.Release(Register, Entry)
+
+    # ------------ RegisterStore::__contains__----------------------------------
+    def __contains__(self, Register):
+
+        return Register in self.Entries
+
+    # ------------ RegisterStore::__iter__--------------------------------------
+    def __iter__(self):
+
+        return iter(self.Entries)
+
+    # ------------ RegisterStore::__len__---------------------------------------
+    def __len__(self):
+
+        return len(self.Entries)
+
+    # ------------ RegisterStore::clear-----------------------------------------
+    def clear(self):
+
+        self.Entries.clear()
+        self.Times.clear()
+        self.Owners.clear()
+        self.Valid = bytearray(len(self.Valid))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myrollup.py
+# PURPOSE: pre-aggregated history (min / max / average) for log charts
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import threading
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# Each tier is a list of buckets of a fixed length of time. A bucket holds the
+# min, max, sum and count of the log entries in that time. Tiers are updated as
+# entries are added to a log, so a chart for a long time period can be created
+# from a few hundred buckets instead of thinning tens of thousands of log
+# entries, and the min / max keep short spikes visible.
+
+# bucket length (seconds), how long buckets are kept (seconds, None is forever)
+ROLLUP_TIERS = [
+    [60, 2 * 24 * 3600],
+    [15 * 60, 31 * 24 * 3600],
+    [60 * 60, 400 * 24 * 3600],
+    [24 * 60 * 60, None],
+]
+
+
+# ------------ Rollup class -----------------------------------------------------
+class Rollup(MyCommon):
+
+    # ------------ Rollup::init-------------------------------------------------
+    def __init__(self, tiers=ROLLUP_TIERS, log=None, debug=False):
+
+        super(Rollup, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.TierConfig = tiers
+        self.RollupLock = threading.RLock()
+        self.Ready = False  # True once built from the existing log
+        self.Reset()
+
+    # ------------ Rollup::Reset------------------------------------------------
+    def Reset(self):
+
+        with self.RollupLock:
+            # each tier is [seconds, retain, buckets, oldest time covered]
+            # buckets are bucket start : [min, max, sum, count]
+            self.Tiers = []
+            for Seconds, Retain in self.TierConfig:
+                self.Tiers.append([Seconds, Retain, collections.OrderedDict(), None])
+
+    # ------------ Rollup::Add--------------------------------------------------
+    # add a log entry, entries should be added oldest first
+    def Add(self, Epoch, Value):
+
+        try:
+            Value = float(Value)
+        except Exception as e1:
+            return
+        with self.RollupLock:
+            for Tier in self.Tiers:
+                Seconds, Retain, Buckets, Oldest = Tier
+                Start = int(Epoch // Seconds) * Seconds
+                Bucket = Buckets.get(Start, None)
+                if Bucket == None:
+                    Buckets[Start] = [Value, Value, Value, 1]
+                else:
+                    Bucket[0] = min(Bucket[0], Value)
+                    Bucket[1] = max(Bucket[1], Value)
+                    Bucket[2] += Value
+                    Bucket[3] += 1
+                if Retain == None:
+                    continue
+                # remove buckets that are too old
+                while len(Buckets):
+                    First = next(iter(Buckets))
+                    if First >= Epoch - Retain:
+                        break
+                    del Buckets[First]
+                    Tier[3] = First + Seconds
+
+    # ------------ Rollup::Build------------------------------------------------
+    # replace the rollup with the data from a list of (epoch, value), oldest
+    # first
+    def Build(self, Entries):
+
+        with self.RollupLock:
+            self.Reset()
+            for Epoch, Value in Entries:
+                self.Add(Epoch, Value)
+            self.Ready = True
+
+    # ------------ Rollup::GetBuckets-------------------------------------------
+    # return the list of (start, bucket) for a tier at or after StartEpoch
+    def GetBuckets(self, Tier, StartEpoch):
+
+        Seconds, Retain, Buckets, Oldest = Tier
+        if StartEpoch == None:
+            return list(Buckets.items())
+        First = int(StartEpoch // Seconds) * Seconds
+        return [Item for Item in Buckets.items() if Item[0] >= First]
+
+    # ------------ Rollup::TierCovers-------------------------------------------
+    # True if no buckets after StartEpoch have been removed from the tier
+    def TierCovers(self, Tier, StartEpoch):
+
+        Oldest = Tier[3]
+        if Oldest == None:
+            return True
+        if StartEpoch == None:
+            return False
+        return StartEpoch >= Oldest
+
+    # ------------ Rollup::Query------------------------------------------------
+    # return rows [time stamp, average, min, max] newest first for the log
+    # entries at or after StartEpoch (None for all) using the most detailed
+    # tier that has no more than MaxPoints rows. Returns None if the number
+    # of log entries is no more than MaxPoints, the entries should be used.
+    def Query(self, StartEpoch, MaxPoints):
+
+        with self.RollupLock:
+            Selected = None
+            for Tier in self.Tiers:
+                if not self.TierCovers(Tier, StartEpoch):
+                    continue
+                Buckets = self.GetBuckets(Tier, StartEpoch)
+                if Selected == None:
+                    # the most detailed tier with all of the entries
+                    if sum(Bucket[3] for Start, Bucket in Buckets) <= MaxPoints:
+                        return None
+                Selected = Buckets
+                if len(Buckets) <= MaxPoints:
+                    break
+            if Selected == None:
+                return None
+
+            ReturnList = []
+            for Start, Bucket in reversed(Selected):
+                ReturnList.append(
+                    [
+                        time.strftime("%x %X", time.localtime(Start)),
+                        str(round(Bucket[2] / Bucket[3], 2)),
+                        str(round(Bucket[0], 2)),
+                        str(round(Bucket[1], 2)),
+                    ]
+                )
+            return ReturnList
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myscanner.py
+# PURPOSE: find the valid registers of a modbus controller using block reads
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# Reading every register on its own takes one transaction per register. The
+# scanner reads blocks of registers instead. If a block read fails (i.e. an
+# Illegal Address exception because some registers in the block do not exist)
+# the block is split in half and each half is read, until the registers that
+# can not be read are found. Registers that do not exist are usually in long
+# ranges, so once a register is found to be invalid the registers after it are
+# read one at a time until a valid register is found, then block reads are
+# used again. Once the valid registers are known, later passes read only the
+# valid registers (merged into blocks) and count how often each register
+# changes.
+#
+# The modbus object can be ModbusProtocol (or a class derived from it) or
+# ModbusFile, so a scan can be tested against a register file.
+
+MAX_BLOCK_LENGTH = 125  # modbus limit for a register read (words)
+
+
+# ------------ RegisterScanner class --------------------------------------------
+class RegisterScanner(MyCommon):
+
+    # ------------ RegisterScanner::init----------------------------------------
+    # wait is called after each read, if it returns True the scan stops. This
+    # is used to delay between reads and to check if the program is stopping.
+    def __init__(
+        self, modbus, log=None, debug=False, block_length=32, wait=None, isinput=False
+    ):
+
+        super(RegisterScanner, self).__init__()
+        self.ModBus = modbus
+        self.log = log
+        self.debug = debug
+        self.BlockLength = max(1, min(int(block_length), MAX_BLOCK_LENGTH))
+        self.Wait = wait
+        self.IsInput = isinput
+        self.Registers = collections.OrderedDict()  # register : last value
+        self.Changes = collections.OrderedDict()  # register : number of changes
+        self.Invalid = []  # [start, end] of ranges that can not be read
+        self.NoResponse = []  # registers that timed out or had errors
+        self.Passes = 0
+        self.Reads = 0
+        self.ScanTime = 0.0
+        self.Stopped = False
+
+    # ------------ RegisterScanner::ReadBlock-----------------------------------
+    # returns the value (hex string) or None if the read failed, and True if
+    # the controller returned an Illegal Address exception
+    def ReadBlock(self, Start, Length):
+
+        ExcepAddress = self.ModBus.ExcepAddress
+        self.Reads += 1
+        if self.IsInput:
+            Value = self.ModBus.ProcessTransaction(
+                "%04x" % Start, Length, skipupdate=True, IsInput=True
+            )
+        else:
+            Value = self.ModBus.ProcessTransaction("%04x" % Start, Length, skipupdate=True)
+        if self.Wait != None and self.Wait():
+            self.Stopped = True
+        IllegalAddress = self.ModBus.ExcepAddress != ExcepAddress
+        if Value == None or len(Value) != Length * 4:
+            return None, IllegalAddress
+        return Value, IllegalAddress
+
+    # ------------ RegisterScanner::AddInvalid----------------------------------
+    def AddInvalid(self, Start, Length):
+
+        End = Start + Length - 1
+        if len(self.Invalid) and self.Invalid[-1][1] == Start - 1:
+            self.Invalid[-1][1] = End
+        else:
+            self.Invalid.append([Start, End])
+
+    # ------------ RegisterScanner::StoreBlock----------------------------------
+    # save the register values in a block, returns the list of changes as
+    # (register, old value, new value)
+    def StoreBlock(self, Start, Value):
+
+        ChangeList = []
+        for Offset in range(0, len(Value) // 4):
+            Register = "%04x" % (Start + Offset)
+            NewValue = Value[Offset * 4 : (Offset + 1) * 4]
+            OldValue = self.Registers.get(Register, None)
+            if OldValue != None and OldValue != NewValue:
+                self.Changes[Register] = self.Changes.get(Register, 0) + 1
+                ChangeList.append((Register, OldValue, NewValue))
+            elif OldValue == None:
+                self.Changes[Register] = 0
+            self.Registers[Register] = NewValue
+        return ChangeList
+
+    # ------------ RegisterScanner::LastWasInvalid------------------------------
+    # True if the register before Register could not be read
+    def LastWasInvalid(self, Register):
+
+        if len(self.Invalid) and self.Invalid[-1][1] == Register - 1:
+            return True
+        return len(self.NoResponse) and self.NoResponse[-1] == "%04x" % (Register - 1)
+
+    # ------------ RegisterScanner::Discover------------------------------------
+    # find the valid registers from Start to End (not included)
+    def Discover(self, Start, End):
+
+        StartTime = time.time()
+        self.Registers = collections.OrderedDict()
+        self.Changes = collections.OrderedDict()
+        self.Invalid = []
+        self.NoResponse = []
+        self.Passes = 0
+        self.Stopped = False
+        try:
+            # blocks to read in register order, [start, length]
+            Blocks = collections.deque()
+            for BlockStart in range(Start, End, self.BlockLength):
+                Blocks.append([BlockStart, min(self.BlockLength, End - BlockStart)])
+
+            while len(Blocks) and not self.Stopped:
+                BlockStart, Length = Blocks.popleft()
+                if Length > 1 and self.LastWasInvalid(BlockStart):
+                    # in a range of invalid registers, read the first register
+                    # on its own and the rest of the block after it
+                    Blocks.appendleft([BlockStart + 1, Length - 1])
+                    Length = 1
+                Value, IllegalAddress = self.ReadBlock(BlockStart, Length)
+                if Value != None:
+                    self.StoreBlock(BlockStart, Value)
+                    continue
+                if Length > 1:
+                    Half = Length // 2
+                    Blocks.appendleft([BlockStart + Half, Length - Half])
+                    Blocks.appendleft([BlockStart, Half])
+                    continue
+                if IllegalAddress:
+                    self.AddInvalid(BlockStart, 1)
+                else:
+                    self.NoResponse.append("%04x" % BlockStart)
+            self.Passes = 1
+        except Exception as e1:
+            self.LogErrorLine("Error in RegisterScanner:Discover: " + str(e1))
+        self.ScanTime += time.time() - StartTime
+        return not self.Stopped
+
+    # ------------ RegisterScanner::GetReadPlan---------------------------------
+    # merge the valid registers into blocks, returns a list of [start, length]
+    def GetReadPlan(self):
+
+        Plan = []
+        for Register in self.Registers.keys():
+            RegInt = int(Register, 16)
+            if (
+                len(Plan)
+                and Plan[-1][0] + Plan[-1][1] == RegInt
+                and Plan[-1][1] < self.BlockLength
+            ):
+                Plan[-1][1] += 1
+            else:
+                Plan.append([RegInt, 1])
+        return Plan
+
+    # ------------ RegisterScanner::Poll----------------------------------------
+    # read the valid registers again, returns the list of changes as
+    # (register, old value, new value)
+    def Poll(self):
+
+        StartTime = time.time()
+        ChangeList = []
+        try:
+            for BlockStart, Length in self.GetReadPlan():
+                if self.Stopped:
+                    break
+                Value, IllegalAddress = self.ReadBlock(BlockStart, Length)
+                if Value == None:
+                    continue
+                ChangeList.extend(self.StoreBlock(BlockStart, Value))
+            if not self.Stopped:
+                self.Passes += 1
+        except Exception as e1:
+            self.LogErrorLine("Error in RegisterScanner:Poll: " + str(e1))
+        self.ScanTime += time.time() - StartTime
+        return ChangeList
+
+    # ------------ RegisterScanner::Scan----------------------------------------
+    # find the valid registers then read them Passes - 1 more times
+    def Scan(self, Start, End, Passes=1):
+
+        if not self.Discover(Start, End):
+            return False
+        for Count in range(1, Passes):
+            self.Poll()
+            if self.Stopped:
+                return False
+        return True
+
+    # ------------ RegisterScanner::GetResults----------------------------------
+    # the registers are in the same format as a ModbusFile input file so the
+    # results can be used for simulation
+    def GetResults(self):
+
+        Results = collections.OrderedDict()
+        if self.IsInput:
+            Results["Registers"] = {}
+            Results["Inputs"] = self.Registers
+        else:
+            Results["Registers"] = self.Registers
+        Results["Strings"] = {}
+        Results["FileData"] = {}
+        Results["Changes"] = self.Changes
+        Results["Invalid"] = ["%04x-%04x" % (Start, End) for Start, End in self.Invalid]
+        Results["No Response"] = self.NoResponse
+        Results["Passes"] = self.Passes
+        Results["Reads"] = self.Reads
+        Results["Scan Time"] = "%.1f sec" % self.ScanTime
+        return Results
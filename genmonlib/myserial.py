@@ -18,6 +18,7 @@ import threading
 
 import serial
 
+from genmonlib.mybuffer import MyBuffer
 from genmonlib.mylog import SetupLogger
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
@@ -44,8 +45,10 @@ class SerialDevice(MySupport):
         self.config = config
         self.DeviceName = name
         self.BaudRate = rate
-        self.Buffer = []
+        self.Buffer = MyBuffer()
         self.BufferLock = threading.Lock()
+        # signaled by the read thread when data is added to the receive buffer
+        self.DataReady = threading.Condition(self.BufferLock)
         self.DiscardedBytes = 0
         self.Restarts = 0
         self.SerialStartTime = datetime.datetime.now()  # used for com metrics
@@ -160,11 +163,12 @@ class SerialDevice(MySupport):
                 while True:
                     data = self.Read()
                     if len(data):
-                        with self.BufferLock:
+                        with self.DataReady:
                             if sys.version_info[0] < 3:
                                 self.Buffer.extend(ord(c) for c in data)  # PYTHON2
                             else:
                                 self.Buffer.extend(data)  # PYTHON3 (bytes -> ints)
+                            self.DataReady.notify_all()
                     # check for SignalStopped once per read (the read above blocks up
                     # to the configured timeout, so this is not a busy loop)
                     if self.IsStopSignaled("SerialReadThread"):
@@ -178,6 +182,18 @@ class SerialDevice(MySupport):
                 #  for the best (actually this works)
                 self.RestartSerial()
 
+    # ---------- SerialDevice::WaitForData--------------------------------------
+    # Wait until at least MinLength bytes are in the receive buffer or until
+    # new data arrives, whichever comes first. Returns True if the buffer holds
+    # at least MinLength bytes.
+    def WaitForData(self, MinLength, timeout):
+
+        with self.DataReady:
+            if len(self.Buffer) >= MinLength:
+                return True
+            self.DataReady.wait(timeout)
+            return len(self.Buffer) >= MinLength
+
     # ------------SerialDevice::RestartSerial------------------------------------
     def RestartSerial(self):
         try:
@@ -218,7 +234,7 @@ class SerialDevice(MySupport):
             self.SerialDevice.flushInput()  # flush input buffer, discarding all its contents
             self.SerialDevice.flushOutput()  # flush output buffer, aborting current output
             with self.BufferLock:  # will block if lock is already held
-                del self.Buffer[:]
+                self.Buffer.Clear()
 
         except Exception as e1:
             self.LogErrorLine("Error in SerialDevice:Flush : " + self.DeviceName + ":" + str(e1))
@@ -251,7 +267,7 @@ class SerialDevice(MySupport):
             if not len(self.Buffer):
                 return ""
             with self.BufferLock:
-                str1 = "".join(chr(e) for e in self.Buffer)
+                str1 = self.Buffer.Peek().decode("latin-1")
             return str1
         except Exception as e1:
             self.LogErrorLine("Error in GetRxBufferAsString: " + str(e1))
@@ -19,6 +19,7 @@ import socket
 import sys
 import threading
 
+from genmonlib.mybuffer import MyBuffer
 from genmonlib.mylog import SetupLogger
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
@@ -34,8 +35,10 @@ class SerialTCPDevice(MySupport):
         super(SerialTCPDevice, self).__init__()
         self.DeviceName = "serialTCP"
         self.config = config
-        self.Buffer = []
+        self.Buffer = MyBuffer()
         self.BufferLock = threading.Lock()
+        # signaled by the read thread when data is added to the receive buffer
+        self.DataReady = threading.Condition(self.BufferLock)
         self.DiscardedBytes = 0
         self.Restarts = 0
         self.SerialStartTime = datetime.datetime.now()  # used for com metrics
@@ -131,16 +134,16 @@ class SerialTCPDevice(MySupport):
                             ):  # 10 seconds
                                 return
                             continue
-                    for c in self.Read():
-                        with self.BufferLock:
+                    data = self.Read()
+                    if len(data):
+                        with self.DataReady:
                             if sys.version_info[0] < 3:
-                                self.Buffer.append(ord(c))  # PYTHON2
+                                self.Buffer.extend(ord(c) for c in data)  # PYTHON2
                             else:
-                                self.Buffer.append(c)  # PYTHON3
-                        # first check for SignalStopped is when we are receiving
-                        if self.IsStopSignaled("SerialTCPReadThread"):
-                            return
-                    # second check for SignalStopped is when we are not receiving
+                                self.Buffer.extend(data)  # PYTHON3 (bytes -> ints)
+                            self.DataReady.notify_all()
+                    # check for SignalStopped once per read (the read above blocks up
+                    # to the socket timeout, so this is not a busy loop)
                     if self.IsStopSignaled("SerialTCPReadThread"):
                         return
 
@@ -160,6 +163,18 @@ class SerialTCPDevice(MySupport):
                     self.Socket = None
                 self.Connect()
 
+    # ---------- SerialTCPDevice::WaitForData-----------------------------------
+    # Wait until at least MinLength bytes are in the receive buffer or until
+    # new data arrives, whichever comes first. Returns True if the buffer holds
+    # at least MinLength bytes.
+    def WaitForData(self, MinLength, timeout):
+
+        with self.DataReady:
+            if len(self.Buffer) >= MinLength:
+                return True
+            self.DataReady.wait(timeout)
+            return len(self.Buffer) >= MinLength
+
     # ------------SerialTCPDevice::DiscardByte-----------------------------------
     def DiscardByte(self):
 
@@ -186,7 +201,7 @@ class SerialTCPDevice(MySupport):
         try:
             # Flush socket
             with self.BufferLock:  # will block if lock is already held
-                del self.Buffer[:]
+                self.Buffer.Clear()
 
         except Exception as e1:
             self.LogErrorLine("Error in SerialTCPDevice:Flush : " + str(e1))
@@ -236,7 +251,7 @@ class SerialTCPDevice(MySupport):
             if not len(self.Buffer):
                 return ""
             with self.BufferLock:
-                str1 = "".join(chr(e) for e in self.Buffer)
+                str1 = self.Buffer.Peek().decode("latin-1")
             return str1
         except Exception as e1:
             self.LogErrorLine(
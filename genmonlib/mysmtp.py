@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mysmtp.py
+# PURPOSE: SMTP connection that is kept open between messages
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import smtplib
+import socket
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# Opening an SMTP connection takes a TLS handshake and a login, which is most
+# of the time needed to send a message. SMTPSession keeps the connection open
+# after a message is sent so the next message (i.e. the messages sent during
+# an outage) can use it. If the connection was not used for KeepAliveCheck
+# seconds it is checked with NOOP before it is used, if it was not used for
+# IdleTime seconds it is closed (most servers drop idle connections after a
+# few minutes).
+
+CONNECT_TIMEOUT = 30  # seconds
+
+
+# ------------ SMTPSession class ------------------------------------------------
+class SMTPSession(MyCommon):
+
+    # ------------ SMTPSession::init--------------------------------------------
+    def __init__(self, log=None, debug=False, idle_time=60, keepalive_check=10):
+
+        super(SMTPSession, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.IdleTime = idle_time
+        self.KeepAliveCheck = keepalive_check
+        self.Session = None  # smtplib.SMTP object or None if not connected
+        self.Settings = None  # settings used to open Session
+        self.LastUsed = 0
+        self.Connects = 0  # stats
+        self.Sent = 0
+
+    # ------------ SMTPSession::Open--------------------------------------------
+    # settings is a tuple of (server, port, ssl, tls disable, account, password),
+    # no login is done if the password is empty
+    def Open(self, settings):
+
+        Server, Port, SSLEnabled, TLSDisable, Account, Password = settings
+        if SSLEnabled:
+            Session = smtplib.SMTP_SSL(Server, Port, timeout=CONNECT_TIMEOUT)
+        else:
+            Session = smtplib.SMTP(Server, Port, timeout=CONNECT_TIMEOUT)
+        try:
+            if not SSLEnabled and not TLSDisable:
+                Session.starttls()
+            Session.ehlo()
+            if Password != "":
+                Session.login(Account, str(Password))
+        except Exception:
+            # the session state is not known, do not send QUIT
+            try:
+                Session.close()
+            except Exception:
+                pass
+            raise
+        self.Connects += 1
+        return Session
+
+    # ------------ SMTPSession::Connect-----------------------------------------
+    # make sure there is an open connection for settings, an exception is
+    # raised if the connection can not be opened
+    def Connect(self, settings):
+
+        if self.Session != None:
+            Idle = time.time() - self.LastUsed
+            if self.Settings != settings or Idle > self.IdleTime:
+                self.Close()
+            elif Idle > self.KeepAliveCheck and not self.IsAlive():
+                self.Close()
+        if self.Session == None:
+            self.Session = self.Open(settings)
+            self.Settings = settings
+            self.LastUsed = time.time()
+        return self.Session
+
+    # ------------ SMTPSession::IsAlive-----------------------------------------
+    def IsAlive(self):
+
+        try:
+            return self.Session.noop()[0] == 250
+        except Exception:
+            return False
+
+    # ------------ SMTPSession::SendMail----------------------------------------
+    # send a message, returns a dict of refused recipients like
+    # smtplib.SMTP.sendmail. If the server closed a connection that was used
+    # before, the message is sent again on a new connection.
+    def SendMail(self, settings, sender, recipients, message):
+
+        Reused = self.Session != None
+        self.Connect(settings)
+        try:
+            Refused = self.Session.sendmail(sender, recipients, message)
+        except smtplib.SMTPRecipientsRefused:
+            self.LastUsed = time.time()
+            raise
+        except (smtplib.SMTPServerDisconnected, socket.error) as e1:
+            self.Close()
+            if not Reused:
+                raise
+            self.LogDebug("SMTP connection closed by server, reconnecting: " + str(e1))
+            self.Connect(settings)
+            Refused = self.Session.sendmail(sender, recipients, message)
+        except Exception:
+            # the state of the connection is not known
+            self.Close()
+            raise
+        self.LastUsed = time.time()
+        self.Sent += 1
+        return Refused
+
+    # ------------ SMTPSession::CloseIfIdle-------------------------------------
+    def CloseIfIdle(self):
+
+        if self.Session != None and time.time() - self.LastUsed > self.IdleTime:
+            self.Close()
+
+    # ------------ SMTPSession::CloseSession------------------------------------
+    def CloseSession(self, Session):
+
+        try:
+            Session.quit()
+        except Exception:
+            try:
+                Session.close()
+            except Exception:
+                pass
+
+    # ------------ SMTPSession::Close-------------------------------------------
+    def Close(self):
+
+        if self.Session != None:
+            self.CloseSession(self.Session)
+        self.Session = None
+        self.Settings = None
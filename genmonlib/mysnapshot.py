@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mysnapshot.py
+# PURPOSE: warm start snapshot of the controller identity and register data
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import json
+import os
+import time
+
+from genmonlib.mycommon import MyCommon
+
+# When genmon starts the controller has to be identified and every register
+# read before the UI has anything to show. The snapshot is saved when genmon
+# stops (and periodically) and holds the controller type, the values found
+# when the controller was identified and the register data. On the next start
+# the snapshot is loaded and shown (marked as saved data) until the registers
+# have been read from the controller again.
+
+SNAPSHOT_VERSION = 1
+# register dicts saved in the snapshot (GeneratorController attribute names)
+SNAPSHOT_REGISTERS = ["Holding", "Strings", "FileData", "Coils", "Inputs"]
+
+
+# ------------ ControllerSnapshot class -----------------------------------------
+class ControllerSnapshot(MyCommon):
+
+    # ------------ ControllerSnapshot::init-------------------------------------
+    def __init__(self, FileName, log=None, debug=False, simulation=False):
+
+        super(ControllerSnapshot, self).__init__()
+        self.FileName = FileName
+        self.log = log
+        self.debug = debug
+        self.Simulation = simulation
+
+    # ------------ ControllerSnapshot::Save-------------------------------------
+    # Controller is the controller type (i.e. "generac_evo_nexus"), Identity is
+    # a dict of values found when the controller was identified and Registers
+    # is a dict of register dict name : register dict
+    def Save(self, Controller, Identity, Registers):
+
+        if self.Simulation:
+            return False
+        try:
+            Data = {
+                "version": SNAPSHOT_VERSION,
+                "controller": str(Controller).lower(),
+                "time": time.time(),
+                "identity": Identity,
+                "registers": dict(
+                    (Name, list(RegDict.items())) for Name, RegDict in Registers.items()
+                ),
+            }
+            TempFile = self.FileName + ".tmp"
+            with open(TempFile, "w") as SnapshotFile:
+                json.dump(Data, SnapshotFile)
+                SnapshotFile.flush()
+                os.fsync(SnapshotFile.fileno())
+            os.rename(TempFile, self.FileName)
+            return True
+        except Exception as e1:
+            self.LogErrorLine("Error in ControllerSnapshot:Save: " + str(e1))
+            return False
+
+    # ------------ ControllerSnapshot::Load-------------------------------------
+    # return the snapshot dict (see Save) if there is a valid snapshot for
+    # Controller that is not older than MaxAge minutes, otherwise None. Register
+    # data is returned as lists of (register, value) in the order they were
+    # saved.
+    def Load(self, Controller, MaxAge):
+
+        try:
+            if not os.path.isfile(self.FileName):
+                return None
+            with open(self.FileName, "r") as SnapshotFile:
+                Data = json.load(SnapshotFile)
+            if Data.get("version", None) != SNAPSHOT_VERSION:
+                return None
+            if Data.get("controller", None) != str(Controller).lower():
+                self.LogDebug("Snapshot is for a different controller, not used")
+                return None
+            Age = time.time() - Data.get("time", 0)
+            if Age < 0 or Age > MaxAge * 60:
+                self.LogDebug("Snapshot is too old, not used")
+                return None
+            if not isinstance(Data.get("identity", None), dict):
+                return None
+            if not isinstance(Data.get("registers", None), dict):
+                return None
+            return Data
+        except Exception as e1:
+            self.LogErrorLine("Error in ControllerSnapshot:Load: " + str(e1))
+            return None
+
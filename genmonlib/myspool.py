@@ -0,0 +1,474 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myspool.py
+# PURPOSE: on disk spool for notifications waiting to be sent
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from genmonlib.mycommon import MyCommon
+from genmonlib.mysupport import MySupport
+from genmonlib.mythread import MyThread
+
+# Messages that are queued to be sent (email, SMS etc.) are appended to a spool
+# so they are not lost if the program is restarted before they are sent. The
+# spool is a directory of segment files, each line of a segment is a JSON
+# record:
+#
+#   {"a": channel, "t": time, "n": seq, "d": data}
+#                                           a message was added
+#   {"k": "segment:offset"}                 the message added at offset of
+#                                           segment was sent (acknowledged)
+#
+# Records are only appended. The messages that are not acknowledged are kept
+# in memory (a deque for each channel) so adding and sending only write one
+# line. A new segment is started when the current one is larger than
+# SEGMENT_SIZE and when the spool is opened, a segment is deleted when it and
+# all the segments before it have no messages left. Messages still waiting in
+# old segments are copied to the current segment so the spool does not grow
+# if a message can not be sent for a long time. A copied record is written
+# after newer messages, so the messages are loaded in the order of their
+# sequence number (the order they were added), not the order in the file.
+#
+# Data is flushed to the OS when it is written. Workers call Sync() before
+# sending, so the messages are on disk before they can be acknowledged and
+# the thread that adds a message does not wait for the disk.
+
+SEGMENT_SIZE = 256 * 1024
+MAX_SEGMENTS = 4  # older segments with messages are copied to the current one
+SEGMENT_SUFFIX = ".seg"
+
+
+# ------------ SpoolEntry class -------------------------------------------------
+class SpoolEntry(object):
+    def __init__(self, Channel, Data, Time=None, Sequence=0):
+
+        self.Id = None  # (segment, offset) of the add record, None if not on disk
+        self.Channel = Channel
+        self.Data = Data
+        self.Time = time.time() if Time == None else Time  # time it was added
+        self.Sequence = Sequence  # order the messages were added in
+        self.Attempts = 0  # failed send attempts, not saved
+        self.NextTry = 0  # time of the next send attempt
+
+
+# ------------ MySpool class ----------------------------------------------------
+class MySpool(MyCommon):
+
+    # ------------ MySpool::init------------------------------------------------
+    # path is the spool directory, if path is None messages are only kept in
+    # memory (as are all messages if the spool can not be opened)
+    def __init__(self, path=None, log=None, debug=False, segment_size=SEGMENT_SIZE):
+
+        super(MySpool, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Path = path
+        self.SegmentSize = segment_size
+        self.Lock = threading.RLock()
+        self.Pending = {}  # channel : deque of SpoolEntry
+        self.Events = {}  # channel : event set when a message is added
+        self.Counts = collections.OrderedDict()  # segment : messages not sent
+        self.Segment = 0  # current segment number
+        self.Sequence = 0  # sequence number of the next message added
+        self.File = None  # current segment file, None if not on disk
+        self.LockFile = None
+        self.Unsynced = False  # True if written since the last Sync
+
+        if self.Path != None:
+            try:
+                self.Open()
+            except Exception as e1:
+                self.LogErrorLine("Error opening spool, messages are not saved: " + str(e1))
+                self.CloseFile()
+
+    # ------------ MySpool::Open------------------------------------------------
+    def Open(self):
+
+        if not os.path.isdir(self.Path):
+            os.makedirs(self.Path)
+        # only one process may use a spool
+        self.LockFile = open(os.path.join(self.Path, "lock"), "a")
+        if fcntl != None:
+            try:
+                fcntl.flock(self.LockFile.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                raise Exception("spool is in use by another process: " + self.Path)
+
+        Segments = self.GetSegments()
+        Entries = self.Load(Segments)
+        self.Segment = (Segments[-1] if len(Segments) else 0) + 1
+        self.OpenSegment()
+        # copy the messages that were not sent to the new segment, a partly
+        # written record at the end of the last segment is left behind. The
+        # messages are numbered again from 0 in the order they were added.
+        for Entry in Entries:
+            Entry.Sequence = self.Sequence
+            self.Sequence += 1
+            self.Write(Entry)
+            self.GetPending(Entry.Channel).append(Entry)
+        self.Sync()
+        for Segment in Segments:
+            self.RemoveSegment(Segment)
+        if len(Entries):
+            self.LogError(
+                "Spool " + os.path.basename(self.Path) + ": "
+                + str(len(Entries)) + " messages waiting to be sent"
+            )
+
+    # ------------ MySpool::GetSegments-----------------------------------------
+    def GetSegments(self):
+
+        Segments = []
+        for FileName in os.listdir(self.Path):
+            if FileName.endswith(SEGMENT_SUFFIX):
+                try:
+                    Segments.append(int(FileName[: -len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(Segments)
+
+    # ------------ MySpool::GetSegmentFile--------------------------------------
+    def GetSegmentFile(self, Segment):
+
+        return os.path.join(self.Path, "%08d%s" % (Segment, SEGMENT_SUFFIX))
+
+    # ------------ MySpool::Load------------------------------------------------
+    # return the list of messages in the segments that were not acknowledged,
+    # in the order they were added
+    def Load(self, Segments):
+
+        Entries = collections.OrderedDict()  # (segment, offset) : SpoolEntry
+        for Segment in Segments:
+            with open(self.GetSegmentFile(Segment), "rb") as SegmentFile:
+                Offset = 0
+                for Line in SegmentFile:
+                    Id = (Segment, Offset)
+                    Offset += len(Line)
+                    try:
+                        Record = json.loads(Line.decode("utf-8"))
+                        if "a" in Record:
+                            # records without a sequence number (older
+                            # spools) are kept in file order
+                            Entries[Id] = SpoolEntry(
+                                Record["a"], Record["d"], Record["t"], Record.get("n", -1)
+                            )
+                        elif "k" in Record:
+                            Entries.pop(tuple(int(Value) for Value in Record["k"].split(":")), None)
+                    except Exception as e1:
+                        # i.e. the last record if the program stopped while it
+                        # was written
+                        self.LogDebug("Invalid spool record in " + str(Segment) + ": " + str(e1))
+        # sorted() is stable, messages with the same number keep file order
+        return sorted(Entries.values(), key=lambda Entry: Entry.Sequence)
+
+    # ------------ MySpool::OpenSegment-----------------------------------------
+    def OpenSegment(self):
+
+        self.File = open(self.GetSegmentFile(self.Segment), "ab")
+        self.Counts[self.Segment] = 0
+
+    # ------------ MySpool::RemoveSegment---------------------------------------
+    def RemoveSegment(self, Segment):
+
+        try:
+            os.remove(self.GetSegmentFile(Segment))
+        except Exception as e1:
+            self.LogErrorLine("Error removing spool segment: " + str(e1))
+        self.Counts.pop(Segment, None)
+
+    # ------------ MySpool::WriteRecord-----------------------------------------
+    # returns the offset of the record in the current segment
+    def WriteRecord(self, Record):
+
+        Line = (json.dumps(Record, sort_keys=False) + "\n").encode("utf-8")
+        Offset = self.File.tell()
+        self.File.write(Line)
+        self.File.flush()
+        self.Unsynced = True
+        return Offset
+
+    # ------------ MySpool::Write-----------------------------------------------
+    # write the add record for Entry, Entry.Id is None if it is not saved
+    def Write(self, Entry):
+
+        Entry.Id = None
+        if self.File == None:
+            return
+        try:
+            Record = {
+                "a": Entry.Channel,
+                "t": Entry.Time,
+                "n": Entry.Sequence,
+                "d": Entry.Data,
+            }
+            Entry.Id = (self.Segment, self.WriteRecord(Record))
+            self.Counts[self.Segment] += 1
+        except Exception as e1:
+            self.LogErrorLine("Error writing to spool, message is not saved: " + str(e1))
+
+    # ------------ MySpool::GetPending------------------------------------------
+    # deque of the messages waiting to be sent for Channel, in the order they
+    # were added. Do not change, use Add and Ack.
+    def GetPending(self, Channel):
+
+        with self.Lock:
+            Pending = self.Pending.get(Channel, None)
+            if Pending == None:
+                Pending = collections.deque()
+                self.Pending[Channel] = Pending
+            return Pending
+
+    # ------------ MySpool::GetEvent--------------------------------------------
+    # event that is set when a message is added to Channel
+    def GetEvent(self, Channel):
+
+        with self.Lock:
+            Event = self.Events.get(Channel, None)
+            if Event == None:
+                Event = threading.Event()
+                self.Events[Channel] = Event
+            return Event
+
+    # ------------ MySpool::GetMessages-----------------------------------------
+    # list of the messages waiting to be sent for Channel
+    def GetMessages(self, Channel):
+
+        with self.Lock:
+            return list(self.GetPending(Channel))
+
+    # ------------ MySpool::Add-------------------------------------------------
+    # add a message (data must be JSON serializable to be saved), returns the
+    # SpoolEntry
+    def Add(self, Channel, Data):
+
+        Entry = SpoolEntry(Channel, Data)
+        with self.Lock:
+            Entry.Sequence = self.Sequence
+            self.Sequence += 1
+            self.Write(Entry)
+            self.GetPending(Channel).append(Entry)
+            if self.File != None and self.File.tell() > self.SegmentSize:
+                self.NextSegment()
+        self.GetEvent(Channel).set()
+        return Entry
+
+    # ------------ MySpool::Ack-------------------------------------------------
+    # the message was sent (or given up on) and is removed from the spool
+    def Ack(self, Entry):
+
+        with self.Lock:
+            Pending = self.GetPending(Entry.Channel)
+            if len(Pending) and Pending[0] is Entry:
+                Pending.popleft()
+            else:
+                try:
+                    Pending.remove(Entry)
+                except ValueError:
+                    return  # already acknowledged
+            if Entry.Id == None or self.File == None:
+                return
+            try:
+                self.WriteRecord({"k": "%d:%d" % Entry.Id})
+                self.Counts[Entry.Id[0]] -= 1
+                self.RemoveSentSegments()
+            except Exception as e1:
+                self.LogErrorLine("Error writing to spool: " + str(e1))
+
+    # ------------ MySpool::NextSegment-----------------------------------------
+    def NextSegment(self):
+
+        try:
+            self.Sync()
+            self.File.close()
+            self.Segment += 1
+            self.OpenSegment()
+            # copy the messages from the oldest segments if there are too many
+            while len(self.Counts) > MAX_SEGMENTS:
+                Oldest = next(iter(self.Counts))
+                for Pending in self.Pending.values():
+                    for Entry in Pending:
+                        if Entry.Id != None and Entry.Id[0] == Oldest:
+                            self.Write(Entry)
+                self.Sync()
+                self.Counts[Oldest] = 0
+                self.RemoveSentSegments()
+        except Exception as e1:
+            self.LogErrorLine("Error starting spool segment: " + str(e1))
+            self.CloseFile()
+
+    # ------------ MySpool::RemoveSentSegments----------------------------------
+    # remove the oldest segments while they have no messages waiting. A newer
+    # segment is not removed before the older ones as it may have the
+    # acknowledgements for them.
+    def RemoveSentSegments(self):
+
+        for Segment in list(self.Counts.keys()):
+            if Segment == self.Segment or self.Counts[Segment] > 0:
+                break
+            self.RemoveSegment(Segment)
+
+    # ------------ MySpool::Sync------------------------------------------------
+    # make sure the records written are on disk
+    def Sync(self):
+
+        with self.Lock:
+            if self.File == None or not self.Unsynced:
+                return
+            try:
+                os.fsync(self.File.fileno())
+                self.Unsynced = False
+            except Exception as e1:
+                self.LogErrorLine("Error in spool Sync: " + str(e1))
+
+    # ------------ MySpool::CloseFile-------------------------------------------
+    def CloseFile(self):
+
+        try:
+            if self.File != None:
+                self.File.close()
+        except Exception:
+            pass
+        self.File = None
+        try:
+            if self.LockFile != None:
+                self.LockFile.close()
+        except Exception:
+            pass
+        self.LockFile = None
+
+    # ------------ MySpool::Close-----------------------------------------------
+    def Close(self):
+
+        with self.Lock:
+            self.Sync()
+            self.CloseFile()
+
+
+# ------------ SpoolWorker class ------------------------------------------------
+# thread that sends the messages of one channel of a spool with callback(data),
+# callback returns True if the message was sent. A message that fails is
+# retried after retry_min seconds, doubling for each failure up to retry_max,
+# and is dropped when it is older than max_age seconds (0 to keep trying). A
+# message that fails does not hold up the other messages of the channel.
+class SpoolWorker(MySupport):
+
+    # ------------ SpoolWorker::init--------------------------------------------
+    def __init__(
+        self,
+        spool,
+        channel,
+        callback,
+        log=None,
+        debug=False,
+        retry_min=15,
+        retry_max=120,
+        max_age=0,
+        min_interval=0,
+        start=True,
+    ):
+
+        super(SpoolWorker, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Spool = spool
+        self.Channel = channel
+        self.Callback = callback
+        self.RetryMin = retry_min
+        self.RetryMax = retry_max
+        self.MaxAge = max_age
+        self.MinInterval = min_interval  # seconds between messages
+        self.LastSentTime = None
+        # after a failure nothing is sent on the channel until this time, the
+        # service is likely down for every message
+        self.RetryTime = None
+        self.ThreadName = "SpoolWorker" + str(channel)
+        self.Event = self.Spool.GetEvent(channel)
+        self.Threads[self.ThreadName] = MyThread(
+            self.WorkerThread, Name=self.ThreadName, start=False
+        )
+        if start:
+            self.Threads[self.ThreadName].Start()
+
+    # ------------ SpoolWorker::WorkerThread------------------------------------
+    def WorkerThread(self):
+
+        time.sleep(0.1)
+        while True:
+            WaitTime = 2.0
+            try:
+                self.Event.clear()
+                self.Spool.Sync()
+                WaitTime = self.SendMessages()
+            except Exception as e1:
+                self.LogErrorLine("Error in SpoolWorker: " + str(e1))
+            # wake up when a message is added or the next message is due
+            self.Event.wait(max(min(WaitTime, 2.0), 0.1))
+            if self.Threads[self.ThreadName].StopSignaled():
+                return
+
+    # ------------ SpoolWorker::SendMessages------------------------------------
+    # send the messages that are due, returns the seconds until the next one
+    # is due
+    def SendMessages(self):
+
+        WaitTime = 2.0
+        if self.RetryTime != None:
+            if time.time() < self.RetryTime:
+                return self.RetryTime - time.time()
+            self.RetryTime = None
+        for Entry in self.Spool.GetMessages(self.Channel):
+            if self.Threads[self.ThreadName].StopSignaled():
+                break
+            Now = time.time()
+            if Entry.NextTry > Now:
+                WaitTime = min(WaitTime, Entry.NextTry - Now)
+                continue
+            if self.LastSentTime != None and Now - self.LastSentTime < self.MinInterval:
+                return min(WaitTime, self.LastSentTime + self.MinInterval - Now)
+            try:
+                Sent = self.Callback(Entry.Data)
+            except Exception as e1:
+                self.LogErrorLine("Error in SpoolWorker callback: " + str(e1))
+                Sent = False
+            if Sent:
+                self.LogDebug("Message Sent")
+                self.LastSentTime = time.time()
+                self.Spool.Ack(Entry)
+            elif self.MaxAge and time.time() - Entry.Time > self.MaxAge:
+                self.LogDebug("Message retry expired: " + str(Entry.Data))
+                self.Spool.Ack(Entry)
+            else:
+                Entry.Attempts += 1
+                Delay = min(self.RetryMin * (2 ** (Entry.Attempts - 1)), self.RetryMax)
+                Entry.NextTry = time.time() + Delay
+                self.RetryTime = Entry.NextTry
+                self.LogError(
+                    "Error sending message, retrying in " + str(int(Delay)) + " seconds"
+                )
+                return Delay
+        return WaitTime
+
+    # ------------ SpoolWorker::Close-------------------------------------------
+    def Close(self):
+
+        try:
+            self.Threads[self.ThreadName].Stop()
+            self.Event.set()
+            self.Threads[self.ThreadName].WaitForThreadToEnd(5)
+        except Exception as e1:
+            self.LogErrorLine("Error in SpoolWorker:Close: " + str(e1))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mysubscription.py
+# PURPOSE: push changed values to clients subscribed on the genmon socket
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 18-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import json
+import socket
+import threading
+
+from genmonlib.mysupport import MySupport
+from genmonlib.mythread import MyThread
+
+# A client subscribes by sending "generator: subscribe=status_json,maint_json"
+# on a new connection. The connection is then only used to push data to the
+# client, commands sent on it are ignored. Each message is a JSON object
+# followed by "EndOfMessage":
+#
+#   {"subscribed": [topics], "rejected": [topics]}    reply to subscribe
+#   {"topic": "status_json", "full": true, "data": {...}}
+#   {"topic": "status_json", "changes": [[path, value], ...]}
+#
+# a full message is sent when a client subscribes and when the layout of the
+# data changes (keys added or removed), otherwise only changed values are
+# sent. A path is a list of dict keys and list indexes from the top of the
+# data to the value, an empty path replaces the data.
+
+SEND_TIMEOUT = 30  # seconds, a subscriber that does not read is dropped
+
+
+# ------------ FlattenData ------------------------------------------------------
+# return an ordered dict of path (tuple) to value for each value in Data
+def FlattenData(Data, Path=(), Output=None):
+
+    if Output == None:
+        Output = collections.OrderedDict()
+    if isinstance(Data, dict) and len(Data):
+        for Key, Value in Data.items():
+            FlattenData(Value, Path + (Key,), Output)
+    elif isinstance(Data, list) and len(Data):
+        for Index, Value in enumerate(Data):
+            FlattenData(Value, Path + (Index,), Output)
+    else:
+        Output[Path] = Data
+    return Output
+
+
+# ------------ ApplyChanges -----------------------------------------------------
+# apply a list of [path, value] changes to Data, returns the updated Data
+def ApplyChanges(Data, Changes):
+
+    for Path, Value in Changes:
+        if not len(Path):
+            Data = Value
+            continue
+        Node = Data
+        for Key in Path[:-1]:
+            Node = Node[Key]
+        Node[Path[-1]] = Value
+    return Data
+
+
+# ------------ SubscriptionServer class -----------------------------------------
+class SubscriptionServer(MySupport):
+
+    # ------------ SubscriptionServer::init--------------------------------------
+    # topics is a dict of topic name to [function, (args)], the function returns
+    # the data for the topic. generation is a function that returns a value that
+    # changes when the data may have changed (i.e. a poll cycle count)
+    def __init__(
+        self,
+        topics,
+        generation,
+        log=None,
+        debug=False,
+        interval=1.0,
+        max_interval=30.0,
+        start=True,
+    ):
+
+        super(SubscriptionServer, self).__init__()
+        self.log = log
+        self.debug = debug
+        self.Topics = topics
+        self.GetGeneration = generation
+        self.Interval = interval  # min time between updates (seconds)
+        self.MaxInterval = max_interval  # updates are sent at least this often
+        self.EndOfMessage = "EndOfMessage"
+        self.SubscriberLock = threading.RLock()
+        # list of [conn, topics, topics that need a full update]
+        self.Subscribers = []
+        self.LastData = {}  # topic : flattened data last sent
+        self.LastGeneration = None
+        self.NewSubscriber = threading.Event()
+
+        self.Threads["SubscriptionThread"] = MyThread(
+            self.SubscriptionThread, Name="SubscriptionThread", start=start
+        )
+
+    # ------------ SubscriptionServer::IsSubscribeCommand------------------------
+    def IsSubscribeCommand(self, command):
+
+        if isinstance(command, bytes):
+            command = command.decode("utf-8")
+        command = command.strip().lower()
+        if command.startswith("generator:"):
+            command = command[len("generator:") :].strip()
+        return command.startswith("subscribe=")
+
+    # ------------ SubscriptionServer::AddSubscriber-----------------------------
+    # command is "generator: subscribe=topic1,topic2"
+    def AddSubscriber(self, conn, command):
+
+        try:
+            if isinstance(command, bytes):
+                command = command.decode("utf-8")
+            command = command.strip()
+            TopicString = command[command.find("=") + 1 :]
+            Subscribed = []
+            Rejected = []
+            for Topic in TopicString.split(","):
+                Topic = Topic.strip().lower()
+                if not len(Topic):
+                    continue
+                if Topic in self.Topics:
+                    if Topic not in Subscribed:
+                        Subscribed.append(Topic)
+                else:
+                    Rejected.append(Topic)
+
+            Reply = {"subscribed": Subscribed, "rejected": Rejected}
+            # the connection timeout is short so the socket thread can check
+            # for exit, a large message to a slow client needs longer
+            conn.settimeout(SEND_TIMEOUT)
+            with self.SubscriberLock:
+                if not self.SendMessage(conn, Reply):
+                    return False
+                if len(Subscribed):
+                    self.Subscribers.append([conn, Subscribed, list(Subscribed)])
+            self.LogDebug("Subscription added: " + ",".join(Subscribed))
+            self.NewSubscriber.set()
+            return True
+        except Exception as e1:
+            self.LogErrorLine("Error in AddSubscriber: " + str(e1))
+            return False
+
+    # ------------ SubscriptionServer::RemoveSubscriber--------------------------
+    def RemoveSubscriber(self, conn):
+
+        with self.SubscriberLock:
+            for Subscriber in self.Subscribers:
+                if Subscriber[0] == conn:
+                    self.Subscribers.remove(Subscriber)
+                    break
+
+    # ------------ SubscriptionServer::SendMessage-------------------------------
+    def SendMessage(self, conn, Message):
+
+        try:
+            conn.sendall(
+                (json.dumps(Message, sort_keys=False) + self.EndOfMessage).encode(
+                    "utf-8"
+                )
+            )
+            return True
+        except Exception as e1:
+            self.LogDebug("Error sending to subscriber: " + str(e1))
+            return False
+
+    # ------------ SubscriptionServer::GetTopicData------------------------------
+    def GetTopicData(self, Topic):
+
+        Function, Args = self.Topics[Topic]
+        return Function(*Args)
+
+    # ------------ SubscriptionServer::Publish-----------------------------------
+    # generate each subscribed topic once and send the changes to all of the
+    # subscribers of that topic
+    def Publish(self):
+
+        with self.SubscriberLock:
+            Subscribers = list(self.Subscribers)
+        if not len(Subscribers):
+            self.LastData = {}
+            return
+
+        ActiveTopics = []
+        for Conn, Topics, NeedFull in Subscribers:
+            for Topic in Topics:
+                if Topic not in ActiveTopics:
+                    ActiveTopics.append(Topic)
+
+        for Topic in list(self.LastData.keys()):
+            if Topic not in ActiveTopics:
+                del self.LastData[Topic]
+
+        for Topic in ActiveTopics:
+            try:
+                Data = self.GetTopicData(Topic)
+                Flat = FlattenData(Data)
+            except Exception as e1:
+                self.LogErrorLine("Error getting subscription data: " + Topic + ": " + str(e1))
+                continue
+
+            Last = self.LastData.get(Topic, None)
+            LayoutChanged = Last == None or list(Last.keys()) != list(Flat.keys())
+            Changes = []
+            if not LayoutChanged:
+                for Path, Value in Flat.items():
+                    if Last[Path] != Value:
+                        Changes.append([list(Path), Value])
+            self.LastData[Topic] = Flat
+
+            FullMessage = {"topic": Topic, "full": True, "data": Data}
+            ChangeMessage = {"topic": Topic, "changes": Changes}
+            for Subscriber in Subscribers:
+                Conn, Topics, NeedFull = Subscriber
+                if Topic not in Topics:
+                    continue
+                if LayoutChanged or Topic in NeedFull:
+                    Message = FullMessage
+                elif len(Changes):
+                    Message = ChangeMessage
+                else:
+                    continue
+                if Topic in NeedFull:
+                    NeedFull.remove(Topic)
+                if not self.SendMessage(Conn, Message):
+                    # part of the message may have been sent
+                    self.RemoveSubscriber(Conn)
+                    try:
+                        Conn.shutdown(socket.SHUT_RDWR)
+                    except Exception:
+                        pass
+
+    # ------------ SubscriptionServer::SubscriptionThread------------------------
+    def SubscriptionThread(self):
+
+        SecondsSinceUpdate = 0.0
+        while True:
+            try:
+                if self.WaitForExit("SubscriptionThread", self.Interval):
+                    return
+                SecondsSinceUpdate += self.Interval
+                with self.SubscriberLock:
+                    if not len(self.Subscribers):
+                        continue
+                Generation = self.GetGeneration()
+                if (
+                    Generation == self.LastGeneration
+                    and not self.NewSubscriber.is_set()
+                    and SecondsSinceUpdate < self.MaxInterval
+                ):
+                    continue
+                self.NewSubscriber.clear()
+                self.LastGeneration = Generation
+                SecondsSinceUpdate = 0.0
+                self.Publish()
+            except Exception as e1:
+                self.LogErrorLine("Error in SubscriptionThread: " + str(e1))
+
+    # ------------ SubscriptionServer::Close-------------------------------------
+    def Close(self):
+
+        try:
+            self.KillThread("SubscriptionThread")
+        except:
+            pass
+        with self.SubscriberLock:
+            self.Subscribers = []
@@ -17,6 +17,7 @@ import sys
 import threading
 import time
 import re
+import signal
 
 from genmonlib.mycommon import MyCommon
 from genmonlib.myconfig import MyConfig
@@ -624,6 +625,105 @@ class MySupport(MyCommon):
             lineno = exc_tb.tb_lineno
             return fname + ":" + str(lineno)
 
+    # ------------ MySupport::SignalReady----------------------------------------
+    # tell genloader the program is ready (i.e. accepting connections). genloader
+    # passes the write end of a pipe in GENMON_READY_FD when it starts a module.
+    @staticmethod
+    def SignalReady():
+
+        try:
+            ReadyFD = os.environ.pop("GENMON_READY_FD", None)
+            if ReadyFD == None:
+                return
+            os.write(int(ReadyFD), b"1")
+            os.close(int(ReadyFD))
+        except Exception as e1:
+            pass
+
+    # ------------ MySupport::SetupConfigReload----------------------------------
+    # genserv sends SIGHUP to a program when its settings are changed. The
+    # config file is re-read and if every changed entry the program uses was
+    # read with live=True, callback() is called to re-read them. Otherwise (or
+    # if no config is given) the program is closed with its SIGTERM handler and
+    # started again with the same PID. Must be called from the main thread.
+    @staticmethod
+    def SetupConfigReload(config=None, callback=None, log=None):
+
+        try:
+            MySupport.ReloadConfig = config
+            MySupport.ReloadCallback = callback
+            if log != None:
+                MySupport.ReloadLog = log
+            if getattr(MySupport, "ReloadEvent", None) == None:
+                MySupport.ReloadEvent = threading.Event()
+                ReloadThread = threading.Thread(
+                    target=MySupport.ConfigReloadThread, name="ConfigReloadThread"
+                )
+                ReloadThread.daemon = True
+                ReloadThread.start()
+            signal.signal(
+                signal.SIGHUP, lambda signum, frame: MySupport.ReloadEvent.set()
+            )
+        except Exception as e1:
+            if getattr(MySupport, "ReloadLog", None) != None:
+                MySupport.ReloadLog.error(
+                    "Error in SetupConfigReload: "
+                    + str(e1)
+                    + ": "
+                    + MySupport.GetErrorLine()
+                )
+
+    # ------------ MySupport::ConfigReloadThread---------------------------------
+    @staticmethod
+    def ConfigReloadThread():
+
+        while True:
+            MySupport.ReloadEvent.wait()
+            MySupport.ReloadEvent.clear()
+            try:
+                MySupport.ReloadProgram()
+            except Exception as e1:
+                if getattr(MySupport, "ReloadLog", None) != None:
+                    MySupport.ReloadLog.error(
+                        "Error in ConfigReloadThread: "
+                        + str(e1)
+                        + ": "
+                        + MySupport.GetErrorLine()
+                    )
+
+    # ------------ MySupport::ReloadProgram--------------------------------------
+    @staticmethod
+    def ReloadProgram():
+
+        log = getattr(MySupport, "ReloadLog", None)
+        config = getattr(MySupport, "ReloadConfig", None)
+        if config != None:
+            Changed = config.Reload()
+            if Changed == None or not len(Changed):
+                return
+            RestartEntries = config.GetRestartEntries(Changed)
+            if not len(RestartEntries):
+                if MySupport.ReloadCallback != None:
+                    MySupport.ReloadCallback()
+                if log != None:
+                    log.info("Settings reloaded")
+                return
+            if log != None:
+                log.info(
+                    "Restarting to use changed settings: "
+                    + ", ".join(Entry for Section, Entry in RestartEntries)
+                )
+        elif log != None:
+            log.info("Restarting to use changed settings")
+
+        Handler = signal.getsignal(signal.SIGTERM)
+        if callable(Handler):
+            try:
+                Handler(signal.SIGTERM, None)
+            except SystemExit:
+                pass
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
     # ------------ MySupport::SetupAddOnProgram----------------------------------
     @staticmethod
     def SetupAddOnProgram(prog_name):
@@ -692,6 +792,9 @@ class MySupport(MyCommon):
             log.error("Error : " + str(e1) + ": " + MySupport.GetErrorLine())
             sys.exit(1)
 
+        # changed settings restart the program unless it calls SetupConfigReload
+        # with its config
+        MySupport.SetupConfigReload(log=log)
         return console, ConfigFilePath, address, port, loglocation, log
 
     # ---------------------MySupport::GetGenmonInitInfo--------------------------
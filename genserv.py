@@ -59,6 +59,7 @@ try:
     from genmonlib.myconfig import MyConfig
     from genmonlib.mylog import SetupLogger
     from genmonlib.mymail import MyMail
+    from genmonlib.mysubscription import FlattenData
     from genmonlib.mysupport import MySupport
     from genmonlib.myplatform import MyPlatform
     from genmonlib.program_defaults import ProgramDefaults
@@ -157,6 +158,24 @@ ControllerType = "generac_evo_nexus"
 CriticalLock = threading.Lock()
 CachedToolTips = {}
 CachedRegisterDescriptions = {}
+GenservConfigEntries = set()  # (section, entry) of genmon.conf read by LoadConfig
+
+# live updates for the web UI (see /stream). One subscription to genmon is
+# shared by all browser sessions.
+StreamTopics = [
+    "gui_status_json",
+    "getbase",
+    "status_json",
+    "maint_json",
+    "outage_json",
+    "monitor_json",
+]
+StreamCondition = threading.Condition()
+StreamData = {}  # topic : [version, data, flattened data, deque of [version, changes]]
+StreamSubscribed = None  # None until the first stream request
+StreamLastAttempt = None  # time of the last failed subscribe
+StreamHistory = 20  # changes kept per topic for sessions that fall behind
+StreamKeepAlive = 15  # seconds
 
 
 # -------------------------------------------------------------------------------
@@ -334,6 +353,9 @@ def add_header(r):
             r.headers["Cache-Control"] = "public, max-age=31536000, immutable"
         else:
             r.headers["Cache-Control"] = "public, max-age=3600"
+    elif r.status_code == 304 or r.get_etag()[0] != None:
+        # may be stored but must be checked with the ETag each time
+        r.headers["Cache-Control"] = "no-cache, private"
     else:
         r.headers[
             "Cache-Control"
@@ -813,6 +835,48 @@ def doLdapLogin(username, password):
     return HasAdmin or HasReadOnly
 
 
+# -------------------------------------------------------------------------------
+# return the ETag in the If-None-Match header of the request, "" if none
+def GetRequestETag():
+
+    try:
+        for ETag in request.headers.get("If-None-Match", "").split(","):
+            ETag = ETag.strip()
+            if ETag.startswith("W/"):
+                ETag = ETag[2:]
+            ETag = ETag.strip('"')
+            if len(ETag) and ETag.isalnum() and len(ETag) <= 64:
+                return ETag
+    except Exception as e1:
+        LogErrorLine("Error in GetRequestETag: " + str(e1))
+    return ""
+
+
+# -------------------------------------------------------------------------------
+# gui_status_json=<etag> returns "ETag: <etag>" on the first line followed by
+# the status, the status is left out if the ETag is the one the browser sent.
+# Unchanged polls are answered with 304 Not Modified.
+def GetGUIStatusResponse(data):
+
+    try:
+        if not data.startswith("ETag: "):
+            return data
+        Header, Separator, Status = data.partition("\n")
+        ETag = Header[len("ETag: ") :].strip()
+        if not len(Status):
+            if ETag != GetRequestETag():
+                # should not happen, send the status without the ETag
+                return MyClientInterface.ProcessMonitorCommand("generator: gui_status_json")
+            response = Response(status=304)
+        else:
+            response = Response(Status, mimetype="application/json")
+        response.set_etag(ETag)
+        return response
+    except Exception as e1:
+        LogErrorLine("Error in GetGUIStatusResponse: " + str(e1))
+        return data
+
+
 # -------------------------------------------------------------------------------
 @app.route("/cmd/<command>")
 def command(command):
@@ -846,6 +910,143 @@ def command(command):
             return commandResponse
 
 
+# -------------------------------------------------------------------------------
+# called by MyClientInterface when genmon pushes new data for a topic
+def StreamCallback(topic, data):
+
+    try:
+        if data == None:
+            # connection to genmon lost, the full data is sent on reconnect
+            return
+        Flat = FlattenData(data)
+        with StreamCondition:
+            Entry = StreamData.get(topic, None)
+            if Entry == None or list(Entry[2].keys()) != list(Flat.keys()):
+                # new topic or the layout changed, sessions will get the full data
+                Version = 0 if Entry == None else Entry[0]
+                StreamData[topic] = [
+                    Version + 1,
+                    data,
+                    Flat,
+                    collections.deque(maxlen=StreamHistory),
+                ]
+            else:
+                Changes = []
+                for Path, Value in Flat.items():
+                    if Entry[2][Path] != Value:
+                        Changes.append([list(Path), Value])
+                if not len(Changes):
+                    return
+                Entry[0] += 1
+                Entry[1] = data
+                Entry[2] = Flat
+                Entry[3].append([Entry[0], Changes])
+            StreamCondition.notify_all()
+    except Exception as e1:
+        LogErrorLine("Error in StreamCallback: " + str(e1))
+
+
+# -------------------------------------------------------------------------------
+# subscribe to genmon the first time a browser opens a stream
+def StartStream():
+
+    global StreamSubscribed
+    global StreamLastAttempt
+
+    with StreamCondition:
+        if StreamSubscribed:
+            return True
+        # if genmon did not support it, try again later in case it was restarted
+        if (
+            StreamLastAttempt != None
+            and (datetime.datetime.now() - StreamLastAttempt).total_seconds() < 300
+        ):
+            return False
+        StreamSubscribed = MyClientInterface.Subscribe(StreamTopics, StreamCallback)
+        if not StreamSubscribed:
+            StreamLastAttempt = datetime.datetime.now()
+            LogError("Live updates not available, web UI will poll")
+        return StreamSubscribed
+
+
+# -------------------------------------------------------------------------------
+# return the messages a session needs to catch up. Versions is a dict of the
+# topic versions already sent to the session. Call with StreamCondition held
+def GetStreamMessages(Topics, Versions):
+
+    Messages = []
+    for Topic in Topics:
+        Entry = StreamData.get(Topic, None)
+        if Entry == None or Versions.get(Topic, None) == Entry[0]:
+            continue
+        LastVersion = Versions.get(Topic, None)
+        Pending = []
+        if LastVersion != None:
+            Pending = [Item for Item in Entry[3] if Item[0] > LastVersion]
+        if len(Pending) and Pending[0][0] == LastVersion + 1:
+            Changes = []
+            for Version, ChangeList in Pending:
+                Changes.extend(ChangeList)
+            Messages.append({"topic": Topic, "changes": Changes})
+        else:
+            Messages.append({"topic": Topic, "full": True, "data": Entry[1]})
+        Versions[Topic] = Entry[0]
+    return Messages
+
+
+# -------------------------------------------------------------------------------
+def StreamGenerator(Topics):
+
+    Versions = {}
+    try:
+        while not Closing and not Restarting:
+            with StreamCondition:
+                Messages = GetStreamMessages(Topics, Versions)
+                if not len(Messages):
+                    StreamCondition.wait(StreamKeepAlive)
+                    Messages = GetStreamMessages(Topics, Versions)
+            if not len(Messages):
+                # keep alive, also detects closed connections
+                yield ": keepalive\n\n"
+                continue
+            for Message in Messages:
+                yield "data: " + json.dumps(Message, sort_keys=False) + "\n\n"
+    except GeneratorExit:
+        pass
+    except Exception as e1:
+        LogErrorLine("Error in StreamGenerator: " + str(e1))
+
+
+# -------------------------------------------------------------------------------
+# server-sent events. Sends the full data for each topic, then only the
+# changed values ({"topic": t, "changes": [[path, value], ...]}) as genmon
+# reads the controller. Returns 404 if genmon does not support subscriptions
+# so the browser falls back to polling /cmd/
+@app.route("/stream")
+def stream():
+
+    if Closing or Restarting:
+        return "Closing", 503
+    if LoginActive() and not session.get("logged_in"):
+        return "Login required", 401
+    if not StartStream():
+        return "Not supported", 404
+
+    Topics = []
+    for Topic in request.args.get("topics", ",".join(StreamTopics), type=str).split(","):
+        Topic = Topic.strip()
+        if Topic in StreamTopics and Topic not in Topics:
+            Topics.append(Topic)
+    if not len(Topics):
+        return "No valid topics", 400
+
+    return Response(
+        StreamGenerator(Topics),
+        mimetype="text/event-stream",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
 # -------------------------------------------------------------------------------
 def ProcessCommand(command):
 
@@ -933,6 +1134,10 @@ def ProcessCommand(command):
                     sensor = request.args.get("sensor", "", type=str)
                     if minutes and sensor:
                         finalcommand += "=" + minutes + "&sensor=" + sensor
+                if command == "gui_status_json":
+                    # genmon returns only the ETag if the status has not
+                    # changed since the copy the browser has
+                    finalcommand += "=" + GetRequestETag()
                 # Sanitize command parameters: strip null bytes and newlines
                 # to prevent header/log injection, cap length to limit abuse.
                 if command == "add_maint_log":
@@ -959,6 +1164,9 @@ def ProcessCommand(command):
                 data = "Retry"
                 LogErrorLine("Error on command function: " + str(e1))
 
+            if command == "gui_status_json":
+                return GetGUIStatusResponse(data)
+
             if command in [
                 "status_json",
                 "outage_json",
@@ -3488,6 +3696,11 @@ def SaveAddOnSettings(query_string):
             "genhubitat": ConfigFiles[GENHUBITAT_CONFIG],
         }
 
+        # genloader writes the PID of each add-on it starts
+        ConfigFiles[GENLOADER_CONFIG].Reload()
+        RestartNeeded = False
+        ReloadModules = []
+        BeginConfigChanges()
         for module, entries in settings.items():  # module
             ParameterConfig = ConfigDict.get(module, None)
             if ParameterConfig == None:
@@ -3496,6 +3709,12 @@ def SaveAddOnSettings(query_string):
             # Find if it needs to be enabled / disabled or if there are parameters
             for basesettings, basevalues in entries.items():  # base settings
                 if basesettings == "enable":
+                    CurrentValue = ConfigFiles[GENLOADER_CONFIG].ReadValue(
+                        "enable", default="", section=module, NoLog=True
+                    )
+                    if str(CurrentValue).strip().lower() != str(basevalues).strip().lower():
+                        # genloader starts or stops the add-on
+                        RestartNeeded = True
                     ConfigFiles[GENLOADER_CONFIG].WriteValue(
                         "enable", basevalues, section=module
                     )
@@ -3533,14 +3752,61 @@ def SaveAddOnSettings(query_string):
                             )
                         else:
                             ParameterConfig.WriteValue(params, paramvalue)
-
-        Restart()
+            if ParameterConfig in [
+                ConfigFiles[GENMON_CONFIG],
+                ConfigFiles[MAIL_CONFIG],
+                ConfigFiles[GENLOADER_CONFIG],
+            ]:
+                # command line arguments or settings of genmon
+                RestartNeeded = True
+            elif not module in ReloadModules:
+                ReloadModules.append(module)
+        CommitConfigChanges()
+
+        if not RestartNeeded:
+            for module in ReloadModules:
+                if not ReloadAddOn(module):
+                    RestartNeeded = True
+                    break
+        if RestartNeeded:
+            Restart()
         return
     except Exception as e1:
+        RollbackConfigChanges()
         LogErrorLine("Error in SaveAddOnSettings: " + str(e1))
         return
 
 
+# -------------------------------------------------------------------------------
+# Tell a running add-on to re-read its config file (see
+# MySupport.SetupConfigReload), the add-on restarts itself if a changed setting
+# can not be used while it is running. Returns False if the add-on could not
+# be signaled and everything must be restarted.
+def ReloadAddOn(module):
+
+    try:
+        pid = ConfigFiles[GENLOADER_CONFIG].ReadValue(
+            "pid", return_type=int, default=0, section=module, NoLog=True
+        )
+        if not pid:
+            return True  # not running, the settings are read when it starts
+        try:
+            with open("/proc/%d/cmdline" % pid, "rb") as CmdFile:
+                CmdLine = CmdFile.read()
+        except (IOError, OSError):
+            if os.path.isdir("/proc"):
+                return True  # not running
+            return False
+        if not (module + ".py").encode("utf-8") in CmdLine:
+            return True  # PID of an add-on that has stopped
+        os.kill(pid, signal.SIGHUP)
+        LogDebug("Reloading settings of " + module)
+        return True
+    except Exception as e1:
+        LogErrorLine("Error in ReloadAddOn: " + str(e1))
+        return False
+
+
 # -------------------------------------------------------------------------------
 def ReadNotificationsFromFile():
 
@@ -3614,6 +3880,7 @@ def SaveNotifications(query_string):
                             MAIL_CONFIG
                         ].ReadValue(oldEmailItem)
 
+            ConfigFiles[MAIL_CONFIG].Begin()
             # compare, remove notifications if needed
             for oldEmailItem in oldEmailsList:
                 if not oldEmailItem in notifications.keys() and ConfigFiles[
@@ -3636,9 +3903,11 @@ def SaveNotifications(query_string):
                 # update or add catigories
                 if len(newCats[0]):
                     ConfigFiles[MAIL_CONFIG].WriteValue(newEmail, newCats[0])
+            ConfigFiles[MAIL_CONFIG].Commit()
 
-        Restart()
+        ApplyConfigChanges([(MAIL_CONFIG, "MyMail", "email_recipient")])
     except Exception as e1:
+        ConfigFiles[MAIL_CONFIG].Rollback()
         LogErrorLine("Error in SaveNotifications: " + str(e1))
     return
 
@@ -3785,6 +4054,61 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "modbus_between_frame_delay",
         ]
+        ConfigSettings["modbus_block_reads"] = [
+            "boolean",
+            "Modbus Block Reads",
+            8,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_reads",
+        ]
+        ConfigSettings["modbus_block_max_gap"] = [
+            "int",
+            "Modbus Block Read Max Gap (registers)",
+            8,
+            0,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_max_gap",
+        ]
+        ConfigSettings["modbus_block_max_length"] = [
+            "int",
+            "Modbus Block Read Max Length (registers)",
+            8,
+            32,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_max_length",
+        ]
+        ConfigSettings["adaptive_polling"] = [
+            "boolean",
+            "Adaptive Register Polling",
+            8,
+            True,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "adaptive_polling",
+        ]
+        ConfigSettings["modbus_tcp_pipeline_depth"] = [
+            "int",
+            "Modbus TCP Pipeline Depth",
+            8,
+            1,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_tcp_pipeline_depth",
+        ]
         # Depricated, no longer needed
         #ConfigSettings["use_modbus_fc4"] = [
         #    "boolean",
@@ -3830,6 +4154,17 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "forceserialuse",
         ]
+        ConfigSettings["response_cache_time"] = [
+            "float",
+            "Response Cache Time (sec)",
+            13,
+            "2.0",
+            "",
+            "number",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "response_cache_time",
+        ]
         ConfigSettings["watchdog_addition"] = [
             "float",
             "Additional Watchdog Timeout (sec)",
@@ -4171,6 +4506,28 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "kwlogmax",
         ]
+        ConfigSettings["binary_power_log"] = [
+            "boolean",
+            "Use Binary Power Log",
+            70,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "binary_power_log",
+        ]
+        ConfigSettings["warm_start"] = [
+            "boolean",
+            "Show Saved Data at Startup",
+            70,
+            True,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "warm_start",
+        ]
         ConfigSettings["max_powerlog_entries"] = [
             "int",
             "Maximum Entries in Power Log",
@@ -4228,6 +4585,17 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "disableplatformstats",
         ]
+        ConfigSettings["platform_stats_interval"] = [
+            "int",
+            "Platform Stats Interval",
+            80,
+            10,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "platform_stats_interval",
+        ]
         ConfigSettings["https_port"] = [
             "int",
             "Override HTTPS port",
@@ -4261,6 +4629,17 @@ def ReadAdvancedSettingsFromFile():
             MAIL_SECTION,
             "extend_wait",
         ]
+        ConfigSettings["batch_window"] = [
+            "int",
+            "Combine email sent within (seconds)",
+            84,
+            0,
+            "",
+            "digits",
+            MAIL_CONFIG,
+            MAIL_SECTION,
+            "batch_window",
+        ]
         ConfigSettings["multi_instance"] = [
             "boolean",
             "Allow Multiple Genmon Instances",
@@ -4392,19 +4771,28 @@ def SaveAdvancedSettings(query_string):
             # nothing to change
             return
         CurrentConfigSettings = ReadAdvancedSettingsFromFile()
+        ChangedList = []
         with CriticalLock:
+            BeginConfigChanges()
             for Entry in settings.keys():
                 ConfigEntry = CurrentConfigSettings.get(Entry, None)
                 if ConfigEntry != None:
                     ConfigFile = CurrentConfigSettings[Entry][6]
                     Value = settings[Entry][0]
                     Section = CurrentConfigSettings[Entry][7]
+                    CurrentValue = str(CurrentConfigSettings[Entry][3]) if CurrentConfigSettings[Entry][3] is not None else ""
+                    if Value.strip().lower() == CurrentValue.strip().lower():
+                        continue  # unchanged
                 else:
                     LogError("Invalid setting in SaveAdvancedSettings: " + str(Entry))
                     continue
                 UpdateConfigFile(ConfigFile, Section, Entry, Value)
-        Restart()
+                ChangedList.append((ConfigFile, Section, Entry))
+            CommitConfigChanges()
+        if len(ChangedList):
+            ApplyConfigChanges(ChangedList)
     except Exception as e1:
+        RollbackConfigChanges()
         LogErrorLine("Error Update Config File (SaveAdvancedSettings): " + str(e1))
 
 
@@ -5472,8 +5860,9 @@ def SaveSettings(query_string):
         if http_user_ro is not None and http_user_ro.strip() == "":
             settings["http_pass_ro"] = [""]
 
-        changed = False
+        ChangedList = []
         with CriticalLock:
+            BeginConfigChanges()
             for Entry in settings.keys():
                 ConfigEntry = CurrentConfigSettings.get(Entry, None)
                 if ConfigEntry != None:
@@ -5490,13 +5879,39 @@ def SaveSettings(query_string):
                     LogError("Invalid setting: " + str(Entry))
                     continue
                 UpdateConfigFile(ConfigFile, Section, Entry, Value)
-                changed = True
-        if changed:
-            Restart()
+                ChangedList.append((ConfigFile, Section, Entry))
+            CommitConfigChanges()
+        if len(ChangedList):
+            ApplyConfigChanges(ChangedList)
     except Exception as e1:
+        RollbackConfigChanges()
         LogErrorLine("Error Update Config File (SaveSettings): " + str(e1))
 
 
+# -------------------------------------------------------------------------------
+# Start a batch of changes to the config files. Changes made by this thread are
+# written when CommitConfigChanges is called, one write per file.
+def BeginConfigChanges():
+
+    for config in ConfigFiles.values():
+        config.Begin()
+
+
+# -------------------------------------------------------------------------------
+def CommitConfigChanges():
+
+    for config in ConfigFiles.values():
+        if not config.Commit():
+            LogError("Error writing config file: " + str(config.FileName))
+
+
+# -------------------------------------------------------------------------------
+def RollbackConfigChanges():
+
+    for config in ConfigFiles.values():
+        config.Rollback()
+
+
 # ---------------------MySupport::UpdateConfigFile-------------------------------
 # Add or update config item
 def UpdateConfigFile(FileName, section, Entry, Value):
@@ -5550,6 +5965,36 @@ def Restart():
     except Exception as e1:
         LogErrorLine("Error in Restart: " + str(e1))
 
+# -------------------------------------------------------------------------------
+# Apply changes to the config files. genmon re-reads genmon.conf and mymail.conf
+# and applies the settings it can change while running. If genmon or genserv
+# must be restarted to use any of the changed settings everything is restarted.
+# ChangedList is a list of (config file, section, entry)
+def ApplyConfigChanges(ChangedList):
+
+    try:
+        for ConfigFile, Section, Entry in ChangedList:
+            if not ConfigFile in [GENMON_CONFIG, MAIL_CONFIG]:
+                Restart()
+                return
+            if (
+                ConfigFile == GENMON_CONFIG
+                and (str(Section).lower(), str(Entry).lower()) in GenservConfigEntries
+            ):
+                # genserv only reads this setting when it starts
+                Restart()
+                return
+        data = MyClientInterface.ProcessMonitorCommand("generator: reload_config")
+        if data.strip().startswith("OK"):
+            LogDebug("Settings applied without restart")
+            return
+        LogError("Restarting to apply settings: " + data.strip())
+        Restart()
+    except Exception as e1:
+        LogErrorLine("Error in ApplyConfigChanges: " + str(e1))
+        Restart()
+
+
 # -------------------------------------------------------------------------------
 # Separate thread to restart so the flask request will return
 def _do_restart():
@@ -7136,6 +7581,8 @@ if __name__ == "__main__":
         LogConsole("Error reading configuraiton file.")
         LogDebug("Error reading configuraiton file.")
         sys.exit(1)
+    # settings genserv reads at startup, changing these requires a restart
+    GenservConfigEntries = set(ConfigFiles[GENMON_CONFIG].AccessedEntries)
 
     for ConfigFile in ConfigFileList:
         ConfigFiles[ConfigFile].log = log
@@ -7180,7 +7627,10 @@ if __name__ == "__main__":
         LogError("Required file missing : genmonmaint.sh")
         sys.exit(1)
 
-    MyClientInterface = ClientInterface(host=address, port=clientport, log=log)
+    # several connections so requests from web clients are not serialized
+    MyClientInterface = ClientInterface(
+        host=address, port=clientport, log=log, pool_size=4
+    )
 
     Start = datetime.datetime.now()
 
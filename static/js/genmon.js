@@ -335,10 +335,13 @@ var Theme = {
    ============================================================ */
 var API = {
   _errs: 0,
-  get: function(cmd, timeout) {
+  /* ifModified: send the ETag of the last response, unchanged data is
+     answered with 304 and done() is called without data */
+  get: function(cmd, timeout, ifModified) {
     return $.ajax({
       url: CFG.baseUrl + cmd, dataType: 'json',
-      timeout: timeout || CFG.ajaxTimeout, cache: false
+      timeout: timeout || CFG.ajaxTimeout, cache: false,
+      ifModified: !!ifModified
     }).done(function() {
       API._errs = 0;
       if (!S.connected) { S.connected = true; UI.connBadge(); }
@@ -730,8 +733,15 @@ var Poll = {
   _st: null, _pt: null, _rt: null,
   start: function() {
     this.stopAll();
+    /* Prefer the live update stream, poll if the server does not support it */
+    if (Stream.start(function() { Poll._startPolling(); })) return;
+    this._startPolling();
+  },
+  _startPolling: function() {
+    clearInterval(this._st);
     this._st = setInterval(function(){ Poll.fetchStatus(); }, CFG.pollMs);
     Poll.fetchStatus();
+    if (S.currentPage) Poll.setPage(S.currentPage);
   },
   stopAll: function() {
     clearInterval(this._st); clearInterval(this._pt); clearInterval(this._rt);
@@ -743,79 +753,97 @@ var Poll = {
     if (page === 'registers') {
       this._rt = setInterval(function(){ Poll.fetchRegs(); }, CFG.regPollMs);
       Poll.fetchRegs();
+    } else if (Pages[page] && Stream.has(Pages[page].cmd)) {
+      /* page data arrives on the stream, show the latest copy now */
+      var d = Stream.data[Pages[page].cmd];
+      if (d !== undefined) { if (Pages[page].update) Pages[page].update(d); }
+      else Poll.fetchPage();
     } else {
       this._pt = setInterval(function(){ Poll.fetchPage(); }, CFG.pagePollMs);
       Poll.fetchPage();
     }
   },
+  /** Called by Stream with the updated data for a topic */
+  onTopic: function(topic, d) {
+    if (topic === 'gui_status_json') Poll.onStatus(d);
+    else if (topic === 'getbase') Poll.onBase(d);
+    else {
+      var p = S.currentPage;
+      if (d && p && Pages[p] && Pages[p].cmd === topic && Pages[p].update) Pages[p].update(d);
+    }
+  },
+  onBase: function(gb) {
+    if (gb) S.getBase = String(gb).replace(/"/g, '').trim().toUpperCase();
+  },
   fetchStatus: function() {
-    API.get('gui_status_json').done(function(d) {
-      if (!d) return;
-      S.baseStatus    = d.basestatus  || 'READY';
-      S.switchState  = d.switchstate || 'Auto';
-      S.engineState  = d.enginestate || '';
-      S.kwOutput     = d.kwOutput    || '0 kW';
-      if (d.RunHours != null) {
-        S.runHours = parseFloat(d.RunHours) || 0;
-        /* Live-fill journal hours field if it's still at default 0 */
-        var $jh = $('#j-hours');
-        if ($jh.length && S.runHours && (!$jh.val() || $jh.val() === '0')) {
-          $jh.val(S.runHours);
-        }
-      }
-      S.altDateFmt   = !!d.AltDateformat;
-      S.updateAvailable = !!d.UpdateAvailable;
-      if (d.Weather) S.weather = d.Weather;
-      UI.statusBadge(S.baseStatus);
-      $('#monitor-time').text(d.MonitorTime || '');
-      UI.updatePill();
+    API.get('gui_status_json', 0, true).done(function(d) {
+      Poll.onStatus(d);
       /* Fetch canonical base status for consistent color mapping */
-      API.get('getbase').done(function(gb) {
-        if (gb) S.getBase = String(gb).replace(/"/g, '').trim().toUpperCase();
-      });
-      /* --- Alert bar: system health + unsent feedback --- */
-      if (d.SystemHealth && d.SystemHealth !== 'OK') {
-        var hl = /thread|dead|log file/i.test(d.SystemHealth) ? 'error' : 'warn';
-        AlertBar.set('health', hl, d.SystemHealth);
-      } else { AlertBar.clear('health'); }
-      if (d.UnsentFeedback && d.UnsentFeedback.toLowerCase() === 'true') {
-        AlertBar.set('feedback', 'info', 'Unknown values detected. Enable Auto Feedback in Settings to help improve the software.');
-      } else { AlertBar.clear('feedback'); }
-      if (d.indicators) UI.indicators(d.indicators);
-      else if (d.tiles || d.SystemHealth) {
-        /* Fallback: derive indicators from tiles + SystemHealth when
-           backend doesn't provide the indicators dict (e.g. upstream genmon) */
-        var ind = {};
-        if (d.tiles) {
-          for (var ti = 0; ti < d.tiles.length; ti++) {
-            var tt = d.tiles[ti], sub = (tt.subtype||'').toLowerCase();
-            if (sub === 'wifi' && tt.value) {
-              ind.wifi = Math.abs(parseFloat(tt.value)) || 0;
-            } else if (sub === 'temperature' && /cpu/i.test(tt.title||'') && tt.value) {
-              ind.cpuTemp = parseFloat(tt.value) || 0;
-            }
+      API.get('getbase').done(Poll.onBase);
+    });
+  },
+  onStatus: function(d) {
+    if (!d) return;
+    S.baseStatus    = d.basestatus  || 'READY';
+    S.switchState  = d.switchstate || 'Auto';
+    S.engineState  = d.enginestate || '';
+    S.kwOutput     = d.kwOutput    || '0 kW';
+    if (d.RunHours != null) {
+      S.runHours = parseFloat(d.RunHours) || 0;
+      /* Live-fill journal hours field if it's still at default 0 */
+      var $jh = $('#j-hours');
+      if ($jh.length && S.runHours && (!$jh.val() || $jh.val() === '0')) {
+        $jh.val(S.runHours);
+      }
+    }
+    S.altDateFmt   = !!d.AltDateformat;
+    S.updateAvailable = !!d.UpdateAvailable;
+    if (d.Weather) S.weather = d.Weather;
+    UI.statusBadge(S.baseStatus);
+    $('#monitor-time').text(d.MonitorTime || '');
+    UI.updatePill();
+    /* --- Alert bar: system health + unsent feedback --- */
+    if (d.SystemHealth && d.SystemHealth !== 'OK') {
+      var hl = /thread|dead|log file/i.test(d.SystemHealth) ? 'error' : 'warn';
+      AlertBar.set('health', hl, d.SystemHealth);
+    } else { AlertBar.clear('health'); }
+    if (d.UnsentFeedback && d.UnsentFeedback.toLowerCase() === 'true') {
+      AlertBar.set('feedback', 'info', 'Unknown values detected. Enable Auto Feedback in Settings to help improve the software.');
+    } else { AlertBar.clear('feedback'); }
+    if (d.indicators) UI.indicators(d.indicators);
+    else if (d.tiles || d.SystemHealth) {
+      /* Fallback: derive indicators from tiles + SystemHealth when
+         backend doesn't provide the indicators dict (e.g. upstream genmon) */
+      var ind = {};
+      if (d.tiles) {
+        for (var ti = 0; ti < d.tiles.length; ti++) {
+          var tt = d.tiles[ti], sub = (tt.subtype||'').toLowerCase();
+          if (sub === 'wifi' && tt.value) {
+            ind.wifi = Math.abs(parseFloat(tt.value)) || 0;
+          } else if (sub === 'temperature' && /cpu/i.test(tt.title||'') && tt.value) {
+            ind.cpuTemp = parseFloat(tt.value) || 0;
           }
         }
-        if (d.SystemHealth) ind.health = d.SystemHealth === 'OK' ? 'ok' : 'warn';
-        UI.indicators(ind);
-      }
-      UI.weatherPill();
-      if (S.currentPage === 'status') {
-        if (d.tiles) Pages._updateGauges(d.tiles);
-        Pages.status._updateInfoTiles(d);
-        Pages.status._updateWeatherTile();
-        /* Auto-show weather tile when data arrives for the first time */
-        if (S.weather && S.weather.length && !Store.get('weatherSeen')) {
-          Store.set('weatherSeen', true);
-          if (!Store.isTileHidden('weather') && !$('[data-tile="weather"]').length) {
-            var $wt = $(Pages.status._weatherTileHtml()).hide();
-            $wt.appendTo($('#tile-grid'));
-            $wt.fadeIn(200);
-            Pages.status._updateWeatherTile();
-          }
+      }
+      if (d.SystemHealth) ind.health = d.SystemHealth === 'OK' ? 'ok' : 'warn';
+      UI.indicators(ind);
+    }
+    UI.weatherPill();
+    if (S.currentPage === 'status') {
+      if (d.tiles) Pages._updateGauges(d.tiles);
+      Pages.status._updateInfoTiles(d);
+      Pages.status._updateWeatherTile();
+      /* Auto-show weather tile when data arrives for the first time */
+      if (S.weather && S.weather.length && !Store.get('weatherSeen')) {
+        Store.set('weatherSeen', true);
+        if (!Store.isTileHidden('weather') && !$('[data-tile="weather"]').length) {
+          var $wt = $(Pages.status._weatherTileHtml()).hide();
+          $wt.appendTo($('#tile-grid'));
+          $wt.fadeIn(200);
+          Pages.status._updateWeatherTile();
         }
       }
-    });
+    }
   },
   fetchPage: function() {
     var p = S.currentPage;
@@ -831,6 +859,67 @@ var Poll = {
   }
 };
 
+/* ============================================================
+   LIVE STREAM — server-sent events from /stream. The server sends
+   the full data for each topic, then only the changed values as
+   {topic, changes: [[path, value], ...]}.
+   ============================================================ */
+var Stream = {
+  es: null, active: false, data: {},
+  topics: ['gui_status_json', 'getbase', 'status_json', 'maint_json', 'outage_json', 'monitor_json'],
+  /** Returns false if the browser has no EventSource, onFail is called if the server has no stream */
+  start: function(onFail) {
+    if (!window.EventSource) return false;
+    var self = this;
+    try {
+      this.es = new EventSource('/stream?topics=' + this.topics.join(','));
+    } catch (e) { return false; }
+    this.es.onopen = function() {
+      self.active = true;
+      if (!S.connected) { S.connected = true; UI.connBadge(); }
+    };
+    this.es.onmessage = function(ev) {
+      var m;
+      try { m = JSON.parse(ev.data); } catch (e) { return; }
+      if (!m || !m.topic) return;
+      if (m.full) self.data[m.topic] = m.data;
+      else if (self.data[m.topic] !== undefined) self.data[m.topic] = self._apply(self.data[m.topic], m.changes || []);
+      else return;
+      Poll.onTopic(m.topic, self.data[m.topic]);
+    };
+    this.es.onerror = function() {
+      if (self.es.readyState === EventSource.CLOSED) {
+        /* not supported (or login required): fall back to polling */
+        var wasActive = self.active;
+        self.stop();
+        if (wasActive && S.connected) { S.connected = false; UI.connBadge(); }
+        onFail();
+      } else if (S.connected) {
+        /* the browser reconnects on its own */
+        S.connected = false; UI.connBadge();
+      }
+    };
+    return true;
+  },
+  stop: function() {
+    if (this.es) this.es.close();
+    this.es = null; this.active = false; this.data = {};
+  },
+  has: function(topic) {
+    return !!this.es && this.topics.indexOf(topic) >= 0;
+  },
+  _apply: function(d, changes) {
+    for (var i = 0; i < changes.length; i++) {
+      var path = changes[i][0], val = changes[i][1];
+      if (!path.length) { d = val; continue; }
+      var node = d;
+      for (var j = 0; j < path.length - 1; j++) node = node[path[j]];
+      node[path[path.length - 1]] = val;
+    }
+    return d;
+  }
+};
+
 /* ============================================================
    ALERT BAR  — non-blocking system warnings
    ============================================================ */
@@ -2802,6 +2891,10 @@ var Pages = {
           label:'kW', data:[], borderColor:'#3b82f6',
           backgroundColor:'rgba(59,130,246,.1)', tension:0, fill:true,
           pointRadius:3, pointBackgroundColor:'#3b82f6', pointBorderColor:'#3b82f6'
+        },{
+          /* peak of each interval when the history is summarized (rollup) */
+          label:'max kW', data:[], borderColor:'rgba(59,130,246,.5)', borderDash:[4,3],
+          borderWidth:1, tension:0, fill:false, pointRadius:0
         }]},
         options:{
           responsive:true, maintainAspectRatio:false,
@@ -2851,8 +2944,12 @@ var Pages = {
         }
       });
     },
-    _fetchChartData: function() {
-      API.get('power_log_json?power_log_json=43200', 20000).done(function(d) {
+    _fetchChartData: function(mins) {
+      /* The 30 day history is fetched once and filtered per range. If the log
+         is large genmon returns summarized rows [time, avg, min, max], then
+         shorter ranges are fetched on their own for more detail. */
+      var range = mins || 43200;
+      API.get('power_log_json?power_log_json=' + range, 20000).done(function(d) {
         if (!d || !Array.isArray(d)) return;
         /* Parse once — data arrives newest-first; build chronological array */
         var parsed = [];
@@ -2875,25 +2972,33 @@ var Pages = {
               }
             }
           } catch(e) {}
-          parsed.push({ raw: raw, val: val, date: dt });
+          parsed.push({ raw: raw, val: val, date: dt, max: p.length > 3 ? parseFloat(p[3]) : null });
+        }
+        if (range !== 43200) {
+          Pages.status._loadChart(range, parsed);
+          return;
         }
         S.chartRawData = parsed;
-        var $active = $('#tile-grid .chart-btn.active');
-        var mins = $active.length ? $active.data('mins') : 43200;
-        Pages.status._loadChart(mins);
+        S.chartRollup = parsed.length > 0 && parsed[0].max !== null;
+        var $active = $('#tile-grid .chart-btn:not([data-sensor]).active');
+        var active = $active.length ? $active.data('mins') : 43200;
+        Pages.status._loadChart(active);
       });
     },
-    _loadChart: function(mins) {
-      var data = S.chartRawData;
+    _loadChart: function(mins, parsed) {
+      if (!parsed && S.chartRollup && mins < 43200) { this._fetchChartData(mins); return; }
+      var data = parsed || S.chartRawData;
       if (!S.chart || !data) return;
       var now = this._chartNow();
       var cutoff = new Date(now.getTime() - mins * 60000);
       var points = [];
+      var maxPoints = [];
       for (var i = 0; i < data.length; i++) {
         var p = data[i];
         if (!p.date) continue;
         if (p.date < cutoff) continue;
         points.push({x: p.date.getTime(), y: p.val});
+        if (p.max !== null && !isNaN(p.max)) maxPoints.push({x: p.date.getTime(), y: p.max});
       }
       /* No data in range: flat line at last known value (usually 0) */
       if (!points.length && data.length) {
@@ -2919,6 +3024,7 @@ var Pages = {
       S.chart.options.scales.x.min = cutoff.getTime();
       S.chart.options.scales.x.max = now.getTime();
       S.chart.data.datasets[0].data = points;
+      if (S.chart.data.datasets[1]) S.chart.data.datasets[1].data = maxPoints;
       S.chart.update();
     },
 
@@ -2961,6 +3067,12 @@ var Pages = {
           label:'°', data:[], borderColor:'#f59e0b',
           backgroundColor:'rgba(245,158,11,.1)', tension:0, fill:true,
           pointRadius:0, pointBackgroundColor:'#f59e0b', pointBorderColor:'#f59e0b'
+        },{
+          label:'min', data:[], borderColor:'rgba(245,158,11,.5)', borderDash:[4,3],
+          borderWidth:1, tension:0, fill:false, pointRadius:0
+        },{
+          label:'max', data:[], borderColor:'rgba(245,158,11,.5)', borderDash:[4,3],
+          borderWidth:1, tension:0, fill:false, pointRadius:0
         }]},
         options:{
           responsive:true, maintainAspectRatio:false,
@@ -3037,7 +3149,9 @@ var Pages = {
               }
             }
           } catch(e) {}
-          parsed.push({ raw: raw, val: val, date: dt });
+          parsed.push({ raw: raw, val: val, date: dt,
+                        min: p.length > 3 ? parseFloat(p[2]) : null,
+                        max: p.length > 3 ? parseFloat(p[3]) : null });
         }
         self._loadTempChart(sensorName, mins, parsed);
       });
@@ -3050,10 +3164,15 @@ var Pages = {
       var now = this._chartNow();
       var cutoff = new Date(now.getTime() - mins * 60000);
       var points = [];
+      var minPoints = [];
+      var maxPoints = [];
       for (var i = 0; i < parsed.length; i++) {
         var p = parsed[i];
         if (!p.date) continue;
         points.push({x: p.date.getTime(), y: p.val});
+        /* summarized history, show the range of each interval */
+        if (p.min !== null && !isNaN(p.min)) minPoints.push({x: p.date.getTime(), y: p.min});
+        if (p.max !== null && !isNaN(p.max)) maxPoints.push({x: p.date.getTime(), y: p.max});
       }
       if (!points.length) {
         points = [{x: cutoff.getTime(), y: 0}, {x: now.getTime(), y: 0}];
@@ -3069,6 +3188,10 @@ var Pages = {
       entry.chart.options.scales.x.min = cutoff.getTime();
       entry.chart.options.scales.x.max = now.getTime();
       entry.chart.data.datasets[0].data = points;
+      if (entry.chart.data.datasets.length > 2) {
+        entry.chart.data.datasets[1].data = minPoints;
+        entry.chart.data.datasets[2].data = maxPoints;
+      }
       entry.chart.update();
     },
 
@@ -37,8 +37,8 @@ self.addEventListener('fetch', event => {
   if (req.mode === 'navigate' || req.destination === 'document') return;
 
   const url = new URL(req.url);
-  // API calls and dynamic content: network only, never cache.
-  if (url.pathname.startsWith('/cmd/') || url.pathname.startsWith('/api/')) return;
+  // API calls, live update stream and dynamic content: network only, never cache.
+  if (url.pathname.startsWith('/cmd/') || url.pathname.startsWith('/api/') || url.pathname === '/stream') return;
 
   // Network-first for static assets: always try a fresh copy, and fall back to
   // the cache only when the network is unavailable (offline resilience).